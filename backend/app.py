@@ -1,17 +1,52 @@
-from flask import Flask, request, redirect, render_template, jsonify, session, flash
+from flask import Flask, request, redirect, render_template, jsonify, session, flash, Response, stream_with_context
 import os
 from flask_cors import CORS
 from flask_socketio import SocketIO, emit
-from kiteconnect import KiteConnect
 import logging
+import multiprocessing
 import random
 import time
 from threading import Thread, Lock
-from typing import Dict, List, Tuple, Any, Optional
+from typing import Dict, Iterator, List, NamedTuple, Tuple, Any, Optional
 from strategies.orb import ORB
 from strategies.capture_mountain_signal import CaptureMountainSignal
 from rules import load_mountain_signal_pe_rules
 from ticker import Ticker
+from strategy_executor import get_strategy_executor
+from strategy_stream import get_strategy_streams
+from tick_dispatcher import StrategyRegistry
+from tick_writer import get_tick_writer
+from update_emitter import get_update_emitter
+from tick_journal import get_tick_journal, read_legacy_ticks, records_to_ticks
+from audit_sink import get_audit_sink
+from instrument_master import get_instrument_master
+from price_board import get_price_board
+from backtest_jobs import JobCancelled, JobLimitExceeded, ProgressCallback, dump_result, get_job_manager
+from result_cache import get_result_cache, is_complete_result
+from option_pricing import BlackScholesModel, get_premium_model
+from mountain_signal_stream import MountainSignalStream, format_option_trade, format_trade, to_ndjson
+from mountain_signal_engine import (
+    RSI_OVERBOUGHT,
+    RSI_OVERSOLD,
+    round_to_atm_price,
+    run_mountain_signal_on_frame,
+    scan_records,
+    square_off_mask,
+)
+from mountain_signal_optimizer import (
+    OBJECTIVES as OPTIMIZER_OBJECTIVES,
+    build_grid,
+    candle_block,
+    get_signal_timeline,
+    get_timeline_cache,
+    is_grid_request,
+    normalise_stop_loss,
+    normalise_target,
+    pareto_front,
+    rank_rows,
+    run_grid,
+    timeline_data_key,
+)
 import uuid
 import sqlite3
 import smtplib, ssl
@@ -21,7 +56,13 @@ import datetime
 import calendar
 import secrets
 import config
+if config.USE_FAKE_KITE:
+    from fake_kite import FakeKiteConnect as KiteConnect
+else:
+    from kiteconnect import KiteConnect
 from database import get_db_connection
+from candle_store import get_candle_store, get_historical_candles
+from trading_calendar import previous_trading_day, trading_days
 from live_trade import (
     ensure_live_trade_tables,
     create_deployment as live_create_deployment,
@@ -61,12 +102,6 @@ import numpy as np
 import torch
 
 
-def round_to_atm_price(price: float, strike_step: int) -> int:
-    if strike_step == 0:
-        return int(price)
-    return int(round(float(price) / strike_step) * strike_step)
-
-
 def ensure_datetime(value: Any) -> datetime.datetime:
     if isinstance(value, datetime.datetime):
         return value
@@ -94,24 +129,7 @@ def _parse_iso_date(value: Optional[str]) -> Optional[datetime.date]:
 
 
 def _fetch_candles_for_range(instrument_token: int, start_date: datetime.date, end_date: datetime.date, interval: str = "5minute") -> List[Dict[str, Any]]:
-    candles: List[Dict[str, Any]] = []
-    current_date = start_date
-    total_days = (end_date - start_date).days + 1
-    processed = 0
-    while current_date <= end_date:
-        start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-        end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-        try:
-            hist = kite.historical_data(instrument_token, start_dt, end_dt, interval)
-            if hist:
-                candles.extend(hist)
-        except Exception as exc:
-            logging.warning(f"[RL] Historical fetch failed for {current_date}: {exc}")
-        current_date += datetime.timedelta(days=1)
-        processed += 1
-        if processed % 50 == 0 or current_date > end_date:
-            logging.info(f"[RL] Fetch progress: {processed}/{total_days} days, candles collected: {len(candles)}")
-    return candles
+    return get_historical_candles(kite, instrument_token, start_date, end_date, interval, log_tag="RL")
 
 
 def compute_drawdown_metrics(trades: List[Dict[str, Any]], initial_capital: float) -> Tuple[float, float, float]:
@@ -145,571 +163,24 @@ def compute_drawdown_metrics(trades: List[Dict[str, Any]], initial_capital: floa
     return max_drawdown_abs, max_drawdown_percent, roi_percent
 
 
-def get_option_symbol_from_components(instrument_key: str, strike: int, option_type: str, candle_date: Any) -> str:
-    dt_obj = ensure_datetime(candle_date)
-    year = dt_obj.year % 100
-    month_names = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
-    month = month_names[dt_obj.month - 1]
-    strike_int = int(strike)
-    return f"{instrument_key}{year:02d}{month}{strike_int}{option_type}"
-
-
-def simulate_option_premium(index_price: float, strike: float, option_type: str) -> float:
-    distance = abs(index_price - strike)
-    premium = 100.0
-    if option_type.upper() == 'PE':
-        premium += distance * 0.5 if strike > index_price else -distance * 0.3
-    else:
-        premium += distance * 0.5 if strike < index_price else -distance * 0.3
-    return max(10.0, premium)
-
-
 def run_mountain_signal_strategy_on_dataframe(
     df: 'pd.DataFrame',
     instrument_key: str,
     lot_size_value: int,
     strike_step: int,
     stop_loss_percent: float,
-    target_percent: float
+    target_percent: float,
+    premium_model: Optional[BlackScholesModel] = None
 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
-    trades: List[Dict[str, Any]] = []
-    option_trades: List[Dict[str, Any]] = []
-    trade_placed = False
-    position = 0
-    entry_price = 0.0
-    pe_signal_candle = None
-    ce_signal_candle = None
-    signal_candles_with_entry: set = set()
-    pe_signal_price_above_low = False
-    ce_signal_price_below_high = False
-    consecutive_candles_for_target = 0
-    last_candle_high_less_than_ema = False
-    last_candle_low_greater_than_ema = False
-    active_trade_signal_candle = None
-    option_trade_sequence = 0
-    active_option_trade = None
-
-    for i in range(1, len(df)):
-        current_candle = df.iloc[i]
-        previous_candle = df.iloc[i - 1]
-        current_ema = current_candle['ema']
-        previous_ema = previous_candle['ema']
-        previous_rsi = df.iloc[i - 1]['rsi14'] if 'rsi14' in df.columns else None
-
-        if previous_candle['low'] > previous_ema:
-            if previous_rsi is not None and previous_rsi > 70:
-                if pe_signal_candle is not None:
-                    pe_signal_price_above_low = False
-                    if 'index' in pe_signal_candle:
-                        signal_candles_with_entry.discard(pe_signal_candle['index'])
-                pe_signal_candle = {
-                    'date': previous_candle['date'],
-                    'high': previous_candle['high'],
-                    'low': previous_candle['low'],
-                    'index': i - 1
-                }
-                ce_signal_candle = None
-
-        if previous_candle['high'] < previous_ema:
-            if previous_rsi is not None and previous_rsi < 30:
-                if ce_signal_candle is not None:
-                    ce_signal_price_below_high = False
-                    if 'index' in ce_signal_candle:
-                        signal_candles_with_entry.discard(ce_signal_candle['index'])
-                ce_signal_candle = {
-                    'date': previous_candle['date'],
-                    'high': previous_candle['high'],
-                    'low': previous_candle['low'],
-                    'index': i - 1
-                }
-                pe_signal_candle = None
-
-        if pe_signal_candle is not None and not trade_placed and not pe_signal_price_above_low:
-            if current_candle['high'] > pe_signal_candle['low']:
-                pe_signal_price_above_low = True
-
-        if ce_signal_candle is not None and not trade_placed and not ce_signal_price_below_high:
-            if current_candle['low'] < ce_signal_candle['high']:
-                ce_signal_price_below_high = True
-
-        if not trade_placed:
-            if pe_signal_candle is not None and current_candle['close'] < pe_signal_candle['low']:
-                signal_candle_index = pe_signal_candle['index']
-                is_first_entry = signal_candle_index not in signal_candles_with_entry
-                entry_allowed = is_first_entry or pe_signal_price_above_low
-
-                if entry_allowed:
-                    trade_placed = True
-                    position = -1
-                    entry_price = current_candle['close']
-                    signal_candles_with_entry.add(signal_candle_index)
-                    pe_signal_price_above_low = False
-                    active_trade_signal_candle = {
-                        'high': pe_signal_candle['high'],
-                        'low': pe_signal_candle['low'],
-                        'type': 'PE'
-                    }
-                    trade_record = {
-                        'signal_time': pe_signal_candle['date'],
-                        'signal_type': 'PE',
-                        'signal_high': pe_signal_candle['high'],
-                        'signal_low': pe_signal_candle['low'],
-                        'entry_time': current_candle['date'],
-                        'entry_price': entry_price,
-                        'exit_time': None,
-                        'exit_price': None,
-                        'exit_type': None,
-                        'pnl': None,
-                        'pnl_percent': None,
-                        'date': current_candle['date'].date() if isinstance(current_candle['date'], datetime.datetime) else current_candle['date'],
-                        'lot_size': lot_size_value,
-                        'option_trade_id': None,
-                        'option_symbol': None,
-                        'option_entry_price': None,
-                        'stop_loss_price': None,
-                        'target_price': None,
-                        'option_exit_price': None
-                    }
-                    trades.append(trade_record)
-                    consecutive_candles_for_target = 0
-                    last_candle_high_less_than_ema = False
-
-                    trade_index = len(trades) - 1
-                    trade_date_value = trades[trade_index]['date']
-                    atm_strike = round_to_atm_price(entry_price, strike_step)
-                    option_symbol = get_option_symbol_from_components(instrument_key, atm_strike, 'PE', current_candle['date'])
-                    option_entry_price = simulate_option_premium(entry_price, atm_strike, 'PE')
-                    stop_loss_price_abs = round(option_entry_price * (1 + stop_loss_percent), 2)
-                    target_price_abs = round(option_entry_price * (1 + target_percent), 2)
-
-                    option_trade = {
-                        'id': option_trade_sequence,
-                        'index_trade_index': trade_index,
-                        'signal_time': pe_signal_candle['date'],
-                        'signal_type': 'PE',
-                        'signal_high': float(pe_signal_candle['high']),
-                        'signal_low': float(pe_signal_candle['low']),
-                        'entry_time': current_candle['date'],
-                        'index_at_entry': float(entry_price),
-                        'atm_strike': float(atm_strike),
-                        'option_symbol': option_symbol,
-                        'option_entry_price': float(option_entry_price),
-                        'stop_loss_price': float(stop_loss_price_abs),
-                        'target_price': float(target_price_abs),
-                        'option_exit_price': None,
-                        'exit_time': None,
-                        'exit_type': None,
-                        'pnl': None,
-                        'pnl_percent': None,
-                        'status': 'open',
-                        'lot_size': lot_size_value,
-                        'date': trade_date_value
-                    }
-                    option_trades.append(option_trade)
-                    option_trade_sequence += 1
-                    trades[trade_index]['option_trade_id'] = option_trade['id']
-                    trades[trade_index]['option_symbol'] = option_symbol
-                    trades[trade_index]['option_entry_price'] = float(option_entry_price)
-                    trades[trade_index]['stop_loss_price'] = float(stop_loss_price_abs)
-                    trades[trade_index]['target_price'] = float(target_price_abs)
-                    active_option_trade = option_trade
-
-            elif ce_signal_candle is not None and current_candle['close'] > ce_signal_candle['high']:
-                signal_candle_index = ce_signal_candle['index']
-                is_first_entry = signal_candle_index not in signal_candles_with_entry
-                entry_allowed = is_first_entry or ce_signal_price_below_high
-
-                if entry_allowed:
-                    trade_placed = True
-                    position = 1
-                    entry_price = current_candle['close']
-                    signal_candles_with_entry.add(signal_candle_index)
-                    ce_signal_price_below_high = False
-                    active_trade_signal_candle = {
-                        'high': ce_signal_candle['high'],
-                        'low': ce_signal_candle['low'],
-                        'type': 'CE'
-                    }
-                    trade_record = {
-                        'signal_time': ce_signal_candle['date'],
-                        'signal_type': 'CE',
-                        'signal_high': ce_signal_candle['high'],
-                        'signal_low': ce_signal_candle['low'],
-                        'entry_time': current_candle['date'],
-                        'entry_price': entry_price,
-                        'exit_time': None,
-                        'exit_price': None,
-                        'exit_type': None,
-                        'pnl': None,
-                        'pnl_percent': None,
-                        'date': current_candle['date'].date() if isinstance(current_candle['date'], datetime.datetime) else current_candle['date'],
-                        'lot_size': lot_size_value,
-                        'option_trade_id': None,
-                        'option_symbol': None,
-                        'option_entry_price': None,
-                        'stop_loss_price': None,
-                        'target_price': None,
-                        'option_exit_price': None
-                    }
-                    trades.append(trade_record)
-                    consecutive_candles_for_target = 0
-                    last_candle_low_greater_than_ema = False
-
-                    trade_index = len(trades) - 1
-                    trade_date_value = trades[trade_index]['date']
-                    atm_strike = round_to_atm_price(entry_price, strike_step)
-                    option_symbol = get_option_symbol_from_components(instrument_key, atm_strike, 'CE', current_candle['date'])
-                    option_entry_price = simulate_option_premium(entry_price, atm_strike, 'CE')
-                    stop_loss_price_abs = round(option_entry_price * (1 + stop_loss_percent), 2)
-                    target_price_abs = round(option_entry_price * (1 + target_percent), 2)
-
-                    option_trade = {
-                        'id': option_trade_sequence,
-                        'index_trade_index': trade_index,
-                        'signal_time': ce_signal_candle['date'],
-                        'signal_type': 'CE',
-                        'signal_high': float(ce_signal_candle['high']),
-                        'signal_low': float(ce_signal_candle['low']),
-                        'entry_time': current_candle['date'],
-                        'index_at_entry': float(entry_price),
-                        'atm_strike': float(atm_strike),
-                        'option_symbol': option_symbol,
-                        'option_entry_price': float(option_entry_price),
-                        'stop_loss_price': float(stop_loss_price_abs),
-                        'target_price': float(target_price_abs),
-                        'option_exit_price': None,
-                        'exit_time': None,
-                        'exit_type': None,
-                        'pnl': None,
-                        'pnl_percent': None,
-                        'status': 'open',
-                        'lot_size': lot_size_value,
-                        'date': trade_date_value
-                    }
-                    option_trades.append(option_trade)
-                    option_trade_sequence += 1
-                    trades[trade_index]['option_trade_id'] = option_trade['id']
-                    trades[trade_index]['option_symbol'] = option_symbol
-                    trades[trade_index]['option_entry_price'] = float(option_entry_price)
-                    trades[trade_index]['stop_loss_price'] = float(stop_loss_price_abs)
-                    trades[trade_index]['target_price'] = float(target_price_abs)
-                    active_option_trade = option_trade
-
-        elif trade_placed:
-            candle_time_obj = current_candle['date']
-            if isinstance(candle_time_obj, datetime.datetime):
-                candle_time_check = candle_time_obj.time()
-            else:
-                candle_time_check = datetime.datetime.now().time()
-
-            current_trade_index = len(trades) - 1
-            current_trade = trades[current_trade_index] if current_trade_index >= 0 else None
-
-            linked_option_trade = None
-            option_exit_price = None
-            option_exit_type = None
-            if active_option_trade and current_trade and current_trade.get('option_trade_id') == active_option_trade.get('id'):
-                linked_option_trade = active_option_trade
-                option_exit_price = simulate_option_premium(
-                    current_candle['close'],
-                    linked_option_trade['atm_strike'],
-                    linked_option_trade['signal_type']
-                )
-                if option_exit_price <= linked_option_trade['stop_loss_price']:
-                    option_exit_type = 'OPTION_STOP_LOSS'
-                elif option_exit_price >= linked_option_trade['target_price']:
-                    option_exit_type = 'OPTION_TARGET'
-
-            if option_exit_type and current_trade:
-                lot_size_for_trade = current_trade.get('lot_size', lot_size_value)
-                entry_price_value = current_trade['entry_price']
-                exit_price_value = current_candle['close']
-                if position == -1:
-                    pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                    pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                else:
-                    pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                    pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-
-                current_trade['exit_time'] = current_candle['date']
-                current_trade['exit_price'] = exit_price_value
-                current_trade['exit_type'] = option_exit_type
-                current_trade['pnl'] = pnl_val
-                current_trade['pnl_percent'] = pnl_percent_val
-                current_trade['option_exit_price'] = option_exit_price
-
-                if linked_option_trade:
-                    entry_opt_price = linked_option_trade.get('option_entry_price')
-                    lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                    linked_option_trade['option_exit_price'] = option_exit_price
-                    linked_option_trade['exit_time'] = current_candle['date']
-                    linked_option_trade['exit_type'] = option_exit_type
-                    if entry_opt_price:
-                        linked_option_trade['pnl'] = (option_exit_price - entry_opt_price) * lot_size_opt
-                        linked_option_trade['pnl_percent'] = ((option_exit_price - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                    linked_option_trade['status'] = 'closed'
-                    active_option_trade = None
-
-                trade_placed = False
-                position = 0
-                active_trade_signal_candle = None
-                consecutive_candles_for_target = 0
-                if current_trade['signal_type'] == 'PE':
-                    pe_signal_price_above_low = False
-                    last_candle_high_less_than_ema = False
-                else:
-                    ce_signal_price_below_high = False
-                    last_candle_low_greater_than_ema = False
-                continue
-
-            if current_trade:
-                market_close_square_off_time = datetime.time(15, 15)
-                if market_close_square_off_time <= candle_time_check < datetime.time(15, 30):
-                    lot_size_for_trade = current_trade.get('lot_size', lot_size_value)
-                    entry_price_value = current_trade['entry_price']
-                    exit_price_value = current_candle['close']
-                    if position == -1:
-                        pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                    else:
-                        pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-
-                    option_exit_price_mc = None
-                    if linked_option_trade:
-                        option_exit_price_mc = simulate_option_premium(
-                            current_candle['close'],
-                            linked_option_trade['atm_strike'],
-                            linked_option_trade['signal_type']
-                        )
-                        entry_opt_price = linked_option_trade.get('option_entry_price')
-                        lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                        linked_option_trade['option_exit_price'] = option_exit_price_mc
-                        linked_option_trade['exit_time'] = current_candle['date']
-                        linked_option_trade['exit_type'] = 'MARKET_CLOSE'
-                        if entry_opt_price:
-                            linked_option_trade['pnl'] = (option_exit_price_mc - entry_opt_price) * lot_size_opt
-                            linked_option_trade['pnl_percent'] = ((option_exit_price_mc - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                        linked_option_trade['status'] = 'closed'
-                        active_option_trade = None
-
-                    current_trade['exit_time'] = current_candle['date']
-                    current_trade['exit_price'] = exit_price_value
-                    current_trade['exit_type'] = 'MKT_CLOSE'
-                    current_trade['pnl'] = pnl_val
-                    current_trade['pnl_percent'] = pnl_percent_val
-                    current_trade['option_exit_price'] = option_exit_price_mc
-
-                    trade_placed = False
-                    position = 0
-                    active_trade_signal_candle = None
-                    consecutive_candles_for_target = 0
-                    if current_trade['signal_type'] == 'PE':
-                        pe_signal_price_above_low = False
-                        last_candle_high_less_than_ema = False
-                    else:
-                        ce_signal_price_below_high = False
-                        last_candle_low_greater_than_ema = False
-                    continue
-
-            if position == -1 and active_trade_signal_candle is not None and active_trade_signal_candle['type'] == 'PE':
-                lot_size_for_trade = current_trade.get('lot_size', lot_size_value) if current_trade else lot_size_value
-                entry_price_value = current_trade['entry_price'] if current_trade else 0
-
-                if current_candle['close'] > active_trade_signal_candle['high']:
-                    exit_price_value = current_candle['close']
-                    pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                    pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                    option_exit_price_idx = None
-                    if linked_option_trade:
-                        option_exit_price_idx = simulate_option_premium(
-                            current_candle['close'],
-                            linked_option_trade['atm_strike'],
-                            linked_option_trade['signal_type']
-                        )
-                        entry_opt_price = linked_option_trade.get('option_entry_price')
-                        lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                        linked_option_trade['option_exit_price'] = option_exit_price_idx
-                        linked_option_trade['exit_time'] = current_candle['date']
-                        linked_option_trade['exit_type'] = 'INDEX_STOP'
-                        if entry_opt_price:
-                            linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                            linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                        linked_option_trade['status'] = 'closed'
-                        active_option_trade = None
-
-                    current_trade['exit_time'] = current_candle['date']
-                    current_trade['exit_price'] = exit_price_value
-                    current_trade['exit_type'] = 'INDEX_STOP'
-                    current_trade['pnl'] = pnl_val
-                    current_trade['pnl_percent'] = pnl_percent_val
-                    current_trade['option_exit_price'] = option_exit_price_idx
-                    trade_placed = False
-                    position = 0
-                    active_trade_signal_candle = None
-                    pe_signal_price_above_low = False
-                    consecutive_candles_for_target = 0
-                    last_candle_high_less_than_ema = False
-                elif current_candle['high'] < current_ema:
-                    last_candle_high_less_than_ema = True
-                    consecutive_candles_for_target = 0
-                elif last_candle_high_less_than_ema and current_candle['close'] > current_ema:
-                    consecutive_candles_for_target += 1
-                    if consecutive_candles_for_target >= 2:
-                        exit_price_value = current_candle['close']
-                        pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                        option_exit_price_idx = None
-                        if linked_option_trade:
-                            option_exit_price_idx = simulate_option_premium(
-                                current_candle['close'],
-                                linked_option_trade['atm_strike'],
-                                linked_option_trade['signal_type']
-                            )
-                            entry_opt_price = linked_option_trade.get('option_entry_price')
-                            lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                            linked_option_trade['option_exit_price'] = option_exit_price_idx
-                            linked_option_trade['exit_time'] = current_candle['date']
-                            linked_option_trade['exit_type'] = 'INDEX_TARGET'
-                            if entry_opt_price:
-                                linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                                linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                            linked_option_trade['status'] = 'closed'
-                            active_option_trade = None
-
-                        current_trade['exit_time'] = current_candle['date']
-                        current_trade['exit_price'] = exit_price_value
-                        current_trade['exit_type'] = 'INDEX_TARGET'
-                        current_trade['pnl'] = pnl_val
-                        current_trade['pnl_percent'] = pnl_percent_val
-                        current_trade['option_exit_price'] = option_exit_price_idx
-                        trade_placed = False
-                        position = 0
-                        active_trade_signal_candle = None
-                        pe_signal_price_above_low = False
-                        consecutive_candles_for_target = 0
-                        last_candle_high_less_than_ema = False
-
-            elif position == 1 and active_trade_signal_candle is not None and active_trade_signal_candle['type'] == 'CE':
-                lot_size_for_trade = current_trade.get('lot_size', lot_size_value) if current_trade else lot_size_value
-                entry_price_value = current_trade['entry_price'] if current_trade else 0
-
-                if current_candle['close'] < active_trade_signal_candle['low']:
-                    exit_price_value = current_candle['close']
-                    pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                    pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                    option_exit_price_idx = None
-                    if linked_option_trade:
-                        option_exit_price_idx = simulate_option_premium(
-                            current_candle['close'],
-                            linked_option_trade['atm_strike'],
-                            linked_option_trade['signal_type']
-                        )
-                        entry_opt_price = linked_option_trade.get('option_entry_price')
-                        lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                        linked_option_trade['option_exit_price'] = option_exit_price_idx
-                        linked_option_trade['exit_time'] = current_candle['date']
-                        linked_option_trade['exit_type'] = 'INDEX_STOP'
-                        if entry_opt_price:
-                            linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                            linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                        linked_option_trade['status'] = 'closed'
-                        active_option_trade = None
-
-                    current_trade['exit_time'] = current_candle['date']
-                    current_trade['exit_price'] = exit_price_value
-                    current_trade['exit_type'] = 'INDEX_STOP'
-                    current_trade['pnl'] = pnl_val
-                    current_trade['pnl_percent'] = pnl_percent_val
-                    current_trade['option_exit_price'] = option_exit_price_idx
-                    trade_placed = False
-                    position = 0
-                    active_trade_signal_candle = None
-                    ce_signal_price_below_high = False
-                    consecutive_candles_for_target = 0
-                    last_candle_low_greater_than_ema = False
-                elif current_candle['low'] > current_ema:
-                    last_candle_low_greater_than_ema = True
-                    consecutive_candles_for_target = 0
-                elif last_candle_low_greater_than_ema and current_candle['close'] < current_ema:
-                    consecutive_candles_for_target += 1
-                    if consecutive_candles_for_target >= 2:
-                        exit_price_value = current_candle['close']
-                        pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                        option_exit_price_idx = None
-                        if linked_option_trade:
-                            option_exit_price_idx = simulate_option_premium(
-                                current_candle['close'],
-                                linked_option_trade['atm_strike'],
-                                linked_option_trade['signal_type']
-                            )
-                            entry_opt_price = linked_option_trade.get('option_entry_price')
-                            lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                            linked_option_trade['option_exit_price'] = option_exit_price_idx
-                            linked_option_trade['exit_time'] = current_candle['date']
-                            linked_option_trade['exit_type'] = 'INDEX_TARGET'
-                            if entry_opt_price:
-                                linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                                linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                            linked_option_trade['status'] = 'closed'
-                            active_option_trade = None
-
-                        current_trade['exit_time'] = current_candle['date']
-                        current_trade['exit_price'] = exit_price_value
-                        current_trade['exit_type'] = 'INDEX_TARGET'
-                        current_trade['pnl'] = pnl_val
-                        current_trade['pnl_percent'] = pnl_percent_val
-                        current_trade['option_exit_price'] = option_exit_price_idx
-                        trade_placed = False
-                        position = 0
-                        active_trade_signal_candle = None
-                        ce_signal_price_below_high = False
-                        consecutive_candles_for_target = 0
-                        last_candle_low_greater_than_ema = False
-
-    if trade_placed and trades:
-        last_trade = trades[-1]
-        last_candle = df.iloc[-1]
-        exit_price_value = last_candle['close']
-        lot_size_for_trade = last_trade.get('lot_size', lot_size_value)
-        entry_price_value = last_trade['entry_price']
-        if position == -1:
-            pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-            pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-        else:
-            pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-            pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-
-        option_exit_price_forced = None
-        if active_option_trade and last_trade.get('option_trade_id') == active_option_trade.get('id'):
-            option_exit_price_forced = simulate_option_premium(
-                exit_price_value,
-                active_option_trade['atm_strike'],
-                active_option_trade['signal_type']
-            )
-            entry_opt_price = active_option_trade.get('option_entry_price')
-            lot_size_opt = active_option_trade.get('lot_size', lot_size_for_trade)
-            active_option_trade['option_exit_price'] = option_exit_price_forced
-            active_option_trade['exit_time'] = last_candle['date']
-            active_option_trade['exit_type'] = 'FORCED_CLOSE'
-            if entry_opt_price:
-                active_option_trade['pnl'] = (option_exit_price_forced - entry_opt_price) * lot_size_opt
-                active_option_trade['pnl_percent'] = ((option_exit_price_forced - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-            active_option_trade['status'] = 'closed'
-            active_option_trade = None
-
-        last_trade['exit_time'] = last_candle['date']
-        last_trade['exit_price'] = exit_price_value
-        last_trade['exit_type'] = 'FORCED_CLOSE'
-        last_trade['pnl'] = pnl_val
-        last_trade['pnl_percent'] = pnl_percent_val
-        last_trade['option_exit_price'] = option_exit_price_forced
-
-    if active_option_trade and active_option_trade.get('status') != 'closed':
-        active_option_trade['status'] = 'open'
-
-    return trades, option_trades
+    return run_mountain_signal_on_frame(
+        df,
+        instrument_key=instrument_key,
+        lot_size=lot_size_value,
+        strike_step=strike_step,
+        stop_loss_percent=stop_loss_percent,
+        target_percent=target_percent,
+        premium_model=premium_model
+    )
 
 
 def aggregate_trades_by_period(trades: List[Dict[str, Any]], period: str) -> List[Dict[str, Any]]:
@@ -1280,7 +751,9 @@ scheduler = BackgroundScheduler()
 scheduler.add_job(func=start_data_collection, trigger="cron", day_of_week='mon-fri', hour=9, minute=15)
 scheduler.add_job(func=stop_data_collection, trigger="cron", day_of_week='mon-fri', hour=15, minute=30)
 scheduler.add_job(func=process_live_trade_deployments, trigger="interval", seconds=30, max_instances=1)
-scheduler.start()
+# Spawned optimizer / backtest job processes re-import this module; only the server process runs the scheduler
+if multiprocessing.parent_process() is None:
+    scheduler.start()
 
 @app.before_request
 def make_session_permanent():
@@ -1319,9 +792,11 @@ def not_found(error):
 
 # Initialize KiteConnect
 kite = KiteConnect(api_key="default_api_key") # The API key will be set dynamically
+if config.USE_FAKE_KITE:
+    logging.warning("USE_FAKE_KITE is enabled: Kite REST and ticker calls are served by fake_kite")
 
-# In-memory storage for running strategies
-running_strategies = {}
+# In-memory storage for running strategies (versioned so the tick dispatcher can cache its token index)
+running_strategies = StrategyRegistry()
 paper_trade_strategies = {}  # Store paper trade strategy instances
 
 # Ticker instance
@@ -1375,6 +850,8 @@ def init_paper_trade_tables():
         
         # Create index for faster queries
         cursor.execute("CREATE INDEX IF NOT EXISTS idx_session_timestamp ON paper_trade_audit_trail(session_id, timestamp)")
+        # Keyset paging of the audit trail walks (session_id, id)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_audit_session_id ON paper_trade_audit_trail(session_id, id)")
         
         conn.commit()
         conn.close()
@@ -1469,10 +946,6 @@ def api_chart_data():
             return jsonify({'candles': [], 'ema': []})
         # Parse selected date (YYYY-MM-DD)
         selected_date = datetime.datetime.strptime(date_str, '%Y-%m-%d').date()
-        # Build from/to with market timings 09:15 to 15:30
-        start_dt = datetime.datetime.combine(selected_date, datetime.time(9, 15))
-        end_dt = datetime.datetime.combine(selected_date, datetime.time(15, 30))
-
         # Resolve instrument token for index
         if instrument.upper() == 'NIFTY':
             token = 256265
@@ -1493,32 +966,15 @@ def api_chart_data():
         kite_interval = interval_map.get(interval, '5minute')
 
         # Get previous trading day for RSI calculation (need at least 14 periods)
-        # Calculate how many candles we need based on interval
-        interval_minutes = {
-            '1m': 1, '3m': 3, '5m': 5, '15m': 15, '30m': 30, '60m': 60
-        }.get(interval, 5)
-        
         # Need at least 14 candles for RSI 14, fetch 20 to be safe
         candles_needed = 20
-        minutes_needed = candles_needed * interval_minutes
         
-        # Get previous trading day (skip weekends)
-        prev_date = selected_date
-        days_back = 0
-        while days_back < 5:  # Max 5 days back to find a trading day
-            prev_date = prev_date - datetime.timedelta(days=1)
-            days_back += 1
-            # Skip weekends (Saturday=5, Sunday=6)
-            if prev_date.weekday() < 5:
-                break
+        # Get previous trading day (skips weekends and NSE holidays)
+        prev_date = previous_trading_day(selected_date)
         
-        # Fetch previous day's data (last portion of trading session)
-        prev_start_dt = datetime.datetime.combine(prev_date, datetime.time(15, 30)) - datetime.timedelta(minutes=minutes_needed)
-        prev_end_dt = datetime.datetime.combine(prev_date, datetime.time(15, 30))
-        
-        # Fetch historical data from Kite (today's data)
+        # Fetch historical data (today's data)
         try:
-            hist_today = kite.historical_data(token, start_dt, end_dt, kite_interval)
+            hist_today = get_historical_candles(kite, token, selected_date, selected_date, kite_interval)
         except Exception as e:
             logging.error(f"Error fetching historical data for today: {e}")
             return jsonify({'candles': [], 'ema': []})
@@ -1526,7 +982,7 @@ def api_chart_data():
         # Fetch previous day's data for RSI warm-up
         hist_prev = []
         try:
-            hist_prev = kite.historical_data(token, prev_start_dt, prev_end_dt, kite_interval)
+            hist_prev = get_historical_candles(kite, token, prev_date, prev_date, kite_interval)
             # Only take the last portion (last 20 candles)
             if len(hist_prev) > candles_needed:
                 hist_prev = hist_prev[-candles_needed:]
@@ -1643,19 +1099,27 @@ def api_option_ltp():
         logging.error(f"Error setting access token for option LTP: {e}")
 
     try:
+        # Serve symbols the ticker is streaming (and has ticked recently) from the price board; the rest go to kite.ltp
+        instrument_master = get_instrument_master()
+        price_board = get_price_board()
+        result = {}
         ltp_request_tokens = []
         symbol_map = {}
         for sym in symbol_list:
+            instrument = instrument_master.find(sym[4:] if sym.startswith('NFO:') else sym)
+            price = price_board.get(instrument['instrument_token'], max_age=config.PRICE_BOARD_MAX_AGE) if instrument else None
+            if price is not None:
+                result[sym] = price
+                continue
             token = sym if sym.startswith('NFO:') else f"NFO:{sym}"
             ltp_request_tokens.append(token)
             symbol_map[token] = sym
 
-        ltp_response = kite.ltp(ltp_request_tokens)
-
-        result = {}
-        for token_key, data in ltp_response.items():
-            sym = symbol_map.get(token_key, token_key.replace('NFO:', ''))
-            result[sym] = data.get('last_price')
+        if ltp_request_tokens:
+            ltp_response = kite.ltp(ltp_request_tokens)
+            for token_key, data in ltp_response.items():
+                sym = symbol_map.get(token_key, token_key.replace('NFO:', ''))
+                result[sym] = data.get('last_price')
 
         return jsonify({'status': 'success', 'ltp': result})
     except Exception as e:
@@ -2541,8 +2005,13 @@ def api_backtest_mountain_signal():
     if 'user_id' not in session:
         return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
 
+    return run_cached('backtest_mountain_signal', request.get_json() or {})
+
+
+def run_backtest_mountain_signal(data: Dict[str, Any], progress: Optional[ProgressCallback] = None) -> Tuple[Dict[str, Any], int]:
+    """Response body and HTTP status of a Mountain Signal backtest (endpoint and background job)"""
+    report = progress or (lambda fraction, message: None)
     try:
-        data = request.get_json()
         from_date_str = data.get('from_date')
         to_date_str = data.get('to_date')
         instrument = data.get('instrument', 'BANKNIFTY')
@@ -2550,7 +2019,7 @@ def api_backtest_mountain_signal():
         ema_period = data.get('ema_period', 5)
 
         if not from_date_str or not to_date_str:
-            return jsonify({'status': 'error', 'message': 'From date and to date are required'}), 400
+            return {'status': 'error', 'message': 'From date and to date are required'}, 400
 
         from_date = datetime.datetime.strptime(from_date_str, '%Y-%m-%d').date()
         to_date = datetime.datetime.strptime(to_date_str, '%Y-%m-%d').date()
@@ -2603,10 +2072,15 @@ def api_backtest_mountain_signal():
         strike_step = strike_rounding_map.get(instrument_key, strike_step_default)
         lot_size_value = lot_sizes_map.get(instrument_key, lot_size_default)
 
+        try:
+            premium_model = get_premium_model(data.get('premium_model'), instrument_key, rules_data.get('expiry_policy'))
+        except ValueError as premium_error:
+            return {'status': 'error', 'message': str(premium_error)}, 400
+
         # Validate date range (max 30 days)
         days_diff = (to_date - from_date).days
         if days_diff > 30:
-            return jsonify({'status': 'error', 'message': 'Maximum 30 days allowed'}), 400
+            return {'status': 'error', 'message': 'Maximum 30 days allowed'}, 400
 
         # Resolve instrument token
         if instrument.upper() == 'NIFTY':
@@ -2614,30 +2088,18 @@ def api_backtest_mountain_signal():
         elif instrument.upper() == 'BANKNIFTY':
             token = 260105
         else:
-            return jsonify({'status': 'error', 'message': 'Invalid instrument'}), 400
+            return {'status': 'error', 'message': 'Invalid instrument'}, 400
 
-        # Fetch historical data for all dates in range
-        all_candles = []
-        current_date = from_date
+        # Fetch historical data for all dates in range (served from the local candle store where possible)
+        report(0.05, 'Fetching candles')
         kite_interval = f"{candle_time}minute"
-
-        while current_date <= to_date:
-            # Skip weekends
-            if current_date.weekday() < 5:  # Monday=0, Friday=4
-                start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-                end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-                
-                try:
-                    hist = kite.historical_data(token, start_dt, end_dt, kite_interval)
-                    if hist:
-                        all_candles.extend(hist)
-                except Exception as e:
-                    logging.error(f"Error fetching historical data for {current_date}: {e}")
-            
-            current_date += datetime.timedelta(days=1)
+        failed_days: List[datetime.date] = []
+        all_candles = get_historical_candles(kite, token, from_date, to_date, kite_interval, log_tag="BACKTEST",
+                                             failed_days=failed_days)
+        report(0.4, f'Running strategy on {len(all_candles)} candles')
 
         if not all_candles:
-            return jsonify({'status': 'error', 'message': 'No historical data found for the selected date range'}), 404
+            return {'status': 'error', 'message': 'No historical data found for the selected date range'}, 404
 
         # Sort candles by date
         all_candles.sort(key=lambda x: x['date'])
@@ -2667,566 +2129,18 @@ def api_backtest_mountain_signal():
         else:
             df['rsi14'] = None
 
-        # Initialize strategy state
-        pe_signal_candle = None
-        ce_signal_candle = None
-        trade_placed = False
-        position = 0  # 0: flat, 1: long (CE), -1: short (PE)
-        entry_price = 0
-        exit_price = 0
-        trades = []
-        option_trades = []
-        active_option_trade = None
-        option_trade_sequence = 0
-        pe_signal_price_above_low = False
-        ce_signal_price_below_high = False
-        signal_candles_with_entry = set()
-        consecutive_candles_for_target = 0
-        last_candle_high_less_than_ema = False
-        last_candle_low_greater_than_ema = False
-        # Store signal candle info in active trade for exit logic
-        active_trade_signal_candle = None
-
-        # Process each candle
-        for i in range(1, len(df)):
-            current_candle = df.iloc[i]
-            previous_candle = df.iloc[i-1]
-            current_ema = current_candle['ema']
-            previous_ema = previous_candle['ema']
-            previous_rsi = df.iloc[i-1]['rsi14'] if 'rsi14' in df.columns else None
-
-            # Signal Identification (using previous candle)
-            # PE Signal: LOW > 5 EMA AND RSI > 70
-            if previous_candle['low'] > previous_ema:
-                if previous_rsi is not None and previous_rsi > 70:
-                    if pe_signal_candle is not None:
-                        pe_signal_price_above_low = False
-                        if 'index' in pe_signal_candle:
-                            signal_candles_with_entry.discard(pe_signal_candle['index'])
-                    pe_signal_candle = {
-                        'date': previous_candle['date'],
-                        'high': previous_candle['high'],
-                        'low': previous_candle['low'],
-                        'index': i - 1
-                    }
-                    ce_signal_candle = None
-
-            # CE Signal: HIGH < 5 EMA AND RSI < 30
-            if previous_candle['high'] < previous_ema:
-                if previous_rsi is not None and previous_rsi < 30:
-                    if ce_signal_candle is not None:
-                        ce_signal_price_below_high = False
-                        if 'index' in ce_signal_candle:
-                            signal_candles_with_entry.discard(ce_signal_candle['index'])
-                    ce_signal_candle = {
-                        'date': previous_candle['date'],
-                        'high': previous_candle['high'],
-                        'low': previous_candle['low'],
-                        'index': i - 1
-                    }
-                    pe_signal_candle = None
-
-            # Price action validation for re-entry
-            if pe_signal_candle is not None and not trade_placed and not pe_signal_price_above_low:
-                if current_candle['high'] > pe_signal_candle['low']:
-                    pe_signal_price_above_low = True
-
-            if ce_signal_candle is not None and not trade_placed and not ce_signal_price_below_high:
-                if current_candle['low'] < ce_signal_candle['high']:
-                    ce_signal_price_below_high = True
-
-            # Entry Logic
-            if not trade_placed:
-                # PE Entry
-                if pe_signal_candle is not None and current_candle['close'] < pe_signal_candle['low']:
-                    signal_candle_index = pe_signal_candle['index']
-                    is_first_entry = signal_candle_index not in signal_candles_with_entry
-                    entry_allowed = is_first_entry or pe_signal_price_above_low
-                    
-                    if entry_allowed:
-                        trade_placed = True
-                        position = -1  # PE (short)
-                        entry_price = current_candle['close']
-                        signal_candles_with_entry.add(signal_candle_index)
-                        pe_signal_price_above_low = False
-                        # Store signal candle info for exit logic
-                        active_trade_signal_candle = {
-                            'high': pe_signal_candle['high'],
-                            'low': pe_signal_candle['low'],
-                            'type': 'PE'
-                        }
-                        trades.append({
-                            'signal_time': pe_signal_candle['date'],
-                            'signal_type': 'PE',
-                            'signal_high': pe_signal_candle['high'],
-                            'signal_low': pe_signal_candle['low'],
-                            'entry_time': current_candle['date'],
-                            'entry_price': entry_price,
-                            'exit_time': None,
-                            'exit_price': None,
-                            'exit_type': None,
-                            'pnl': None,
-                            'pnl_percent': None,
-                            'date': current_candle['date'].date() if isinstance(current_candle['date'], datetime.datetime) else current_candle['date'],
-                            'lot_size': lot_size_value,
-                            'option_trade_id': None,
-                            'option_symbol': None,
-                            'option_entry_price': None,
-                            'stop_loss_price': None,
-                            'target_price': None,
-                            'option_exit_price': None
-                        })
-                        consecutive_candles_for_target = 0
-                        last_candle_high_less_than_ema = False
-
-                        trade_index = len(trades) - 1
-                        trade_date_value = trades[trade_index]['date']
-                        atm_strike = round_to_atm(entry_price)
-                        option_symbol = get_option_symbol(atm_strike, 'PE', current_candle['date'])
-                        option_entry_price = simulate_option_premium(entry_price, atm_strike, 'PE')
-                        stop_loss_price_abs = round(option_entry_price * (1 + stop_loss_percent), 2)
-                        target_price_abs = round(option_entry_price * (1 + target_percent), 2)
-
-                        option_trade = {
-                            'id': option_trade_sequence,
-                            'index_trade_index': trade_index,
-                            'signal_time': pe_signal_candle['date'],
-                            'signal_type': 'PE',
-                            'signal_high': float(pe_signal_candle['high']),
-                            'signal_low': float(pe_signal_candle['low']),
-                            'entry_time': current_candle['date'],
-                            'index_at_entry': float(entry_price),
-                            'atm_strike': float(atm_strike),
-                            'option_symbol': option_symbol,
-                            'option_entry_price': float(option_entry_price),
-                            'stop_loss_price': float(stop_loss_price_abs),
-                            'target_price': float(target_price_abs),
-                            'option_exit_price': None,
-                            'exit_time': None,
-                            'exit_type': None,
-                            'pnl': None,
-                            'pnl_percent': None,
-                            'status': 'open',
-                            'lot_size': lot_size_value,
-                            'date': trade_date_value
-                        }
-                        option_trades.append(option_trade)
-                        option_trade_sequence += 1
-                        trades[trade_index]['option_trade_id'] = option_trade['id']
-                        trades[trade_index]['option_symbol'] = option_symbol
-                        trades[trade_index]['option_entry_price'] = float(option_entry_price)
-                        trades[trade_index]['stop_loss_price'] = float(stop_loss_price_abs)
-                        trades[trade_index]['target_price'] = float(target_price_abs)
-                        active_option_trade = option_trade
-
-                # CE Entry
-                elif ce_signal_candle is not None and current_candle['close'] > ce_signal_candle['high']:
-                    signal_candle_index = ce_signal_candle['index']
-                    is_first_entry = signal_candle_index not in signal_candles_with_entry
-                    entry_allowed = is_first_entry or ce_signal_price_below_high
-                    
-                    if entry_allowed:
-                        trade_placed = True
-                        position = 1  # CE (long)
-                        entry_price = current_candle['close']
-                        signal_candles_with_entry.add(signal_candle_index)
-                        ce_signal_price_below_high = False
-                        # Store signal candle info for exit logic
-                        active_trade_signal_candle = {
-                            'high': ce_signal_candle['high'],
-                            'low': ce_signal_candle['low'],
-                            'type': 'CE'
-                        }
-                        trades.append({
-                            'signal_time': ce_signal_candle['date'],
-                            'signal_type': 'CE',
-                            'signal_high': ce_signal_candle['high'],
-                            'signal_low': ce_signal_candle['low'],
-                            'entry_time': current_candle['date'],
-                            'entry_price': entry_price,
-                            'exit_time': None,
-                            'exit_price': None,
-                            'exit_type': None,
-                            'pnl': None,
-                            'pnl_percent': None,
-                            'date': current_candle['date'].date() if isinstance(current_candle['date'], datetime.datetime) else current_candle['date'],
-                            'lot_size': lot_size_value,
-                            'option_trade_id': None,
-                            'option_symbol': None,
-                            'option_entry_price': None,
-                            'stop_loss_price': None,
-                            'target_price': None,
-                            'option_exit_price': None
-                        })
-                        consecutive_candles_for_target = 0
-                        last_candle_low_greater_than_ema = False
-
-                        trade_index = len(trades) - 1
-                        trade_date_value = trades[trade_index]['date']
-                        atm_strike = round_to_atm(entry_price)
-                        option_symbol = get_option_symbol(atm_strike, 'CE', current_candle['date'])
-                        option_entry_price = simulate_option_premium(entry_price, atm_strike, 'CE')
-                        stop_loss_price_abs = round(option_entry_price * (1 + stop_loss_percent), 2)
-                        target_price_abs = round(option_entry_price * (1 + target_percent), 2)
-
-                        option_trade = {
-                            'id': option_trade_sequence,
-                            'index_trade_index': trade_index,
-                            'signal_time': ce_signal_candle['date'],
-                            'signal_type': 'CE',
-                            'signal_high': float(ce_signal_candle['high']),
-                            'signal_low': float(ce_signal_candle['low']),
-                            'entry_time': current_candle['date'],
-                            'index_at_entry': float(entry_price),
-                            'atm_strike': float(atm_strike),
-                            'option_symbol': option_symbol,
-                            'option_entry_price': float(option_entry_price),
-                            'stop_loss_price': float(stop_loss_price_abs),
-                            'target_price': float(target_price_abs),
-                            'option_exit_price': None,
-                            'exit_time': None,
-                            'exit_type': None,
-                            'pnl': None,
-                            'pnl_percent': None,
-                            'status': 'open',
-                            'lot_size': lot_size_value,
-                            'date': trade_date_value
-                        }
-                        option_trades.append(option_trade)
-                        option_trade_sequence += 1
-                        trades[trade_index]['option_trade_id'] = option_trade['id']
-                        trades[trade_index]['option_symbol'] = option_symbol
-                        trades[trade_index]['option_entry_price'] = float(option_entry_price)
-                        trades[trade_index]['stop_loss_price'] = float(stop_loss_price_abs)
-                        trades[trade_index]['target_price'] = float(target_price_abs)
-                        active_option_trade = option_trade
-
-            # Exit Logic with DSL-driven priorities
-            elif trade_placed:
-                candle_time_obj = current_candle['date']
-                if isinstance(candle_time_obj, datetime.datetime):
-                    candle_time_check = candle_time_obj.time()
-                else:
-                    candle_time_check = datetime.datetime.now().time()
-
-                current_trade_index = len(trades) - 1
-                current_trade = trades[current_trade_index] if current_trade_index >= 0 else None
-
-                linked_option_trade = None
-                option_exit_price = None
-                option_exit_type = None
-                if active_option_trade and current_trade and current_trade.get('option_trade_id') == active_option_trade.get('id'):
-                    linked_option_trade = active_option_trade
-                    option_exit_price = simulate_option_premium(
-                        current_candle['close'],
-                        linked_option_trade['atm_strike'],
-                        linked_option_trade['signal_type']
-                    )
-                    if option_exit_price <= linked_option_trade['stop_loss_price']:
-                        option_exit_type = 'OPTION_STOP_LOSS'
-                    elif option_exit_price >= linked_option_trade['target_price']:
-                        option_exit_type = 'OPTION_TARGET'
-
-                if option_exit_type and current_trade:
-                    lot_size_for_trade = current_trade.get('lot_size', lot_size_value)
-                    entry_price_value = current_trade['entry_price']
-                    exit_price_value = current_candle['close']
-                    if position == -1:
-                        pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                    else:
-                        pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-
-                    current_trade['exit_time'] = current_candle['date']
-                    current_trade['exit_price'] = exit_price_value
-                    current_trade['exit_type'] = option_exit_type
-                    current_trade['pnl'] = pnl_val
-                    current_trade['pnl_percent'] = pnl_percent_val
-                    current_trade['option_exit_price'] = option_exit_price
-
-                    if linked_option_trade:
-                        entry_opt_price = linked_option_trade.get('option_entry_price')
-                        lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                        linked_option_trade['option_exit_price'] = option_exit_price
-                        linked_option_trade['exit_time'] = current_candle['date']
-                        linked_option_trade['exit_type'] = option_exit_type
-                        if entry_opt_price:
-                            linked_option_trade['pnl'] = (option_exit_price - entry_opt_price) * lot_size_opt
-                            linked_option_trade['pnl_percent'] = ((option_exit_price - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                        linked_option_trade['status'] = 'closed'
-                        active_option_trade = None
-
-                    trade_placed = False
-                    position = 0
-                    active_trade_signal_candle = None
-                    consecutive_candles_for_target = 0
-                    if current_trade['signal_type'] == 'PE':
-                        pe_signal_price_above_low = False
-                        last_candle_high_less_than_ema = False
-                    else:
-                        ce_signal_price_below_high = False
-                        last_candle_low_greater_than_ema = False
-                    continue
-
-                if current_trade:
-                    market_close_square_off_time = datetime.time(15, 15)
-                    if market_close_square_off_time <= candle_time_check < datetime.time(15, 30):
-                        lot_size_for_trade = current_trade.get('lot_size', lot_size_value)
-                        entry_price_value = current_trade['entry_price']
-                        exit_price_value = current_candle['close']
-                        if position == -1:
-                            pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                            pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                        else:
-                            pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                            pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-
-                        option_exit_price_mc = None
-                        if linked_option_trade:
-                            option_exit_price_mc = simulate_option_premium(
-                                current_candle['close'],
-                                linked_option_trade['atm_strike'],
-                                linked_option_trade['signal_type']
-                            )
-                            entry_opt_price = linked_option_trade.get('option_entry_price')
-                            lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                            linked_option_trade['option_exit_price'] = option_exit_price_mc
-                            linked_option_trade['exit_time'] = current_candle['date']
-                            linked_option_trade['exit_type'] = 'MARKET_CLOSE'
-                            if entry_opt_price:
-                                linked_option_trade['pnl'] = (option_exit_price_mc - entry_opt_price) * lot_size_opt
-                                linked_option_trade['pnl_percent'] = ((option_exit_price_mc - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                            linked_option_trade['status'] = 'closed'
-                            active_option_trade = None
-
-                        current_trade['exit_time'] = current_candle['date']
-                        current_trade['exit_price'] = exit_price_value
-                        current_trade['exit_type'] = 'MKT_CLOSE'
-                        current_trade['pnl'] = pnl_val
-                        current_trade['pnl_percent'] = pnl_percent_val
-                        current_trade['option_exit_price'] = option_exit_price_mc
-
-                        trade_placed = False
-                        position = 0
-                        active_trade_signal_candle = None
-                        consecutive_candles_for_target = 0
-                        if current_trade['signal_type'] == 'PE':
-                            pe_signal_price_above_low = False
-                            last_candle_high_less_than_ema = False
-                        else:
-                            ce_signal_price_below_high = False
-                            last_candle_low_greater_than_ema = False
-                        continue
-
-                if position == -1 and active_trade_signal_candle is not None and active_trade_signal_candle['type'] == 'PE':
-                    lot_size_for_trade = current_trade.get('lot_size', lot_size_value) if current_trade else lot_size_value
-                    entry_price_value = current_trade['entry_price'] if current_trade else 0
-
-                    if current_candle['close'] > active_trade_signal_candle['high']:
-                        exit_price_value = current_candle['close']
-                        pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                        option_exit_price_idx = None
-                        if linked_option_trade:
-                            option_exit_price_idx = simulate_option_premium(
-                                current_candle['close'],
-                                linked_option_trade['atm_strike'],
-                                linked_option_trade['signal_type']
-                            )
-                            entry_opt_price = linked_option_trade.get('option_entry_price')
-                            lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                            linked_option_trade['option_exit_price'] = option_exit_price_idx
-                            linked_option_trade['exit_time'] = current_candle['date']
-                            linked_option_trade['exit_type'] = 'INDEX_STOP'
-                            if entry_opt_price:
-                                linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                                linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                            linked_option_trade['status'] = 'closed'
-                            active_option_trade = None
-
-                        current_trade['exit_time'] = current_candle['date']
-                        current_trade['exit_price'] = exit_price_value
-                        current_trade['exit_type'] = 'INDEX_STOP'
-                        current_trade['pnl'] = pnl_val
-                        current_trade['pnl_percent'] = pnl_percent_val
-                        current_trade['option_exit_price'] = option_exit_price_idx
-                        trade_placed = False
-                        position = 0
-                        active_trade_signal_candle = None
-                        pe_signal_price_above_low = False
-                        consecutive_candles_for_target = 0
-                        last_candle_high_less_than_ema = False
-                    elif current_candle['high'] < current_ema:
-                        last_candle_high_less_than_ema = True
-                        consecutive_candles_for_target = 0
-                    elif last_candle_high_less_than_ema and current_candle['close'] > current_ema:
-                        consecutive_candles_for_target += 1
-                        if consecutive_candles_for_target >= 2:
-                            exit_price_value = current_candle['close']
-                            pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                            pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                            option_exit_price_idx = None
-                            if linked_option_trade:
-                                option_exit_price_idx = simulate_option_premium(
-                                    current_candle['close'],
-                                    linked_option_trade['atm_strike'],
-                                    linked_option_trade['signal_type']
-                                )
-                                entry_opt_price = linked_option_trade.get('option_entry_price')
-                                lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                                linked_option_trade['option_exit_price'] = option_exit_price_idx
-                                linked_option_trade['exit_time'] = current_candle['date']
-                                linked_option_trade['exit_type'] = 'INDEX_TARGET'
-                                if entry_opt_price:
-                                    linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                                    linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                                linked_option_trade['status'] = 'closed'
-                                active_option_trade = None
-
-                            current_trade['exit_time'] = current_candle['date']
-                            current_trade['exit_price'] = exit_price_value
-                            current_trade['exit_type'] = 'INDEX_TARGET'
-                            current_trade['pnl'] = pnl_val
-                            current_trade['pnl_percent'] = pnl_percent_val
-                            current_trade['option_exit_price'] = option_exit_price_idx
-                            trade_placed = False
-                            position = 0
-                            active_trade_signal_candle = None
-                            pe_signal_price_above_low = False
-                            consecutive_candles_for_target = 0
-                            last_candle_high_less_than_ema = False
-
-                elif position == 1 and active_trade_signal_candle is not None and active_trade_signal_candle['type'] == 'CE':
-                    lot_size_for_trade = current_trade.get('lot_size', lot_size_value) if current_trade else lot_size_value
-                    entry_price_value = current_trade['entry_price'] if current_trade else 0
-
-                    if current_candle['close'] < active_trade_signal_candle['low']:
-                        exit_price_value = current_candle['close']
-                        pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                        pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                        option_exit_price_idx = None
-                        if linked_option_trade:
-                            option_exit_price_idx = simulate_option_premium(
-                                current_candle['close'],
-                                linked_option_trade['atm_strike'],
-                                linked_option_trade['signal_type']
-                            )
-                            entry_opt_price = linked_option_trade.get('option_entry_price')
-                            lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                            linked_option_trade['option_exit_price'] = option_exit_price_idx
-                            linked_option_trade['exit_time'] = current_candle['date']
-                            linked_option_trade['exit_type'] = 'INDEX_STOP'
-                            if entry_opt_price:
-                                linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                                linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                            linked_option_trade['status'] = 'closed'
-                            active_option_trade = None
-
-                        current_trade['exit_time'] = current_candle['date']
-                        current_trade['exit_price'] = exit_price_value
-                        current_trade['exit_type'] = 'INDEX_STOP'
-                        current_trade['pnl'] = pnl_val
-                        current_trade['pnl_percent'] = pnl_percent_val
-                        current_trade['option_exit_price'] = option_exit_price_idx
-                        trade_placed = False
-                        position = 0
-                        active_trade_signal_candle = None
-                        ce_signal_price_below_high = False
-                        consecutive_candles_for_target = 0
-                        last_candle_low_greater_than_ema = False
-                    elif current_candle['low'] > current_ema:
-                        last_candle_low_greater_than_ema = True
-                        consecutive_candles_for_target = 0
-                    elif last_candle_low_greater_than_ema and current_candle['close'] < current_ema:
-                        consecutive_candles_for_target += 1
-                        if consecutive_candles_for_target >= 2:
-                            exit_price_value = current_candle['close']
-                            pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                            pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-                            option_exit_price_idx = None
-                            if linked_option_trade:
-                                option_exit_price_idx = simulate_option_premium(
-                                    current_candle['close'],
-                                    linked_option_trade['atm_strike'],
-                                    linked_option_trade['signal_type']
-                                )
-                                entry_opt_price = linked_option_trade.get('option_entry_price')
-                                lot_size_opt = linked_option_trade.get('lot_size', lot_size_for_trade)
-                                linked_option_trade['option_exit_price'] = option_exit_price_idx
-                                linked_option_trade['exit_time'] = current_candle['date']
-                                linked_option_trade['exit_type'] = 'INDEX_TARGET'
-                                if entry_opt_price:
-                                    linked_option_trade['pnl'] = (option_exit_price_idx - entry_opt_price) * lot_size_opt
-                                    linked_option_trade['pnl_percent'] = ((option_exit_price_idx - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                                linked_option_trade['status'] = 'closed'
-                                active_option_trade = None
-
-                            current_trade['exit_time'] = current_candle['date']
-                            current_trade['exit_price'] = exit_price_value
-                            current_trade['exit_type'] = 'INDEX_TARGET'
-                            current_trade['pnl'] = pnl_val
-                            current_trade['pnl_percent'] = pnl_percent_val
-                            current_trade['option_exit_price'] = option_exit_price_idx
-                            trade_placed = False
-                            position = 0
-                            active_trade_signal_candle = None
-                            ce_signal_price_below_high = False
-                            consecutive_candles_for_target = 0
-                            last_candle_low_greater_than_ema = False
-
-        # Force-close any remaining open trade at the end of the dataset
-        if trade_placed and trades:
-            last_trade = trades[-1]
-            last_candle = df.iloc[-1]
-            exit_price_value = last_candle['close']
-            lot_size_for_trade = last_trade.get('lot_size', lot_size_value)
-            entry_price_value = last_trade['entry_price']
-            if position == -1:
-                pnl_val = (entry_price_value - exit_price_value) * lot_size_for_trade
-                pnl_percent_val = ((entry_price_value - exit_price_value) / entry_price_value) * 100 if entry_price_value else 0
-            else:
-                pnl_val = (exit_price_value - entry_price_value) * lot_size_for_trade
-                pnl_percent_val = ((exit_price_value - entry_price_value) / entry_price_value) * 100 if entry_price_value else 0
-
-            option_exit_price_forced = None
-            if active_option_trade and last_trade.get('option_trade_id') == active_option_trade.get('id'):
-                option_exit_price_forced = simulate_option_premium(
-                    exit_price_value,
-                    active_option_trade['atm_strike'],
-                    active_option_trade['signal_type']
-                )
-                entry_opt_price = active_option_trade.get('option_entry_price')
-                lot_size_opt = active_option_trade.get('lot_size', lot_size_for_trade)
-                active_option_trade['option_exit_price'] = option_exit_price_forced
-                active_option_trade['exit_time'] = last_candle['date']
-                active_option_trade['exit_type'] = 'FORCED_CLOSE'
-                if entry_opt_price:
-                    active_option_trade['pnl'] = (option_exit_price_forced - entry_opt_price) * lot_size_opt
-                    active_option_trade['pnl_percent'] = ((option_exit_price_forced - entry_opt_price) / entry_opt_price) * 100 if entry_opt_price else None
-                active_option_trade['status'] = 'closed'
-                active_option_trade = None
-
-            last_trade['exit_time'] = last_candle['date']
-            last_trade['exit_price'] = exit_price_value
-            last_trade['exit_type'] = 'FORCED_CLOSE'
-            last_trade['pnl'] = pnl_val
-            last_trade['pnl_percent'] = pnl_percent_val
-            last_trade['option_exit_price'] = option_exit_price_forced
-            trade_placed = False
-            position = 0
-            active_trade_signal_candle = None
-            pe_signal_price_above_low = False
-            ce_signal_price_below_high = False
-            consecutive_candles_for_target = 0
-            last_candle_high_less_than_ema = False
-            last_candle_low_greater_than_ema = False
-
-        if active_option_trade and active_option_trade.get('status') != 'closed':
-            active_option_trade['status'] = 'open'
-            active_option_trade = None
+        trades, option_trades = run_mountain_signal_strategy_on_dataframe(
+            df=df,
+            instrument_key=instrument_key,
+            lot_size_value=lot_size_value,
+            strike_step=strike_step,
+            stop_loss_percent=stop_loss_percent,
+            target_percent=target_percent,
+            premium_model=premium_model
+        )
 
         # Calculate summary metrics
+        report(0.8, f'Aggregating {len(trades)} trades')
         closed_trades = [t for t in trades if t['exit_time'] is not None]
         total_trades = len(closed_trades)
         winning_trades = len([t for t in closed_trades if t['pnl'] and t['pnl'] > 0])
@@ -3306,58 +2220,12 @@ def api_backtest_mountain_signal():
                 option_max_losing_day = {'date': date_key, 'pnl': pnl}
 
         # Format trades for response
-        formatted_trades = []
-        for trade in trades:
-            formatted_trades.append({
-                'signalTime': trade['signal_time'].isoformat() if isinstance(trade['signal_time'], datetime.datetime) else str(trade['signal_time']),
-                'signalType': trade['signal_type'],
-                'signalHigh': float(trade['signal_high']),
-                'signalLow': float(trade['signal_low']),
-                'entryTime': trade['entry_time'].isoformat() if isinstance(trade['entry_time'], datetime.datetime) else str(trade['entry_time']),
-                'entryPrice': float(trade['entry_price']),
-                'exitTime': trade['exit_time'].isoformat() if isinstance(trade['exit_time'], datetime.datetime) else str(trade['exit_time']) if trade['exit_time'] else None,
-                'exitPrice': float(trade['exit_price']) if trade['exit_price'] else None,
-                'exitType': trade['exit_type'],
-                'pnl': float(trade['pnl']) if trade['pnl'] is not None else None,
-                'pnlPercent': float(trade['pnl_percent']) if trade['pnl_percent'] is not None else None,
-                'date': trade['date'].isoformat() if isinstance(trade['date'], datetime.date) else str(trade['date']),
-                'lotSize': int(trade['lot_size']) if trade.get('lot_size') is not None else None,
-                'optionTradeId': trade.get('option_trade_id'),
-                'optionSymbol': trade.get('option_symbol'),
-                'optionEntryPrice': float(trade['option_entry_price']) if trade.get('option_entry_price') is not None else None,
-                'stopLossPrice': float(trade['stop_loss_price']) if trade.get('stop_loss_price') is not None else None,
-                'targetPrice': float(trade['target_price']) if trade.get('target_price') is not None else None,
-                'optionExitPrice': float(trade['option_exit_price']) if trade.get('option_exit_price') is not None else None
-            })
-
-        formatted_option_trades = []
-        for opt_trade in option_trades:
-            formatted_option_trades.append({
-                'id': opt_trade.get('id'),
-                'indexTradeIndex': opt_trade.get('index_trade_index'),
-                'signalTime': opt_trade.get('signal_time').isoformat() if isinstance(opt_trade.get('signal_time'), datetime.datetime) else str(opt_trade.get('signal_time')),
-                'signalType': opt_trade.get('signal_type'),
-                'signalHigh': float(opt_trade.get('signal_high')) if opt_trade.get('signal_high') is not None else None,
-                'signalLow': float(opt_trade.get('signal_low')) if opt_trade.get('signal_low') is not None else None,
-                'entryTime': opt_trade.get('entry_time').isoformat() if isinstance(opt_trade.get('entry_time'), datetime.datetime) else str(opt_trade.get('entry_time')),
-                'indexAtEntry': float(opt_trade.get('index_at_entry')) if opt_trade.get('index_at_entry') is not None else None,
-                'atmStrike': float(opt_trade.get('atm_strike')) if opt_trade.get('atm_strike') is not None else None,
-                'optionSymbol': opt_trade.get('option_symbol'),
-                'optionEntryPrice': float(opt_trade.get('option_entry_price')) if opt_trade.get('option_entry_price') is not None else None,
-                'stopLossPrice': float(opt_trade.get('stop_loss_price')) if opt_trade.get('stop_loss_price') is not None else None,
-                'targetPrice': float(opt_trade.get('target_price')) if opt_trade.get('target_price') is not None else None,
-                'optionExitPrice': float(opt_trade.get('option_exit_price')) if opt_trade.get('option_exit_price') is not None else None,
-                'exitTime': opt_trade.get('exit_time').isoformat() if isinstance(opt_trade.get('exit_time'), datetime.datetime) else str(opt_trade.get('exit_time')) if opt_trade.get('exit_time') else None,
-                'exitType': opt_trade.get('exit_type'),
-                'pnl': float(opt_trade.get('pnl')) if opt_trade.get('pnl') is not None else None,
-                'pnlPercent': float(opt_trade.get('pnl_percent')) if opt_trade.get('pnl_percent') is not None else None,
-                'status': opt_trade.get('status'),
-                'lotSize': int(opt_trade.get('lot_size')) if opt_trade.get('lot_size') is not None else None,
-                'date': opt_trade.get('date').isoformat() if isinstance(opt_trade.get('date'), datetime.date) else str(opt_trade.get('date'))
-            })
+        formatted_trades = [format_trade(trade) for trade in trades]
+        formatted_option_trades = [format_option_trade(opt_trade) for opt_trade in option_trades]
 
-        return jsonify({
+        return {
             'status': 'success',
+            'incompleteDays': [day.isoformat() for day in failed_days],
             'trades': formatted_trades,
             'optionTrades': formatted_option_trades,
             'summary': {
@@ -3386,11 +2254,13 @@ def api_backtest_mountain_signal():
                 'maxWinningDay': option_max_winning_day,
                 'maxLosingDay': option_max_losing_day
             }
-        })
+        }, 200
 
+    except JobCancelled:
+        raise
     except Exception as e:
         logging.error(f"Error in backtest_mountain_signal: {e}", exc_info=True)
-        return jsonify({'status': 'error', 'message': f'Error running backtest: {str(e)}'}), 500
+        return {'status': 'error', 'message': f'Error running backtest: {str(e)}'}, 500
 
 
 @app.route("/api/optimizer_mountain_signal", methods=['POST'])
@@ -3399,129 +2269,194 @@ def api_optimizer_mountain_signal():
     if 'user_id' not in session:
         return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
 
-    try:
-        data = request.get_json() or {}
-        from_date_str = data.get('from_date')
-        to_date_str = data.get('to_date')
-        instrument = data.get('instrument', 'BANKNIFTY')
-        candle_time = data.get('candle_time', '5')
-        ema_period = data.get('ema_period', 5)
-        stop_loss_input = data.get('option_stop_loss_percent')
-        target_input = data.get('option_target_percent')
-        initial_investment_input = data.get('initial_investment')
-
-        if not from_date_str or not to_date_str:
-            return jsonify({'status': 'error', 'message': 'From date and to date are required'}), 400
+    return run_cached('optimizer_mountain_signal', request.get_json() or {})
+
+
+class OptimizerRequest(NamedTuple):
+    from_date_str: str
+    to_date_str: str
+    from_date: datetime.date
+    to_date: datetime.date
+    days_diff: int
+    instrument_key: str
+    token: int
+    kite_interval: str
+    ema_period: int
+    lot_size_value: int
+    strike_step: int
+    stop_loss_percent: float
+    target_percent: float
+    rsi_overbought: float
+    rsi_oversold: float
+    initial_investment: float
+    grid: Optional[List[Dict[str, Any]]]
+    rules_version: Optional[str]
+    premium_model: Optional[BlackScholesModel]
+
+
+def parse_optimizer_request(data: Dict[str, Any]) -> Tuple[Optional[OptimizerRequest], Optional[Tuple[Dict[str, Any], int]]]:
+    """Validated optimizer settings, or None and the error response body and HTTP status"""
+    from_date_str = data.get('from_date')
+    to_date_str = data.get('to_date')
+    instrument = data.get('instrument', 'BANKNIFTY')
+    candle_time = data.get('candle_time', '5')
+    ema_period = data.get('ema_period', 5)
+    stop_loss_input = data.get('option_stop_loss_percent')
+    target_input = data.get('option_target_percent')
+    initial_investment_input = data.get('initial_investment')
+
+    if not from_date_str or not to_date_str:
+        return None, ({'status': 'error', 'message': 'From date and to date are required'}, 400)
 
-        from_date = datetime.datetime.strptime(from_date_str, '%Y-%m-%d').date()
-        to_date = datetime.datetime.strptime(to_date_str, '%Y-%m-%d').date()
-        if from_date > to_date:
-            return jsonify({'status': 'error', 'message': 'From date must be before To date'}), 400
+    from_date = datetime.datetime.strptime(from_date_str, '%Y-%m-%d').date()
+    to_date = datetime.datetime.strptime(to_date_str, '%Y-%m-%d').date()
+    if from_date > to_date:
+        return None, ({'status': 'error', 'message': 'From date must be before To date'}, 400)
 
-        days_diff = (to_date - from_date).days
-        if days_diff > 365 * 3:
-            return jsonify({'status': 'error', 'message': 'Maximum 3 years allowed'}), 400
+    days_diff = (to_date - from_date).days
+    if days_diff > 365 * 3:
+        return None, ({'status': 'error', 'message': 'Maximum 3 years allowed'}, 400)
 
-        try:
-            rules_data = load_mountain_signal_pe_rules()
-        except Exception as rules_error:
-            logging.error(f"Failed to load Mountain Signal PE rules for optimizer: {rules_error}", exc_info=True)
-            rules_data = {
-                'option_trade': {
-                    'stop_loss_percent': -0.17,
-                    'target_percent': 0.45
-                },
-                'lot_sizes': {
-                    'BANKNIFTY': 35,
-                    'NIFTY': 75
-                },
-                'strike_rounding': {
-                    'BANKNIFTY': 100,
-                    'NIFTY': 50
-                }
+    try:
+        rules_data = load_mountain_signal_pe_rules()
+    except Exception as rules_error:
+        logging.error(f"Failed to load Mountain Signal PE rules for optimizer: {rules_error}", exc_info=True)
+        rules_data = {
+            'option_trade': {
+                'stop_loss_percent': -0.17,
+                'target_percent': 0.45
+            },
+            'lot_sizes': {
+                'BANKNIFTY': 35,
+                'NIFTY': 75
+            },
+            'strike_rounding': {
+                'BANKNIFTY': 100,
+                'NIFTY': 50
+            },
+            'expiry_policy': {
+                'BANKNIFTY': 'monthly',
+                'NIFTY': 'weekly'
             }
+        }
 
-        instrument_key = 'BANKNIFTY' if 'BANK' in instrument.upper() else 'NIFTY'
+    instrument_key = 'BANKNIFTY' if 'BANK' in instrument.upper() else 'NIFTY'
 
-        strike_rounding_map = {
-            key.upper(): int(value)
-            for key, value in (rules_data.get('strike_rounding') or {}).items()
-            if value is not None
-        }
-        lot_sizes_map = {
-            key.upper(): int(value)
-            for key, value in (rules_data.get('lot_sizes') or {}).items()
-            if value is not None
-        }
+    strike_rounding_map = {
+        key.upper(): int(value)
+        for key, value in (rules_data.get('strike_rounding') or {}).items()
+        if value is not None
+    }
+    lot_sizes_map = {
+        key.upper(): int(value)
+        for key, value in (rules_data.get('lot_sizes') or {}).items()
+        if value is not None
+    }
 
-        strike_step_default = 100 if instrument_key == 'BANKNIFTY' else 50
-        lot_size_default = 35 if instrument_key == 'BANKNIFTY' else 75
+    strike_step_default = 100 if instrument_key == 'BANKNIFTY' else 50
+    lot_size_default = 35 if instrument_key == 'BANKNIFTY' else 75
 
-        strike_step = strike_rounding_map.get(instrument_key, strike_step_default)
-        lot_size_value = lot_sizes_map.get(instrument_key, lot_size_default)
+    strike_step = strike_rounding_map.get(instrument_key, strike_step_default)
+    lot_size_value = lot_sizes_map.get(instrument_key, lot_size_default)
 
-        default_stop_loss_percent = rules_data.get('option_trade', {}).get('stop_loss_percent', -0.17)
-        default_target_percent = rules_data.get('option_trade', {}).get('target_percent', 0.45)
+    default_stop_loss_percent = rules_data.get('option_trade', {}).get('stop_loss_percent', -0.17)
+    default_target_percent = rules_data.get('option_trade', {}).get('target_percent', 0.45)
 
-        stop_loss_percent = default_stop_loss_percent
-        target_percent = default_target_percent
+    stop_loss_percent = default_stop_loss_percent
+    target_percent = default_target_percent
 
-        if stop_loss_input is not None:
-            try:
-                stop_loss_value = float(stop_loss_input)
-                if abs(stop_loss_value) > 1:
-                    stop_loss_percent = -abs(stop_loss_value) / 100.0
-                else:
-                    stop_loss_percent = stop_loss_value if stop_loss_value <= 0 else -abs(stop_loss_value)
-            except (TypeError, ValueError):
-                pass
+    grid_request = is_grid_request(data)
 
-        if target_input is not None:
-            try:
-                target_value = float(target_input)
-                if abs(target_value) > 1:
-                    target_percent = abs(target_value) / 100.0
-                else:
-                    target_percent = abs(target_value)
-            except (TypeError, ValueError):
-                pass
+    if stop_loss_input is not None and not grid_request:
+        try:
+            stop_loss_percent = normalise_stop_loss(stop_loss_input)
+        except (TypeError, ValueError):
+            pass
 
-        if initial_investment_input is not None:
-            try:
-                initial_investment = float(initial_investment_input)
-            except (TypeError, ValueError):
-                initial_investment = 100000.0
-        else:
+    if target_input is not None and not grid_request:
+        try:
+            target_percent = normalise_target(target_input)
+        except (TypeError, ValueError):
+            pass
+
+    try:
+        rsi_overbought = float(data.get('rsi_overbought', RSI_OVERBOUGHT)) if not grid_request else RSI_OVERBOUGHT
+        rsi_oversold = float(data.get('rsi_oversold', RSI_OVERSOLD)) if not grid_request else RSI_OVERSOLD
+    except (TypeError, ValueError):
+        return None, ({'status': 'error', 'message': 'RSI thresholds must be numbers'}, 400)
+
+    if initial_investment_input is not None:
+        try:
+            initial_investment = float(initial_investment_input)
+        except (TypeError, ValueError):
             initial_investment = 100000.0
+    else:
+        initial_investment = 100000.0
 
-        if initial_investment <= 0:
-            return jsonify({'status': 'error', 'message': 'Initial investment must be greater than 0'}), 400
+    if initial_investment <= 0:
+        return None, ({'status': 'error', 'message': 'Initial investment must be greater than 0'}, 400)
 
-        if instrument.upper() == 'NIFTY':
-            token = 256265
-        elif instrument.upper() == 'BANKNIFTY':
-            token = 260105
-        else:
-            return jsonify({'status': 'error', 'message': 'Invalid instrument'}), 400
+    try:
+        premium_model = get_premium_model(data.get('premium_model'), instrument_key, rules_data.get('expiry_policy'))
+    except ValueError as premium_error:
+        return None, ({'status': 'error', 'message': str(premium_error)}, 400)
 
-        all_candles: List[Dict[str, Any]] = []
-        current_date = from_date
-        kite_interval = f"{candle_time}minute"
+    grid = None
+    if grid_request:
+        try:
+            grid = build_grid(data, default_stop_loss_percent, default_target_percent, 5)
+        except (KeyError, TypeError, ValueError) as grid_error:
+            return None, ({'status': 'error', 'message': f'Invalid parameter grid: {grid_error}'}, 400)
+        if not grid:
+            return None, ({'status': 'error', 'message': 'Parameter grid is empty (RSI oversold must be below overbought)'}, 400)
+        if len(grid) > config.OPTIMIZER_MAX_EVALUATIONS:
+            return None, ({'status': 'error', 'message': f'Parameter grid has {len(grid)} combinations; maximum is {config.OPTIMIZER_MAX_EVALUATIONS}'}, 400)
+
+    if grid is not None:
+        # A grid may list several EMA periods (see build_grid); the scalar field carries the first one
+        ema_period = grid[0][0]
+    else:
+        try:
+            ema_period = int(ema_period)
+        except (TypeError, ValueError):
+            return None, ({'status': 'error', 'message': 'EMA period must be an integer'}, 400)
+        if ema_period < 1:
+            return None, ({'status': 'error', 'message': 'EMA period must be at least 1'}, 400)
+
+    if instrument.upper() == 'NIFTY':
+        token = 256265
+    elif instrument.upper() == 'BANKNIFTY':
+        token = 260105
+    else:
+        return None, ({'status': 'error', 'message': 'Invalid instrument'}, 400)
+
+    return OptimizerRequest(
+        from_date_str, to_date_str, from_date, to_date, days_diff, instrument_key, token, f"{candle_time}minute",
+        ema_period, lot_size_value, strike_step, stop_loss_percent, target_percent, rsi_overbought, rsi_oversold,
+        initial_investment, grid, (rules_data.get('strategy') or {}).get('version'), premium_model
+    ), None
 
-        while current_date <= to_date:
-            if current_date.weekday() < 5:
-                start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-                end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-                try:
-                    hist = kite.historical_data(token, start_dt, end_dt, kite_interval)
-                    if hist:
-                        all_candles.extend(hist)
-                except Exception as e:
-                    logging.error(f"Error fetching historical data for {current_date}: {e}")
-            current_date += datetime.timedelta(days=1)
+
+def run_optimizer_mountain_signal(data: Dict[str, Any], progress: Optional[ProgressCallback] = None) -> Tuple[Dict[str, Any], int]:
+    """Response body and HTTP status of a Mountain Signal optimizer run (endpoint and background job)"""
+    report = progress or (lambda fraction, message: None)
+    try:
+        optimizer_request, error = parse_optimizer_request(data)
+        if error is not None:
+            return error
+        (from_date_str, to_date_str, from_date, to_date, days_diff, instrument_key, token, kite_interval, ema_period,
+         lot_size_value, strike_step, stop_loss_percent, target_percent, rsi_overbought, rsi_oversold,
+         initial_investment, grid, rules_version, premium_model) = optimizer_request
+
+        report(0.05, 'Fetching candles')
+        failed_days: List[datetime.date] = []
+        all_candles: List[Dict[str, Any]] = get_historical_candles(
+            kite, token, from_date, to_date, kite_interval, log_tag="OPTIMIZER", failed_days=failed_days
+        )
+        report(0.3, f'Evaluating {len(grid) if grid else 1} parameter set(s) on {len(all_candles)} candles')
 
         if not all_candles:
-            return jsonify({'status': 'error', 'message': 'No historical data found for the selected date range'}), 404
+            return {'status': 'error', 'message': 'No historical data found for the selected date range'}, 404
 
         all_candles.sort(key=lambda x: x['date'])
 
@@ -3537,22 +2472,66 @@ def api_optimizer_mountain_signal():
         } for candle in all_candles]
 
         df = pd.DataFrame(df_data)
-        df['ema'] = df['close'].ewm(span=ema_period, adjust=False).mean()
-
-        if len(df) >= 15:
-            df['rsi14'] = calculate_rsi(df['close'], period=14)
-        else:
-            df['rsi14'] = None
+        rsi_values = calculate_rsi(df['close'], period=14) if len(df) >= 15 else np.full(len(df), np.nan)
+        square_off = square_off_mask(df['date'])
+        premiums = premium_model.bar_premiums(df['date']) if premium_model is not None else None
+        # Signal timelines are cached per candle set and signal parameters, so SL / target changes only replay exits
+        data_key = timeline_data_key(
+            instrument_key, kite_interval, from_date, to_date, rules_version,
+            df['date'], df['close'].to_numpy(), premium_model
+        )
 
-        trades, option_trades = run_mountain_signal_strategy_on_dataframe(
-            df=df,
-            instrument_key=instrument_key,
-            lot_size_value=lot_size_value,
-            strike_step=strike_step,
-            stop_loss_percent=stop_loss_percent,
-            target_percent=target_percent
+        if grid is not None:
+            objective = data.get('objective', 'option')
+            if objective not in OPTIMIZER_OBJECTIVES:
+                objective = 'option'
+            result = run_grid(
+                df['high'], df['low'], df['close'], rsi_values, square_off, grid,
+                lot_size=lot_size_value, strike_step=strike_step, initial_capital=initial_investment,
+                data_key=data_key,
+                progress=lambda done, total: report(0.3 + 0.65 * done / total, f'{done}/{total} parameter groups evaluated'),
+                premiums=premiums
+            )
+            ranked = rank_rows(result['rows'], objective)
+            try:
+                top_n = max(1, min(int(data.get('top_n', config.OPTIMIZER_TOP_RESULTS)), len(ranked)))
+            except (TypeError, ValueError):
+                top_n = min(config.OPTIMIZER_TOP_RESULTS, len(ranked))
+            logging.info(f"[OPTIMIZER] {result['evaluations']} evaluations on {len(df)} bars with {result['workers']} workers in {result['elapsed_seconds']:.2f}s")
+            return {
+                'status': 'success',
+                'incompleteDays': [day.isoformat() for day in failed_days],
+                'mode': 'grid',
+                'objective': objective,
+                'evaluations': result['evaluations'],
+                'evaluationsPerSecond': round(result['evaluations_per_second'], 2),
+                'elapsedSeconds': round(result['elapsed_seconds'], 3),
+                'workers': result['workers'],
+                'bars': len(df),
+                'ranked': ranked[:top_n],
+                'paretoFront': pareto_front(result['rows'], objective),
+                'timelineCache': get_timeline_cache().get_metrics(),
+                'parameters': {
+                    'lotSize': lot_size_value,
+                    'strikeStep': strike_step,
+                    'initialInvestment': round(initial_investment, 2)
+                },
+                'dateRange': {
+                    'from': from_date_str,
+                    'to': to_date_str,
+                    'days': days_diff + 1
+                }
+            }, 200
+
+        arrays = candle_block(df['high'], df['low'], df['close'], rsi_values, square_off, premiums)
+        timeline = get_signal_timeline(data_key, arrays, ema_period, rsi_overbought, rsi_oversold, strike_step)
+        trades, option_trades = scan_records(
+            timeline.scan(stop_loss_percent, target_percent), df['date'].array, df['high'].to_numpy(),
+            df['low'].to_numpy(), df['close'].to_numpy(), instrument_key, lot_size_value, strike_step,
+            stop_loss_percent, target_percent
         )
 
+        report(0.8, f'Aggregating {len(trades)} trades')
         closed_trades = [t for t in trades if t.get('exit_time') is not None and t.get('pnl') is not None]
         closed_option_trades = [t for t in option_trades if t.get('exit_time') is not None and t.get('pnl') is not None]
 
@@ -3591,8 +2570,9 @@ def api_optimizer_mountain_signal():
         max_drawdown_abs, max_drawdown_percent, roi_percent = compute_drawdown_metrics(closed_trades, initial_investment)
         option_max_drawdown_abs, option_max_drawdown_percent, option_roi_percent = compute_drawdown_metrics(closed_option_trades, initial_investment)
 
-        return jsonify({
+        return {
             'status': 'success',
+            'incompleteDays': [day.isoformat() for day in failed_days],
             'summary': {
                 'totalTrades': total_trades,
                 'winningTrades': winning_trades,
@@ -3652,11 +2632,179 @@ def api_optimizer_mountain_signal():
                 'monthly': option_monthly_stats,
                 'yearly': option_yearly_stats
             }
-        })
+        }, 200
 
+    except JobCancelled:
+        raise
     except Exception as e:
         logging.error(f"Error in optimizer_mountain_signal: {e}", exc_info=True)
-        return jsonify({'status': 'error', 'message': f'Error running optimizer: {str(e)}'}), 500
+        return {'status': 'error', 'message': f'Error running optimizer: {str(e)}'}, 500
+
+
+@app.route("/api/optimizer_mountain_signal/stream", methods=['POST'])
+def api_optimizer_mountain_signal_stream():
+    """Optimizer run streamed as newline-delimited JSON records, one trading session at a time.
+
+    Takes the optimizer request body (without a parameter grid). Trades and
+    completed daily / weekly / monthly / yearly rows are sent as soon as they
+    are known and the summary comes last; see mountain_signal_stream.py for
+    the record types.
+    """
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+
+    try:
+        optimizer_request, error = parse_optimizer_request(request.get_json() or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': f'Invalid optimizer request: {e}'}), 400
+    if error is not None:
+        return jsonify(error[0]), error[1]
+    if optimizer_request.grid is not None:
+        return jsonify({'status': 'error', 'message': 'Parameter grids are not streamed; submit them as an optimizer_mountain_signal job'}), 400
+
+    return Response(stream_with_context(stream_optimizer_records(optimizer_request)), mimetype='application/x-ndjson')
+
+
+def stream_optimizer_records(optimizer_request: OptimizerRequest) -> Iterator[str]:
+    req = optimizer_request
+    stream = MountainSignalStream(
+        req.instrument_key, req.lot_size_value, req.strike_step, req.stop_loss_percent, req.target_percent,
+        req.ema_period, req.initial_investment, req.rsi_overbought, req.rsi_oversold, req.premium_model
+    )
+    sessions = get_candle_store().iter_candles(kite, req.token, req.from_date, req.to_date, req.kite_interval, log_tag="OPTIMIZER")
+    meta = {
+        'status': 'success',
+        'instrument': req.instrument_key,
+        'interval': req.kite_interval,
+        'dateRange': {'from': req.from_date_str, 'to': req.to_date_str, 'days': req.days_diff + 1},
+    }
+    try:
+        for record in stream.run(sessions, len(trading_days(req.from_date, req.to_date)), meta):
+            if record['type'] == 'summary' and stream.bars == 0:
+                record = {'type': 'error', 'message': 'No historical data found for the selected date range'}
+            yield to_ndjson(record)
+    except Exception as e:
+        logging.error(f"Error in streamed optimizer_mountain_signal: {e}", exc_info=True)
+        yield to_ndjson({'type': 'error', 'message': f'Error running optimizer: {str(e)}'})
+
+
+# Request bodies of these endpoints can also be submitted as background jobs
+BACKGROUND_JOB_RUNNERS = {
+    'backtest_mountain_signal': run_backtest_mountain_signal,
+    'optimizer_mountain_signal': run_optimizer_mountain_signal,
+}
+
+
+def connect_job_kite(credentials: Dict[str, Any]) -> None:
+    """Job process set up: authenticate this process's Kite client with the submitting user's session"""
+    if credentials.get('api_key'):
+        kite.api_key = credentials['api_key']
+    if credentials.get('access_token'):
+        kite.set_access_token(credentials['access_token'])
+
+
+def job_manager():
+    return get_job_manager(socketio, BACKGROUND_JOB_RUNNERS, get_result_cache(), process_setup=connect_job_kite)
+
+
+def run_cached(kind: str, data: Dict[str, Any]):
+    """Response of a backtest / optimizer request; completed date ranges are served from the result cache"""
+    cache = get_result_cache()
+    cache_key = cache.key(kind, data) if cache is not None else None
+    cached = cache.get(cache_key) if cache_key else None
+    if cached is not None:
+        body_json, status_code = cached
+        response = app.response_class(body_json, status=status_code, mimetype='application/json')
+        response.headers['X-Result-Cache'] = 'hit'
+        return response
+
+    body, status_code = BACKGROUND_JOB_RUNNERS[kind](data)
+    # Results missing sessions (failed historical windows) are served but not cached so the next request refetches
+    if cache_key and status_code < 400 and is_complete_result(body):
+        cache.put(cache_key, dump_result(body), status_code)
+    response = jsonify(body)
+    response.headers['X-Result-Cache'] = 'miss' if cache_key else 'bypass'
+    return response, status_code
+
+
+@app.route("/api/jobs", methods=['POST'])
+def api_submit_job():
+    """Queue a backtest / optimizer run; progress arrives as job_update events in the jobs_<user_id> room"""
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+
+    data = request.get_json() or {}
+    kind = data.get('kind')
+    params = data.get('params') or {}
+    if kind not in BACKGROUND_JOB_RUNNERS:
+        return jsonify({'status': 'error', 'message': f"Unknown job kind; expected one of {', '.join(BACKGROUND_JOB_RUNNERS)}"}), 400
+    if not isinstance(params, dict):
+        return jsonify({'status': 'error', 'message': 'Job params must be an object'}), 400
+
+    conn = get_db_connection()
+    user = conn.execute('SELECT app_key FROM users WHERE id = ?', (session['user_id'],)).fetchone()
+    conn.close()
+    # Job processes do not share this process's Kite client; they rebuild it from these credentials
+    credentials = {'api_key': user['app_key'] if user else None, 'access_token': session.get('access_token')}
+
+    try:
+        job, created = job_manager().submit(session['user_id'], kind, params, credentials=credentials)
+    except JobLimitExceeded as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 429
+    return jsonify({'status': 'success', 'job': job, 'created': created}), 202 if created else 200
+
+
+@app.route("/api/jobs", methods=['GET'])
+def api_list_jobs():
+    """Recent background jobs of the current user (newest first, without results)"""
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except (TypeError, ValueError):
+        limit = 20
+    active_only = request.args.get('active', '').lower() in ('1', 'true')
+    jobs = job_manager().list_jobs(session['user_id'], limit=limit, active_only=active_only)
+    return jsonify({'status': 'success', 'jobs': jobs})
+
+
+@app.route("/api/jobs/<job_id>", methods=['GET'])
+def api_job_status(job_id):
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+
+    job = job_manager().status(session['user_id'], job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job})
+
+
+@app.route("/api/jobs/<job_id>/result", methods=['GET'])
+def api_job_result(job_id):
+    """Stored response of a finished job, with the HTTP status the synchronous endpoint would have returned"""
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+
+    found = job_manager().result(session['user_id'], job_id)
+    if found is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    job, body, status_code = found
+    if body is None:
+        message = 'Job has not finished yet' if job['status'] in ('queued', 'running') else f"Job {job['status']} without a result"
+        return jsonify({'status': 'error', 'message': message, 'job': job}), 409
+    return jsonify(body), status_code
+
+
+@app.route("/api/jobs/<job_id>/cancel", methods=['POST'])
+def api_cancel_job(job_id):
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+
+    job = job_manager().cancel(session['user_id'], job_id)
+    if job is None:
+        return jsonify({'status': 'error', 'message': 'Job not found'}), 404
+    return jsonify({'status': 'success', 'job': job})
 
 @app.route("/backtest", methods=['POST'])
 def backtest_strategy():
@@ -3959,15 +3107,13 @@ def market_replay():
     from_date = datetime.datetime.strptime(from_date_str, '%Y-%m-%d')
     to_date = datetime.datetime.strptime(to_date_str, '%Y-%m-%d')
 
-    global instruments_df
-    if instruments_df is None:
-        try:
-            instruments_df = kite.instruments()
-        except Exception as e:
-            logging.error(f"Error fetching instruments: {e}")
-            return jsonify({'status': 'error', 'message': 'Could not fetch instruments'}), 500
+    try:
+        nfo_instruments = get_instrument_master().load(kite, 'NFO')
+    except Exception as e:
+        logging.error(f"Error fetching instruments: {e}")
+        return jsonify({'status': 'error', 'message': 'Could not fetch instruments'}), 500
 
-    instrument = next((item for item in instruments_df if item["name"] == instrument_name and item["exchange"] == "NFO"), None)
+    instrument = next((item for item in nfo_instruments if item["name"] == instrument_name and item["exchange"] == "NFO"), None)
     if not instrument:
         return jsonify({'status': 'error', 'message': f'Instrument {instrument_name} not found'}), 404
     instrument_token = instrument['instrument_token']
@@ -3978,17 +3124,14 @@ def market_replay():
     if not strategy_data:
         return jsonify({'status': 'error', 'message': 'Strategy not found'}), 404
 
-    ticks_rows = conn.execute(
-        'SELECT * FROM tick_data WHERE instrument_token = ? AND timestamp BETWEEN ? AND ? ORDER BY timestamp',
-        (instrument_token, from_date, to_date)
-    ).fetchall()
+    ticks = records_to_ticks(get_tick_journal().read_range(instrument_token, from_date, to_date))
+    if not ticks:
+        # Ranges recorded before the tick journal (and not yet migrated) are still in tick_data
+        ticks = read_legacy_ticks(conn, instrument_token, from_date, to_date)
     conn.close()
-
-    if not ticks_rows:
+    if not ticks:
         return jsonify({'status': 'error', 'message': 'No data found for the selected criteria'}), 404
 
-    ticks = [dict(row) for row in ticks_rows]
-
     strategy_type = strategy_data['strategy_type']
     strategy_class = None
     if strategy_type == 'orb':
@@ -4019,48 +3162,58 @@ def market_replay():
 
     return jsonify({'status': 'success', 'pnl': pnl, 'trades': trades})
 
-instruments_df = None
 
 @app.route("/tick_data/<instrument_token>")
 def tick_data(instrument_token):
     if 'user_id' not in session:
         return jsonify([]), 401
 
-    conn = get_db_connection()
-    tick_data_rows = conn.execute('SELECT * FROM tick_data WHERE instrument_token = ? ORDER BY timestamp DESC LIMIT 100', (instrument_token,)).fetchall()
-    conn.close()
+    try:
+        instrument_token = int(instrument_token)
+    except ValueError:
+        return jsonify([]), 400
 
-    tick_data = [dict(row) for row in tick_data_rows]
+    tick_data = records_to_ticks(get_tick_journal().tail(instrument_token, 100))
+    if not tick_data:
+        conn = get_db_connection()
+        tick_data = read_legacy_ticks(conn, instrument_token, limit=100)
+        conn.close()
     return jsonify(tick_data)
 
 @app.route("/tick_data_status")
 def tick_data_status():
-    global instruments_df
     if 'user_id' not in session:
         return jsonify([]), 401
 
-    if instruments_df is None:
-        try:
-            instruments_df = kite.instruments()
-        except Exception as e:
-            logging.error(f"Error fetching instruments: {e}")
-            return jsonify([]), 500
+    instrument_master = get_instrument_master()
+    try:
+        instrument_master.load(kite)
+    except Exception as e:
+        logging.error(f"Error fetching instruments: {e}")
+        return jsonify([]), 500
 
     conn = get_db_connection()
     status_rows = conn.execute('SELECT * FROM tick_data_status').fetchall()
+    get_tick_journal()  # ensures the segment metadata table exists
+    journal_summaries = {
+        row['instrument_token']: {'row_count': row['row_count'], 'last_collected_at': row['last_ts']}
+        for row in conn.execute(
+            'SELECT instrument_token, SUM(record_count) AS row_count, MAX(last_ts) AS last_ts FROM tick_journal_segments GROUP BY instrument_token'
+        ).fetchall()
+    }
 
     status_data = []
     for row in status_rows:
         instrument_token = row['instrument_token']
         status = row['status']
 
-        # Find trading symbol from the dataframe
-        instrument_details = next((item for item in instruments_df if item["instrument_token"] == instrument_token), None)
+        # Find trading symbol from the instrument master
+        instrument_details = instrument_master.get(instrument_token)
         trading_symbol = instrument_details['tradingsymbol'] if instrument_details else f"Unknown ({instrument_token})"
 
-        row_count = conn.execute('SELECT COUNT(*) FROM tick_data WHERE instrument_token = ?', (instrument_token,)).fetchone()[0]
-        last_collected_at_row = conn.execute('SELECT MAX(timestamp) FROM tick_data WHERE instrument_token = ?', (instrument_token,)).fetchone()
-        last_collected_at = last_collected_at_row[0] if last_collected_at_row and last_collected_at_row[0] else 'N/A'
+        journal_summary = journal_summaries.get(instrument_token, {})
+        row_count = journal_summary.get('row_count', 0)
+        last_collected_at = journal_summary.get('last_collected_at') or 'N/A'
 
         status_data.append({
             'instrument': trading_symbol,
@@ -4130,6 +3283,24 @@ def api_start_ticker():
         logging.error(f"Error in api_start_ticker: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': f'Error starting ticker: {str(e)}'}), 500
 
+@app.route("/api/ticker/metrics", methods=['GET'])
+def api_ticker_metrics():
+    """Tick ingestion metrics (queue depth, flush latency, dropped ticks, per-strategy lag)"""
+    if 'user_id' not in session:
+        return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
+    return jsonify({
+        'status': 'success',
+        'ticker_running': ticker is not None,
+        'tick_writer': get_tick_writer().get_metrics(),
+        'strategy_executor': get_strategy_executor().get_metrics(),
+        'strategy_updates': get_update_emitter(socketio).get_metrics(),
+        'instruments': get_instrument_master().get_metrics(),
+        'price_board': get_price_board().get_metrics(),
+        'audit_sink': get_audit_sink().get_metrics(),
+        'jobs': job_manager().get_metrics(),
+        'result_cache': get_result_cache().get_metrics() if config.RESULT_CACHE_ENABLED else None,
+    })
+
 @app.route("/api/market_snapshot", methods=['GET'])
 def api_market_snapshot():
     """Return current snapshot prices for NIFTY and BANKNIFTY to avoid UI 'Loading...' before websocket ticks."""
@@ -4322,6 +3493,9 @@ def api_paper_trade_stop():
             if running_strat_info.get('paper_trade') and running_strat_info['db_id'] in strategies_to_stop:
                 del running_strategies[unique_run_id]
 
+        # Persist audit rows still buffered for the stopped sessions before closing them
+        get_audit_sink().flush()
+
         # Remove from paper_trade_strategies and update DB
         conn = get_db_connection()
         for strategy_id in strategies_to_stop:
@@ -4371,6 +3545,18 @@ def api_paper_trade_stop():
         logging.error(f"Error stopping paper trade: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': f'Error stopping paper trading: {str(e)}'}), 500
 
+@socketio.on('subscribe_jobs')
+def on_subscribe_jobs(data=None):
+    """Join the background job room and receive the currently active jobs"""
+    if 'user_id' not in session:
+        emit('error', {'message': 'Not authenticated'})
+        return
+
+    from flask_socketio import join_room
+    join_room(f"jobs_{session['user_id']}")
+    jobs = job_manager().list_jobs(session['user_id'], active_only=True)
+    emit('job_snapshot', {'jobs': jobs})
+
 @socketio.on('join_paper_trade')
 def on_join_paper_trade(data):
     """Join paper trade room for real-time updates"""
@@ -4440,9 +3626,12 @@ def api_paper_trade_sessions():
         logging.error(f"Error fetching paper trade sessions: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': f'Error fetching sessions: {str(e)}'}), 500
 
+AUDIT_TRAIL_PAGE_SIZE = 500
+AUDIT_TRAIL_MAX_PAGE_SIZE = 5000
+
 @app.route("/api/paper_trade/audit_trail/<int:session_id>", methods=['GET'])
 def api_paper_trade_audit_trail(session_id):
-    """Get audit trail for a specific paper trade session"""
+    """Get one page of the audit trail for a paper trade session (?after=<last id>&limit=N)"""
     if 'user_id' not in session:
         return jsonify({'status': 'error', 'message': 'User not logged in'}), 401
     
@@ -4464,17 +3653,28 @@ def api_paper_trade_audit_trail(session_id):
             conn.close()
             return jsonify({'status': 'error', 'message': 'Unauthorized'}), 403
         
-        # Fetch audit trail
+        # Fetch one page of the audit trail, keyset-paged on the row id (ids follow insertion order)
+        try:
+            after_id = int(request.args.get('after', 0))
+            limit = min(max(int(request.args.get('limit', AUDIT_TRAIL_PAGE_SIZE)), 1), AUDIT_TRAIL_MAX_PAGE_SIZE)
+        except ValueError:
+            conn.close()
+            return jsonify({'status': 'error', 'message': 'Invalid paging parameters'}), 400
+
         cursor.execute("""
             SELECT id, timestamp, log_type, message, details
             FROM paper_trade_audit_trail
-            WHERE session_id = ?
-            ORDER BY timestamp ASC
-        """, (session_id,))
+            WHERE session_id = ? AND id > ?
+            ORDER BY id ASC
+            LIMIT ?
+        """, (session_id, after_id, limit + 1))
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         import json
         audit_logs = []
-        for row in cursor.fetchall():
+        for row in rows:
             audit_logs.append({
                 'id': row['id'],
                 'timestamp': row['timestamp'],
@@ -4484,7 +3684,12 @@ def api_paper_trade_audit_trail(session_id):
             })
         
         conn.close()
-        return jsonify({'status': 'success', 'audit_logs': audit_logs})
+        return jsonify({
+            'status': 'success',
+            'audit_logs': audit_logs,
+            'next_cursor': audit_logs[-1]['id'] if audit_logs else after_id,
+            'has_more': has_more,
+        })
     except Exception as e:
         logging.error(f"Error fetching audit trail: {e}", exc_info=True)
         return jsonify({'status': 'error', 'message': f'Error fetching audit trail: {str(e)}'}), 500
@@ -4536,25 +3741,9 @@ def api_market_replay():
         else:
             return jsonify({'status': 'error', 'message': f'Unknown instrument: {instrument_name}'}), 400
         
-        # Fetch historical candles from KiteConnect for all dates in range
-        all_candles = []
-        current_date = from_date
+        # Fetch historical candles for all dates in range
         candle_interval = '5minute'  # Default 5-minute candles, can be made configurable
-        
-        while current_date <= to_date:
-            # Skip weekends
-            if current_date.weekday() < 5:  # Monday=0, Friday=4
-                start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-                end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-                
-                try:
-                    hist = kite.historical_data(instrument_token, start_dt, end_dt, candle_interval)
-                    if hist:
-                        all_candles.extend(hist)
-                except Exception as e:
-                    logging.error(f"Error fetching historical data for {current_date}: {e}")
-            
-            current_date += datetime.timedelta(days=1)
+        all_candles = get_historical_candles(kite, instrument_token, from_date, to_date, candle_interval, log_tag="REPLAY")
         
         if not all_candles:
             return jsonify({'status': 'error', 'message': 'No historical data found for the selected date range'}), 404
@@ -4968,10 +4157,33 @@ def handle_subscribe_strategy(data):
             emit('subscribed', {'strategy_id': str(strategy_id), 'message': 'Subscribed to strategy updates'})
         except Exception:
             pass
+        # Start the client from a full snapshot; later strategy_update messages are deltas
+        try:
+            snapshot = get_strategy_streams().snapshot(room_name)
+            if snapshot:
+                emit('strategy_update', snapshot)
+        except Exception as e:
+            logging.debug(f"Error sending strategy snapshot: {e}")
         return True
     except Exception:
         return True
 
+@socketio.on('strategy_resync')
+def handle_strategy_resync(data):
+    """Resend the latest strategy snapshot to a client that detected a sequence gap"""
+    try:
+        user_id = session.get('user_id')
+        strategy_id = (data or {}).get('strategy_id')
+        if not user_id or not strategy_id:
+            return True
+        snapshot = get_strategy_streams().snapshot(f"strategy_{user_id}_{strategy_id}")
+        if snapshot:
+            emit('strategy_update', snapshot)
+        return True
+    except Exception as e:
+        logging.debug(f"Error in strategy_resync: {e}")
+        return True
+
 @socketio.on('unsubscribe_strategy')
 def handle_unsubscribe_strategy(data):
     """Unsubscribe from strategy updates"""
@@ -5054,25 +4266,9 @@ def api_aiml_train():
 
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=365 * years)
-        all_candles = []
-        current_date = start_date
         interval = '5minute'
-        total_days = (end_date - start_date).days + 1
-        day_index = 0
         logging.info(f"[AIML] Training request: symbol={symbol}, years={years}, horizon={horizon}, lookback={lookback}, epochs={epochs}, batch_size={batch_size}")
-        while current_date <= end_date:
-            start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-            end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-            try:
-                hist = kite.historical_data(instrument_token, start_dt, end_dt, interval)
-                if hist:
-                    all_candles.extend(hist)
-            except Exception as e:
-                logging.warning(f"Historical fetch failed for {current_date}: {e}")
-            current_date += datetime.timedelta(days=1)
-            day_index += 1
-            if day_index % 20 == 0 or current_date > end_date:
-                logging.info(f"[AIML] Fetch progress: {day_index}/{total_days} trading days processed, candles so far: {len(all_candles)}")
+        all_candles = get_historical_candles(kite, instrument_token, start_date, end_date, interval, log_tag="AIML")
 
         if not all_candles:
             return jsonify({'status': 'error', 'message': 'No historical data fetched for training'}), 404
@@ -5114,19 +4310,8 @@ def api_aiml_predict():
 
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=7)
-        all_candles = []
-        current_date = start_date
         interval = '5minute'
-        while current_date <= end_date and len(all_candles) < (lookback + 50):
-            start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-            end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-            try:
-                hist = kite.historical_data(instrument_token, start_dt, end_dt, interval)
-                if hist:
-                    all_candles.extend(hist)
-            except Exception as e:
-                logging.warning(f"Historical fetch failed for {current_date}: {e}")
-            current_date += datetime.timedelta(days=1)
+        all_candles = get_historical_candles(kite, instrument_token, start_date, end_date, interval, log_tag="AIML")
 
         if len(all_candles) < lookback:
             return jsonify({'status': 'error', 'message': 'Not enough recent candles for prediction'}), 400
@@ -5164,24 +4349,8 @@ def api_aiml_evaluate():
 
         end_date = datetime.date.today()
         start_date = end_date - datetime.timedelta(days=365 * years)
-        all_candles = []
-        current_date = start_date
         interval = '5minute'
-        total_days = (end_date - start_date).days + 1
-        processed = 0
-        while current_date <= end_date:
-            start_dt = datetime.datetime.combine(current_date, datetime.time(9, 15))
-            end_dt = datetime.datetime.combine(current_date, datetime.time(15, 30))
-            try:
-                hist = kite.historical_data(instrument_token, start_dt, end_dt, interval)
-                if hist:
-                    all_candles.extend(hist)
-            except Exception as e:
-                logging.warning(f"Historical fetch failed for {current_date}: {e}")
-            current_date += datetime.timedelta(days=1)
-            processed += 1
-            if processed % 40 == 0 or current_date > end_date:
-                logging.info(f"[AIML] Evaluate fetch progress: {processed}/{total_days} days, candles: {len(all_candles)}")
+        all_candles = get_historical_candles(kite, instrument_token, start_date, end_date, interval, log_tag="AIML")
 
         if len(all_candles) < (lookback + 100):
             return jsonify({'status': 'error', 'message': 'Insufficient candles for evaluation'}), 400
@@ -5317,36 +4486,19 @@ def api_aiml_evaluate_date():
         instrument_token = token_map[symbol]
 
         # Fetch data for the target date and enough prior days for lookback
-        start_dt = datetime.datetime.combine(target_date, datetime.time(9, 15))
-        end_dt = datetime.datetime.combine(target_date, datetime.time(15, 30))
         interval = '5minute'
         
         # Fetch target date candles
-        target_candles = []
-        try:
-            hist = kite.historical_data(instrument_token, start_dt, end_dt, interval)
-            if hist:
-                target_candles.extend(hist)
-        except Exception as e:
-            logging.warning(f"Historical fetch failed for {target_date}: {e}")
+        target_candles = get_historical_candles(kite, instrument_token, target_date, target_date, interval, log_tag="AIML")
         
         if len(target_candles) < 10:
             return jsonify({'status': 'error', 'message': f'Insufficient data for {target_date}. Market may be closed.'}), 400
 
         # Fetch prior days for lookback context (need at least lookback candles before target date)
         prior_days = max(7, (lookback // 75) + 2)  # Estimate: ~75 candles per day
-        all_candles = []
-        current_date = target_date - datetime.timedelta(days=prior_days)
-        while current_date <= target_date:
-            start_d = datetime.datetime.combine(current_date, datetime.time(9, 15))
-            end_d = datetime.datetime.combine(current_date, datetime.time(15, 30))
-            try:
-                hist = kite.historical_data(instrument_token, start_d, end_d, interval)
-                if hist:
-                    all_candles.extend(hist)
-            except Exception as e:
-                logging.warning(f"Historical fetch failed for {current_date}: {e}")
-            current_date += datetime.timedelta(days=1)
+        all_candles = get_historical_candles(
+            kite, instrument_token, target_date - datetime.timedelta(days=prior_days), target_date, interval, log_tag="AIML"
+        )
 
         if len(all_candles) < (lookback + 10):
             return jsonify({'status': 'error', 'message': 'Insufficient historical data for lookback'}), 400
@@ -0,0 +1,154 @@
+"""
+Buffered persistence for the paper trading audit trail.
+
+Strategies append audit rows to a bounded in-memory deque and return
+immediately; a single writer thread flushes them to paper_trade_audit_trail
+in batches (one transaction per batch) once per flush interval, or sooner when
+a full batch is waiting. flush() writes everything pending synchronously and
+is called when paper trading stops and at interpreter exit, so rows are never
+left behind on a clean shutdown. If the deque overflows the oldest rows are
+dropped and counted in the metrics.
+"""
+import atexit
+import collections
+import datetime
+import json
+import logging
+import threading
+import time
+from typing import Any, Dict, Optional
+
+import config
+from database import get_db_connection
+
+
+class AuditSink:
+    def __init__(self, max_pending: Optional[int] = None, flush_interval: Optional[float] = None, batch_size: Optional[int] = None):
+        self.max_pending = max_pending or config.AUDIT_SINK_MAX_PENDING
+        self.flush_interval = flush_interval if flush_interval is not None else config.AUDIT_SINK_FLUSH_INTERVAL
+        self.batch_size = batch_size or config.AUDIT_SINK_BATCH_SIZE
+        self.pending = collections.deque(maxlen=self.max_pending)
+        self.lock = threading.Lock()
+        # Serialises drain + write so rows reach the table in append order
+        self.write_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.metrics = {
+            'appended': 0,
+            'dropped': 0,
+            'flushes': 0,
+            'rows_written': 0,
+            'write_errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+        }
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='audit-sink', daemon=True)
+            self.thread.start()
+        logging.info("Audit sink started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        self.wakeup.set()
+        if self.thread:
+            self.thread.join(timeout)
+        self.flush()
+
+    def append(self, session_id: int, log_type: str, message: str, details: Optional[Dict[str, Any]] = None,
+               timestamp: Optional[datetime.datetime] = None) -> None:
+        """Queue one audit row; never touches the database"""
+        row = (session_id, timestamp or datetime.datetime.now(), log_type, message, details)
+        with self.lock:
+            if len(self.pending) == self.pending.maxlen:
+                self.metrics['dropped'] += 1
+            self.pending.append(row)
+            self.metrics['appended'] += 1
+            backlog = len(self.pending)
+        if backlog >= self.batch_size:
+            self.wakeup.set()
+
+    def flush(self) -> int:
+        """Write everything pending now; returns the number of rows written"""
+        written = 0
+        with self.write_lock:
+            conn = None
+            try:
+                while True:
+                    with self.lock:
+                        count = min(len(self.pending), self.batch_size)
+                        batch = [self.pending.popleft() for _ in range(count)]
+                    if not batch:
+                        break
+                    if conn is None:
+                        conn = get_db_connection()
+                    written += self._write(conn, batch)
+            finally:
+                if conn is not None:
+                    conn.close()
+        return written
+
+    def _write(self, conn, batch) -> int:
+        started = time.monotonic()
+        rows = [
+            (session_id, timestamp, log_type, message, json.dumps(details) if details else None)
+            for session_id, timestamp, log_type, message, details in batch
+        ]
+        try:
+            with conn:
+                conn.executemany("""
+                    INSERT INTO paper_trade_audit_trail
+                    (session_id, timestamp, log_type, message, details)
+                    VALUES (?, ?, ?, ?, ?)
+                """, rows)
+        except Exception as e:
+            logging.error(f"Error saving {len(rows)} audit trail rows to database: {e}", exc_info=True)
+            with self.lock:
+                self.metrics['write_errors'] += 1
+            return 0
+
+        elapsed_ms = (time.monotonic() - started) * 1000.0
+        with self.lock:
+            m = self.metrics
+            m['flushes'] += 1
+            m['rows_written'] += len(rows)
+            m['last_flush_ms'] = elapsed_ms
+            m['max_flush_ms'] = max(m['max_flush_ms'], elapsed_ms)
+        return len(rows)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics['pending'] = len(self.pending)
+        metrics['capacity'] = self.max_pending
+        metrics['running'] = bool(self.thread and self.thread.is_alive())
+        return metrics
+
+    def _run(self) -> None:
+        while not self.stop_event.is_set():
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Audit sink flush failed: {e}", exc_info=True)
+
+
+_audit_sink = None
+_audit_sink_lock = threading.Lock()
+
+
+def get_audit_sink() -> AuditSink:
+    global _audit_sink
+    if _audit_sink is None:
+        with _audit_sink_lock:
+            if _audit_sink is None:
+                _audit_sink = AuditSink()
+                _audit_sink.start()
+                atexit.register(_audit_sink.stop)
+    return _audit_sink
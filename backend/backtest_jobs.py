@@ -0,0 +1,569 @@
+"""
+Background jobs for long Mountain Signal backtests and optimizer runs.
+
+Submitting a job stores a row in backtest_jobs and returns at once. At most
+JOB_MAX_WORKERS jobs run at a time, each in its own process started with
+forkserver (spawn where unavailable) so nothing of the threaded web process is
+inherited. A job process builds its own Kite client: the manager's
+``process_setup`` hook is called there first with the credentials captured at
+submit time, which are kept in memory only (never persisted or emitted).
+Further jobs wait in FIFO order and each user may have at most
+JOB_MAX_ACTIVE_PER_USER jobs queued or running. Job processes lower their
+priority by JOB_NICE so a heavy optimizer does not starve the live trading
+threads of the web process.
+
+Runners report progress through a callback. A monitor thread in the web
+process persists it and emits ``job_update`` events to the ``jobs_<user_id>``
+Socket.IO room. Cancelling a running job sets its cancel event, so the next
+progress call raises JobCancelled; the process is terminated if it has not
+stopped after JOB_CANCEL_GRACE_SECONDS. Results are stored with the job, so a
+reloaded page reads them back instead of rerunning, and resubmitting the same
+parameters while a job is still active returns that job. Jobs left queued or
+running by a previous server process are marked failed on start up.
+
+With a result cache (see result_cache.py) a job whose result is cached is
+recorded as succeeded on submit without starting a process, and successful
+results of new jobs are stored in the cache by the web process unless they
+were computed with sessions missing (see result_cache.is_complete_result).
+"""
+import atexit
+import collections
+import datetime
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+from database import get_db_connection
+from result_cache import is_complete_result
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED_STATUSES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Seconds between progress writes to the database (events are emitted for every update)
+PROGRESS_PERSIST_INTERVAL = 1.0
+
+ProgressCallback = Callable[[float, str], None]
+# A runner takes the job parameters and a progress callback and returns (response body, HTTP status)
+Runner = Callable[[Dict[str, Any], ProgressCallback], Tuple[Dict[str, Any], int]]
+# Called in the job process with the submitting user's credentials before the runner
+ProcessSetup = Callable[[Dict[str, Any]], None]
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress callback once the job has been cancelled"""
+
+
+class JobLimitExceeded(Exception):
+    """The user already has the maximum number of queued or running jobs"""
+
+
+def ensure_backtest_job_tables() -> None:
+    """Create the backtest_jobs table if it doesn't exist."""
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS backtest_jobs (
+                id TEXT PRIMARY KEY,
+                user_id INTEGER NOT NULL,
+                kind TEXT NOT NULL,
+                status TEXT NOT NULL,
+                params_json TEXT NOT NULL,
+                params_hash TEXT NOT NULL,
+                progress REAL NOT NULL DEFAULT 0,
+                message TEXT,
+                result_json TEXT,
+                result_status INTEGER,
+                error_message TEXT,
+                created_at DATETIME NOT NULL,
+                started_at DATETIME,
+                finished_at DATETIME,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+            """
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_backtest_jobs_user_created ON backtest_jobs(user_id, created_at)")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
+
+
+def dump_result(body: Dict[str, Any]) -> str:
+    """Serialise a runner's response body (dates as ISO strings, NumPy scalars as numbers)"""
+    return json.dumps(body, default=_json_default)
+
+
+def _run_job(runner: Runner, params: Dict[str, Any], job_id: str, channel, cancel_event, nice: int,
+             setup: Optional[ProcessSetup] = None, credentials: Optional[Dict[str, Any]] = None) -> None:
+    """Job process entry point; reports back through ``channel``"""
+    if nice and hasattr(os, 'nice'):
+        try:
+            os.nice(nice)
+        except OSError:
+            pass
+
+    def progress(fraction: float, message: str = '') -> None:
+        if cancel_event.is_set():
+            raise JobCancelled()
+        channel.put(('progress', job_id, float(fraction), message))
+
+    try:
+        if setup is not None:
+            setup(credentials or {})
+        body, status_code = runner(params, progress)
+        channel.put(('result', job_id, dump_result(body), status_code, is_complete_result(body)))
+    except JobCancelled:
+        channel.put(('cancelled', job_id))
+    except Exception as e:
+        logging.error(f"Background job {job_id} failed: {e}", exc_info=True)
+        channel.put(('error', job_id, str(e)))
+
+
+def _process_context():
+    # Forking the threaded web process would copy held locks and sockets into the job
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+class JobManager:
+    def __init__(self, socketio=None, max_workers: Optional[int] = None, max_active_per_user: Optional[int] = None,
+                 result_cache=None, process_setup: Optional[ProcessSetup] = None):
+        self.socketio = socketio
+        self.result_cache = result_cache
+        self.process_setup = process_setup
+        self.max_workers = max_workers or config.JOB_MAX_WORKERS
+        self.max_active_per_user = max_active_per_user or config.JOB_MAX_ACTIVE_PER_USER
+        self.runners: Dict[str, Runner] = {}
+        self.context = _process_context()
+        self.channel = self.context.Queue()
+        self.lock = threading.Lock()
+        self.jobs: Dict[str, Dict[str, Any]] = {}  # queued and running jobs
+        self.pending = collections.deque()  # ids of queued jobs in submission order
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.metrics = {
+            'submitted': 0,
+            'deduplicated': 0,
+            'cached': 0,
+            'rejected': 0,
+            'succeeded': 0,
+            'failed': 0,
+            'cancelled': 0,
+            'terminated': 0,
+        }
+
+    def register(self, kind: str, runner: Runner) -> None:
+        self.runners[kind] = runner
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='backtest-jobs', daemon=True)
+            self.thread.start()
+        logging.info(f"Background job manager started with {self.max_workers} job processes")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+        with self.lock:
+            running = [job for job in self.jobs.values() if job['status'] == RUNNING]
+        for job in running:
+            job['process'].terminate()
+
+    def recover(self) -> int:
+        """Fail jobs a previous server process left queued or running and drop expired finished jobs"""
+        cutoff = datetime.datetime.now() - datetime.timedelta(days=config.JOB_RETENTION_DAYS)
+        conn = get_db_connection()
+        try:
+            with conn:
+                interrupted = conn.execute(
+                    """
+                    UPDATE backtest_jobs
+                    SET status = ?, error_message = ?, finished_at = ?
+                    WHERE status IN (?, ?)
+                    """,
+                    (FAILED, 'Interrupted by a server restart', datetime.datetime.now(), QUEUED, RUNNING)
+                ).rowcount
+                conn.execute("DELETE FROM backtest_jobs WHERE finished_at IS NOT NULL AND finished_at < ?", (cutoff,))
+        finally:
+            conn.close()
+        if interrupted:
+            logging.warning(f"Marked {interrupted} interrupted background jobs as failed")
+        return interrupted
+
+    def submit(self, user_id: int, kind: str, params: Dict[str, Any],
+               credentials: Optional[Dict[str, Any]] = None) -> Tuple[Dict[str, Any], bool]:
+        """Queue a job; returns (job, created). An identical active job of the user is returned instead of a new one.
+
+        ``credentials`` are handed to ``process_setup`` in the job process.
+        """
+        if kind not in self.runners:
+            raise ValueError(f"Unknown job kind: {kind}")
+        params_json = json.dumps(params, sort_keys=True, default=_json_default)
+        params_hash = hashlib.sha256(f"{kind}:{params_json}".encode()).hexdigest()
+        cache_key = self.result_cache.key(kind, params) if self.result_cache is not None else None
+        cached = self.result_cache.get(cache_key) if cache_key else None
+        with self.lock:
+            active = [job for job in self.jobs.values() if job['user_id'] == user_id]
+            for job in active:
+                if job['params_hash'] == params_hash:
+                    self.metrics['deduplicated'] += 1
+                    return self._view(job), False
+            if cached is not None:
+                self.metrics['cached'] += 1
+            elif len(active) >= self.max_active_per_user:
+                self.metrics['rejected'] += 1
+                raise JobLimitExceeded(
+                    f"At most {self.max_active_per_user} backtest/optimizer jobs can be queued or running; "
+                    f"wait for one to finish or cancel it"
+                )
+            job = {
+                'id': uuid.uuid4().hex,
+                'user_id': user_id,
+                'kind': kind,
+                'status': QUEUED,
+                'params': params,
+                'params_hash': params_hash,
+                'progress': 0.0,
+                'message': 'Queued',
+                'error_message': None,
+                'created_at': datetime.datetime.now(),
+                'started_at': None,
+                'finished_at': None,
+                'process': None,
+                'cancel_event': None,
+                'cancel_deadline': None,
+                'persisted_at': 0.0,
+                'cache_key': cache_key,
+                'credentials': credentials or {},
+            }
+            if cached is None:
+                self.jobs[job['id']] = job
+                self.pending.append(job['id'])
+                self.metrics['submitted'] += 1
+        result_json, result_status = cached if cached is not None else (None, None)
+        if cached is not None:
+            job.update(status=SUCCEEDED, progress=1.0, message='Served from cache', started_at=job['created_at'],
+                       finished_at=job['created_at'], has_result=True)
+        conn = get_db_connection()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    INSERT INTO backtest_jobs (id, user_id, kind, status, params_json, params_hash, progress, message,
+                                               result_json, result_status, created_at, started_at, finished_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    (job['id'], user_id, kind, job['status'], params_json, params_hash, job['progress'], job['message'],
+                     result_json, result_status, job['created_at'], job['started_at'], job['finished_at'])
+                )
+        finally:
+            conn.close()
+        self.start()
+        self._emit(job)
+        if cached is None:
+            self._dispatch()
+        return self._view(job), True
+
+    def cancel(self, user_id: int, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is None or job['user_id'] != user_id:
+                job = None
+            elif job['status'] == QUEUED:
+                self.pending.remove(job_id)
+            elif job['cancel_event'] is not None and not job['cancel_event'].is_set():
+                job['cancel_event'].set()
+                job['cancel_deadline'] = time.monotonic() + config.JOB_CANCEL_GRACE_SECONDS
+                job['message'] = 'Cancelling'
+        if job is None:
+            return self.status(user_id, job_id)
+        if job['status'] == QUEUED:
+            self._finish(job, CANCELLED)
+        else:
+            self._emit(job)
+        return self._view(job)
+
+    def status(self, user_id: int, job_id: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            job = self.jobs.get(job_id)
+            if job is not None and job['user_id'] == user_id:
+                return self._view(job)
+        row = self._fetch(user_id, job_id)
+        return self._row_view(row) if row else None
+
+    def result(self, user_id: int, job_id: str) -> Optional[Tuple[Dict[str, Any], Optional[Dict[str, Any]], Optional[int]]]:
+        """(job, result body, HTTP status of the result); the body is None until the job has finished with a result"""
+        job = self.status(user_id, job_id)
+        if job is None or job['status'] not in FINISHED_STATUSES:
+            return (job, None, None) if job else None
+        row = self._fetch(user_id, job_id, with_result=True)
+        if row is None or row['result_json'] is None:
+            return job, None, None
+        return job, json.loads(row['result_json']), row['result_status']
+
+    def list_jobs(self, user_id: int, limit: int = 20, active_only: bool = False) -> List[Dict[str, Any]]:
+        with self.lock:
+            active = {job_id: self._view(job) for job_id, job in self.jobs.items() if job['user_id'] == user_id}
+        if active_only:
+            return sorted(active.values(), key=lambda job: job['createdAt'], reverse=True)
+        conn = get_db_connection()
+        try:
+            rows = conn.execute(
+                """
+                SELECT id, kind, status, params_json, progress, message, error_message, created_at, started_at, finished_at,
+                       result_json IS NOT NULL AS has_result
+                FROM backtest_jobs
+                WHERE user_id = ?
+                ORDER BY created_at DESC
+                LIMIT ?
+                """,
+                (user_id, limit)
+            ).fetchall()
+        finally:
+            conn.close()
+        # In-memory progress of active jobs is fresher than the throttled database copy
+        return [active.get(row['id']) or self._row_view(row) for row in rows]
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics['running'] = sum(1 for job in self.jobs.values() if job['status'] == RUNNING)
+            metrics['queued'] = len(self.pending)
+        metrics['max_workers'] = self.max_workers
+        metrics['max_active_per_user'] = self.max_active_per_user
+        return metrics
+
+    def _dispatch(self) -> None:
+        started = []
+        with self.lock:
+            running = sum(1 for job in self.jobs.values() if job['status'] == RUNNING)
+            while self.pending and running < self.max_workers:
+                job = self.jobs[self.pending.popleft()]
+                cancel_event = self.context.Event()
+                process = self.context.Process(
+                    target=_run_job,
+                    args=(self.runners[job['kind']], job['params'], job['id'], self.channel, cancel_event, config.JOB_NICE,
+                          self.process_setup, job['credentials']),
+                    name=f"job-{job['id'][:8]}",
+                )
+                process.start()
+                job.update(status=RUNNING, process=process, cancel_event=cancel_event,
+                           started_at=datetime.datetime.now(), message='Started')
+                running += 1
+                started.append(job)
+        for job in started:
+            self._persist(job)
+            self._emit(job)
+
+    def _run(self) -> None:
+        while not self.stop_event.is_set():
+            try:
+                self._handle(self.channel.get(timeout=0.5))
+            except queue.Empty:
+                pass
+            except Exception as e:
+                logging.error(f"Background job monitor failed: {e}", exc_info=True)
+            try:
+                self._reap()
+            except Exception as e:
+                logging.error(f"Background job reaper failed: {e}", exc_info=True)
+
+    def _handle(self, message: Tuple) -> None:
+        kind, job_id = message[0], message[1]
+        with self.lock:
+            job = self.jobs.get(job_id)
+        if job is None:
+            return
+        if kind == 'progress':
+            job['progress'] = max(0.0, min(1.0, message[2]))
+            job['message'] = message[3]
+            if time.monotonic() - job['persisted_at'] >= PROGRESS_PERSIST_INTERVAL:
+                self._persist(job)
+            self._emit(job)
+        elif kind == 'result':
+            result_json, status_code, complete = message[2], message[3], message[4]
+            if status_code < 400:
+                if job['cache_key'] and self.result_cache is not None and complete:
+                    self.result_cache.put(job['cache_key'], result_json, status_code)
+                self._finish(job, SUCCEEDED, result_json=result_json, result_status=status_code)
+            else:
+                error_message = json.loads(result_json).get('message')
+                self._finish(job, FAILED, result_json=result_json, result_status=status_code, error_message=error_message)
+        elif kind == 'cancelled':
+            self._finish(job, CANCELLED)
+        elif kind == 'error':
+            self._finish(job, FAILED, error_message=message[2])
+
+    def _reap(self) -> None:
+        """Terminate jobs past their cancel grace period and fail jobs whose process died without reporting"""
+        with self.lock:
+            running = [job for job in self.jobs.values() if job['status'] == RUNNING]
+        now = time.monotonic()
+        for job in running:
+            process = job['process']
+            if job['cancel_deadline'] is not None and now > job['cancel_deadline'] and process.is_alive():
+                logging.warning(f"Terminating background job {job['id']} after the cancel grace period")
+                process.terminate()
+                with self.lock:
+                    self.metrics['terminated'] += 1
+            if process.is_alive():
+                continue
+            process.join(1)
+            # A report sent just before exit may still be queued
+            try:
+                while True:
+                    self._handle(self.channel.get(timeout=0.1))
+            except queue.Empty:
+                pass
+            with self.lock:
+                still_active = job['id'] in self.jobs
+            if not still_active:
+                continue
+            if job['cancel_event'].is_set():
+                self._finish(job, CANCELLED)
+            else:
+                self._finish(job, FAILED, error_message=f"Job process exited with code {process.exitcode}")
+
+    def _finish(self, job: Dict[str, Any], status: str, result_json: Optional[str] = None,
+                result_status: Optional[int] = None, error_message: Optional[str] = None) -> None:
+        with self.lock:
+            if self.jobs.pop(job['id'], None) is None:
+                return
+            self.metrics[status] += 1
+        job.update(status=status, finished_at=datetime.datetime.now(), error_message=error_message,
+                   message={SUCCEEDED: 'Finished', FAILED: 'Failed', CANCELLED: 'Cancelled'}[status],
+                   has_result=result_json is not None)
+        if status == SUCCEEDED:
+            job['progress'] = 1.0
+        if job['process'] is not None:
+            job['process'].join(1)
+        self._persist(job, result_json, result_status)
+        self._emit(job)
+        self._dispatch()
+
+    def _persist(self, job: Dict[str, Any], result_json: Optional[str] = None, result_status: Optional[int] = None) -> None:
+        job['persisted_at'] = time.monotonic()
+        conn = get_db_connection()
+        try:
+            with conn:
+                conn.execute(
+                    """
+                    UPDATE backtest_jobs
+                    SET status = ?, progress = ?, message = ?, error_message = ?, started_at = ?, finished_at = ?,
+                        result_json = COALESCE(?, result_json), result_status = COALESCE(?, result_status)
+                    WHERE id = ?
+                    """,
+                    (job['status'], job['progress'], job['message'], job['error_message'], job['started_at'],
+                     job['finished_at'], result_json, result_status, job['id'])
+                )
+        except Exception as e:
+            logging.error(f"Error saving background job {job['id']}: {e}", exc_info=True)
+        finally:
+            conn.close()
+
+    def _fetch(self, user_id: int, job_id: str, with_result: bool = False):
+        columns = ", result_json, result_status" if with_result else ", result_json IS NOT NULL AS has_result"
+        conn = get_db_connection()
+        try:
+            return conn.execute(
+                f"""
+                SELECT id, kind, status, params_json, progress, message, error_message, created_at, started_at, finished_at
+                       {columns}
+                FROM backtest_jobs
+                WHERE id = ? AND user_id = ?
+                """,
+                (job_id, user_id)
+            ).fetchone()
+        finally:
+            conn.close()
+
+    def _emit(self, job: Dict[str, Any]) -> None:
+        if self.socketio is None:
+            return
+        try:
+            self.socketio.emit('job_update', self._view(job), room=f"jobs_{job['user_id']}")
+        except Exception as e:
+            logging.error(f"Error emitting background job update: {e}", exc_info=True)
+
+    @staticmethod
+    def _view(job: Dict[str, Any]) -> Dict[str, Any]:
+        def iso(value):
+            return value.isoformat() if value else None
+        return {
+            'id': job['id'],
+            'kind': job['kind'],
+            'status': job['status'],
+            'progress': round(job['progress'], 4),
+            'message': job['message'],
+            'errorMessage': job['error_message'],
+            'params': job['params'],
+            'createdAt': iso(job['created_at']),
+            'startedAt': iso(job['started_at']),
+            'finishedAt': iso(job['finished_at']),
+            'hasResult': job.get('has_result', False),
+        }
+
+    @staticmethod
+    def _row_view(row) -> Dict[str, Any]:
+        def iso(value):
+            return value.replace(' ', 'T') if isinstance(value, str) else value
+        keys = row.keys()
+        return {
+            'id': row['id'],
+            'kind': row['kind'],
+            'status': row['status'],
+            'progress': round(row['progress'] or 0.0, 4),
+            'message': row['message'],
+            'errorMessage': row['error_message'],
+            'params': json.loads(row['params_json']),
+            'createdAt': iso(row['created_at']),
+            'startedAt': iso(row['started_at']),
+            'finishedAt': iso(row['finished_at']),
+            'hasResult': bool(row['has_result']) if 'has_result' in keys else row['result_json'] is not None,
+        }
+
+
+_job_manager = None
+_job_manager_lock = threading.Lock()
+
+
+def get_job_manager(socketio=None, runners: Optional[Dict[str, Runner]] = None, result_cache=None,
+                    process_setup: Optional[ProcessSetup] = None) -> JobManager:
+    global _job_manager
+    if _job_manager is None:
+        with _job_manager_lock:
+            if _job_manager is None:
+                ensure_backtest_job_tables()
+                manager = JobManager(socketio, result_cache=result_cache, process_setup=process_setup)
+                for kind, runner in (runners or {}).items():
+                    manager.register(kind, runner)
+                manager.recover()
+                manager.start()
+                # Job processes are not daemonic (the optimizer starts its own pool), so stop them explicitly
+                atexit.register(manager.stop)
+                _job_manager = manager
+    return _job_manager
@@ -0,0 +1,82 @@
+"""
+Benchmark historical candle retrieval against the offline FakeKiteConnect.
+
+Compares the legacy one-request-per-day serial loop with the range-coalesced,
+rate-limited HistoricalFetcher and with the on-disk CandleStore (cold and warm).
+
+Usage:
+    python benchmark_historical_fetch.py --years 1 3 --latency 0.08 --rate 3
+"""
+import argparse
+import datetime
+import shutil
+import tempfile
+import time
+
+from candle_store import CandleStore
+from fake_kite import FakeKiteConnect
+from historical_fetcher import HistoricalFetcher, TokenBucket
+
+
+def run_legacy(kite, token, start, end, interval):
+    candles = []
+    current = start
+    while current <= end:
+        if current.weekday() < 5:
+            start_dt = datetime.datetime.combine(current, datetime.time(9, 15))
+            end_dt = datetime.datetime.combine(current, datetime.time(15, 30))
+            candles.extend(kite.historical_data(token, start_dt, end_dt, interval))
+        current += datetime.timedelta(days=1)
+    return candles
+
+
+def report(label, elapsed, candles, calls):
+    rate = len(candles) / elapsed if elapsed > 0 else float('inf')
+    print(f"  {label:<22} {elapsed:8.2f}s  requests={calls:<5} candles={len(candles):<7} candles/s={rate:,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--years', type=int, nargs='+', default=[1, 3])
+    parser.add_argument('--latency', type=float, default=0.08, help='Simulated seconds per historical_data call')
+    parser.add_argument('--rate', type=float, default=3.0, help='Requests per second allowed by the token bucket')
+    parser.add_argument('--workers', type=int, default=3)
+    parser.add_argument('--interval', default='5minute')
+    parser.add_argument('--skip-legacy', action='store_true', help='Skip the slow per-day serial baseline')
+    args = parser.parse_args()
+
+    token = 260105
+    end = datetime.date.today() - datetime.timedelta(days=1)
+    for years in args.years:
+        start = end - datetime.timedelta(days=365 * years)
+        print(f"{years}-year pull ({start}..{end}, {args.interval}, latency={args.latency}s, rate={args.rate}/s)")
+
+        if not args.skip_legacy:
+            kite = FakeKiteConnect(latency=args.latency, recorded_dir='')
+            t0 = time.perf_counter()
+            candles = run_legacy(kite, token, start, end, args.interval)
+            report('legacy per-day', time.perf_counter() - t0, candles, kite.calls)
+
+        kite = FakeKiteConnect(latency=args.latency, recorded_dir='')
+        fetcher = HistoricalFetcher(kite, max_workers=args.workers, rate_limiter=TokenBucket(args.rate))
+        t0 = time.perf_counter()
+        candles = fetcher.fetch(token, start, end, args.interval)
+        report('coalesced fetcher', time.perf_counter() - t0, candles, kite.calls)
+
+        store_dir = tempfile.mkdtemp(prefix='candle_store_bench_')
+        try:
+            store = CandleStore(store_dir)
+            kite = FakeKiteConnect(latency=args.latency, recorded_dir='')
+            t0 = time.perf_counter()
+            candles = store.get_candles(kite, token, start, end, args.interval)
+            report('candle store (cold)', time.perf_counter() - t0, candles, kite.calls)
+            kite.calls = 0
+            t0 = time.perf_counter()
+            candles = store.get_candles(kite, token, start, end, args.interval)
+            report('candle store (warm)', time.perf_counter() - t0, candles, kite.calls)
+        finally:
+            shutil.rmtree(store_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
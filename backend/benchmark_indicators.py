@@ -0,0 +1,146 @@
+"""
+Benchmark the streaming indicators in utils/streaming_indicators.py against
+the pandas functions in utils/indicators.py.
+
+For every indicator it reports:
+  - per-update cost: one streaming update() versus recomputing the pandas
+    function over the last --window bars (what a live strategy did per bar)
+  - batch throughput: the vectorized batch() path versus the pandas function
+    over the whole series, in bars per second
+  - parity: maximum relative deviation between streaming, batch and pandas
+
+Bars are a seeded random walk, so runs are repeatable.
+
+Usage:
+    python benchmark_indicators.py --bars 100000 --window 100
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils import indicators
+from utils.streaming_indicators import (
+    ATR, EMA, MACD, OBV, RSI, SMA, WMA, BollingerBands, CandlePatterns, PATTERN_NAMES, Stochastic,
+)
+
+
+def make_bars(count, seed):
+    rng = np.random.default_rng(seed)
+    close = 45000 + np.cumsum(rng.normal(0, 15, count))
+    open_ = close + rng.normal(0, 5, count)
+    high = np.maximum(open_, close) + np.abs(rng.normal(0, 8, count))
+    low = np.minimum(open_, close) - np.abs(rng.normal(0, 8, count))
+    volume = rng.integers(100, 10000, count).astype(float)
+    return pd.DataFrame({'open': open_, 'high': high, 'low': low, 'close': close, 'volume': volume})
+
+
+def as_columns(value):
+    """Normalise an indicator output (array, tuple, dict) to a list of float arrays"""
+    if isinstance(value, dict):
+        return [np.asarray(value[name], dtype=float) for name in PATTERN_NAMES]
+    if isinstance(value, tuple):
+        return [np.asarray(part, dtype=float) for part in value]
+    return [np.asarray(value, dtype=float)]
+
+
+def stream_columns(values, width):
+    columns = [np.full(len(values), np.nan) for _ in range(width)]
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        if isinstance(value, dict):
+            value = tuple(value[name] for name in PATTERN_NAMES)
+        elif not isinstance(value, tuple):
+            value = (value,)
+        for column, part in zip(columns, value):
+            column[i] = np.nan if part is None else float(part)
+    return columns
+
+
+def deviation(left, right):
+    worst = 0.0
+    for a, b in zip(left, right):
+        a = np.where(np.isinf(a), np.nan, a)
+        b = np.where(np.isinf(b), np.nan, b)
+        if (np.isnan(a) != np.isnan(b)).any():
+            return float('inf')
+        mask = ~np.isnan(a)
+        if mask.any():
+            worst = max(worst, float(np.max(np.abs(a[mask] - b[mask]) / np.maximum(1.0, np.abs(b[mask])))))
+    return worst
+
+
+def cases():
+    return [
+        ('SMA 20', lambda: SMA(20), lambda d: SMA.batch(d.close, 20), lambda d: indicators.calculate_sma(d.close, 20)),
+        ('EMA 20', lambda: EMA(20), lambda d: EMA.batch(d.close, 20), lambda d: indicators.calculate_ema(d.close, 20)),
+        ('WMA 20', lambda: WMA(20), lambda d: WMA.batch(d.close, 20), lambda d: indicators.calculate_wma(d.close, 20)),
+        ('RSI 14', lambda: RSI(14), lambda d: RSI.batch(d.close, 14), lambda d: indicators.calculate_rsi(d.close, 14)),
+        ('MACD', MACD, lambda d: MACD.batch(d.close), lambda d: indicators.calculate_macd(d.close)),
+        ('Bollinger 20', BollingerBands, lambda d: BollingerBands.batch(d.close),
+         lambda d: indicators.calculate_bollinger_bands(d.close)),
+        ('ATR 14', ATR, lambda d: ATR.batch(d.high, d.low, d.close),
+         lambda d: indicators.calculate_atr(d.high, d.low, d.close)),
+        ('Stochastic', Stochastic, lambda d: Stochastic.batch(d.high, d.low, d.close),
+         lambda d: indicators.calculate_stochastic(d.high, d.low, d.close)),
+        ('OBV', OBV, lambda d: OBV.batch(d.close, d.volume), lambda d: indicators.calculate_obv(d.close, d.volume)),
+        ('Patterns', CandlePatterns, lambda d: CandlePatterns.batch(d.open, d.high, d.low, d.close),
+         lambda d: {name: column.to_numpy() for name, column in indicators.identify_candlestick_patterns(d).items()}),
+    ]
+
+
+def timed(fn, *args):
+    t0 = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bars', type=int, default=100000, help='Bars in the batch series')
+    parser.add_argument('--window', type=int, default=100, help='Bars the pandas per-update recompute looks at')
+    parser.add_argument('--updates', type=int, default=2000, help='Bars timed for the pandas per-update recompute')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='Maximum relative deviation')
+    args = parser.parse_args()
+
+    df = make_bars(args.bars, args.seed)
+    bars = df.to_dict('records')
+    updates = min(args.updates, args.bars - args.window)
+
+    print(f"{args.bars} bars, pandas per-update window {args.window}")
+    print(f"  {'indicator':<13} {'stream us':>10} {'pandas us':>10} {'speedup':>8}   "
+          f"{'batch bars/s':>13} {'pandas bars/s':>14}   {'deviation':>9}")
+    failed = False
+    for name, factory, batch, reference in cases():
+        indicator = factory()
+        update = indicator.update
+        t0 = time.perf_counter()
+        streamed = [update(bar) for bar in bars]
+        stream_us = (time.perf_counter() - t0) * 1e6 / args.bars
+
+        t0 = time.perf_counter()
+        for end in range(args.window, args.window + updates):
+            reference(df.iloc[end - args.window:end])
+        pandas_us = (time.perf_counter() - t0) * 1e6 / max(updates, 1)
+
+        batch_columns, batch_seconds = timed(batch, df)
+        reference_columns, reference_seconds = timed(reference, df)
+        batch_columns = as_columns(batch_columns)
+        reference_columns = as_columns(reference_columns)
+        streamed_columns = stream_columns(streamed, len(batch_columns))
+
+        worst = max(deviation(streamed_columns, batch_columns), deviation(batch_columns, reference_columns))
+        failed = failed or worst > args.tolerance
+        print(f"  {name:<13} {stream_us:10.2f} {pandas_us:10.1f} {pandas_us / stream_us:7.0f}x   "
+              f"{args.bars / batch_seconds:13,.0f} {args.bars / reference_seconds:14,.0f}   {worst:9.1e}")
+
+    print('FAIL' if failed else 'OK')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
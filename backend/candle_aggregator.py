@@ -0,0 +1,226 @@
+"""
+Shared tick-to-candle aggregation.
+
+One CandleAggregator per (instrument token, timeframe) turns ticks into
+candles. Closed bars and the forming bar live in a fixed-size CandleRing, so
+strategies on the same instrument and timeframe share one series instead of
+each building their own. Bucket boundaries are computed exactly as the
+strategies always have: ``ts - (ts.minute % candle_time)`` minutes, with
+seconds and microseconds cleared.
+
+Strategies subscribe with on_close / on_update callbacks. Callbacks run on the
+thread that feeds the aggregator (the websocket thread for the live registry),
+so they must stay cheap. While an on_update callback runs, ``last_tick_at`` holds
+the timestamp of the tick that triggered it. Bound methods are held weakly so a stopped strategy
+does not stay alive through the shared aggregator.
+
+The live registry is shared through get_candle_aggregators(); market replay
+creates its own CandleAggregators so replayed ticks never touch live candles.
+"""
+import datetime
+import logging
+import threading
+import weakref
+from collections.abc import Sequence
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+CandleCallback = Callable[[Dict[str, Any]], None]
+
+DEFAULT_CAPACITY = 100
+
+
+def tick_datetime(value: Any) -> Optional[datetime.datetime]:
+    """Normalise a tick timestamp (datetime, epoch seconds or string) to a datetime"""
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, (int, float)):
+        return datetime.datetime.fromtimestamp(value)
+    if isinstance(value, str):
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m-%d %H:%M:%S')
+        except ValueError:
+            return datetime.datetime.fromisoformat(value)
+    return None
+
+
+def bucket_start(ts: datetime.datetime, candle_minutes: int) -> datetime.datetime:
+    """Start of the candle containing ``ts``"""
+    return ts - datetime.timedelta(minutes=ts.minute % candle_minutes, seconds=ts.second, microseconds=ts.microsecond)
+
+
+class CandleRing(Sequence):
+    """Fixed-capacity ring of candle dicts, oldest first; the last entry is the forming candle"""
+
+    def __init__(self, capacity: int, lock: Optional[threading.RLock] = None):
+        self.capacity = capacity
+        self.slots: List[Optional[Dict[str, Any]]] = [None] * capacity
+        self.start = 0
+        self.size = 0
+        self.lock = lock or threading.RLock()
+
+    def append(self, candle: Dict[str, Any]) -> None:
+        with self.lock:
+            if self.size < self.capacity:
+                self.slots[(self.start + self.size) % self.capacity] = candle
+                self.size += 1
+            else:
+                self.slots[self.start] = candle
+                self.start = (self.start + 1) % self.capacity
+
+    def clear(self) -> None:
+        with self.lock:
+            self.slots = [None] * self.capacity
+            self.start = 0
+            self.size = 0
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        with self.lock:
+            end = self.start + self.size
+            if end <= self.capacity:
+                return self.slots[self.start:end]
+            return self.slots[self.start:] + self.slots[:end - self.capacity]
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.to_list()[index]
+        with self.lock:
+            if index < 0:
+                index += self.size
+            if not 0 <= index < self.size:
+                raise IndexError('candle index out of range')
+            return self.slots[(self.start + index) % self.capacity]
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def __repr__(self) -> str:
+        return f"CandleRing({self.size}/{self.capacity})"
+
+
+class CandleAggregator:
+    def __init__(self, instrument_token: int, candle_minutes: int, capacity: int = DEFAULT_CAPACITY):
+        self.instrument_token = instrument_token
+        self.candle_minutes = int(candle_minutes)
+        self.lock = threading.RLock()
+        self.candles = CandleRing(capacity, self.lock)
+        self.forming: Optional[Dict[str, Any]] = None
+        self.last_tick_at: Optional[datetime.datetime] = None
+        self.close_callbacks: List[Callable[[], Optional[CandleCallback]]] = []
+        self.update_callbacks: List[Callable[[], Optional[CandleCallback]]] = []
+
+    @staticmethod
+    def _ref(callback: CandleCallback):
+        if hasattr(callback, '__self__'):
+            return weakref.WeakMethod(callback)
+        return lambda: callback
+
+    def subscribe(self, on_close: Optional[CandleCallback] = None, on_update: Optional[CandleCallback] = None) -> None:
+        with self.lock:
+            if on_close is not None:
+                self.close_callbacks = self.close_callbacks + [self._ref(on_close)]
+            if on_update is not None:
+                self.update_callbacks = self.update_callbacks + [self._ref(on_update)]
+
+    def unsubscribe(self, on_close: Optional[CandleCallback] = None, on_update: Optional[CandleCallback] = None) -> None:
+        with self.lock:
+            self.close_callbacks = [ref for ref in self.close_callbacks if ref() is not None and ref() != on_close]
+            self.update_callbacks = [ref for ref in self.update_callbacks if ref() is not None and ref() != on_update]
+
+    def update(self, price: float, ts: datetime.datetime) -> None:
+        """Apply one tick"""
+        start = bucket_start(ts, self.candle_minutes)
+        closed = None
+        with self.lock:
+            self.last_tick_at = ts
+            forming = self.forming
+            if forming is None or forming['date'] != start:
+                closed = forming
+                forming = {
+                    'date': start,
+                    'open': price,
+                    'high': price,
+                    'low': price,
+                    'close': price,
+                    'volume': 0  # Volume not available in ticks
+                }
+                self.forming = forming
+                self.candles.append(forming)
+            else:
+                if price > forming['high']:
+                    forming['high'] = price
+                if price < forming['low']:
+                    forming['low'] = price
+                forming['close'] = price
+            close_callbacks = self.close_callbacks
+            update_callbacks = self.update_callbacks
+
+        if closed is not None:
+            for ref in close_callbacks:
+                self._call(ref, closed)
+        for ref in update_callbacks:
+            self._call(ref, forming)
+
+    def _call(self, ref, candle: Dict[str, Any]) -> None:
+        callback = ref()
+        if callback is None:
+            # Subscriber was garbage collected
+            self.unsubscribe()
+            return
+        try:
+            callback(candle)
+        except Exception as e:
+            logging.error(f"Candle aggregator callback failed for {self.instrument_token}/{self.candle_minutes}m: {e}", exc_info=True)
+
+
+class CandleAggregators:
+    """Registry of aggregators keyed by (instrument token, candle minutes)"""
+
+    def __init__(self):
+        self.aggregators: Dict[Tuple[int, int], CandleAggregator] = {}
+        self.by_token: Dict[int, List[CandleAggregator]] = {}
+        self.lock = threading.Lock()
+
+    def get(self, instrument_token: int, candle_minutes: int, capacity: int = DEFAULT_CAPACITY) -> CandleAggregator:
+        key = (int(instrument_token), int(candle_minutes))
+        with self.lock:
+            aggregator = self.aggregators.get(key)
+            if aggregator is None:
+                aggregator = CandleAggregator(key[0], key[1], capacity)
+                self.aggregators[key] = aggregator
+                # Copy-on-write so feed() can iterate without the lock
+                by_token = dict(self.by_token)
+                by_token[key[0]] = by_token.get(key[0], []) + [aggregator]
+                self.by_token = by_token
+            return aggregator
+
+    def tokens(self) -> List[int]:
+        return list(self.by_token)
+
+    def feed(self, ticks: Iterable[Any]) -> None:
+        """Route ticks (dicts or TickRecords) to the aggregators of their token, in order"""
+        by_token = self.by_token
+        if not by_token:
+            return
+        for tick in ticks:
+            aggregators = by_token.get(tick['instrument_token'])
+            if not aggregators:
+                continue
+            ts = tick_datetime(tick.get('timestamp') or tick.get('last_trade_time') or tick.get('exchange_timestamp'))
+            if ts is None:
+                continue
+            price = tick['last_price']
+            for aggregator in aggregators:
+                aggregator.update(price, ts)
+
+
+_candle_aggregators = CandleAggregators()
+
+
+def get_candle_aggregators() -> CandleAggregators:
+    """Live registry fed by the ticker"""
+    return _candle_aggregators
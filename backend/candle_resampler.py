@@ -0,0 +1,80 @@
+"""
+Vectorized resampling of 1-minute candle columns into higher timeframes.
+
+Buckets are aligned to the 09:15 session open (09:15, 09:20, ... for 5minute;
+09:15, 10:15, ... for 60minute), matching how Kite labels intraday candles.
+Operates on the column dicts produced by ``candle_store.candles_to_columns``.
+"""
+from typing import Dict, Optional
+
+import numpy as np
+
+SESSION_OPEN_SECONDS = 9 * 3600 + 15 * 60
+SECONDS_PER_DAY = 86400
+
+# Timeframes that can be derived from 1-minute bars (None means one bar per session)
+RESAMPLE_MINUTES: Dict[str, Optional[int]] = {
+    '3minute': 3,
+    '5minute': 5,
+    '10minute': 10,
+    '15minute': 15,
+    '30minute': 30,
+    '60minute': 60,
+    'day': None,
+}
+
+
+def can_resample(interval: str) -> bool:
+    return interval in RESAMPLE_MINUTES
+
+
+def bucket_starts(ts_local: np.ndarray, interval: str) -> np.ndarray:
+    """Return the local-time bucket start (epoch seconds) for each timestamp"""
+    day_start = ts_local - ts_local % SECONDS_PER_DAY
+    minutes = RESAMPLE_MINUTES[interval]
+    if minutes is None:
+        return day_start
+    step = minutes * 60
+    session_offset = ts_local - day_start - SESSION_OPEN_SECONDS
+    return day_start + SESSION_OPEN_SECONDS + (session_offset // step) * step
+
+
+def resample_columns(columns: Dict[str, np.ndarray], interval: str) -> Dict[str, np.ndarray]:
+    """Aggregate 1-minute OHLCV columns into ``interval`` candles.
+
+    Args:
+        columns: Column dict with ts (epoch seconds), open, high, low, close, volume, oi, tz_offset
+        interval: Target Kite interval name, e.g. '5minute' or 'day'
+
+    Returns:
+        Column dict in the same layout
+    """
+    tz_offset = int(columns['tz_offset'])
+    ts = columns['ts']
+    if len(ts) == 0:
+        return {key: (value[:0] if key != 'tz_offset' else value) for key, value in columns.items()}
+
+    order = None
+    if len(ts) > 1 and np.any(ts[1:] < ts[:-1]):
+        order = np.argsort(ts, kind='stable')
+
+    def col(name):
+        values = columns[name]
+        return values[order] if order is not None else values
+
+    shift = tz_offset if tz_offset >= 0 else 0
+    ts_sorted = col('ts')
+    keys = bucket_starts(ts_sorted + shift, interval)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.concatenate((starts[1:], [len(keys)])) - 1
+
+    return {
+        'ts': keys[starts] - shift,
+        'open': col('open')[starts],
+        'high': np.maximum.reduceat(col('high'), starts),
+        'low': np.minimum.reduceat(col('low'), starts),
+        'close': col('close')[ends],
+        'volume': np.add.reduceat(col('volume'), starts),
+        'oi': col('oi')[ends],
+        'tz_offset': np.array(tz_offset, dtype=np.int64),
+    }
@@ -0,0 +1,426 @@
+"""
+On-disk candle store for Kite historical data.
+
+Candles are partitioned as ``<root>/<instrument_token>/<interval>/<YYYY-MM-DD>.npz``
+with one NumPy array per column. Completed trading days never change, so once a
+past day has been fetched it is served from disk; the current day is always
+fetched from Kite and never persisted. Higher timeframes are resampled from the stored
+1-minute bars (see candle_resampler.py) and cached in their own partitions.
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+import config
+from candle_resampler import can_resample, resample_columns
+from historical_fetcher import HistoricalFetcher, plan_windows, split_by_day
+from trading_calendar import trading_days
+
+IST_OFFSET_SECONDS = 19800
+# Interval kept as the source of truth when higher timeframes are resampled locally
+BASE_INTERVAL = 'minute'
+
+
+def _tz_from_offset(offset_seconds: int) -> datetime.timezone:
+    return datetime.timezone(datetime.timedelta(seconds=int(offset_seconds)))
+
+
+def candles_to_columns(candles: List[Dict[str, Any]]) -> Dict[str, np.ndarray]:
+    """Convert Kite candle dicts to a dict of column arrays."""
+    count = len(candles)
+    ts = np.empty(count, dtype=np.int64)
+    opens = np.empty(count, dtype=np.float64)
+    highs = np.empty(count, dtype=np.float64)
+    lows = np.empty(count, dtype=np.float64)
+    closes = np.empty(count, dtype=np.float64)
+    volumes = np.empty(count, dtype=np.int64)
+    oi = np.zeros(count, dtype=np.int64)
+    tz_offset = -1  # -1 marks naive datetimes
+
+    for i, candle in enumerate(candles):
+        dt = candle['date']
+        if isinstance(dt, str):
+            dt = datetime.datetime.fromisoformat(dt)
+        offset = dt.utcoffset()
+        if offset is None:
+            ts[i] = int(dt.replace(tzinfo=datetime.timezone.utc).timestamp())
+        else:
+            tz_offset = int(offset.total_seconds())
+            ts[i] = int(dt.timestamp())
+        opens[i] = candle['open']
+        highs[i] = candle['high']
+        lows[i] = candle['low']
+        closes[i] = candle['close']
+        volumes[i] = candle.get('volume', 0) or 0
+        oi[i] = candle.get('oi', 0) or 0
+
+    return {
+        'ts': ts,
+        'open': opens,
+        'high': highs,
+        'low': lows,
+        'close': closes,
+        'volume': volumes,
+        'oi': oi,
+        'tz_offset': np.array(tz_offset, dtype=np.int64),
+    }
+
+
+def columns_to_candles(columns: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    """Convert column arrays back into Kite-style candle dicts."""
+    tz_offset = int(columns['tz_offset'])
+    tz = _tz_from_offset(tz_offset) if tz_offset >= 0 else None
+    candles: List[Dict[str, Any]] = []
+    for ts, o, h, l, c, v, oi in zip(
+        columns['ts'].tolist(),
+        columns['open'].tolist(),
+        columns['high'].tolist(),
+        columns['low'].tolist(),
+        columns['close'].tolist(),
+        columns['volume'].tolist(),
+        columns['oi'].tolist(),
+    ):
+        if tz is None:
+            dt = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).replace(tzinfo=None)
+        else:
+            dt = datetime.datetime.fromtimestamp(ts, tz)
+        candle = {'date': dt, 'open': o, 'high': h, 'low': l, 'close': c, 'volume': v}
+        if oi:
+            candle['oi'] = oi
+        candles.append(candle)
+    return candles
+
+
+class CoverageIndex:
+    """SQLite index recording which (instrument, interval, day) partitions are complete"""
+
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.path = os.path.join(root_dir, 'coverage.db')
+        self.lock = threading.Lock()
+        self.bootstrapped: Set[Tuple[int, str]] = set()
+        os.makedirs(root_dir, exist_ok=True)
+        conn = self._connect()
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS candle_coverage (
+                instrument_token INTEGER NOT NULL,
+                interval TEXT NOT NULL,
+                day TEXT NOT NULL,
+                candle_count INTEGER NOT NULL,
+                fetched_at TEXT NOT NULL,
+                PRIMARY KEY (instrument_token, interval, day)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _bootstrap(self, instrument_token: int, interval: str) -> None:
+        """Index partitions written before the coverage index existed"""
+        key = (int(instrument_token), interval)
+        if key in self.bootstrapped:
+            return
+        with self.lock:
+            if key in self.bootstrapped:
+                return
+            partition_dir = os.path.join(self.root_dir, str(int(instrument_token)), interval)
+            if os.path.isdir(partition_dir):
+                conn = self._connect()
+                indexed = {row[0] for row in conn.execute(
+                    'SELECT day FROM candle_coverage WHERE instrument_token = ? AND interval = ?', key
+                )}
+                now = datetime.datetime.now().isoformat()
+                rows = [
+                    (key[0], interval, name[:-4], -1, now)
+                    for name in os.listdir(partition_dir)
+                    if name.endswith('.npz') and name[:-4] not in indexed
+                ]
+                if rows:
+                    conn.executemany('INSERT OR IGNORE INTO candle_coverage VALUES (?, ?, ?, ?, ?)', rows)
+                    conn.commit()
+                    logging.info(f"[CANDLES] Indexed {len(rows)} existing partitions for {instrument_token} {interval}")
+                conn.close()
+            self.bootstrapped.add(key)
+
+    def covered_days(self, instrument_token: int, interval: str, from_date: datetime.date, to_date: datetime.date) -> Set[datetime.date]:
+        self._bootstrap(instrument_token, interval)
+        conn = self._connect()
+        rows = conn.execute(
+            'SELECT day FROM candle_coverage WHERE instrument_token = ? AND interval = ? AND day BETWEEN ? AND ?',
+            (int(instrument_token), interval, from_date.isoformat(), to_date.isoformat())
+        ).fetchall()
+        conn.close()
+        return {datetime.date.fromisoformat(row[0]) for row in rows}
+
+    def mark(self, instrument_token: int, interval: str, day: datetime.date, candle_count: int) -> None:
+        conn = self._connect()
+        conn.execute(
+            'INSERT OR REPLACE INTO candle_coverage VALUES (?, ?, ?, ?, ?)',
+            (int(instrument_token), interval, day.isoformat(), int(candle_count), datetime.datetime.now().isoformat())
+        )
+        conn.commit()
+        conn.close()
+
+    def discard(self, instrument_token: int, interval: str, day: datetime.date) -> None:
+        conn = self._connect()
+        conn.execute(
+            'DELETE FROM candle_coverage WHERE instrument_token = ? AND interval = ? AND day = ?',
+            (int(instrument_token), interval, day.isoformat())
+        )
+        conn.commit()
+        conn.close()
+
+
+class CandleStore:
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.coverage = CoverageIndex(root_dir)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _day_path(self, instrument_token: int, interval: str, day: datetime.date) -> str:
+        return os.path.join(self.root_dir, str(int(instrument_token)), interval, f"{day.isoformat()}.npz")
+
+    def has_day(self, instrument_token: int, interval: str, day: datetime.date) -> bool:
+        return day in self.coverage.covered_days(instrument_token, interval, day, day)
+
+    def missing_sessions(self, instrument_token: int, interval: str, from_date: datetime.date, to_date: datetime.date) -> List[datetime.date]:
+        """Trading sessions in the range that are not yet stored"""
+        covered = self.coverage.covered_days(instrument_token, interval, from_date, to_date)
+        return [day for day in trading_days(from_date, to_date) if day not in covered]
+
+    def _missing(self, instrument_token: int, interval: str, days: List[datetime.date]) -> List[datetime.date]:
+        if not days:
+            return []
+        covered = self.coverage.covered_days(instrument_token, interval, days[0], days[-1])
+        return [day for day in days if day not in covered]
+
+    def read_day(self, instrument_token: int, interval: str, day: datetime.date) -> Optional[List[Dict[str, Any]]]:
+        """Return the stored candles for a day, or None if the day is not stored"""
+        columns = self.read_day_columns(instrument_token, interval, day)
+        return columns_to_candles(columns) if columns is not None else None
+
+    def read_day_columns(self, instrument_token: int, interval: str, day: datetime.date) -> Optional[Dict[str, np.ndarray]]:
+        path = self._day_path(instrument_token, interval, day)
+        if not os.path.exists(path):
+            self.coverage.discard(instrument_token, interval, day)
+            return None
+        try:
+            with np.load(path) as data:
+                return {key: data[key] for key in data.files}
+        except Exception as e:
+            logging.warning(f"[CANDLES] Discarding unreadable partition {path}: {e}")
+            self.coverage.discard(instrument_token, interval, day)
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            return None
+
+    def write_day(self, instrument_token: int, interval: str, day: datetime.date, candles: List[Dict[str, Any]]) -> None:
+        """Persist one day of candles atomically"""
+        self.write_day_columns(instrument_token, interval, day, candles_to_columns(candles))
+
+    def write_day_columns(self, instrument_token: int, interval: str, day: datetime.date, columns: Dict[str, np.ndarray]) -> None:
+        path = self._day_path(instrument_token, interval, day)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'wb') as fh:
+            np.savez(fh, **columns)
+        os.replace(tmp_path, path)
+        self.coverage.mark(instrument_token, interval, day, len(columns['ts']))
+
+    @staticmethod
+    def is_immutable(day: datetime.date) -> bool:
+        """Only sessions that are fully in the past are safe to persist"""
+        now_ist = datetime.datetime.utcnow() + datetime.timedelta(seconds=IST_OFFSET_SECONDS)
+        return day < now_ist.date()
+
+    def iter_candles(
+        self,
+        kite,
+        instrument_token: int,
+        from_date: datetime.date,
+        to_date: datetime.date,
+        interval: str,
+        log_tag: str = "CANDLES",
+        failed_days: Optional[List[datetime.date]] = None,
+    ) -> Iterator[List[Dict[str, Any]]]:
+        """Yield one list of candles per trading session in chronological order.
+
+        Weekends and exchange holidays are skipped using the NSE calendar. When resampling is enabled, 1-minute bars are the source of truth and
+        higher timeframes are derived locally and cached per timeframe.
+        Otherwise the interval is fetched from Kite directly.
+        Sessions whose historical window failed are yielded empty and, when
+        ``failed_days`` is given, appended to it so callers can tell a partial
+        result from a complete one.
+        """
+        days = trading_days(from_date, to_date)
+
+        if config.CANDLE_STORE_RESAMPLE and can_resample(interval):
+            day_iter = self._iter_derived_days(kite, instrument_token, days, interval, log_tag)
+        else:
+            day_iter = self._iter_source_days(kite, instrument_token, days, interval, log_tag)
+        for day, candles, ok in day_iter:
+            if not ok and failed_days is not None:
+                failed_days.append(day)
+            yield candles
+
+    def _iter_derived_days(self, kite, instrument_token: int, days: List[datetime.date], interval: str, log_tag: str):
+        """Yield (day, candles, ok) for a resampled timeframe"""
+        missing = self._missing(instrument_token, interval, days)
+        missing_set = set(missing)
+        source = self._iter_source_days(kite, instrument_token, missing, BASE_INTERVAL, log_tag, as_columns=True)
+
+        for day in days:
+            if day not in missing_set:
+                cached = self.read_day(instrument_token, interval, day)
+                if cached is not None:
+                    with self.lock:
+                        self.hits += 1
+                    yield day, cached, True
+                    continue
+                # Unreadable derived partition: rebuild it from the base interval
+                _, columns, ok = next(self._iter_source_days(kite, instrument_token, [day], BASE_INTERVAL, log_tag, as_columns=True))
+            else:
+                _, columns, ok = next(source)
+
+            if not ok:
+                yield day, [], False
+                continue
+            derived = resample_columns(columns, interval)
+            if self.is_immutable(day):
+                try:
+                    self.write_day_columns(instrument_token, interval, day, derived)
+                except Exception as e:
+                    logging.warning(f"[CANDLES] Could not persist {instrument_token} {interval} {day}: {e}")
+            yield day, columns_to_candles(derived), True
+
+    def _iter_source_days(self, kite, instrument_token: int, days: List[datetime.date], interval: str, log_tag: str, as_columns: bool = False):
+        """Yield (day, candles, ok) for an interval served by Kite.
+
+        Stored days are read from disk. Missing days are coalesced into the
+        largest windows Kite allows and fetched concurrently; windows that fail
+        are logged and yielded empty with ok=False.
+        """
+        missing = self._missing(instrument_token, interval, days)
+        windows = plan_windows(missing, interval)
+        if windows:
+            logging.info(f"[{log_tag}] Fetching {len(missing)} missing days for {instrument_token} {interval} in {len(windows)} requests")
+
+        fetched = HistoricalFetcher(kite).iter_windows(instrument_token, windows, interval)
+        missing_set = set(missing)
+        window_days: Dict[datetime.date, List[Dict[str, Any]]] = {}
+        window_ok = False
+        window_end: Optional[datetime.date] = None
+
+        for day in days:
+            if day not in missing_set:
+                if as_columns:
+                    cached = self.read_day_columns(instrument_token, interval, day)
+                else:
+                    cached = self.read_day(instrument_token, interval, day)
+                if cached is not None:
+                    with self.lock:
+                        self.hits += 1
+                    yield day, cached, True
+                    continue
+            if window_end is None or day > window_end:
+                result = next(fetched, None)
+                if result is None:
+                    yield day, (candles_to_columns([]) if as_columns else []), False
+                    continue
+                window, hist, error = result
+                window_end = window[1]
+                window_days = {}
+                window_ok = error is None
+                with self.lock:
+                    self.misses += 1
+                if error is not None:
+                    logging.warning(f"[{log_tag}] Historical fetch failed for {window[0]}..{window[1]}: {error}")
+                else:
+                    window_days = split_by_day(hist)
+                    self._persist_window(instrument_token, interval, window, window_days, missing)
+            day_candles = window_days.get(day, [])
+            yield day, (candles_to_columns(day_candles) if as_columns else day_candles), window_ok
+
+    def _persist_window(self, instrument_token: int, interval: str, window, window_days, missing) -> None:
+        for day in missing:
+            if day < window[0] or day > window[1] or not self.is_immutable(day):
+                continue
+            try:
+                self.write_day(instrument_token, interval, day, window_days.get(day, []))
+            except Exception as e:
+                logging.warning(f"[CANDLES] Could not persist {instrument_token} {interval} {day}: {e}")
+
+    def get_candles(
+        self,
+        kite,
+        instrument_token: int,
+        from_date: datetime.date,
+        to_date: datetime.date,
+        interval: str,
+        log_tag: str = "CANDLES",
+        failed_days: Optional[List[datetime.date]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Return all candles between two dates (inclusive), sorted by time; see iter_candles for ``failed_days``"""
+        candles: List[Dict[str, Any]] = []
+        for day_candles in self.iter_candles(kite, instrument_token, from_date, to_date, interval, log_tag=log_tag,
+                                             failed_days=failed_days):
+            candles.extend(day_candles)
+        logging.info(f"[{log_tag}] Loaded {len(candles)} candles for {instrument_token} {interval} {from_date}..{to_date}")
+        return candles
+
+    def stats(self) -> Dict[str, int]:
+        with self.lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+_candle_store = None
+_candle_store_lock = threading.Lock()
+
+
+def get_candle_store() -> CandleStore:
+    global _candle_store
+    if _candle_store is None:
+        with _candle_store_lock:
+            if _candle_store is None:
+                _candle_store = CandleStore(config.CANDLE_STORE_DIR)
+    return _candle_store
+
+
+def get_historical_candles(
+    kite,
+    instrument_token: int,
+    from_date: datetime.date,
+    to_date: datetime.date,
+    interval: str,
+    log_tag: str = "CANDLES",
+    failed_days: Optional[List[datetime.date]] = None,
+) -> List[Dict[str, Any]]:
+    """Single entry point for historical candles; past days are served from disk"""
+    return get_candle_store().get_candles(kite, instrument_token, from_date, to_date, interval, log_tag=log_tag,
+                                          failed_days=failed_days)
+
+
+def backfill_candles(kite, instrument_tokens: List[int], intervals: List[str], from_date: datetime.date, to_date: datetime.date) -> Dict[str, int]:
+    """Fetch only the trading sessions not yet covered by the store (e.g. for a nightly refresh)"""
+    store = get_candle_store()
+    summary: Dict[str, int] = {}
+    for instrument_token in instrument_tokens:
+        for interval in intervals:
+            missing = store.missing_sessions(instrument_token, interval, from_date, to_date)
+            if missing:
+                for _ in store.iter_candles(kite, instrument_token, missing[0], missing[-1], interval, log_tag="BACKFILL"):
+                    pass
+            summary[f"{instrument_token}:{interval}"] = len(missing)
+            logging.info(f"[BACKFILL] {instrument_token} {interval}: {len(missing)} sessions backfilled for {from_date}..{to_date}")
+    return summary
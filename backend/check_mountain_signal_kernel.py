@@ -0,0 +1,262 @@
+"""
+Golden-output check for the Mountain Signal array kernel.
+
+Runs the same candles through run_mountain_signal_on_frame (vectorised masks +
+array scan) and run_mountain_signal_engine (MountainSignalEngine.on_bar bar by
+bar) and requires identical trade and option trade records. The kernel must
+also reproduce a golden file on that file's own candles and parameters. The
+default, mountain_signal_golden.json, was produced by the DataFrame loop the
+backtest ran before the shared engine (BANKNIFTY 5m, 2024-01-01 -> 2024-01-12),
+so the kernel stays tied to the original behaviour. --golden selects another
+file, --no-golden skips the step and --save-golden writes the kernel output for
+the checked range in the same format. With --sweep N an N x N stop loss /
+target grid is replayed through one SignalTimeline and every pair is compared
+with its own kernel scan. With --stream the candles are also fed one session at a time
+through MountainSignalStream, whose trades must match the kernel's; its peak
+traced memory is reported. With --premium-model black_scholes every check
+prices options with option_pricing instead of the heuristic, and the normal
+CDF approximation is checked against math.erfc.
+
+Candles are the deterministic synthetic market served by fake_kite.
+
+Usage:
+    python check_mountain_signal_kernel.py --token 260105 --years 3 --candle-time 5
+    python check_mountain_signal_kernel.py --save-golden /tmp/mountain_signal_golden.json
+    python check_mountain_signal_kernel.py --golden /tmp/mountain_signal_golden.json
+    python check_mountain_signal_kernel.py --no-golden --years 1
+    python check_mountain_signal_kernel.py --sweep 20
+    python check_mountain_signal_kernel.py --stream --candle-time 1
+    python check_mountain_signal_kernel.py --premium-model black_scholes --sweep 20 --stream
+"""
+import argparse
+import datetime
+import json
+import math
+import os
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from fake_kite import FakeKiteConnect
+from mountain_signal_engine import (
+    SignalTimeline,
+    run_mountain_signal_engine,
+    run_mountain_signal_on_frame,
+    scan_mountain_signal,
+    signal_masks,
+    square_off_mask,
+)
+from mountain_signal_stream import MountainSignalStream, format_option_trade, format_trade
+from option_pricing import PREMIUM_MODELS, get_premium_model, norm_cdf
+from rules import load_mountain_signal_pe_rules
+from trading_calendar import previous_trading_day
+from utils.indicators import calculate_rsi
+
+INSTRUMENTS = {256265: ('NIFTY', 75, 50), 260105: ('BANKNIFTY', 35, 100)}
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'mountain_signal_golden.json')
+
+
+def load_frame(token, from_date, to_date, candle_time, ema_period):
+    candles = FakeKiteConnect(latency=0).historical_data(token, from_date, to_date, f"{candle_time}minute")
+    df = pd.DataFrame([{key: candle[key] for key in ('date', 'open', 'high', 'low', 'close')} for candle in candles])
+    df['ema'] = df['close'].ewm(span=ema_period, adjust=False).mean()
+    df['rsi14'] = calculate_rsi(df['close'], period=14) if len(df) >= 15 else None
+    return df
+
+
+def serialise(records):
+    """JSON-comparable copy of trade records (dates as ISO strings, NumPy scalars as floats)"""
+    def value(v):
+        if isinstance(v, (datetime.date, datetime.datetime)):
+            return v.isoformat()
+        if hasattr(v, 'item'):
+            return v.item()
+        return v
+    return [{key: value(v) for key, v in record.items()} for record in records]
+
+
+def first_difference(expected, actual):
+    if len(expected) != len(actual):
+        return f"{len(expected)} records expected, got {len(actual)}"
+    for i, (a, b) in enumerate(zip(expected, actual)):
+        if a != b:
+            keys = [key for key in a if a.get(key) != b.get(key)]
+            return f"record {i} differs in {keys}: {[a.get(k) for k in keys]} != {[b.get(k) for k in keys]}"
+    return None
+
+
+def check_golden(path):
+    """Re-run the kernel on the candles and parameters of a golden file; returns True when its records match"""
+    with open(path) as f:
+        golden = json.load(f)
+    params = golden['params']
+    instrument_key, lot_size, strike_step = INSTRUMENTS[params['token']]
+    premium_model = get_premium_model(params.get('premium_model', 'heuristic'), instrument_key,
+                                      load_mountain_signal_pe_rules()['expiry_policy'])
+    from_date = datetime.date.fromisoformat(params['from_date'])
+    to_date = datetime.date.fromisoformat(params['to_date'])
+    df = load_frame(params['token'], from_date, to_date, params['candle_time'], params['ema_period'])
+    trades, option_trades = run_mountain_signal_on_frame(df, instrument_key, lot_size, strike_step, params['stop_loss'],
+                                                         params['target'], premium_model=premium_model)
+    print(f"  golden {os.path.basename(path)}: {instrument_key} {params['candle_time']}m {from_date} -> {to_date}, "
+          f"{len(golden['trades'])} trades")
+    matched = True
+    for label, expected, actual in (
+        ('golden trades', golden['trades'], serialise(trades)),
+        ('golden option trades', golden['option_trades'], serialise(option_trades)),
+    ):
+        difference = first_difference(expected, actual)
+        print(f"  {label:<22} {'mismatch: ' + difference if difference else 'identical'}")
+        matched = matched and not difference
+    return matched
+
+
+def check_norm_cdf():
+    """Largest absolute error of norm_cdf against math.erfc on [-8, 8]; returns True when below 7.5e-8"""
+    x = np.linspace(-8.0, 8.0, 160001)
+    exact = np.array([0.5 * math.erfc(-value / math.sqrt(2.0)) for value in x.tolist()])
+    error = float(np.abs(norm_cdf(x) - exact).max())
+    print(f"  norm_cdf max abs error {error:.2e}")
+    return error < 7.5e-8
+
+
+def check_sweep(df, strike_step, size, premium_model=None):
+    """Compare SignalTimeline.sweep with one scan_mountain_signal per pair; returns True when identical"""
+    high, low, close, ema = (df[column].to_numpy(dtype=float) for column in ('high', 'low', 'close', 'ema'))
+    rsi = df['rsi14'].to_numpy(dtype=float) if df['rsi14'].notna().any() else None
+    pe_mask, ce_mask = signal_masks(high, low, ema, rsi)
+    square_off = square_off_mask(df['date'])
+    premiums = premium_model.bar_premiums(df['date']) if premium_model is not None else None
+    pairs = [(-stop_loss, target) for stop_loss in np.linspace(0.05, 0.5, size) for target in np.linspace(0.1, 1.0, size)]
+
+    t0 = time.perf_counter()
+    timeline = SignalTimeline(high, low, close, ema, pe_mask, ce_mask, square_off, strike_step, premiums)
+    sweeps = timeline.sweep(pairs)
+    sweep_seconds = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    timeline.sweep(pairs)
+    warm_seconds = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    scans = [scan_mountain_signal(high, low, close, ema, pe_mask, ce_mask, square_off, strike_step, *pair, premiums)
+             for pair in pairs]
+    scan_seconds = time.perf_counter() - t0
+
+    mismatches = [pair for pair, sweep, scan in zip(pairs, sweeps, scans) if sweep != scan]
+    print(f"  sweep {size}x{size}: {sweep_seconds * 1000:8.1f} ms cold, {warm_seconds * 1000:8.1f} ms warm, "
+          f"{scan_seconds * 1000:8.1f} ms as {len(pairs)} kernel scans")
+    print(f"  sweep {'mismatch: ' + str(mismatches[:3]) if mismatches else 'identical'}")
+    return not mismatches
+
+
+def check_stream(df, instrument_key, lot_size, strike_step, stop_loss, target, ema_period, trades, option_trades,
+                 premium_model=None):
+    """Compare MountainSignalStream fed per session with the kernel records; returns True when identical"""
+    sessions = (group.to_dict('records') for _, group in df[['date', 'high', 'low', 'close']].groupby(df['date'].dt.date))
+    stream = MountainSignalStream(instrument_key, lot_size, strike_step, stop_loss, target, ema_period, 100000.0,
+                                  premium_model=premium_model)
+    expected = iter(zip(trades, option_trades))
+    difference = None
+    count = 0
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    # Records are compared as they arrive so the peak reflects the stream, not a list of its output
+    for record in stream.run(sessions):
+        if record['type'] != 'trade':
+            continue
+        trade, option_trade = next(expected, (None, None))
+        if difference is None and (trade is None or record['trade'] != format_trade(trade)
+                                   or record['optionTrade'] != format_option_trade(option_trade)):
+            difference = f"trade {count} differs"
+        count += 1
+    stream_seconds = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    if difference is None and count != len(trades):
+        difference = f"{len(trades)} trades expected, got {count}"
+    print(f"  stream {stream_seconds * 1000:8.1f} ms traced, peak {peak / 1024 / 1024:.1f} MB")
+    print(f"  stream {'mismatch: ' + difference if difference else 'identical'}")
+    return not difference
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--token', type=int, default=260105, choices=sorted(INSTRUMENTS))
+    parser.add_argument('--years', type=float, default=3.0)
+    parser.add_argument('--candle-time', type=int, default=5)
+    parser.add_argument('--ema-period', type=int, default=5)
+    parser.add_argument('--stop-loss', type=float, default=-0.17, help='Option stop loss as a fraction (negative)')
+    parser.add_argument('--target', type=float, default=0.45, help='Option target as a fraction')
+    parser.add_argument('--golden', default=GOLDEN_PATH, help='Compare the kernel against this saved output')
+    parser.add_argument('--no-golden', action='store_true', help='Skip the golden output check')
+    parser.add_argument('--save-golden', help='Write the kernel output to this file')
+    parser.add_argument('--sweep', type=int, default=0, metavar='N', help='Also check an N x N SL / target sweep')
+    parser.add_argument('--stream', action='store_true', help='Also check the per-session streaming run')
+    parser.add_argument('--premium-model', default='heuristic', choices=PREMIUM_MODELS)
+    args = parser.parse_args()
+
+    to_date = previous_trading_day(datetime.date.today())
+    from_date = to_date - datetime.timedelta(days=int(args.years * 365))
+
+    instrument_key, lot_size, strike_step = INSTRUMENTS[args.token]
+    premium_model = get_premium_model(args.premium_model, instrument_key, load_mountain_signal_pe_rules()['expiry_policy'])
+    df = load_frame(args.token, from_date, to_date, args.candle_time, args.ema_period)
+    print(f"{instrument_key} {args.candle_time}m {from_date} -> {to_date}: {len(df)} bars, {args.premium_model} premiums")
+
+    t0 = time.perf_counter()
+    kernel = run_mountain_signal_on_frame(df, instrument_key, lot_size, strike_step, args.stop_loss, args.target,
+                                          premium_model=premium_model)
+    kernel_seconds = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    engine = run_mountain_signal_engine(
+        df['date'].tolist(), df['high'], df['low'], df['close'], df['ema'], df['rsi14'],
+        instrument_key, lot_size, strike_step, args.stop_loss, args.target, premium_model
+    )
+    engine_seconds = time.perf_counter() - t0
+
+    kernel_trades, kernel_options = serialise(kernel[0]), serialise(kernel[1])
+    print(f"  trades {len(kernel_trades)}")
+    print(f"  kernel {kernel_seconds * 1000:8.1f} ms ({len(df) / kernel_seconds:,.0f} bars/s)")
+    print(f"  engine {engine_seconds * 1000:8.1f} ms ({len(df) / engine_seconds:,.0f} bars/s)")
+
+    failures = []
+    if premium_model is not None and not check_norm_cdf():
+        failures.append('norm_cdf')
+    for label, expected, actual in (
+        ('engine trades', serialise(engine[0]), kernel_trades),
+        ('engine option trades', serialise(engine[1]), kernel_options),
+    ):
+        difference = first_difference(expected, actual)
+        print(f"  {label:<22} {'mismatch: ' + difference if difference else 'identical'}")
+        if difference:
+            failures.append(label)
+
+    if not args.no_golden and not check_golden(args.golden):
+        failures.append('golden')
+    if args.sweep and not check_sweep(df, strike_step, args.sweep, premium_model):
+        failures.append('sweep')
+    if args.stream and not check_stream(df, instrument_key, lot_size, strike_step, args.stop_loss, args.target,
+                                         args.ema_period, kernel[0], kernel[1], premium_model):
+        failures.append('stream')
+
+    if args.save_golden:
+        with open(args.save_golden, 'w') as f:
+            json.dump({
+                'params': {
+                    'token': args.token, 'candle_time': args.candle_time, 'ema_period': args.ema_period,
+                    'stop_loss': args.stop_loss, 'target': args.target, 'premium_model': args.premium_model,
+                    'from_date': from_date.isoformat(), 'to_date': to_date.isoformat(),
+                },
+                'trades': kernel_trades,
+                'option_trades': kernel_options,
+            }, f)
+        print(f"  golden output written to {args.save_golden}")
+
+    print('FAIL' if failures else 'OK')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
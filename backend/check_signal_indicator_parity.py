@@ -0,0 +1,123 @@
+"""
+Parity check for CaptureMountainSignal's streaming EMA / RSI state.
+
+Replays sessions tick by tick through a CandleAggregator and compares
+SignalIndicatorState with the pandas computation the strategy used before
+(``ewm(span, adjust=False)`` and ``calculate_rsi`` over the full candle
+DataFrame) on every tick: forming-candle EMA and RSI 14, and the last closed
+candle's EMA.
+
+Sessions come from the tick journal when it has data for the token, otherwise
+from the deterministic synthetic market used by fake_kite.
+
+Usage:
+    python check_signal_indicator_parity.py --token 260105 --days 10 --candle-time 5
+"""
+import argparse
+import datetime
+import math
+import sys
+import time
+
+import pandas as pd
+
+from candle_aggregator import CandleAggregators
+from fake_kite import get_synthetic_market
+from strategies.capture_mountain_signal import SignalIndicatorState
+from tick_journal import from_epoch_ns, get_tick_journal
+from trading_calendar import previous_trading_day, session_bounds
+from utils.indicators import calculate_rsi
+
+
+def journal_ticks(token, day):
+    start, end = session_bounds(day)
+    records = get_tick_journal().read_range(token, start, end)
+    return [(from_epoch_ns(int(ts)), float(price)) for ts, price in zip(records['ts_ns'].tolist(), records['price'].tolist())]
+
+
+def synthetic_ticks(token, day):
+    """Four ticks per synthetic minute bar: open, high, low, close"""
+    ticks = []
+    for ts, o, h, l, c in get_synthetic_market().minute_bars(token, day):
+        for second, price in ((0, o), (15, h), (30, l), (45, c)):
+            ticks.append((ts + datetime.timedelta(seconds=second), price))
+    return ticks
+
+
+def pandas_values(candles, ema_period):
+    df = pd.DataFrame(list(candles))
+    df['ema'] = df['close'].ewm(span=ema_period, adjust=False).mean()
+    rsi = None
+    if len(df) >= 15:
+        value = calculate_rsi(df['close'], period=14).iloc[-1]
+        rsi = None if pd.isna(value) else float(value)
+    prev_ema = float(df['ema'].iloc[-2]) if len(df) >= 2 else None
+    return float(df['ema'].iloc[-1]), rsi, prev_ema
+
+
+def deviation(a, b):
+    if a is None or b is None:
+        return 0.0 if a is None and b is None else math.inf
+    return abs(a - b) / max(1.0, abs(b))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--token', type=int, default=260105)
+    parser.add_argument('--days', type=int, default=10, help='Number of most recent trading sessions to replay')
+    parser.add_argument('--candle-time', type=int, default=5)
+    parser.add_argument('--ema-period', type=int, default=5)
+    parser.add_argument('--tolerance', type=float, default=1e-9, help='Maximum relative deviation')
+    args = parser.parse_args()
+
+    days = []
+    day = datetime.date.today()
+    for _ in range(args.days):
+        day = previous_trading_day(day)
+        days.append(day)
+    days.reverse()
+
+    registry = CandleAggregators()
+    aggregator = registry.get(args.token, args.candle_time)
+    state = SignalIndicatorState(args.ema_period, 14)
+    worst = {'ema': 0.0, 'rsi': 0.0, 'prev_ema': 0.0}
+    checked = 0
+    stream_seconds = 0.0
+    pandas_seconds = 0.0
+
+    for day in days:
+        ticks = journal_ticks(args.token, day)
+        source = 'journal'
+        if not ticks:
+            ticks = synthetic_ticks(args.token, day)
+            source = 'synthetic'
+        for ts, price in ticks:
+            registry.feed([{'instrument_token': args.token, 'last_price': price, 'timestamp': ts}])
+
+            t0 = time.perf_counter()
+            state.sync(aggregator.candles)
+            snapshot = state.snapshot(aggregator.candles)
+            stream_seconds += time.perf_counter() - t0
+
+            t0 = time.perf_counter()
+            ema, rsi, prev_ema = pandas_values(aggregator.candles, args.ema_period)
+            pandas_seconds += time.perf_counter() - t0
+
+            worst['ema'] = max(worst['ema'], deviation(snapshot['ema'], ema))
+            worst['rsi'] = max(worst['rsi'], deviation(snapshot['rsi'], rsi))
+            worst['prev_ema'] = max(worst['prev_ema'], deviation(snapshot['prev_ema'], prev_ema))
+            checked += 1
+        print(f"  {day} {source:<9} ticks={len(ticks)}")
+
+    print(f"Checked {checked} ticks over {len(days)} sessions ({args.candle_time}m candles)")
+    for name, value in worst.items():
+        print(f"  max relative deviation {name:<8} {value:.3e}")
+    print(f"  streaming {stream_seconds * 1e6 / max(checked, 1):8.1f} us/tick   pandas {pandas_seconds * 1e6 / max(checked, 1):8.1f} us/tick")
+
+    failed = any(value > args.tolerance for value in worst.values())
+    print('FAIL' if failed else 'OK')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
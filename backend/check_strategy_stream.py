@@ -0,0 +1,88 @@
+"""
+Delta check for the versioned strategy_update stream.
+
+Builds strategy_update payloads the way ticker._build_updates does, directly
+from a strategy status dict, and mutates that status in place between
+updates: an option LTP changes inside option_prices, a new entry is appended
+to signal_history_today and to the audit trail. Every change must arrive as a
+delta, and applying the deltas to the snapshot must rebuild the latest state.
+
+Usage:
+    python check_strategy_stream.py
+    python check_strategy_stream.py --updates 200
+"""
+import argparse
+import sys
+
+from strategy_stream import StrategyStream
+
+
+def build_payload(status):
+    """Payload that shares the status' dicts and lists, as ticker._build_updates does"""
+    return {
+        'strategy_id': '1',
+        'metrics': {
+            'currentPrice': status['current_price'],
+            'option_prices': status['option_prices'],
+            'audit_trail': status['audit_trail'][-50:],
+        },
+        'historical_candles': [],
+        'signal_history_today': status['signal_history_today'],
+    }
+
+
+def apply(state, message):
+    """Client side of the protocol for the fields this check touches"""
+    for key, value in message.items():
+        if key == 'metrics':
+            state['metrics'].update(value)
+        elif key == 'audit_append':
+            state['metrics']['audit_trail'] = (state['metrics']['audit_trail'] + value)[-50:]
+        elif key not in ('type', 'version', 'seq', 'strategy_id', 'candles', 'log'):
+            state[key] = value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--updates', type=int, default=50)
+    args = parser.parse_args()
+
+    status = {'current_price': 48000.0, 'option_prices': {'ce': 100.0, 'pe': 100.0},
+              'signal_history_today': [], 'audit_trail': []}
+    stream = StrategyStream('1')
+    snapshot = stream.encode(build_payload(status))
+    client = {'metrics': dict(snapshot['metrics']), 'signal_history_today': list(snapshot['signal_history_today'])}
+
+    failures = []
+    for i in range(args.updates):
+        # In-place changes, as CaptureMountainSignal makes them
+        status['option_prices']['ce'] += 1.5
+        if i % 5 == 0:
+            status['signal_history_today'].append({'time': f'09:{15 + i:02d}', 'type': 'PE'})
+            status['audit_trail'].append({'event': 'signal', 'n': i})
+        message = stream.encode(build_payload(status))
+        if message is None or 'option_prices' not in message.get('metrics', {}):
+            failures.append(f"update {i}: option_prices change produced no delta")
+            continue
+        if i % 5 == 0 and 'signal_history_today' not in message:
+            failures.append(f"update {i}: appended signal produced no delta")
+        apply(client, message)
+
+    expected = build_payload(status)
+    for label, actual, wanted in (
+        ('option_prices', client['metrics']['option_prices'], expected['metrics']['option_prices']),
+        ('signal_history_today', client['signal_history_today'], expected['signal_history_today']),
+        ('audit_trail', client['metrics']['audit_trail'], expected['metrics']['audit_trail']),
+    ):
+        if actual != wanted:
+            failures.append(f"{label} rebuilt from deltas differs from the strategy status")
+
+    for failure in failures[:10]:
+        print(f"  {failure}")
+    print(f"  {args.updates} updates, seq {stream.seq}")
+    print('FAIL' if failures else 'OK')
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -26,3 +26,72 @@ CORS_ORIGINS = [origin.strip() for origin in os.getenv('CORS_ORIGINS', 'http://l
 
 # Frontend URL Configuration
 FRONTEND_URL = os.getenv('FRONTEND_URL', 'http://localhost:3000')
+
+# Historical Candle Store Configuration
+CANDLE_STORE_DIR = os.getenv('CANDLE_STORE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'candles'))
+# Derive 3/5/10/15/30/60 minute and day candles locally from stored 1-minute bars
+CANDLE_STORE_RESAMPLE = os.getenv('CANDLE_STORE_RESAMPLE', 'True').lower() == 'true'
+
+# Daily instrument dumps (kite.instruments) cached by instrument_master.py
+INSTRUMENT_CACHE_DIR = os.getenv('INSTRUMENT_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'instruments'))
+
+# Optional JSON file with extra NSE holidays / special sessions (see trading_calendar.py)
+NSE_CALENDAR_FILE = os.getenv('NSE_CALENDAR_FILE', '')
+
+# Kite historical API limits (requests per second per API key) and fetch concurrency
+KITE_HISTORICAL_RATE_LIMIT = float(os.getenv('KITE_HISTORICAL_RATE_LIMIT', 3))
+HISTORICAL_FETCH_WORKERS = int(os.getenv('HISTORICAL_FETCH_WORKERS', 3))
+
+# Offline Kite Configuration (serves synthetic or recorded market data instead of Zerodha)
+USE_FAKE_KITE = os.getenv('USE_FAKE_KITE', 'False').lower() == 'true'
+FAKE_KITE_LATENCY_MS = float(os.getenv('FAKE_KITE_LATENCY_MS', 0))
+FAKE_KITE_TICK_INTERVAL = float(os.getenv('FAKE_KITE_TICK_INTERVAL', 1.0))
+FAKE_KITE_RECORDED_DIR = os.getenv('FAKE_KITE_RECORDED_DIR', '')
+
+# Tick Writer Configuration (background persistence of websocket ticks; queue size is in tick batches)
+TICK_WRITER_QUEUE_SIZE = int(os.getenv('TICK_WRITER_QUEUE_SIZE', 10000))
+TICK_WRITER_FLUSH_INTERVAL = float(os.getenv('TICK_WRITER_FLUSH_INTERVAL', 0.5))
+TICK_JOURNAL_DIR = os.getenv('TICK_JOURNAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'ticks'))
+
+# Strategy Executor Configuration (off-thread strategy processing and throttled strategy_update emission; inbox size is in tick batches)
+STRATEGY_EXECUTOR_WORKERS = int(os.getenv('STRATEGY_EXECUTOR_WORKERS', 4))
+STRATEGY_INBOX_MAX_BATCHES = int(os.getenv('STRATEGY_INBOX_MAX_BATCHES', 1000))
+STRATEGY_COALESCE_BACKLOG = int(os.getenv('STRATEGY_COALESCE_BACKLOG', 2))
+STRATEGY_UPDATE_RATE_HZ = float(os.getenv('STRATEGY_UPDATE_RATE_HZ', 4))
+
+# Paper trade audit sink (buffered audit trail persistence; pending size is in rows)
+AUDIT_SINK_MAX_PENDING = int(os.getenv('AUDIT_SINK_MAX_PENDING', 50000))
+AUDIT_SINK_FLUSH_INTERVAL = float(os.getenv('AUDIT_SINK_FLUSH_INTERVAL', 1.0))
+AUDIT_SINK_BATCH_SIZE = int(os.getenv('AUDIT_SINK_BATCH_SIZE', 500))
+
+# Price board (seconds a websocket LTP stays usable for option prices and paper trade fills; older prices, e.g.
+# after a ticker disconnect, are fetched with kite.ltp instead)
+PRICE_BOARD_MAX_AGE = float(os.getenv('PRICE_BOARD_MAX_AGE', 5.0))
+
+# Mountain Signal parameter-grid optimizer (process pool size, 0 = one per CPU; grid size cap; rows returned;
+# cached signal timelines, one per candle set and EMA / RSI setting)
+OPTIMIZER_MAX_WORKERS = int(os.getenv('OPTIMIZER_MAX_WORKERS', 0))
+OPTIMIZER_MAX_EVALUATIONS = int(os.getenv('OPTIMIZER_MAX_EVALUATIONS', 2000))
+OPTIMIZER_TOP_RESULTS = int(os.getenv('OPTIMIZER_TOP_RESULTS', 50))
+OPTIMIZER_TIMELINE_CACHE_SIZE = int(os.getenv('OPTIMIZER_TIMELINE_CACHE_SIZE', 32))
+
+# Background backtest / optimizer jobs (concurrent job processes; queued + running jobs per user; seconds a
+# cancelled job gets to stop before it is terminated; niceness of job processes; days finished jobs are kept)
+JOB_MAX_WORKERS = int(os.getenv('JOB_MAX_WORKERS', 2))
+JOB_MAX_ACTIVE_PER_USER = int(os.getenv('JOB_MAX_ACTIVE_PER_USER', 2))
+JOB_CANCEL_GRACE_SECONDS = float(os.getenv('JOB_CANCEL_GRACE_SECONDS', 5.0))
+JOB_NICE = int(os.getenv('JOB_NICE', 10))
+JOB_RETENTION_DAYS = int(os.getenv('JOB_RETENTION_DAYS', 7))
+
+# Content-addressed backtest / optimizer result cache (results of past date ranges, keyed by request, rules file
+# and engine version; least recently used entries are evicted beyond the size limit)
+RESULT_CACHE_ENABLED = os.getenv('RESULT_CACHE_ENABLED', 'True').lower() == 'true'
+RESULT_CACHE_DIR = os.getenv('RESULT_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'results'))
+RESULT_CACHE_MAX_MB = float(os.getenv('RESULT_CACHE_MAX_MB', 256))
+
+# Option premium model for Mountain Signal backtests ('heuristic' or 'black_scholes'; risk-free rate and default
+# implied volatility as fractions; OPTION_IV_FILE holds per-day IVs, e.g. {"BANKNIFTY": {"2024-01-01": 0.14}})
+OPTION_PREMIUM_MODEL = os.getenv('OPTION_PREMIUM_MODEL', 'heuristic')
+OPTION_RISK_FREE_RATE = float(os.getenv('OPTION_RISK_FREE_RATE', 0.065))
+OPTION_DEFAULT_IV = float(os.getenv('OPTION_DEFAULT_IV', 0.15))
+OPTION_IV_FILE = os.getenv('OPTION_IV_FILE', '')
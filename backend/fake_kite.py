@@ -0,0 +1,652 @@
+"""
+Offline stand-ins for KiteConnect and KiteTicker.
+
+FakeKiteConnect serves synthetic (or recorded) historical candles, an NFO
+instruments dump, LTP/quote responses and order endpoints with optional
+injected latency. FakeKiteTicker streams ticks for subscribed tokens at a
+configurable rate. Both share one deterministic synthetic market so REST and
+websocket prices agree.
+
+Enable with USE_FAKE_KITE=true to boot the backend without Zerodha access.
+"""
+import datetime
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import config
+from trading_calendar import is_trading_day
+
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+SESSION_START = datetime.time(9, 15)
+SESSION_END = datetime.time(15, 30)
+SESSION_MINUTES = 375
+
+# Index instruments known to the rest of the backend
+INDEX_INSTRUMENTS = {
+    256265: {'tradingsymbol': 'NIFTY 50', 'name': 'NIFTY', 'base_price': 24000.0, 'strike_step': 50, 'lot_size': 75},
+    260105: {'tradingsymbol': 'NIFTY BANK', 'name': 'BANKNIFTY', 'base_price': 52000.0, 'strike_step': 100, 'lot_size': 35},
+}
+
+INTERVAL_MINUTES = {
+    'minute': 1,
+    '3minute': 3,
+    '5minute': 5,
+    '10minute': 10,
+    '15minute': 15,
+    '30minute': 30,
+    '60minute': 60,
+    'day': SESSION_MINUTES,
+}
+
+WEEKLY_MONTH_CODES = {10: 'O', 11: 'N', 12: 'D'}
+OPTION_TOKEN_BASE = 10_000_000
+
+
+def _last_thursday(year: int, month: int) -> datetime.date:
+    if month == 12:
+        last_day = datetime.date(year, 12, 31)
+    else:
+        last_day = datetime.date(year, month + 1, 1) - datetime.timedelta(days=1)
+    while last_day.weekday() != 3:
+        last_day -= datetime.timedelta(days=1)
+    return last_day
+
+
+class SyntheticMarket:
+    """Deterministic index price paths plus a live random walk for ticks"""
+
+    def __init__(self, seed: int = 0):
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.live_prices: Dict[int, float] = {}
+        self.day_cache: Dict[Tuple[int, datetime.date], List[float]] = {}
+        self.options: Dict[int, Dict[str, Any]] = {}
+        self.options_by_symbol: Dict[str, Dict[str, Any]] = {}
+        self.options_built_for: Optional[datetime.date] = None
+
+    def _day_open(self, token: int, day: datetime.date) -> float:
+        base = INDEX_INSTRUMENTS[token]['base_price']
+        ordinal = day.toordinal()
+        rng = random.Random(f"{self.seed}:{token}:open:{ordinal}")
+        # Slow cycle plus a small daily gap keeps multi-year series within a realistic band
+        return base * (1.0 + 0.08 * math.sin(ordinal / 90.0) + rng.gauss(0.0, 0.004))
+
+    def minute_closes(self, token: int, day: datetime.date) -> List[float]:
+        """Return the 375 one-minute closes for a session"""
+        key = (token, day)
+        with self.lock:
+            cached = self.day_cache.get(key)
+        if cached is not None:
+            return cached
+        rng = random.Random(f"{self.seed}:{token}:path:{day.toordinal()}")
+        price = self._day_open(token, day)
+        sigma = price * 0.0006
+        closes = []
+        for _ in range(SESSION_MINUTES):
+            price = max(1.0, price + rng.gauss(0.0, sigma))
+            closes.append(round(price, 2))
+        with self.lock:
+            if len(self.day_cache) > 4096:
+                self.day_cache.clear()
+            self.day_cache[key] = closes
+        return closes
+
+    def minute_bars(self, token: int, day: datetime.date) -> List[Tuple[datetime.datetime, float, float, float, float]]:
+        closes = self.minute_closes(token, day)
+        rng = random.Random(f"{self.seed}:{token}:wick:{day.toordinal()}")
+        start = datetime.datetime.combine(day, SESSION_START, IST)
+        bars = []
+        prev_close = self._day_open(token, day)
+        for i, close in enumerate(closes):
+            open_ = prev_close
+            wick = abs(rng.gauss(0.0, close * 0.0003))
+            high = round(max(open_, close) + wick, 2)
+            low = round(min(open_, close) - wick, 2)
+            bars.append((start + datetime.timedelta(minutes=i), round(open_, 2), high, low, close))
+            prev_close = close
+        return bars
+
+    def price_at(self, token: int, when: datetime.datetime) -> float:
+        """Index price at a moment in the session (clamped to session bounds)"""
+        day = when.date()
+        closes = self.minute_closes(token, day)
+        minutes = int((when.replace(tzinfo=None) - datetime.datetime.combine(day, SESSION_START)).total_seconds() // 60)
+        return closes[min(max(minutes, 0), SESSION_MINUTES - 1)]
+
+    def live_price(self, token: int) -> float:
+        with self.lock:
+            price = self.live_prices.get(token)
+        if price is not None:
+            return price
+        if token in INDEX_INSTRUMENTS:
+            price = self.price_at(token, datetime.datetime.now(IST))
+        else:
+            price = self.option_price(token)
+        with self.lock:
+            self.live_prices.setdefault(token, price)
+            return self.live_prices[token]
+
+    def step(self, token: int, rng: random.Random) -> float:
+        """Advance the live random walk for one token and return the new price"""
+        if token not in INDEX_INSTRUMENTS:
+            price = self.option_price(token)
+            with self.lock:
+                self.live_prices[token] = price
+            return price
+        price = self.live_price(token)
+        price = round(max(1.0, price + rng.gauss(0.0, price * 0.0002)), 2)
+        with self.lock:
+            self.live_prices[token] = price
+        return price
+
+    # ------------------------------------------------------------------
+    # Options
+    # ------------------------------------------------------------------
+    def expiries(self, today: datetime.date) -> Tuple[List[datetime.date], List[datetime.date]]:
+        """Return (weekly, monthly) expiries from today"""
+        weekly = []
+        day = today
+        while len(weekly) < 4:
+            if day.weekday() == 3 and day >= today:
+                weekly.append(day)
+            day += datetime.timedelta(days=1)
+        monthly = []
+        year, month = today.year, today.month
+        while len(monthly) < 3:
+            expiry = _last_thursday(year, month)
+            if expiry >= today:
+                monthly.append(expiry)
+            month += 1
+            if month > 12:
+                year, month = year + 1, 1
+        return weekly, monthly
+
+    def build_options(self, today: datetime.date, strikes_each_side: int = 40) -> None:
+        with self.lock:
+            if self.options_built_for == today:
+                return
+        options: Dict[int, Dict[str, Any]] = {}
+        weekly, monthly = self.expiries(today)
+        next_token = OPTION_TOKEN_BASE
+        for index_token, meta in INDEX_INSTRUMENTS.items():
+            step = meta['strike_step']
+            spot = self.live_price(index_token)
+            atm = int(round(spot / step) * step)
+            expiries = sorted(set(monthly) | (set(weekly) if meta['name'] == 'NIFTY' else set()))
+            for expiry in expiries:
+                is_monthly = expiry in monthly
+                for offset in range(-strikes_each_side, strikes_each_side + 1):
+                    strike = atm + offset * step
+                    for option_type in ('CE', 'PE'):
+                        if is_monthly:
+                            symbol = f"{meta['name']}{expiry.strftime('%y%b').upper()}{strike}{option_type}"
+                        else:
+                            month_code = WEEKLY_MONTH_CODES.get(expiry.month, str(expiry.month))
+                            symbol = f"{meta['name']}{expiry.strftime('%y')}{month_code}{expiry.day:02d}{strike}{option_type}"
+                        options[next_token] = {
+                            'instrument_token': next_token,
+                            'exchange_token': str(next_token // 256),
+                            'tradingsymbol': symbol,
+                            'name': meta['name'],
+                            'last_price': 0.0,
+                            'expiry': expiry,
+                            'strike': float(strike),
+                            'tick_size': 0.05,
+                            'lot_size': meta['lot_size'],
+                            'instrument_type': option_type,
+                            'segment': 'NFO-OPT',
+                            'exchange': 'NFO',
+                            'underlying_token': index_token,
+                        }
+                        next_token += 1
+        with self.lock:
+            self.options = options
+            self.options_by_symbol = {item['tradingsymbol']: item for item in options.values()}
+            self.options_built_for = today
+
+    def option_price(self, token: int, spot: Optional[float] = None, when: Optional[datetime.datetime] = None) -> float:
+        """Intrinsic value plus a time value that decays with expiry and moneyness"""
+        option = self.options.get(token)
+        if option is None:
+            return 0.0
+        if spot is None:
+            spot = self.live_price(option['underlying_token'])
+        when = when or datetime.datetime.now(IST)
+        days = max((option['expiry'] - when.date()).days, 0) + 1
+        strike = option['strike']
+        if option['instrument_type'] == 'CE':
+            intrinsic = max(spot - strike, 0.0)
+        else:
+            intrinsic = max(strike - spot, 0.0)
+        sigma = spot * 0.012 * math.sqrt(days)
+        time_value = 0.4 * sigma * math.exp(-((spot - strike) ** 2) / (2 * sigma * sigma))
+        return round(max(intrinsic + time_value, 0.05), 2)
+
+
+_market = SyntheticMarket(seed=int(os.getenv('FAKE_KITE_SEED', 0)))
+
+
+def get_synthetic_market() -> SyntheticMarket:
+    return _market
+
+
+class FakeKiteConnect:
+    """Drop-in replacement for kiteconnect.KiteConnect"""
+
+    # Constants mirrored from kiteconnect.KiteConnect
+    PRODUCT_MIS = "MIS"
+    PRODUCT_CNC = "CNC"
+    PRODUCT_NRML = "NRML"
+    ORDER_TYPE_MARKET = "MARKET"
+    ORDER_TYPE_LIMIT = "LIMIT"
+    ORDER_TYPE_SLM = "SL-M"
+    ORDER_TYPE_SL = "SL"
+    VARIETY_REGULAR = "regular"
+    VARIETY_AMO = "amo"
+    TRANSACTION_TYPE_BUY = "BUY"
+    TRANSACTION_TYPE_SELL = "SELL"
+    VALIDITY_DAY = "DAY"
+    VALIDITY_IOC = "IOC"
+    EXCHANGE_NSE = "NSE"
+    EXCHANGE_BSE = "BSE"
+    EXCHANGE_NFO = "NFO"
+
+    def __init__(self, api_key: str = "fake_api_key", access_token: Optional[str] = None, latency: Optional[float] = None,
+                 market: Optional[SyntheticMarket] = None, recorded_dir: Optional[str] = None, **kwargs):
+        self.api_key = api_key
+        self.access_token = access_token
+        self.latency = config.FAKE_KITE_LATENCY_MS / 1000.0 if latency is None else latency
+        self.market = market or _market
+        self.recorded_dir = config.FAKE_KITE_RECORDED_DIR if recorded_dir is None else recorded_dir
+        self.orders_book: List[Dict[str, Any]] = []
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.call_counts: Dict[str, int] = {}
+
+    def _call(self, name: str) -> None:
+        with self.lock:
+            self.calls += 1
+            self.call_counts[name] = self.call_counts.get(name, 0) + 1
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+    # ------------------------------------------------------------------
+    # Session
+    # ------------------------------------------------------------------
+    def login_url(self) -> str:
+        host = 'localhost' if config.SERVER_HOST in ('0.0.0.0', '') else config.SERVER_HOST
+        return f"http://{host}:{config.SERVER_PORT}/callback?request_token=fake_{uuid.uuid4().hex[:12]}&status=success"
+
+    def generate_session(self, request_token: str, api_secret: str) -> Dict[str, Any]:
+        self._call('generate_session')
+        self.access_token = f"fake_access_{uuid.uuid4().hex}"
+        return {
+            'user_id': 'FAKE01',
+            'user_name': 'Offline Trader',
+            'access_token': self.access_token,
+            'public_token': uuid.uuid4().hex,
+            'login_time': datetime.datetime.now(),
+        }
+
+    def set_access_token(self, access_token: str) -> None:
+        self.access_token = access_token
+
+    def profile(self) -> Dict[str, Any]:
+        self._call('profile')
+        return {
+            'user_id': 'FAKE01',
+            'user_name': 'Offline Trader',
+            'user_shortname': 'Offline',
+            'email': 'offline@example.com',
+            'broker': 'ZERODHA',
+            'exchanges': ['NSE', 'NFO'],
+            'products': ['CNC', 'NRML', 'MIS'],
+            'order_types': ['MARKET', 'LIMIT', 'SL', 'SL-M'],
+        }
+
+    def margins(self, segment: Optional[str] = None) -> Dict[str, Any]:
+        self._call('margins')
+        equity = {
+            'enabled': True,
+            'net': 500000.0,
+            'available': {'adhoc_margin': 0, 'cash': 500000.0, 'opening_balance': 500000.0, 'live_balance': 500000.0, 'collateral': 0, 'intraday_payin': 0},
+            'utilised': {'debits': 0, 'exposure': 0, 'm2m_realised': 0, 'm2m_unrealised': 0, 'option_premium': 0, 'span': 0},
+        }
+        data = {'equity': equity, 'commodity': {'enabled': False, 'net': 0, 'available': {}, 'utilised': {}}}
+        return data[segment] if segment else data
+
+    # ------------------------------------------------------------------
+    # Instruments and quotes
+    # ------------------------------------------------------------------
+    def instruments(self, exchange: Optional[str] = None) -> List[Dict[str, Any]]:
+        self._call('instruments')
+        today = datetime.datetime.now(IST).date()
+        self.market.build_options(today)
+        result: List[Dict[str, Any]] = []
+        if exchange in (None, 'NSE'):
+            for token, meta in INDEX_INSTRUMENTS.items():
+                result.append({
+                    'instrument_token': token,
+                    'exchange_token': str(token // 256),
+                    'tradingsymbol': meta['tradingsymbol'],
+                    'name': meta['tradingsymbol'],
+                    'last_price': 0.0,
+                    'expiry': '',
+                    'strike': 0.0,
+                    'tick_size': 0.0,
+                    'lot_size': 0,
+                    'instrument_type': 'EQ',
+                    'segment': 'INDICES',
+                    'exchange': 'NSE',
+                })
+        if exchange in (None, 'NFO'):
+            for option in self.market.options.values():
+                item = dict(option)
+                item.pop('underlying_token', None)
+                result.append(item)
+        return result
+
+    def _resolve(self, key: Union[str, int]) -> Optional[int]:
+        if isinstance(key, int) or (isinstance(key, str) and key.isdigit()):
+            return int(key)
+        exchange, _, symbol = str(key).partition(':')
+        if exchange == 'NSE':
+            for token, meta in INDEX_INSTRUMENTS.items():
+                if meta['tradingsymbol'] == symbol:
+                    return token
+            return None
+        if not self.market.options:
+            self.market.build_options(datetime.datetime.now(IST).date())
+        option = self.market.options_by_symbol.get(symbol)
+        return option['instrument_token'] if option else None
+
+    def ltp(self, *instruments) -> Dict[str, Any]:
+        self._call('ltp')
+        keys = instruments[0] if len(instruments) == 1 and isinstance(instruments[0], (list, tuple)) else instruments
+        response = {}
+        for key in keys:
+            token = self._resolve(key)
+            if token is None:
+                continue
+            response[str(key)] = {
+                'instrument_token': token,
+                'last_price': self.market.live_price(token),
+            }
+        return response
+
+    def quote(self, *instruments) -> Dict[str, Any]:
+        self._call('quote')
+        keys = instruments[0] if len(instruments) == 1 and isinstance(instruments[0], (list, tuple)) else instruments
+        response = {}
+        now = datetime.datetime.now(IST).replace(tzinfo=None)
+        for key in keys:
+            token = self._resolve(key)
+            if token is None:
+                continue
+            price = self.market.live_price(token)
+            response[str(key)] = {
+                'instrument_token': token,
+                'timestamp': now,
+                'last_trade_time': now,
+                'last_price': price,
+                'volume': 0,
+                'oi': 0,
+                'net_change': 0.0,
+                'ohlc': {'open': price, 'high': price, 'low': price, 'close': price},
+            }
+        return response
+
+    # ------------------------------------------------------------------
+    # Historical data
+    # ------------------------------------------------------------------
+    def _recorded_day(self, instrument_token: int, day: datetime.date, interval: str) -> Optional[List[Dict[str, Any]]]:
+        if not self.recorded_dir:
+            return None
+        from candle_store import CandleStore
+        return CandleStore(self.recorded_dir).read_day(instrument_token, interval, day)
+
+    def _synthetic_day(self, instrument_token: int, day: datetime.date, interval: str) -> List[Dict[str, Any]]:
+        if instrument_token in INDEX_INSTRUMENTS:
+            bars = self.market.minute_bars(instrument_token, day)
+        elif instrument_token in self.market.options:
+            underlying = self.market.options[instrument_token]['underlying_token']
+            bars = []
+            for ts, o, h, l, c in self.market.minute_bars(underlying, day):
+                prices = [self.market.option_price(instrument_token, spot, ts) for spot in (o, h, l, c)]
+                bars.append((ts, prices[0], max(prices), min(prices), prices[3]))
+        else:
+            return []
+        step = INTERVAL_MINUTES.get(interval, 1)
+        candles = []
+        for start in range(0, len(bars), step):
+            chunk = bars[start:start + step]
+            candles.append({
+                'date': chunk[0][0] if interval != 'day' else datetime.datetime.combine(day, datetime.time(0, 0), IST),
+                'open': chunk[0][1],
+                'high': max(bar[2] for bar in chunk),
+                'low': min(bar[3] for bar in chunk),
+                'close': chunk[-1][4],
+                'volume': 0,
+            })
+        return candles
+
+    def historical_data(self, instrument_token: int, from_date, to_date, interval: str, continuous: bool = False, oi: bool = False) -> List[Dict[str, Any]]:
+        self._call('historical_data')
+        if isinstance(from_date, str):
+            from_date = datetime.datetime.fromisoformat(from_date)
+        if isinstance(to_date, str):
+            to_date = datetime.datetime.fromisoformat(to_date)
+        if not isinstance(from_date, datetime.datetime):
+            from_date = datetime.datetime.combine(from_date, datetime.time(0, 0))
+        if not isinstance(to_date, datetime.datetime):
+            to_date = datetime.datetime.combine(to_date, datetime.time(23, 59))
+        now = datetime.datetime.now(IST).replace(tzinfo=None)
+        upper = min(to_date.replace(tzinfo=None), now)
+        lower = from_date.replace(tzinfo=None)
+
+        candles: List[Dict[str, Any]] = []
+        day = lower.date()
+        while day <= upper.date():
+            if is_trading_day(day):
+                day_candles = self._recorded_day(instrument_token, day, interval)
+                if day_candles is None:
+                    day_candles = self._synthetic_day(instrument_token, day, interval)
+                for candle in day_candles:
+                    ts = candle['date'].replace(tzinfo=None)
+                    if interval == 'day' or lower <= ts <= upper:
+                        candles.append(candle)
+            day += datetime.timedelta(days=1)
+        return candles
+
+    # ------------------------------------------------------------------
+    # Orders and positions
+    # ------------------------------------------------------------------
+    def place_order(self, variety: str, exchange: str, tradingsymbol: str, transaction_type: str, quantity: int,
+                    product: str, order_type: str, price: Optional[float] = None, validity: Optional[str] = None, **kwargs) -> str:
+        self._call('place_order')
+        token = self._resolve(f"{exchange}:{tradingsymbol}")
+        fill_price = self.market.live_price(token) if token is not None else (price or 0.0)
+        order_id = str(int(time.time() * 1000))
+        with self.lock:
+            self.orders_book.append({
+                'order_id': order_id,
+                'status': 'COMPLETE',
+                'variety': variety,
+                'exchange': exchange,
+                'tradingsymbol': tradingsymbol,
+                'instrument_token': token,
+                'transaction_type': transaction_type,
+                'quantity': int(quantity),
+                'filled_quantity': int(quantity),
+                'product': product,
+                'order_type': order_type,
+                'validity': validity or self.VALIDITY_DAY,
+                'average_price': fill_price,
+                'order_timestamp': datetime.datetime.now(),
+            })
+        return order_id
+
+    def orders(self) -> List[Dict[str, Any]]:
+        self._call('orders')
+        with self.lock:
+            return [dict(order) for order in self.orders_book]
+
+    def positions(self) -> Dict[str, List[Dict[str, Any]]]:
+        self._call('positions')
+        net: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        with self.lock:
+            orders = list(self.orders_book)
+        for order in orders:
+            key = (order['exchange'], order['tradingsymbol'], order['product'])
+            position = net.setdefault(key, {
+                'tradingsymbol': order['tradingsymbol'],
+                'exchange': order['exchange'],
+                'instrument_token': order['instrument_token'],
+                'product': order['product'],
+                'quantity': 0,
+                'average_price': order['average_price'],
+                'pnl': 0.0,
+            })
+            signed = order['quantity'] if order['transaction_type'] == self.TRANSACTION_TYPE_BUY else -order['quantity']
+            position['quantity'] += signed
+        for position in net.values():
+            if position['instrument_token'] is not None:
+                position['last_price'] = self.market.live_price(position['instrument_token'])
+                position['pnl'] = round((position['last_price'] - position['average_price']) * position['quantity'], 2)
+        positions = list(net.values())
+        return {'net': positions, 'day': positions}
+
+
+class FakeKiteTicker:
+    """Drop-in replacement for kiteconnect.KiteTicker driven by the synthetic market"""
+
+    MODE_FULL = "full"
+    MODE_QUOTE = "quote"
+    MODE_LTP = "ltp"
+
+    def __init__(self, api_key: str, access_token: str, tick_interval: Optional[float] = None,
+                 market: Optional[SyntheticMarket] = None, **kwargs):
+        self.api_key = api_key
+        self.access_token = access_token
+        self.tick_interval = config.FAKE_KITE_TICK_INTERVAL if tick_interval is None else tick_interval
+        self.market = market or _market
+        self.subscribed: Dict[int, str] = {}
+        self.lock = threading.Lock()
+        self.rng = random.Random()
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.connected = False
+        self.ticks_sent = 0
+
+        self.on_ticks = None
+        self.on_connect = None
+        self.on_close = None
+        self.on_error = None
+        self.on_reconnect = None
+        self.on_noreconnect = None
+        self.on_order_update = None
+        self.on_message = None
+
+    def subscribe(self, instrument_tokens: List[int]) -> bool:
+        with self.lock:
+            for token in instrument_tokens:
+                self.subscribed.setdefault(int(token), self.MODE_QUOTE)
+        return True
+
+    def unsubscribe(self, instrument_tokens: List[int]) -> bool:
+        with self.lock:
+            for token in instrument_tokens:
+                self.subscribed.pop(int(token), None)
+        return True
+
+    def set_mode(self, mode: str, instrument_tokens: List[int]) -> bool:
+        with self.lock:
+            for token in instrument_tokens:
+                self.subscribed[int(token)] = mode
+        return True
+
+    def is_connected(self) -> bool:
+        return self.connected
+
+    def _build_tick(self, token: int, mode: str, now: datetime.datetime) -> Dict[str, Any]:
+        price = self.market.step(token, self.rng)
+        is_index = token in INDEX_INSTRUMENTS
+        tick = {
+            'tradable': not is_index,
+            'mode': mode,
+            'instrument_token': token,
+            'last_price': price,
+        }
+        if mode == self.MODE_LTP:
+            return tick
+        tick['ohlc'] = {'open': price, 'high': price, 'low': price, 'close': price}
+        tick['change'] = 0.0
+        if not is_index:
+            tick.update({
+                'last_traded_quantity': self.rng.randint(1, 50) * 25,
+                'average_traded_price': price,
+                'volume_traded': self.ticks_sent * 25,
+                'total_buy_quantity': 0,
+                'total_sell_quantity': 0,
+            })
+        if mode == self.MODE_FULL:
+            tick['exchange_timestamp'] = now
+            if not is_index:
+                tick['last_trade_time'] = now
+                tick['oi'] = 0
+                tick['depth'] = {'buy': [], 'sell': []}
+        return tick
+
+    def _run(self) -> None:
+        self.connected = True
+        if self.on_connect:
+            try:
+                self.on_connect(self, {'status': 'connected'})
+            except Exception as e:
+                logging.error(f"[FAKE_KITE] on_connect raised: {e}", exc_info=True)
+        while not self.stop_event.is_set():
+            started = time.monotonic()
+            with self.lock:
+                subscriptions = list(self.subscribed.items())
+            if subscriptions and self.on_ticks:
+                now = datetime.datetime.now(IST).replace(tzinfo=None)
+                ticks = [self._build_tick(token, mode, now) for token, mode in subscriptions]
+                self.ticks_sent += len(ticks)
+                try:
+                    self.on_ticks(self, ticks)
+                except Exception as e:
+                    logging.error(f"[FAKE_KITE] on_ticks raised: {e}", exc_info=True)
+            remaining = self.tick_interval - (time.monotonic() - started)
+            if remaining > 0:
+                self.stop_event.wait(remaining)
+        self.connected = False
+        if self.on_close:
+            try:
+                self.on_close(self, 1000, 'closed')
+            except Exception as e:
+                logging.error(f"[FAKE_KITE] on_close raised: {e}", exc_info=True)
+
+    def connect(self, threaded: bool = False, disable_ssl_verification: bool = False, proxy: Optional[Dict[str, Any]] = None) -> None:
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        if threaded:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+        else:
+            self._run()
+
+    def close(self, code: Optional[int] = None, reason: Optional[str] = None) -> None:
+        self.stop_event.set()
+
+    def stop(self) -> None:
+        self.stop_event.set()
+
+    def stop_retry(self) -> None:
+        pass
@@ -0,0 +1,153 @@
+"""
+Range-coalesced, rate-limited historical data fetcher.
+
+Kite serves up to a fixed number of days per ``historical_data`` call depending
+on the interval, and caps historical requests per second per API key. This
+module splits a date range into the largest windows Kite allows, issues them
+from a small worker pool behind a shared token bucket, and yields the results
+back in chronological order.
+"""
+import datetime
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import config
+from trading_calendar import session_bounds, trading_days
+
+# Maximum number of calendar days Kite returns in a single historical_data call
+MAX_DAYS_PER_REQUEST = {
+    'minute': 60,
+    '3minute': 100,
+    '5minute': 100,
+    '10minute': 100,
+    '15minute': 200,
+    '30minute': 200,
+    '60minute': 400,
+    'day': 2000,
+}
+
+Window = Tuple[datetime.date, datetime.date]
+
+
+class TokenBucket:
+    """Thread-safe token bucket; acquire() blocks until a token is available"""
+
+    def __init__(self, rate_per_second: float, capacity: Optional[float] = None):
+        self.rate = float(rate_per_second)
+        self.capacity = float(capacity if capacity is not None else max(1.0, rate_per_second))
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1.0:
+                    self.tokens -= 1.0
+                    return
+                wait = (1.0 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+# Kite's limit applies per API key, so every fetcher in the process shares one bucket
+_rate_limiter = TokenBucket(config.KITE_HISTORICAL_RATE_LIMIT)
+
+
+def max_days_for_interval(interval: str) -> int:
+    return MAX_DAYS_PER_REQUEST.get(interval, 60)
+
+
+def plan_windows(days: Sequence[datetime.date], interval: str) -> List[Window]:
+    """Group days into request windows no longer than Kite allows for the interval.
+
+    ``days`` must be sorted. A window never spans more calendar days than the
+    interval permits; gaps in ``days`` are only bridged within that limit.
+    """
+    max_days = max_days_for_interval(interval)
+    windows: List[Window] = []
+    window_start: Optional[datetime.date] = None
+    window_end: Optional[datetime.date] = None
+    for day in days:
+        if window_start is None:
+            window_start = window_end = day
+        elif (day - window_start).days < max_days:
+            window_end = day
+        else:
+            windows.append((window_start, window_end))
+            window_start = window_end = day
+    if window_start is not None:
+        windows.append((window_start, window_end))
+    return windows
+
+
+class HistoricalFetcher:
+    def __init__(self, kite, max_workers: Optional[int] = None, rate_limiter: Optional[TokenBucket] = None, max_retries: int = 2):
+        self.kite = kite
+        self.max_workers = max_workers or config.HISTORICAL_FETCH_WORKERS
+        self.rate_limiter = rate_limiter or _rate_limiter
+        self.max_retries = max_retries
+        self.requests_made = 0
+        self.lock = threading.Lock()
+
+    def _fetch_window(self, instrument_token: int, window: Window, interval: str) -> List[Dict[str, Any]]:
+        start_dt = session_bounds(window[0])[0]
+        end_dt = session_bounds(window[1])[1]
+        attempt = 0
+        while True:
+            self.rate_limiter.acquire()
+            with self.lock:
+                self.requests_made += 1
+            try:
+                return list(self.kite.historical_data(instrument_token, start_dt, end_dt, interval) or [])
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries:
+                    raise
+                logging.warning(f"[HISTORICAL] Retrying {instrument_token} {interval} {window[0]}..{window[1]} after error: {e}")
+                time.sleep(0.5 * attempt)
+
+    def iter_windows(self, instrument_token: int, windows: Sequence[Window], interval: str) -> Iterator[Tuple[Window, Optional[List[Dict[str, Any]]], Optional[Exception]]]:
+        """Fetch windows concurrently and yield (window, candles, error) in window order"""
+        if not windows:
+            return
+        executor = ThreadPoolExecutor(max_workers=min(self.max_workers, len(windows)))
+        try:
+            futures: List[Future] = [
+                executor.submit(self._fetch_window, instrument_token, window, interval)
+                for window in windows
+            ]
+            for window, future in zip(windows, futures):
+                try:
+                    yield window, future.result(), None
+                except Exception as e:
+                    yield window, None, e
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def fetch(self, instrument_token: int, from_date: datetime.date, to_date: datetime.date, interval: str) -> List[Dict[str, Any]]:
+        """Fetch a full range using the fewest requests Kite allows"""
+        days = trading_days(from_date, to_date)
+        candles: List[Dict[str, Any]] = []
+        for window, hist, error in self.iter_windows(instrument_token, plan_windows(days, interval), interval):
+            if error is not None:
+                logging.warning(f"[HISTORICAL] Fetch failed for {window[0]}..{window[1]}: {error}")
+                continue
+            candles.extend(hist)
+        return candles
+
+
+def split_by_day(candles: List[Dict[str, Any]]) -> Dict[datetime.date, List[Dict[str, Any]]]:
+    """Group candles by the session date of their timestamp"""
+    by_day: Dict[datetime.date, List[Dict[str, Any]]] = {}
+    for candle in candles:
+        dt = candle['date']
+        if isinstance(dt, str):
+            dt = datetime.datetime.fromisoformat(dt)
+        by_day.setdefault(dt.date(), []).append(candle)
+    return by_day
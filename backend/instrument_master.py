@@ -0,0 +1,255 @@
+"""
+Process-wide instrument master.
+
+``kite.instruments()`` returns tens of thousands of rows and used to be
+downloaded and scanned linearly on every option lookup. The master downloads
+each exchange dump at most once per trading day, persists it as
+``<root>/instruments_<EXCHANGE>_<YYYY-MM-DD>.pkl`` so restarts reuse it, and
+indexes it:
+
+- by instrument token and by (exchange, tradingsymbol) (dicts)
+- by underlying name into sorted option expiries
+- by (name, expiry) into an OptionChain with sorted strike arrays per CE / PE
+
+ATM +/- N lookups bisect the strike arrays, so they cost microseconds.
+Dumps older than today are removed when a new one is written.
+"""
+import bisect
+import datetime
+import logging
+import os
+import pickle
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+
+ALL_EXCHANGES = 'ALL'
+OPTION_TYPES = ('CE', 'PE')
+
+
+def _to_date(value: Any) -> Optional[datetime.date]:
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    try:
+        return datetime.date.fromisoformat(str(value)[:10])
+    except ValueError:
+        return None
+
+
+def _nearest_index(strikes: List[float], price: float) -> int:
+    """Index of the strike closest to ``price``; ties go to the lower strike like min(key=abs)"""
+    i = bisect.bisect_left(strikes, price)
+    if i == 0:
+        return 0
+    if i == len(strikes):
+        return i - 1
+    return i - 1 if price - strikes[i - 1] <= strikes[i] - price else i
+
+
+class OptionChain:
+    """Options of one underlying and expiry with strikes sorted per option type"""
+    __slots__ = ('name', 'expiry', 'strikes', 'by_type')
+
+    def __init__(self, name: str, expiry: datetime.date, rows: List[Dict[str, Any]]):
+        self.name = name
+        self.expiry = expiry
+        self.by_type: Dict[str, Tuple[List[float], List[Dict[str, Any]]]] = {}
+        for option_type in OPTION_TYPES:
+            typed = sorted((row for row in rows if row.get('instrument_type') == option_type), key=lambda row: row['strike'])
+            self.by_type[option_type] = ([row['strike'] for row in typed], typed)
+        self.strikes: List[float] = sorted({row['strike'] for row in rows})
+
+    def atm_strike(self, price: float, option_type: Optional[str] = None) -> Optional[float]:
+        strikes = self.by_type[option_type][0] if option_type else self.strikes
+        if not strikes:
+            return None
+        return strikes[_nearest_index(strikes, price)]
+
+    def strikes_around(self, price: float, count: int) -> List[float]:
+        """ATM strike and ``count`` strikes on each side (clipped at the ends of the chain)"""
+        if not self.strikes:
+            return []
+        atm = _nearest_index(self.strikes, price)
+        return self.strikes[max(0, atm - count):atm + count + 1]
+
+    def option(self, strike: float, option_type: str) -> Optional[Dict[str, Any]]:
+        strikes, rows = self.by_type.get(option_type, ([], []))
+        i = bisect.bisect_left(strikes, strike)
+        if i < len(strikes) and strikes[i] == strike:
+            return rows[i]
+        return None
+
+    def options_around(self, price: float, count: int) -> List[Dict[str, Any]]:
+        """CE and PE rows for the ATM +/- ``count`` strikes"""
+        result = []
+        for strike in self.strikes_around(price, count):
+            for option_type in OPTION_TYPES:
+                row = self.option(strike, option_type)
+                if row is not None:
+                    result.append(row)
+        return result
+
+    def __repr__(self) -> str:
+        return f"OptionChain({self.name} {self.expiry}, {len(self.strikes)} strikes)"
+
+
+class InstrumentMaster:
+    def __init__(self, root: str):
+        self.root = root
+        self.lock = threading.Lock()
+        self.loaded: Dict[str, datetime.date] = {}  # exchange key -> trading day of the dump
+        self.rows: Dict[str, List[Dict[str, Any]]] = {}
+        self.by_token: Dict[int, Dict[str, Any]] = {}
+        self.by_symbol: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.expiries_by_name: Dict[str, List[datetime.date]] = {}
+        self.chains: Dict[Tuple[str, datetime.date], OptionChain] = {}
+        self.downloads = 0
+        self.disk_loads = 0
+
+    def _path(self, key: str, day: datetime.date) -> str:
+        return os.path.join(self.root, f"instruments_{key}_{day.isoformat()}.pkl")
+
+    def load(self, kite, exchange: Optional[str] = None, today: Optional[datetime.date] = None) -> List[Dict[str, Any]]:
+        """Rows of ``exchange`` (None for every exchange) for today, downloading at most once per day"""
+        key = exchange or ALL_EXCHANGES
+        today = today or datetime.date.today()
+        if self.loaded.get(key) == today:
+            return self.rows[key]
+        with self.lock:
+            if self.loaded.get(key) == today:
+                return self.rows[key]
+            rows = self._read(key, today)
+            if rows is None:
+                if kite is None:
+                    return self.rows.get(key, [])
+                rows = kite.instruments(exchange) if exchange else kite.instruments()
+                self.downloads += 1
+                logging.info(f"Downloaded {len(rows)} {key} instruments for {today}")
+                self._write(key, today, rows)
+            else:
+                self.disk_loads += 1
+            self._index(key, rows)
+            self.loaded[key] = today
+            return rows
+
+    def _read(self, key: str, day: datetime.date) -> Optional[List[Dict[str, Any]]]:
+        path = self._path(key, day)
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'rb') as f:
+                return pickle.load(f)
+        except Exception as e:
+            logging.warning(f"Ignoring unreadable instrument dump {path}: {e}")
+            return None
+
+    def _write(self, key: str, day: datetime.date, rows: List[Dict[str, Any]]) -> None:
+        try:
+            os.makedirs(self.root, exist_ok=True)
+            path = self._path(key, day)
+            tmp = f"{path}.tmp"
+            with open(tmp, 'wb') as f:
+                pickle.dump(rows, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, path)
+            prefix = f"instruments_{key}_"
+            for name in os.listdir(self.root):
+                if name.startswith(prefix) and name.endswith('.pkl') and name != os.path.basename(path):
+                    os.remove(os.path.join(self.root, name))
+        except OSError as e:
+            logging.warning(f"Could not persist {key} instruments: {e}")
+
+    def _index(self, key: str, rows: List[Dict[str, Any]]) -> None:
+        """Rebuild the indexes from every loaded dump (copy-on-write, readers never lock)"""
+        all_rows = dict(self.rows)
+        all_rows[key] = rows
+        by_token: Dict[int, Dict[str, Any]] = {}
+        by_symbol: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        grouped: Dict[Tuple[str, datetime.date], List[Dict[str, Any]]] = {}
+        for exchange_rows in all_rows.values():
+            for row in exchange_rows:
+                token = row['instrument_token']
+                if token in by_token:
+                    # Same contract from another dump (e.g. NFO and ALL)
+                    continue
+                by_token[token] = row
+                by_symbol.setdefault((row.get('exchange'), row.get('tradingsymbol')), row)
+                if row.get('instrument_type') in OPTION_TYPES:
+                    expiry = _to_date(row.get('expiry'))
+                    if expiry is not None:
+                        grouped.setdefault((row['name'], expiry), []).append(row)
+        chains = {chain_key: OptionChain(chain_key[0], chain_key[1], chain_rows) for chain_key, chain_rows in grouped.items()}
+        expiries_by_name: Dict[str, List[datetime.date]] = {}
+        for name, expiry in sorted(chains):
+            expiries_by_name.setdefault(name, []).append(expiry)
+        self.rows = all_rows
+        self.by_token = by_token
+        self.by_symbol = by_symbol
+        self.chains = chains
+        self.expiries_by_name = expiries_by_name
+
+    def get(self, instrument_token: int) -> Optional[Dict[str, Any]]:
+        return self.by_token.get(instrument_token)
+
+    def find(self, tradingsymbol: str, exchange: str = 'NFO') -> Optional[Dict[str, Any]]:
+        return self.by_symbol.get((exchange, tradingsymbol))
+
+    def expiries(self, name: str) -> List[datetime.date]:
+        return self.expiries_by_name.get(name, [])
+
+    def resolve_expiry(self, name: str, expiry_type: str, today: Optional[datetime.date] = None) -> Optional[datetime.date]:
+        """Expiry for 'weekly', 'next_weekly' or 'monthly' (case-insensitive), with the same fallbacks as get_option_symbols"""
+        all_expiries = self.expiries(name)
+        today = today or datetime.date.today()
+        expiry_type_lower = expiry_type.lower() if expiry_type else ''
+        expiries_after_today = all_expiries[bisect.bisect_right(all_expiries, today):]
+        if expiry_type_lower == 'weekly':
+            if expiries_after_today:
+                return expiries_after_today[0]
+            return next((d for d in all_expiries if d >= today), None)
+        if expiry_type_lower == 'next_weekly':
+            if len(expiries_after_today) > 1:
+                return expiries_after_today[1]
+            return expiries_after_today[0] if expiries_after_today else None
+        if expiry_type_lower == 'monthly':
+            expiry = next((d for d in all_expiries if (d - today).days >= 20), None)
+            if not expiry and all_expiries:
+                expiry = all_expiries[-1]
+            return expiry
+        return None
+
+    def chain(self, name: str, expiry: Optional[datetime.date]) -> Optional[OptionChain]:
+        if expiry is None:
+            return None
+        return self.chains.get((name, expiry))
+
+    def option_chain(self, kite, name: str, expiry_type: str) -> Optional[OptionChain]:
+        """Load today's NFO dump if needed and return the chain for ``expiry_type``"""
+        self.load(kite, 'NFO')
+        return self.chain(name, self.resolve_expiry(name, expiry_type))
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'loaded': {key: day.isoformat() for key, day in self.loaded.items()},
+            'instruments': len(self.by_token),
+            'chains': len(self.chains),
+            'downloads': self.downloads,
+            'disk_loads': self.disk_loads,
+        }
+
+
+_instrument_master = None
+_instrument_master_lock = threading.Lock()
+
+
+def get_instrument_master() -> InstrumentMaster:
+    global _instrument_master
+    if _instrument_master is None:
+        with _instrument_master_lock:
+            if _instrument_master is None:
+                _instrument_master = InstrumentMaster(config.INSTRUMENT_CACHE_DIR)
+    return _instrument_master
@@ -98,6 +98,7 @@ class MarketReplayManager:
         try:
             from strategies.orb import ORB
             from strategies.capture_mountain_signal import CaptureMountainSignal
+            from candle_aggregator import CandleAggregators
             
             strategy_data = replay_info['strategy_data']
             historical_candles = replay_info['historical_candles']
@@ -115,6 +116,9 @@ class MarketReplayManager:
                 }, room=session_id)
                 return
             
+            # Replay candles are aggregated separately so they never mix with live candles
+            candle_source = CandleAggregators()
+            strategy_kwargs = {'candle_source': candle_source} if strategy_class is CaptureMountainSignal else {}
             strategy = strategy_class(
                 None,  # No kite object for replay
                 strategy_data['instrument'],
@@ -130,7 +134,8 @@ class MarketReplayManager:
                 strategy_data['strike_price'],
                 strategy_data['expiry_type'],
                 strategy_data['strategy_name'],
-                paper_trade=True  # Always paper trade in replay
+                paper_trade=True,  # Always paper trade in replay
+                **strategy_kwargs
             )
             
             replay_info['strategy'] = strategy
@@ -190,6 +195,7 @@ class MarketReplayManager:
                 
                 # Process candle through strategy
                 try:
+                    candle_source.feed([tick_data])
                     if hasattr(strategy, 'process_ticks'):
                         strategy.process_ticks([tick_data])
                     elif hasattr(strategy, 'on_tick'):
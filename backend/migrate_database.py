@@ -1,7 +1,9 @@
 """
 Database migration script to add new columns to strategies table
+and copy pre-journal tick rows into the tick journal.
 Run this script once to update existing databases
 """
+import datetime
 import sqlite3
 import config
 import logging
@@ -58,7 +60,72 @@ def migrate_strategies_table():
     finally:
         conn.close()
 
+def migrate_tick_tables_to_journal():
+    """Copy rows from the old tick_data / market_data tables into tick journal segments.
+
+    A (day, instrument) pair that already has a journal segment is skipped, so the
+    migration can be re-run and never interleaves old rows with live-recorded ones.
+    tick_data is copied first; market_data only fills pairs tick_data did not have.
+    The old tables are left in place.
+    """
+    from tick_journal import LEGACY_TICK_TABLES, get_tick_journal
+
+    journal = get_tick_journal()
+    conn = sqlite3.connect(config.DATABASE_PATH)
+    conn.row_factory = sqlite3.Row
+
+    try:
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        copied = {}
+        skipped = 0
+        for table in LEGACY_TICK_TABLES:
+            if table not in tables:
+                continue
+            copied[table] = 0
+            existing = {
+                (row['day'], row['instrument_token'])
+                for row in conn.execute('SELECT day, instrument_token FROM tick_journal_segments')
+            }
+            pairs = conn.execute(
+                f'SELECT DATE(timestamp) AS day, instrument_token, COUNT(*) AS row_count FROM {table} GROUP BY day, instrument_token ORDER BY day, instrument_token'
+            ).fetchall()
+            # One segment at a time keeps memory bounded to a single day of one instrument
+            for pair in pairs:
+                if (pair['day'], pair['instrument_token']) in existing:
+                    skipped += pair['row_count']
+                    continue
+                rows = conn.execute(
+                    f'SELECT timestamp, last_price, volume FROM {table} WHERE instrument_token = ? AND DATE(timestamp) = ? ORDER BY timestamp',
+                    (pair['instrument_token'], pair['day'])
+                ).fetchall()
+                copied[table] += journal.append(conn, (
+                    {
+                        'ts': datetime.datetime.fromisoformat(str(row['timestamp'])),
+                        'instrument_token': pair['instrument_token'],
+                        'last_price': row['last_price'],
+                        'volume': row['volume'],
+                        'oi': 0,
+                    }
+                    for row in rows if row['last_price'] is not None
+                ))
+                conn.commit()
+
+        logging.info(f"Tick journal migration copied {copied}, skipped {skipped} rows already journaled")
+        print("SUCCESS: Tick journal migration completed successfully!")
+        for table, count in copied.items():
+            print(f"   {table}: {count} rows copied")
+        print(f"   Skipped {skipped} rows for days that already had journal segments")
+
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"Error during tick journal migration: {e}")
+        print(f"ERROR: Error during tick journal migration: {e}")
+        raise
+    finally:
+        conn.close()
+
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     migrate_strategies_table()
+    migrate_tick_tables_to_journal()
 
@@ -0,0 +1,944 @@
+"""
+Event-driven Mountain Signal engine.
+
+One state machine for the Mountain Signal rules (signal candle identification,
+price-action validated re-entry, option SL/TP, 15:15 square off, index stop and
+two-close EMA target) instead of a copy per caller. MountainSignalEngine takes
+one closed bar at a time through on_bar() and returns a TradeEvent when a trade
+opens or closes, so it can be fed incrementally.
+
+Offline runs use the array kernel instead: signal_masks() and
+square_off_mask() evaluate the per-bar conditions vectorially,
+scan_mountain_signal() runs the stateful entry / exit scan over plain float
+lists and returns a compact TradeScan, and scan_records() turns that into the
+trade and option trade records the backtest and optimizer endpoints serialise.
+run_mountain_signal() / run_mountain_signal_on_frame() chain the three.
+check_mountain_signal_kernel.py verifies the kernel against the engine.
+SignalTimeline splits the scan into its SL / target independent part and a
+per-pair option exit replay for optimizer sweeps.
+
+MountainSignalEngine, scan_mountain_signal() and SignalTimeline share
+check_exit() for the exit rules (option SL / target, square off, index stop,
+two-close EMA target); the signal and entry rules are still written out in
+each. Any rule change must keep
+``python check_mountain_signal_kernel.py --sweep 20 --stream`` passing (with
+and without ``--premium-model black_scholes``) and must bump ENGINE_VERSION if
+trade output changes.
+
+Signals are evaluated on the previous bar and acted on with the current bar's
+close, and option prices come from simulate_option_premium unless a
+Black-Scholes premium model (option_pricing) is passed: MountainSignalEngine
+takes a BlackScholesModel, the kernel and SignalTimeline the BarPremiums it
+builds for the candle set, and price each trade's premium path in one call.
+"""
+import bisect
+import datetime
+import heapq
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from option_pricing import BarPremiums, BlackScholesModel
+
+# Bump whenever a rule or kernel change alters trade output; it is part of the result cache key
+ENGINE_VERSION = '1'
+
+RSI_OVERBOUGHT = 70
+RSI_OVERSOLD = 30
+MARKET_CLOSE_SQUARE_OFF_TIME = datetime.time(15, 15)
+MARKET_CLOSE_TIME = datetime.time(15, 30)
+TARGET_CLOSES = 2
+# Most bars of an open trade's premium path priced per call when a Black-Scholes model is used
+PREMIUM_PATH_CHUNK = 512
+
+ENTRY = 'entry'
+EXIT = 'exit'
+
+# (index trade exit type, option trade exit type) by scan exit code
+EXIT_TYPES = (
+    ('OPTION_STOP_LOSS', 'OPTION_STOP_LOSS'),
+    ('OPTION_TARGET', 'OPTION_TARGET'),
+    ('MKT_CLOSE', 'MARKET_CLOSE'),
+    ('INDEX_STOP', 'INDEX_STOP'),
+    ('INDEX_TARGET', 'INDEX_TARGET'),
+    ('FORCED_CLOSE', 'FORCED_CLOSE'),
+)
+OPTION_STOP_LOSS, OPTION_TARGET, MARKET_CLOSE, INDEX_STOP, INDEX_TARGET, FORCED_CLOSE = range(len(EXIT_TYPES))
+
+MONTH_NAMES = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+
+def round_to_atm_price(price: float, strike_step: int) -> int:
+    if strike_step == 0:
+        return int(price)
+    return int(round(float(price) / strike_step) * strike_step)
+
+
+def get_option_symbol_from_components(instrument_key: str, strike: int, option_type: str, candle_date: Any) -> str:
+    if isinstance(candle_date, str):
+        candle_date = datetime.datetime.fromisoformat(candle_date)
+    year = candle_date.year % 100
+    month = MONTH_NAMES[candle_date.month - 1]
+    return f"{instrument_key}{year:02d}{month}{int(strike)}{option_type}"
+
+
+def simulate_option_premium(index_price: float, strike: float, option_type: str) -> float:
+    distance = abs(index_price - strike)
+    premium = 100.0
+    if option_type.upper() == 'PE':
+        premium += distance * 0.5 if strike > index_price else -distance * 0.3
+    else:
+        premium += distance * 0.5 if strike < index_price else -distance * 0.3
+    return max(10.0, premium)
+
+
+def is_pe_signal(low: float, ema: float, rsi: Optional[float], rsi_overbought: float = RSI_OVERBOUGHT) -> bool:
+    """PE signal candle: LOW above the EMA and RSI overbought"""
+    return low > ema and rsi is not None and rsi > rsi_overbought
+
+
+def is_ce_signal(high: float, ema: float, rsi: Optional[float], rsi_oversold: float = RSI_OVERSOLD) -> bool:
+    """CE signal candle: HIGH below the EMA and RSI oversold"""
+    return high < ema and rsi is not None and rsi < rsi_oversold
+
+
+def check_exit(position: int, high: float, low: float, close: float, ema: float, stop_level: float, square_off: bool,
+               ema_side_seen: bool, target_candles: int, option_price: Optional[float] = None,
+               stop_loss_price: float = 0.0, target_price: float = 0.0) -> Tuple[int, bool, int]:
+    """
+    Exit rules for one bar of an open trade, shared by the engine, the kernel and SignalTimeline.
+
+    In priority order: option stop loss / target (skipped when ``option_price`` is None,
+    as SignalTimeline resolves them separately), market close square off, index stop at
+    the signal candle's far side (``stop_level``), then the two-close EMA target. The
+    target needs a bar entirely on the trade's side of the EMA (HIGH below it for PE, LOW
+    above it for CE; ``ema_side_seen``) before TARGET_CLOSES closes back across it.
+    Returns (exit code or -1, ema_side_seen, target_candles) for the next bar.
+    """
+    if option_price is not None:
+        if option_price <= stop_loss_price:
+            return OPTION_STOP_LOSS, ema_side_seen, target_candles
+        if option_price >= target_price:
+            return OPTION_TARGET, ema_side_seen, target_candles
+    if square_off:
+        return MARKET_CLOSE, ema_side_seen, target_candles
+    if position == -1:
+        if close > stop_level:
+            return INDEX_STOP, ema_side_seen, target_candles
+        if high < ema:
+            return -1, True, 0
+        if ema_side_seen and close > ema:
+            target_candles += 1
+            return (INDEX_TARGET if target_candles >= TARGET_CLOSES else -1), ema_side_seen, target_candles
+    else:
+        if close < stop_level:
+            return INDEX_STOP, ema_side_seen, target_candles
+        if low > ema:
+            return -1, True, 0
+        if ema_side_seen and close < ema:
+            target_candles += 1
+            return (INDEX_TARGET if target_candles >= TARGET_CLOSES else -1), ema_side_seen, target_candles
+    return -1, ema_side_seen, target_candles
+
+
+def option_levels(close: float, strike_step: int, option_type: str, stop_loss_percent: float,
+                  target_percent: float, premium: Optional[float] = None) -> Tuple[int, float, float, float]:
+    """ATM strike, entry premium (simulated unless given) and absolute option SL / target for an entry at ``close``"""
+    atm_strike = round_to_atm_price(close, strike_step)
+    option_entry_price = simulate_option_premium(close, atm_strike, option_type) if premium is None else premium
+    # Scaled half-even rounding, i.e. np.round(x, 2) as the NumPy scalars the DataFrame loops used to round
+    stop_loss_price = round(option_entry_price * (1 + stop_loss_percent) * 100) / 100
+    target_price = round(option_entry_price * (1 + target_percent) * 100) / 100
+    return atm_strike, option_entry_price, stop_loss_price, target_price
+
+
+def _open_records(instrument_key: str, lot_size: int, strike_step: int, stop_loss_percent: float, target_percent: float,
+                  trade_index: int, option_type: str, signal_date: Any, signal_high: float, signal_low: float,
+                  date: Any, close: float, option_entry_price: Optional[float] = None
+                  ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Index trade and linked option trade records for an entry at ``close``"""
+    trade_date = date.date() if isinstance(date, datetime.datetime) else date
+    atm_strike, option_entry_price, stop_loss_price, target_price = option_levels(
+        close, strike_step, option_type, stop_loss_percent, target_percent, option_entry_price
+    )
+    option_symbol = get_option_symbol_from_components(instrument_key, atm_strike, option_type, date)
+
+    option_trade = {
+        'id': trade_index,
+        'index_trade_index': trade_index,
+        'signal_time': signal_date,
+        'signal_type': option_type,
+        'signal_high': float(signal_high),
+        'signal_low': float(signal_low),
+        'entry_time': date,
+        'index_at_entry': float(close),
+        'atm_strike': float(atm_strike),
+        'option_symbol': option_symbol,
+        'option_entry_price': float(option_entry_price),
+        'stop_loss_price': stop_loss_price,
+        'target_price': target_price,
+        'option_exit_price': None,
+        'exit_time': None,
+        'exit_type': None,
+        'pnl': None,
+        'pnl_percent': None,
+        'status': 'open',
+        'lot_size': lot_size,
+        'date': trade_date
+    }
+    trade = {
+        'signal_time': signal_date,
+        'signal_type': option_type,
+        'signal_high': signal_high,
+        'signal_low': signal_low,
+        'entry_time': date,
+        'entry_price': close,
+        'exit_time': None,
+        'exit_price': None,
+        'exit_type': None,
+        'pnl': None,
+        'pnl_percent': None,
+        'date': trade_date,
+        'lot_size': lot_size,
+        'option_trade_id': option_trade['id'],
+        'option_symbol': option_symbol,
+        'option_entry_price': float(option_entry_price),
+        'stop_loss_price': stop_loss_price,
+        'target_price': target_price,
+        'option_exit_price': None
+    }
+    return trade, option_trade
+
+
+def _close_records(trade: Dict[str, Any], option_trade: Dict[str, Any], short: bool, date: Any, close: float,
+                   option_price: float, exit_type: str, option_exit_type: str) -> None:
+    entry_price = trade['entry_price']
+    move = entry_price - close if short else close - entry_price
+    trade['exit_time'] = date
+    trade['exit_price'] = close
+    trade['exit_type'] = exit_type
+    trade['pnl'] = move * trade['lot_size']
+    trade['pnl_percent'] = (move / entry_price) * 100 if entry_price else 0
+    trade['option_exit_price'] = option_price
+
+    option_entry_price = option_trade['option_entry_price']
+    option_trade['option_exit_price'] = option_price
+    option_trade['exit_time'] = date
+    option_trade['exit_type'] = option_exit_type
+    option_trade['pnl'] = (option_price - option_entry_price) * option_trade['lot_size']
+    option_trade['pnl_percent'] = ((option_price - option_entry_price) / option_entry_price) * 100
+    option_trade['status'] = 'closed'
+
+
+class TradeEvent(NamedTuple):
+    kind: str  # ENTRY or EXIT
+    index: int  # bar index the event happened on
+    trade: Dict[str, Any]
+    option_trade: Optional[Dict[str, Any]]
+
+
+class MountainSignalEngine:
+    """Mountain Signal state machine over closed bars"""
+    __slots__ = (
+        'instrument_key', 'lot_size', 'strike_step', 'stop_loss_percent', 'target_percent',
+        'rsi_overbought', 'rsi_oversold', 'premium_model', 'trades', 'option_trades', 'released', 'count', 'prev', 'last_date', 'last_close',
+        'pe_signal', 'ce_signal', 'signals_with_entry', 'pe_signal_price_above_low', 'ce_signal_price_below_high',
+        'position', 'stop_level', 'active_option_trade', 'target_candles', 'ema_side_seen',
+    )
+
+    def __init__(self, instrument_key: str, lot_size: int, strike_step: int, stop_loss_percent: float, target_percent: float,
+                 rsi_overbought: float = RSI_OVERBOUGHT, rsi_oversold: float = RSI_OVERSOLD,
+                 premium_model: Optional[BlackScholesModel] = None):
+        self.instrument_key = instrument_key
+        self.lot_size = lot_size
+        self.strike_step = strike_step
+        self.stop_loss_percent = stop_loss_percent
+        self.target_percent = target_percent
+        self.rsi_overbought = rsi_overbought
+        self.rsi_oversold = rsi_oversold
+        self.premium_model = premium_model
+        self.reset()
+
+    def reset(self) -> None:
+        self.trades: List[Dict[str, Any]] = []
+        self.option_trades: List[Dict[str, Any]] = []
+        self.released = 0  # closed trades dropped by release_closed(); trade ids keep counting from here
+        self.count = 0
+        self.prev = None  # (date, high, low, ema, rsi) of the previous bar
+        self.last_date = None
+        self.last_close = None
+        # Signal candles are (date, high, low, bar index)
+        self.pe_signal = None
+        self.ce_signal = None
+        self.signals_with_entry = set()
+        self.pe_signal_price_above_low = False
+        self.ce_signal_price_below_high = False
+        self.position = 0  # 0: flat, 1: long (CE), -1: short (PE)
+        self.stop_level = None
+        self.active_option_trade = None
+        self.target_candles = 0
+        self.ema_side_seen = False  # see check_exit
+
+    @property
+    def in_trade(self) -> bool:
+        return self.position != 0
+
+    def on_bar(self, date: Any, high: float, low: float, close: float, ema: float, rsi: Optional[float] = None) -> Optional[TradeEvent]:
+        """Advance one closed bar; returns the entry or exit it caused, if any"""
+        index = self.count
+        self.count += 1
+        prev = self.prev
+        self.prev = (date, high, low, ema, rsi)
+        self.last_date = date
+        self.last_close = close
+        if prev is None:
+            return None
+
+        prev_date, prev_high, prev_low, prev_ema, prev_rsi = prev
+        if is_pe_signal(prev_low, prev_ema, prev_rsi, self.rsi_overbought):
+            # A newer signal candle replaces the previous one and its entry history
+            if self.pe_signal is not None:
+                self.pe_signal_price_above_low = False
+                self.signals_with_entry.discard(self.pe_signal[3])
+            self.pe_signal = (prev_date, prev_high, prev_low, index - 1)
+            self.ce_signal = None
+        if is_ce_signal(prev_high, prev_ema, prev_rsi, self.rsi_oversold):
+            if self.ce_signal is not None:
+                self.ce_signal_price_below_high = False
+                self.signals_with_entry.discard(self.ce_signal[3])
+            self.ce_signal = (prev_date, prev_high, prev_low, index - 1)
+            self.pe_signal = None
+
+        if self.position == 0:
+            return self._check_entry(index, date, high, low, close)
+        return self._check_exit(index, date, high, low, close, ema)
+
+    def _check_entry(self, index: int, date: Any, high: float, low: float, close: float) -> Optional[TradeEvent]:
+        pe_signal = self.pe_signal
+        ce_signal = self.ce_signal
+        # Price action validation: re-entry on the same signal candle needs price back through it first
+        if pe_signal is not None and not self.pe_signal_price_above_low and high > pe_signal[2]:
+            self.pe_signal_price_above_low = True
+        if ce_signal is not None and not self.ce_signal_price_below_high and low < ce_signal[1]:
+            self.ce_signal_price_below_high = True
+
+        if pe_signal is not None and close < pe_signal[2]:
+            if pe_signal[3] in self.signals_with_entry and not self.pe_signal_price_above_low:
+                return None
+            self.pe_signal_price_above_low = False
+            return self._open(index, date, close, 'PE', pe_signal)
+        if ce_signal is not None and close > ce_signal[1]:
+            if ce_signal[3] in self.signals_with_entry and not self.ce_signal_price_below_high:
+                return None
+            self.ce_signal_price_below_high = False
+            return self._open(index, date, close, 'CE', ce_signal)
+        return None
+
+    def _premium(self, date: Any, close: float, strike: float, option_type: str) -> float:
+        if self.premium_model is None:
+            return simulate_option_premium(close, strike, option_type)
+        return self.premium_model.premium(date, close, strike, option_type)
+
+    def _open(self, index: int, date: Any, close: float, option_type: str, signal: Tuple) -> TradeEvent:
+        signal_date, signal_high, signal_low, signal_index = signal
+        self.position = -1 if option_type == 'PE' else 1
+        self.signals_with_entry.add(signal_index)
+        # Index stop at the signal candle's far side: HIGH for PE, LOW for CE
+        self.stop_level = signal_high if option_type == 'PE' else signal_low
+        self.target_candles = 0
+        self.ema_side_seen = False
+
+        premium = None
+        if self.premium_model is not None:
+            premium = self._premium(date, close, round_to_atm_price(close, self.strike_step), option_type)
+        trade, option_trade = _open_records(
+            self.instrument_key, self.lot_size, self.strike_step, self.stop_loss_percent, self.target_percent,
+            self.released + len(self.trades), option_type, signal_date, signal_high, signal_low, date, close, premium
+        )
+        self.trades.append(trade)
+        self.option_trades.append(option_trade)
+        self.active_option_trade = option_trade
+        return TradeEvent(ENTRY, index, trade, option_trade)
+
+    def _check_exit(self, index: int, date: Any, high: float, low: float, close: float, ema: float) -> Optional[TradeEvent]:
+        option_trade = self.active_option_trade
+        option_price = self._premium(date, close, option_trade['atm_strike'], option_trade['signal_type'])
+
+        bar_time = date.time() if isinstance(date, datetime.datetime) else datetime.datetime.now().time()
+        exit_code, self.ema_side_seen, self.target_candles = check_exit(
+            self.position, high, low, close, ema, self.stop_level,
+            MARKET_CLOSE_SQUARE_OFF_TIME <= bar_time < MARKET_CLOSE_TIME,
+            self.ema_side_seen, self.target_candles,
+            option_price, option_trade['stop_loss_price'], option_trade['target_price'],
+        )
+        if exit_code < 0:
+            return None
+        return self._close(index, date, close, option_price, *EXIT_TYPES[exit_code])
+
+    def _close(self, index: int, date: Any, close: float, option_price: float, exit_type: str, option_exit_type: str) -> TradeEvent:
+        trade = self.trades[-1]
+        option_trade = self.active_option_trade
+        _close_records(trade, option_trade, self.position == -1, date, close, option_price, exit_type, option_exit_type)
+
+        if self.position == -1:
+            self.pe_signal_price_above_low = False
+        else:
+            self.ce_signal_price_below_high = False
+        self.position = 0
+        self.stop_level = None
+        self.active_option_trade = None
+        self.target_candles = 0
+        self.ema_side_seen = False
+        return TradeEvent(EXIT, index, trade, option_trade)
+
+    def release_closed(self) -> None:
+        """Drop closed trade records once the caller has consumed them (bounded memory for streamed runs)"""
+        keep = 1 if self.position != 0 else 0
+        dropped = len(self.trades) - keep
+        if dropped > 0:
+            self.released += dropped
+            del self.trades[:dropped]
+            del self.option_trades[:dropped]
+
+    def finish(self) -> Optional[TradeEvent]:
+        """Force-close an open trade at the last bar's close (end of the data set)"""
+        if self.position == 0:
+            return None
+        option_trade = self.active_option_trade
+        option_price = self._premium(self.last_date, self.last_close, option_trade['atm_strike'], option_trade['signal_type'])
+        return self._close(self.count - 1, self.last_date, self.last_close, option_price, 'FORCED_CLOSE', 'FORCED_CLOSE')
+
+
+def _as_floats(values: Optional[Sequence[Any]], length: int) -> List[float]:
+    """Plain float list (None -> NaN) so the bar loop never touches NumPy scalars"""
+    if values is None:
+        return [float('nan')] * length
+    return np.asarray(values, dtype=float).tolist()
+
+
+def signal_masks(high: Sequence[float], low: Sequence[float], ema: Sequence[float], rsi: Optional[Sequence[float]],
+                 rsi_overbought: float = RSI_OVERBOUGHT, rsi_oversold: float = RSI_OVERSOLD) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorised is_pe_signal / is_ce_signal for every bar (NaN EMA or RSI never signals)"""
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    ema = np.asarray(ema, dtype=float)
+    if rsi is None:
+        empty = np.zeros(len(high), dtype=bool)
+        return empty, empty.copy()
+    rsi = np.asarray(rsi, dtype=float)
+    return (low > ema) & (rsi > rsi_overbought), (high < ema) & (rsi < rsi_oversold)
+
+
+def square_off_mask(dates: Sequence[Any]) -> np.ndarray:
+    """Bars whose time falls in the 15:15-15:30 square off window (non-datetimes use the current time, like the engine)"""
+    if hasattr(dates, 'dt'):
+        # pandas datetime Series: compare minutes of the day without boxing every timestamp
+        minutes = (dates.dt.hour * 60 + dates.dt.minute).to_numpy()
+        start = MARKET_CLOSE_SQUARE_OFF_TIME.hour * 60 + MARKET_CLOSE_SQUARE_OFF_TIME.minute
+        end = MARKET_CLOSE_TIME.hour * 60 + MARKET_CLOSE_TIME.minute
+        return (minutes >= start) & (minutes < end)
+    now = datetime.datetime.now().time()
+    return np.fromiter(
+        (MARKET_CLOSE_SQUARE_OFF_TIME <= (date.time() if isinstance(date, datetime.datetime) else now) < MARKET_CLOSE_TIME
+         for date in dates),
+        dtype=bool,
+        count=len(dates)
+    )
+
+
+class TradeScan(NamedTuple):
+    """Compact per-trade output of scan_mountain_signal (parallel lists, one item per trade)"""
+    signal_index: List[int]
+    entry_index: List[int]
+    exit_index: List[int]
+    position: List[int]  # -1: PE, 1: CE
+    exit_code: List[int]  # index into EXIT_TYPES
+    option_entry_price: List[float]
+    option_exit_price: List[float]
+
+
+def scan_mountain_signal(
+    high: Sequence[float],
+    low: Sequence[float],
+    close: Sequence[float],
+    ema: Sequence[float],
+    pe_mask: Sequence[bool],
+    ce_mask: Sequence[bool],
+    square_off: Sequence[bool],
+    strike_step: int,
+    stop_loss_percent: float,
+    target_percent: float,
+    premiums: Optional[BarPremiums] = None
+) -> TradeScan:
+    """
+    Stateful entry / exit scan of MountainSignalEngine over precomputed arrays.
+
+    Signal candles come from signal_masks() and the square off window from
+    square_off_mask(), so the loop only compares plain floats held in local
+    variables and records where each trade starts and ends; no dates or
+    records are touched. With ``premiums`` each trade's option premiums are
+    priced in one call from its entry bar up to the next square off bar,
+    which the trade cannot outlast (at most PREMIUM_PATH_CHUNK bars per call),
+    instead of per bar. check_mountain_signal_kernel.py verifies the result
+    matches the bar-by-bar engine.
+    """
+    count = len(close)
+    pe_signals = np.asarray(pe_mask, dtype=bool).tolist()
+    ce_signals = np.asarray(ce_mask, dtype=bool).tolist()
+    square_offs = np.asarray(square_off, dtype=bool).tolist()
+    highs = _as_floats(high, count)
+    lows = _as_floats(low, count)
+    closes = _as_floats(close, count)
+    emas = _as_floats(ema, count)
+    close_array = np.asarray(close, dtype=float)
+    path: List[float] = []
+    path_start = 0
+    if premiums is not None:
+        # End (exclusive) of the premium path of a trade entered on each bar: its first square off bar after it
+        bars = np.arange(count)
+        next_square_off = np.minimum.accumulate(np.where(square_offs, bars, count - 1)[::-1])[::-1]
+        path_ends = np.append(next_square_off[1:] + 1, count).tolist()
+    scan = TradeScan([], [], [], [], [], [], [])
+    if count == 0:
+        return scan
+
+    pe_index = ce_index = -1
+    signals_with_entry = set()
+    pe_signal_price_above_low = ce_signal_price_below_high = False
+    ema_side_seen = False
+    position = 0
+    target_candles = 0
+    option_type = None
+    strike = stop_loss_price = target_price = stop_level = 0.0
+
+    for i in range(1, count):
+        prev = i - 1
+        if pe_signals[prev]:
+            if pe_index >= 0:
+                pe_signal_price_above_low = False
+                signals_with_entry.discard(pe_index)
+            pe_index = prev
+            ce_index = -1
+        if ce_signals[prev]:
+            if ce_index >= 0:
+                ce_signal_price_below_high = False
+                signals_with_entry.discard(ce_index)
+            ce_index = prev
+            pe_index = -1
+
+        close_price = closes[i]
+        if position == 0:
+            if pe_index >= 0 and not pe_signal_price_above_low and highs[i] > lows[pe_index]:
+                pe_signal_price_above_low = True
+            if ce_index >= 0 and not ce_signal_price_below_high and lows[i] < highs[ce_index]:
+                ce_signal_price_below_high = True
+
+            if pe_index >= 0 and close_price < lows[pe_index]:
+                if pe_index in signals_with_entry and not pe_signal_price_above_low:
+                    continue
+                pe_signal_price_above_low = False
+                position, signal_index, option_type = -1, pe_index, 'PE'
+                stop_level = highs[pe_index]
+            elif ce_index >= 0 and close_price > highs[ce_index]:
+                if ce_index in signals_with_entry and not ce_signal_price_below_high:
+                    continue
+                ce_signal_price_below_high = False
+                position, signal_index, option_type = 1, ce_index, 'CE'
+                stop_level = lows[ce_index]
+            else:
+                continue
+            signals_with_entry.add(signal_index)
+            target_candles = 0
+            ema_side_seen = False
+            premium = None
+            if premiums is not None:
+                path_start = i
+                path = premiums.path(close_array, round_to_atm_price(close_price, strike_step), option_type,
+                                     i, min(path_ends[i], i + PREMIUM_PATH_CHUNK)).tolist()
+                premium = path[0]
+            strike, option_entry_price, stop_loss_price, target_price = option_levels(
+                close_price, strike_step, option_type, stop_loss_percent, target_percent, premium
+            )
+            scan.signal_index.append(signal_index)
+            scan.entry_index.append(i)
+            scan.position.append(position)
+            scan.option_entry_price.append(option_entry_price)
+            continue
+
+        if premiums is None:
+            option_price = simulate_option_premium(close_price, strike, option_type)
+        else:
+            if i - path_start >= len(path):
+                path_start = i
+                path = premiums.path(close_array, strike, option_type, i, i + PREMIUM_PATH_CHUNK).tolist()
+            option_price = path[i - path_start]
+        exit_code, ema_side_seen, target_candles = check_exit(
+            position, highs[i], lows[i], close_price, emas[i], stop_level, square_offs[i],
+            ema_side_seen, target_candles, option_price, stop_loss_price, target_price
+        )
+        if exit_code < 0:
+            continue
+
+        scan.exit_index.append(i)
+        scan.exit_code.append(exit_code)
+        scan.option_exit_price.append(option_price)
+        if position == -1:
+            pe_signal_price_above_low = False
+        else:
+            ce_signal_price_below_high = False
+        position = 0
+
+    if position != 0:
+        last = count - 1
+        scan.exit_index.append(last)
+        scan.exit_code.append(FORCED_CLOSE)
+        if premiums is None:
+            scan.option_exit_price.append(simulate_option_premium(closes[last], strike, option_type))
+        else:
+            if last - path_start >= len(path):
+                path_start = last
+                path = premiums.path(close_array, strike, option_type, last, last + 1).tolist()
+            scan.option_exit_price.append(path[last - path_start])
+    return scan
+
+
+class SignalTimeline:
+    """
+    SL / target independent pre-pass of scan_mountain_signal for sweeps.
+
+    Which signal candle is active on every bar, the bars where it would be
+    entered, and, for each entry, the index exit (square off, index stop or
+    two-close EMA target) and the option premium path up to it (simulated, or
+    priced in one call from ``premiums``) do not depend on the option stop
+    loss or target. Only the option exit does,
+    and it is the first bar where the running min / max of the premium path
+    crosses the SL / target price, found by bisection. sweep() replays every
+    (stop loss, target) pair through those memoised entries, grouping pairs
+    that reach the same entry bar so each entry is evaluated once for all of
+    them. Results are identical to scan_mountain_signal for each pair.
+    """
+    __slots__ = (
+        'count', 'strike_step', 'premiums', 'close_array', 'highs', 'lows', 'closes', 'emas', 'square_offs',
+        'candidates', 'candidate_signal', 'candidate_position', 'signal_at', 'position_at', 'premium_at',
+        'next_entries', 'entries',
+    )
+
+    def __init__(self, high: Sequence[float], low: Sequence[float], close: Sequence[float], ema: Sequence[float],
+                 pe_mask: Sequence[bool], ce_mask: Sequence[bool], square_off: Sequence[bool], strike_step: int,
+                 premiums: Optional[BarPremiums] = None):
+        count = len(close)
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        self.count = count
+        self.strike_step = strike_step
+        self.premiums = premiums
+        self.close_array = close
+        self.highs = high.tolist()
+        self.lows = low.tolist()
+        self.closes = close.tolist()
+        self.emas = _as_floats(ema, count)
+        self.square_offs = np.asarray(square_off, dtype=bool).tolist()
+
+        # Latest PE / CE signal candle before each bar; a signal clears the opposite side
+        bars = np.arange(count)
+        last_pe = np.full(count, -1)
+        last_ce = np.full(count, -1)
+        if count > 1:
+            last_pe[1:] = np.maximum.accumulate(np.where(np.asarray(pe_mask, dtype=bool), bars, -1))[:-1]
+            last_ce[1:] = np.maximum.accumulate(np.where(np.asarray(ce_mask, dtype=bool), bars, -1))[:-1]
+        pe_active = np.where(last_pe > last_ce, last_pe, -1)
+        ce_active = np.where(last_ce > last_pe, last_ce, -1)
+        pe_entry = (pe_active >= 0) & (close < low[np.maximum(pe_active, 0)])
+        ce_entry = (ce_active >= 0) & (close > high[np.maximum(ce_active, 0)])
+        self.candidates = np.flatnonzero(pe_entry | ce_entry).tolist()
+        self.signal_at = np.where(pe_entry, pe_active, ce_active)
+        self.position_at = np.where(pe_entry, -1, 1)
+        self.premium_at = np.zeros(count)
+        self.candidate_signal = self.signal_at.tolist()
+        self.candidate_position = self.position_at.tolist()
+        self.next_entries: Dict[Tuple[int, int], Optional[int]] = {}
+        self.entries: Dict[int, Tuple] = {}
+
+    def _next_entry(self, after: int, traded_signal: int) -> Optional[int]:
+        """First entry bar after a flat bar ``after``; ``traded_signal`` is the signal candle of the trade that just closed"""
+        key = (after, traded_signal)
+        if key in self.next_entries:
+            return self.next_entries[key]
+        entry = None
+        checked = after
+        price_crossed = False
+        candidates = self.candidates
+        for k in range(bisect.bisect_right(candidates, after), len(candidates)):
+            i = candidates[k]
+            signal = self.candidate_signal[i]
+            if signal == traded_signal and not price_crossed:
+                # Re-entry on the same signal candle needs price back above its low (PE) / below its high (CE) first
+                if self.candidate_position[i] == -1:
+                    price_crossed = any(h > self.lows[signal] for h in self.highs[checked + 1:i + 1])
+                else:
+                    price_crossed = any(low < self.highs[signal] for low in self.lows[checked + 1:i + 1])
+                checked = i
+                if not price_crossed:
+                    continue
+            entry = i
+            break
+        self.next_entries[key] = entry
+        return entry
+
+    def _entry(self, index: int) -> Tuple:
+        """(signal, premium, exit bar, exit code, premium path, -running min, running max, and the three as lists) of an entry"""
+        entry = self.entries.get(index)
+        if entry is not None:
+            return entry
+        signal = self.candidate_signal[index]
+        position = self.candidate_position[index]
+        option_type = 'PE' if position == -1 else 'CE'
+        stop_level = self.highs[signal] if position == -1 else self.lows[signal]
+        closes, highs, lows, emas, square_offs = self.closes, self.highs, self.lows, self.emas, self.square_offs
+        exit_index, exit_code = self.count - 1, FORCED_CLOSE
+        ema_side_seen = False
+        target_candles = 0
+        for i in range(index + 1, self.count):
+            # Option SL / target are left to the per-pair bisection in sweep_arrays
+            code, ema_side_seen, target_candles = check_exit(
+                position, highs[i], lows[i], closes[i], emas[i], stop_level, square_offs[i], ema_side_seen, target_candles
+            )
+            if code >= 0:
+                exit_index, exit_code = i, code
+                break
+        strike = round_to_atm_price(closes[index], self.strike_step)
+        if self.premiums is None:
+            premium = simulate_option_premium(closes[index], strike, option_type)
+            path = np.array([simulate_option_premium(closes[i], strike, option_type) for i in range(index + 1, exit_index + 1)])
+        else:
+            priced = self.premiums.path(self.close_array, strike, option_type, index, exit_index + 1)
+            premium = float(priced[0])
+            path = priced[1:]
+        neg_running_min = -np.minimum.accumulate(path)
+        running_max = np.maximum.accumulate(path)
+        # Lists as well for groups of one pair, where bisect beats NumPy call overhead
+        entry = (signal, premium, exit_index, exit_code, path, neg_running_min, running_max,
+                 path.tolist(), neg_running_min.tolist(), running_max.tolist())
+        self.premium_at[index] = premium
+        self.entries[index] = entry
+        return entry
+
+    def sweep(self, pairs: Sequence[Tuple[float, float]]) -> List[TradeScan]:
+        """TradeScan for every (stop_loss_percent, target_percent) pair"""
+        bounds, columns = self.sweep_arrays(pairs)
+        return [
+            TradeScan(*(column[start:stop].tolist() for column in columns))
+            for start, stop in zip(bounds[:-1], bounds[1:])
+        ]
+
+    def sweep_arrays(self, pairs: Sequence[Tuple[float, float]]) -> Tuple[List[int], TradeScan]:
+        """
+        Trades of every pair as one TradeScan of NumPy arrays, grouped by pair:
+        pair k owns items bounds[k]:bounds[k + 1].
+        """
+        pairs = list(pairs)
+        # Rows: 1 + stop loss, 1 + target (multiplied by the entry premium as in option_levels)
+        factors = 1 + np.array(pairs, dtype=float).reshape(-1, 2).T
+        stop_loss_factors, target_factors = factors.tolist()
+        # Trades per processed entry as (pairs, entry bar, exit bars, exit codes, exit premiums)
+        chunks: List[Tuple[np.ndarray, int, Sequence[int], Sequence[int], Sequence[float]]] = []
+        # Pairs waiting at each upcoming entry bar; entries are processed in bar order and every
+        # exit routes its pairs to a later entry, so a bucket is complete when it is popped
+        waiting: Dict[int, List[np.ndarray]] = {}
+        upcoming: List[int] = []
+
+        def route(after: int, traded_signal: int, group: np.ndarray) -> None:
+            index = self._next_entry(after, traded_signal)
+            if index is None:
+                return
+            if index not in waiting:
+                waiting[index] = []
+                heapq.heappush(upcoming, index)
+            waiting[index].append(group)
+
+        if pairs and self.count:
+            route(0, -1, np.arange(len(pairs)))
+        while upcoming:
+            index = heapq.heappop(upcoming)
+            groups = waiting.pop(index)
+            group = groups[0] if len(groups) == 1 else np.concatenate(groups)
+            (signal, premium, exit_index, exit_code, path, neg_running_min, running_max,
+             path_list, neg_running_min_list, running_max_list) = self._entry(index)
+            length = len(path)
+            if length and len(group) == 1:
+                k = int(group[0])
+                stop_hit = bisect.bisect_left(neg_running_min_list, -(round(premium * stop_loss_factors[k] * 100) / 100))
+                target_hit = bisect.bisect_left(running_max_list, round(premium * target_factors[k] * 100) / 100)
+                offset = min(stop_hit, target_hit)
+                if offset >= length:
+                    offset, code = length - 1, exit_code
+                else:
+                    code = OPTION_STOP_LOSS if stop_hit <= target_hit else OPTION_TARGET
+                chunks.append((group, index, (index + offset + 1,), (code,), (path_list[offset],)))
+                route(index + offset + 1, signal, group)
+                continue
+            if length == 0:
+                # Entry on the last bar: force closed at its own close
+                offsets = np.zeros(len(group), dtype=np.int64)
+                codes = np.full(len(group), exit_code)
+                prices = np.full(len(group), premium)
+            else:
+                # Same half-even rounding as option_levels
+                stop_loss_prices, target_prices = np.round(premium * factors[:, group] * 100) / 100
+                stop_hits = np.searchsorted(neg_running_min, -stop_loss_prices, side='left')
+                target_hits = np.searchsorted(running_max, target_prices, side='left')
+                offsets = np.minimum(stop_hits, target_hits)
+                codes = np.where(offsets >= length, exit_code,
+                                 np.where(stop_hits <= target_hits, OPTION_STOP_LOSS, OPTION_TARGET))
+                np.minimum(offsets, length - 1, out=offsets)
+                prices = path[offsets]
+                offsets += 1
+            chunks.append((group, index, index + offsets, codes, prices))
+            first, last = offsets.min(), offsets.max()
+            if first == last:
+                route(index + int(first), signal, group)
+            else:
+                for offset in np.unique(offsets).tolist():
+                    route(index + offset, signal, group[offsets == offset])
+
+        if not chunks:
+            empty = np.zeros(0, dtype=np.int64)
+            return [0] * (len(pairs) + 1), TradeScan(empty, empty, empty, empty, empty, np.zeros(0), np.zeros(0))
+        # States were visited in bar order, so a stable sort by pair keeps each pair's trades chronological
+        pair_ids = np.concatenate([chunk[0] for chunk in chunks])
+        order = np.argsort(pair_ids, kind='stable')
+        bounds = np.searchsorted(pair_ids[order], np.arange(len(pairs) + 1)).tolist()
+        entry_index = np.concatenate([np.full(len(chunk[0]), chunk[1]) for chunk in chunks])[order]
+        return bounds, TradeScan(
+            self.signal_at[entry_index],
+            entry_index,
+            np.concatenate([chunk[2] for chunk in chunks])[order],
+            self.position_at[entry_index],
+            np.concatenate([chunk[3] for chunk in chunks])[order],
+            self.premium_at[entry_index],
+            np.concatenate([chunk[4] for chunk in chunks])[order],
+        )
+
+    def scan(self, stop_loss_percent: float, target_percent: float) -> TradeScan:
+        return self.sweep([(stop_loss_percent, target_percent)])[0]
+
+
+def _take(values: Sequence[Any], indices: List[int]) -> List[Any]:
+    """values[i] for each index; NumPy / pandas arrays box the selection in one pass"""
+    if hasattr(values, 'take'):
+        return list(values.take(indices))
+    return [values[i] for i in indices]
+
+
+def scan_records(scan: TradeScan, dates: Sequence[Any], high: Sequence[float], low: Sequence[float], close: Sequence[float],
+                 instrument_key: str, lot_size: int, strike_step: int, stop_loss_percent: float, target_percent: float
+                 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Build the engine's trade and option trade records from a TradeScan"""
+    wanted = sorted(set(scan.signal_index) | set(scan.entry_index) | set(scan.exit_index))
+    date_of = dict(zip(wanted, _take(dates, wanted)))
+    trades: List[Dict[str, Any]] = []
+    option_trades: List[Dict[str, Any]] = []
+    for k, (signal_index, entry_index, exit_index, position, exit_code, option_entry_price,
+            option_exit_price) in enumerate(zip(*scan)):
+        trade, option_trade = _open_records(
+            instrument_key, lot_size, strike_step, stop_loss_percent, target_percent, k, 'PE' if position == -1 else 'CE',
+            date_of[signal_index], float(high[signal_index]), float(low[signal_index]), date_of[entry_index],
+            float(close[entry_index]), float(option_entry_price)
+        )
+        exit_type, option_exit_type = EXIT_TYPES[exit_code]
+        _close_records(trade, option_trade, position == -1, date_of[exit_index], float(close[exit_index]),
+                       option_exit_price, exit_type, option_exit_type)
+        trades.append(trade)
+        option_trades.append(option_trade)
+    return trades, option_trades
+
+
+def run_mountain_signal(
+    dates: Sequence[Any],
+    high: Sequence[float],
+    low: Sequence[float],
+    close: Sequence[float],
+    ema: Sequence[float],
+    rsi: Optional[Sequence[float]],
+    instrument_key: str,
+    lot_size: int,
+    strike_step: int,
+    stop_loss_percent: float,
+    target_percent: float,
+    square_off: Optional[Sequence[bool]] = None,
+    rsi_overbought: float = RSI_OVERBOUGHT,
+    rsi_oversold: float = RSI_OVERSOLD,
+    premium_model: Optional[BlackScholesModel] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """
+    Array driver for whole data sets; returns (trades, option_trades).
+
+    Masks are computed vectorially, scan_mountain_signal finds the trades and
+    scan_records builds the records. ``dates`` is only read at signal, entry
+    and exit bars (and once in full for a premium model's time to expiry), so
+    it may be any indexable sequence (a pandas DatetimeArray is boxed in one
+    batch).
+    """
+    high = np.asarray(high, dtype=float)
+    low = np.asarray(low, dtype=float)
+    close = np.asarray(close, dtype=float)
+    pe_mask, ce_mask = signal_masks(high, low, ema, rsi, rsi_overbought, rsi_oversold)
+    if square_off is None:
+        square_off = square_off_mask(dates)
+    premiums = premium_model.bar_premiums(dates) if premium_model is not None else None
+    scan = scan_mountain_signal(high, low, close, ema, pe_mask, ce_mask, square_off,
+                                strike_step, stop_loss_percent, target_percent, premiums)
+    return scan_records(scan, dates, high, low, close, instrument_key, lot_size, strike_step, stop_loss_percent, target_percent)
+
+
+def run_mountain_signal_engine(
+    dates: Sequence[Any],
+    high: Sequence[float],
+    low: Sequence[float],
+    close: Sequence[float],
+    ema: Sequence[float],
+    rsi: Optional[Sequence[float]],
+    instrument_key: str,
+    lot_size: int,
+    strike_step: int,
+    stop_loss_percent: float,
+    target_percent: float,
+    premium_model: Optional[BlackScholesModel] = None
+) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """Reference driver: feed every bar through MountainSignalEngine.on_bar"""
+    engine = MountainSignalEngine(instrument_key, lot_size, strike_step, stop_loss_percent, target_percent,
+                                  premium_model=premium_model)
+    count = len(dates)
+    on_bar = engine.on_bar
+    for bar in zip(list(dates), _as_floats(high, count), _as_floats(low, count), _as_floats(close, count),
+                   _as_floats(ema, count), _as_floats(rsi, count)):
+        on_bar(*bar)
+    engine.finish()
+    return engine.trades, engine.option_trades
+
+
+def run_mountain_signal_on_frame(df, instrument_key: str, lot_size: int, strike_step: int, stop_loss_percent: float,
+                                 target_percent: float, ema_column: str = 'ema', rsi_column: str = 'rsi14',
+                                 rsi_overbought: float = RSI_OVERBOUGHT, rsi_oversold: float = RSI_OVERSOLD,
+                                 premium_model: Optional[BlackScholesModel] = None
+                                 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+    """run_mountain_signal over a candle DataFrame with date/high/low/close and indicator columns"""
+    dates = df['date']
+    return run_mountain_signal(
+        dates.array,
+        df['high'].to_numpy(),
+        df['low'].to_numpy(),
+        df['close'].to_numpy(),
+        df[ema_column].to_numpy(),
+        df[rsi_column].to_numpy() if rsi_column in df.columns else None,
+        instrument_key,
+        lot_size,
+        strike_step,
+        stop_loss_percent,
+        target_percent,
+        square_off=square_off_mask(dates),
+        rsi_overbought=rsi_overbought,
+        rsi_oversold=rsi_oversold,
+        premium_model=premium_model
+    )
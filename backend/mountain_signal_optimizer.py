@@ -0,0 +1,358 @@
+"""
+Parameter-grid optimizer for Mountain Signal.
+
+A grid is the cartesian product of option stop loss %, option target %, EMA
+period and RSI overbought / oversold thresholds; each parameter accepts a
+scalar, a list or a ``{"start", "stop", "step"}`` range. Candle arrays
+(high, low, close, RSI 14, square off window, plus time to expiry and IV when
+a Black-Scholes premium model is used) are placed in one shared memory block
+that every worker of a process pool maps instead of receiving a copy.
+Work is grouped by (EMA period, RSI thresholds): signals do not depend on the
+option SL / target, so each group builds one SignalTimeline and replays all of
+its SL / target pairs through it in a single sweep. Timelines are kept in an
+LRU keyed by the data set (instrument, interval, date range, rules version,
+premium model, last candle) and the signal parameters, so repeated optimizer calls on the
+same candles skip the signal pre-pass and reuse memoised entries. Each
+evaluation returns index and option trade metrics; results are ranked by ROI
+and the Pareto front of ROI versus max drawdown is extracted.
+"""
+import collections
+import itertools
+import math
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from mountain_signal_engine import RSI_OVERBOUGHT, RSI_OVERSOLD, SignalTimeline, signal_masks
+from option_pricing import BarPremiums
+
+OBJECTIVES = ('option', 'index')
+# Rows of the shared candle block; TIME_TO_EXPIRY and IV only with a premium model
+HIGH, LOW, CLOSE, RSI, SQUARE_OFF, TIME_TO_EXPIRY, IV = range(7)
+
+
+def normalise_stop_loss(value: Any) -> float:
+    """Option stop loss as a negative fraction; accepts -0.17, 0.17 or 17 (percent)"""
+    value = float(value)
+    if abs(value) > 1:
+        return -abs(value) / 100.0
+    return value if value <= 0 else -abs(value)
+
+
+def normalise_target(value: Any) -> float:
+    """Option target as a positive fraction; accepts 0.45 or 45 (percent)"""
+    value = float(value)
+    if abs(value) > 1:
+        return abs(value) / 100.0
+    return abs(value)
+
+
+def expand_values(spec: Any, default: Any) -> List[float]:
+    """Values of one grid parameter: None -> [default], scalar, list, or {"start", "stop", "step"} (inclusive)"""
+    if spec is None:
+        return [default]
+    if isinstance(spec, dict):
+        start, stop = float(spec['start']), float(spec['stop'])
+        step = float(spec.get('step') or 0)
+        if step <= 0:
+            if start != stop:
+                raise ValueError('Range step must be greater than 0')
+            return [start]
+        if stop < start:
+            raise ValueError('Range stop must not be below start')
+        count = int(math.floor((stop - start) / step + 1e-9)) + 1
+        return [round(start + i * step, 6) for i in range(count)]
+    if isinstance(spec, (list, tuple)):
+        if not spec:
+            raise ValueError('Parameter list must not be empty')
+        return [float(value) for value in spec]
+    return [float(spec)]
+
+
+def is_grid_request(data: Dict[str, Any]) -> bool:
+    return any(isinstance(data.get(key), (list, tuple, dict)) for key in (
+        'option_stop_loss_percent', 'option_target_percent', 'ema_period', 'rsi_overbought', 'rsi_oversold'
+    ))
+
+
+def build_grid(data: Dict[str, Any], default_stop_loss: float, default_target: float, default_ema_period: int
+               ) -> List[Tuple[int, float, float, float, float]]:
+    """(ema_period, rsi_overbought, rsi_oversold, stop_loss, target) for every valid combination"""
+    stop_losses = sorted({normalise_stop_loss(v) for v in expand_values(data.get('option_stop_loss_percent'), default_stop_loss)}, reverse=True)
+    targets = sorted({normalise_target(v) for v in expand_values(data.get('option_target_percent'), default_target)})
+    ema_periods = sorted({int(v) for v in expand_values(data.get('ema_period'), default_ema_period)})
+    overbought = sorted(set(expand_values(data.get('rsi_overbought'), RSI_OVERBOUGHT)))
+    oversold = sorted(set(expand_values(data.get('rsi_oversold'), RSI_OVERSOLD)))
+    if any(period < 1 for period in ema_periods):
+        raise ValueError('EMA period must be at least 1')
+    if any(target <= 0 for target in targets):
+        raise ValueError('Option target must be greater than 0')
+    return [
+        (ema_period, high, low, stop_loss, target)
+        for ema_period, high, low, stop_loss, target in itertools.product(ema_periods, overbought, oversold, stop_losses, targets)
+        if low < high
+    ]
+
+
+def drawdown_metrics(pnl: np.ndarray, initial_capital: float) -> Tuple[float, float, float]:
+    """(max drawdown, max drawdown %, ROI %) of an equity curve, computed like app.compute_drawdown_metrics"""
+    if initial_capital <= 0 or len(pnl) == 0:
+        return 0.0, 0.0, 0.0
+    equity = initial_capital + np.cumsum(pnl)
+    running_max = np.maximum.accumulate(np.concatenate(([initial_capital], equity)))[1:]
+    max_drawdown = min(0.0, float((equity - running_max).min()))
+    peak = float(running_max[-1])
+    max_drawdown_percent = abs(max_drawdown) / peak * 100 if peak != 0 else 0.0
+    roi_percent = (float(equity[-1]) - initial_capital) / initial_capital * 100
+    return abs(max_drawdown), max_drawdown_percent, roi_percent
+
+
+def _leg_metrics(pnl: np.ndarray, initial_capital: float) -> Dict[str, Any]:
+    total = len(pnl)
+    wins = int((pnl > 0).sum())
+    total_pnl = float(pnl.sum())
+    max_drawdown, max_drawdown_percent, roi_percent = drawdown_metrics(pnl, initial_capital)
+    return {
+        'totalTrades': total,
+        'winningTrades': wins,
+        'losingTrades': total - wins,
+        'winRate': round(wins / total * 100, 2) if total else 0,
+        'totalPnl': round(total_pnl, 2),
+        'averagePnl': round(total_pnl / total, 2) if total else 0,
+        'maxDrawdown': round(max_drawdown, 2),
+        'maxDrawdownPercent': round(max_drawdown_percent, 2),
+        'roiPercent': round(roi_percent, 2),
+    }
+
+
+def _block_rows(high: Sequence[float], low: Sequence[float], close: Sequence[float], rsi: Sequence[float],
+                square_off: Sequence[bool], premiums: Optional[BarPremiums]) -> List[Sequence[float]]:
+    rows = [high, low, close, rsi, square_off]
+    if premiums is not None:
+        rows += [premiums.tte, premiums.iv]
+    return rows
+
+
+def candle_block(high: Sequence[float], low: Sequence[float], close: Sequence[float], rsi: Sequence[float],
+                 square_off: Sequence[bool], premiums: Optional[BarPremiums] = None) -> np.ndarray:
+    """(5, bars) float64 block with the HIGH, LOW, CLOSE, RSI and SQUARE_OFF rows; (7, bars) with ``premiums``"""
+    rows = _block_rows(high, low, close, rsi, square_off, premiums)
+    return np.vstack([np.asarray(values, dtype=np.float64) for values in rows])
+
+
+def build_signal_timeline(arrays: np.ndarray, ema_period: int, rsi_overbought: float, rsi_oversold: float,
+                          strike_step: int) -> SignalTimeline:
+    high, low, close = arrays[HIGH], arrays[LOW], arrays[CLOSE]
+    ema = pd.Series(close).ewm(span=ema_period, adjust=False).mean().to_numpy()
+    pe_mask, ce_mask = signal_masks(high, low, ema, arrays[RSI], rsi_overbought, rsi_oversold)
+    premiums = BarPremiums(arrays[TIME_TO_EXPIRY], arrays[IV]) if len(arrays) > IV else None
+    return SignalTimeline(high, low, close, ema, pe_mask, ce_mask, arrays[SQUARE_OFF] > 0, strike_step, premiums)
+
+
+class SignalTimelineCache:
+    """LRU of SignalTimeline objects; a timeline keeps memoising entries as it is swept"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.timelines: 'collections.OrderedDict[Tuple, SignalTimeline]' = collections.OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: Tuple, build) -> SignalTimeline:
+        with self.lock:
+            timeline = self.timelines.get(key)
+            if timeline is not None:
+                self.timelines.move_to_end(key)
+                self.hits += 1
+                return timeline
+            self.misses += 1
+        timeline = build()
+        with self.lock:
+            self.timelines[key] = timeline
+            self.timelines.move_to_end(key)
+            while len(self.timelines) > self.max_entries:
+                self.timelines.popitem(last=False)
+        return timeline
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.timelines),
+                'capacity': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+_timeline_cache = None
+_timeline_cache_lock = threading.Lock()
+
+
+def get_timeline_cache() -> SignalTimelineCache:
+    global _timeline_cache
+    if _timeline_cache is None:
+        with _timeline_cache_lock:
+            if _timeline_cache is None:
+                _timeline_cache = SignalTimelineCache(config.OPTIMIZER_TIMELINE_CACHE_SIZE)
+    return _timeline_cache
+
+
+def get_signal_timeline(data_key: Optional[Tuple], arrays: np.ndarray, ema_period: int, rsi_overbought: float,
+                        rsi_oversold: float, strike_step: int) -> SignalTimeline:
+    """Cached timeline for ``data_key`` (see timeline_data_key); None builds an uncached one"""
+    def build():
+        return build_signal_timeline(arrays, ema_period, rsi_overbought, rsi_oversold, strike_step)
+    if data_key is None:
+        return build()
+    return get_timeline_cache().get_or_build((data_key, ema_period, rsi_overbought, rsi_oversold, strike_step), build)
+
+
+def timeline_data_key(instrument_key: str, interval: str, from_date: Any, to_date: Any, rules_version: Any,
+                      dates: Sequence[Any], close: Sequence[float], premium_model: Any = None) -> Tuple:
+    """Identity of a candle set; the bar count and last candle change when a range ending today gains bars"""
+    premium_key = premium_model.fingerprint if premium_model is not None else 'heuristic'
+    if len(close) == 0:
+        return (instrument_key, interval, str(from_date), str(to_date), rules_version, premium_key, 0)
+    return (instrument_key, interval, str(from_date), str(to_date), rules_version, premium_key,
+            len(close), str(dates[len(dates) - 1]), float(close[len(close) - 1]))
+
+
+def _evaluate_group(arrays: np.ndarray, task: Tuple) -> List[Dict[str, Any]]:
+    """Evaluate every (stop loss, target) pair of one (EMA period, RSI thresholds) group in one sweep"""
+    data_key, ema_period, rsi_overbought, rsi_oversold, pairs, lot_size, strike_step, initial_capital = task
+    timeline = get_signal_timeline(data_key, arrays, ema_period, rsi_overbought, rsi_oversold, strike_step)
+    bounds, scan = timeline.sweep_arrays(pairs)
+    close = arrays[CLOSE]
+    index_pnl = (close[scan.exit_index] - close[scan.entry_index]) * scan.position * lot_size
+    option_pnl = (scan.option_exit_price - scan.option_entry_price) * lot_size
+    rows = []
+    for (stop_loss, target), start, stop in zip(pairs, bounds[:-1], bounds[1:]):
+        rows.append({
+            'parameters': {
+                'stopLossPercent': round(abs(stop_loss) * 100, 2),
+                'targetPercent': round(target * 100, 2),
+                'emaPeriod': ema_period,
+                'rsiOverbought': rsi_overbought,
+                'rsiOversold': rsi_oversold,
+            },
+            'summary': _leg_metrics(index_pnl[start:stop], initial_capital),
+            'optionSummary': _leg_metrics(option_pnl[start:stop], initial_capital),
+        })
+    return rows
+
+
+_worker_shm = None
+_worker_arrays = None
+
+
+def _init_worker(shm_name: str, shape: Tuple[int, int]) -> None:
+    global _worker_shm, _worker_arrays
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_arrays = np.ndarray(shape, dtype=np.float64, buffer=_worker_shm.buf)
+
+
+def _worker_evaluate(task: Tuple) -> List[Dict[str, Any]]:
+    return _evaluate_group(_worker_arrays, task)
+
+
+def _pool_context():
+    # Never fork the threaded web process (held locks, sockets and scheduler threads would be copied);
+    # workers start clean and only map the shared memory block
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+
+
+def pareto_front(rows: List[Dict[str, Any]], objective: str = 'option') -> List[Dict[str, Any]]:
+    """Rows not dominated on (higher ROI, lower max drawdown), ordered by drawdown"""
+    key = 'optionSummary' if objective == 'option' else 'summary'
+    ordered = sorted(rows, key=lambda row: (row[key]['maxDrawdown'], -row[key]['roiPercent']))
+    front = []
+    best_roi = -math.inf
+    for row in ordered:
+        if row[key]['roiPercent'] > best_roi:
+            front.append(row)
+            best_roi = row[key]['roiPercent']
+    return front
+
+
+def run_grid(high: Sequence[float], low: Sequence[float], close: Sequence[float], rsi: Sequence[float],
+             square_off: Sequence[bool], grid: List[Tuple[int, float, float, float, float]], lot_size: int,
+             strike_step: int, initial_capital: float, workers: Optional[int] = None,
+             data_key: Optional[Tuple] = None, progress: Optional[Callable[[int, int], None]] = None,
+             premiums: Optional[BarPremiums] = None) -> Dict[str, Any]:
+    """
+    Evaluate ``grid`` (see build_grid) over one candle series; returns rows plus timing.
+
+    Each (EMA period, RSI thresholds) group is one task, so a pure SL / target
+    grid runs in-process against the timeline cache; ``data_key`` (see
+    timeline_data_key) enables caching. ``premiums`` switches option prices
+    from the heuristic to a Black-Scholes model's per-bar inputs. ``progress(done, total)`` is called
+    after every group; an exception raised from it stops the run.
+    """
+    groups: Dict[Tuple[int, float, float], List[Tuple[float, float]]] = {}
+    for ema_period, rsi_overbought, rsi_oversold, stop_loss, target in grid:
+        groups.setdefault((ema_period, rsi_overbought, rsi_oversold), []).append((stop_loss, target))
+
+    workers = workers or config.OPTIMIZER_MAX_WORKERS or os.cpu_count() or 1
+    workers = max(1, min(workers, len(groups)))
+    tasks = [
+        (data_key, ema_period, rsi_overbought, rsi_oversold, pairs, lot_size, strike_step, initial_capital)
+        for (ema_period, rsi_overbought, rsi_oversold), pairs in groups.items()
+    ]
+
+    started = time.perf_counter()
+    rows: List[Dict[str, Any]] = []
+    if workers == 1:
+        arrays = candle_block(high, low, close, rsi, square_off, premiums)
+        for done, task in enumerate(tasks, 1):
+            rows.extend(_evaluate_group(arrays, task))
+            if progress:
+                progress(done, len(tasks))
+    else:
+        count = len(close)
+        block_rows = _block_rows(high, low, close, rsi, square_off, premiums)
+        shape = (len(block_rows), count)
+        shm = shared_memory.SharedMemory(create=True, size=max(1, len(block_rows) * count * 8))
+        try:
+            arrays = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+            for row, values in enumerate(block_rows):
+                arrays[row] = np.asarray(values, dtype=np.float64)
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=_pool_context(),
+                                       initializer=_init_worker, initargs=(shm.name, shape))
+            try:
+                for done, result in enumerate(pool.map(_worker_evaluate, tasks), 1):
+                    rows.extend(result)
+                    if progress:
+                        progress(done, len(tasks))
+            finally:
+                # Do not wait for queued groups when the run is stopped early
+                pool.shutdown(wait=True, cancel_futures=True)
+            del arrays
+        finally:
+            shm.close()
+            shm.unlink()
+    elapsed = time.perf_counter() - started
+    return {
+        'rows': rows,
+        'evaluations': len(rows),
+        'workers': workers,
+        'elapsed_seconds': elapsed,
+        'evaluations_per_second': len(rows) / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def rank_rows(rows: List[Dict[str, Any]], objective: str = 'option') -> List[Dict[str, Any]]:
+    """Best ROI first; ties broken by the smaller max drawdown"""
+    key = 'optionSummary' if objective == 'option' else 'summary'
+    return sorted(rows, key=lambda row: (-row[key]['roiPercent'], row[key]['maxDrawdown']))
@@ -0,0 +1,332 @@
+"""
+Chunked Mountain Signal runs for multi-year date ranges.
+
+The optimizer endpoint loads every candle of the range into one DataFrame and
+answers with one JSON document, which for years of 1-minute bars means a large
+memory spike and seconds of serialisation before the first byte.
+MountainSignalStream instead consumes one trading session at a time (as
+yielded by CandleStore.iter_candles) and carries everything that spans
+sessions: the EMA value, the last RSI_PERIOD closes for the rolling RSI, the
+MountainSignalEngine state (signal candles, open position) and the running
+summary, drawdown and period aggregates. Closed trades are emitted as they
+happen and released from the engine, so memory stays bounded by one session of
+candles plus the open trade.
+
+run() yields plain dict records that to_ndjson() turns into newline-delimited
+JSON, in this order:
+
+    {"type": "meta", ...}                      request echo, once
+    {"type": "trade", "trade": ..., "optionTrade": ...}
+    {"type": "period", "scope": "index" | "option", "period": "daily" | "weekly" | "monthly" | "yearly", "row": ...}
+    {"type": "progress", "fraction": ..., "date": ..., "bars": ..., "trades": ...}
+    {"type": "summary", "summary": ..., "optionSummary": ...}   once, last
+
+A period row is emitted as soon as its period can no longer change. Trades,
+period rows and the summary have the shapes the backtest and optimizer
+endpoints return.
+"""
+import datetime
+import json
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from mountain_signal_engine import EXIT, RSI_OVERBOUGHT, RSI_OVERSOLD, MountainSignalEngine
+from option_pricing import BlackScholesModel
+from utils.indicators import calculate_rsi
+
+RSI_PERIOD = 14
+PERIODS = ('daily', 'weekly', 'monthly', 'yearly')
+PERIOD_FORMATS = {'daily': '%Y-%m-%d', 'weekly': '%G-W%V', 'monthly': '%Y-%m', 'yearly': '%Y'}
+
+
+def _iso(value: Any) -> Optional[str]:
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+def format_trade(trade: Dict[str, Any]) -> Dict[str, Any]:
+    """Index trade record as the backtest endpoint serialises it"""
+    return {
+        'signalTime': _iso(trade['signal_time']),
+        'signalType': trade['signal_type'],
+        'signalHigh': float(trade['signal_high']),
+        'signalLow': float(trade['signal_low']),
+        'entryTime': _iso(trade['entry_time']),
+        'entryPrice': float(trade['entry_price']),
+        'exitTime': _iso(trade['exit_time']) if trade['exit_time'] else None,
+        'exitPrice': float(trade['exit_price']) if trade['exit_price'] else None,
+        'exitType': trade['exit_type'],
+        'pnl': float(trade['pnl']) if trade['pnl'] is not None else None,
+        'pnlPercent': float(trade['pnl_percent']) if trade['pnl_percent'] is not None else None,
+        'date': _iso(trade['date']),
+        'lotSize': int(trade['lot_size']) if trade.get('lot_size') is not None else None,
+        'optionTradeId': trade.get('option_trade_id'),
+        'optionSymbol': trade.get('option_symbol'),
+        'optionEntryPrice': float(trade['option_entry_price']) if trade.get('option_entry_price') is not None else None,
+        'stopLossPrice': float(trade['stop_loss_price']) if trade.get('stop_loss_price') is not None else None,
+        'targetPrice': float(trade['target_price']) if trade.get('target_price') is not None else None,
+        'optionExitPrice': float(trade['option_exit_price']) if trade.get('option_exit_price') is not None else None
+    }
+
+
+def format_option_trade(opt_trade: Dict[str, Any]) -> Dict[str, Any]:
+    """Option trade record as the backtest endpoint serialises it"""
+    def number(key: str) -> Optional[float]:
+        value = opt_trade.get(key)
+        return float(value) if value is not None else None
+
+    return {
+        'id': opt_trade.get('id'),
+        'indexTradeIndex': opt_trade.get('index_trade_index'),
+        'signalTime': _iso(opt_trade.get('signal_time')),
+        'signalType': opt_trade.get('signal_type'),
+        'signalHigh': number('signal_high'),
+        'signalLow': number('signal_low'),
+        'entryTime': _iso(opt_trade.get('entry_time')),
+        'indexAtEntry': number('index_at_entry'),
+        'atmStrike': number('atm_strike'),
+        'optionSymbol': opt_trade.get('option_symbol'),
+        'optionEntryPrice': number('option_entry_price'),
+        'stopLossPrice': number('stop_loss_price'),
+        'targetPrice': number('target_price'),
+        'optionExitPrice': number('option_exit_price'),
+        'exitTime': _iso(opt_trade.get('exit_time')) if opt_trade.get('exit_time') else None,
+        'exitType': opt_trade.get('exit_type'),
+        'pnl': number('pnl'),
+        'pnlPercent': number('pnl_percent'),
+        'status': opt_trade.get('status'),
+        'lotSize': int(opt_trade.get('lot_size')) if opt_trade.get('lot_size') is not None else None,
+        'date': _iso(opt_trade.get('date'))
+    }
+
+
+def to_ndjson(record: Dict[str, Any]) -> str:
+    return json.dumps(record, default=_iso) + '\n'
+
+
+class PeriodAggregator:
+    """Running aggregate_trades_by_period row for one period; trades must arrive in date order"""
+    __slots__ = ('period', 'label', 'trades', 'wins', 'pnl', 'compensation')
+
+    def __init__(self, period: str):
+        self.period = period
+        self.label: Optional[str] = None
+        self.trades = 0
+        self.wins = 0
+        self.pnl = 0.0
+        self.compensation = 0.0
+
+    def add(self, date: Any, pnl: float) -> Optional[Dict[str, Any]]:
+        """Count a closed trade; returns the previous period's row when this trade starts a new period"""
+        label = date.strftime(PERIOD_FORMATS[self.period])
+        row = self.flush() if label != self.label else None
+        self.label = label
+        self.trades += 1
+        self.wins += 1 if pnl > 0 else 0
+        # Kahan summation, as pandas' groupby sum does, so rows round like aggregate_trades_by_period
+        y = pnl - self.compensation
+        t = self.pnl + y
+        self.compensation = t - self.pnl - y
+        self.pnl = t
+        return row
+
+    def flush(self) -> Optional[Dict[str, Any]]:
+        if self.label is None:
+            return None
+        # NumPy scalar like the pandas sum, so round() rounds the way aggregate_trades_by_period does
+        total_pnl = np.float64(self.pnl)
+        row = {
+            'label': self.label,
+            'trades': self.trades,
+            'wins': self.wins,
+            'losses': self.trades - self.wins,
+            'winRate': round(self.wins / self.trades * 100, 2),
+            'pnl': float(round(total_pnl, 2)),
+            'avgPnl': float(round(total_pnl / self.trades, 2)),
+        }
+        self.label = None
+        self.trades = 0
+        self.wins = 0
+        self.pnl = 0.0
+        self.compensation = 0.0
+        return row
+
+
+class LegSummary:
+    """Running optimizer summary (totals, drawdown on an equity curve, best / worst day) of the index or option leg"""
+    __slots__ = ('scope', 'initial_capital', 'periods', 'trades', 'wins', 'total_pnl', 'equity', 'running_max',
+                 'max_drawdown', 'best_day', 'worst_day')
+
+    def __init__(self, scope: str, initial_capital: float):
+        self.scope = scope
+        self.initial_capital = initial_capital
+        self.periods = [PeriodAggregator(period) for period in PERIODS]
+        self.trades = 0
+        self.wins = 0
+        self.total_pnl = 0
+        self.equity = initial_capital
+        self.running_max = initial_capital
+        self.max_drawdown = 0.0
+        self.best_day: Optional[Dict[str, Any]] = None
+        self.worst_day: Optional[Dict[str, Any]] = None
+
+    def add(self, trade: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Count a closed trade; yields the period records it completes"""
+        pnl = trade['pnl']
+        self.trades += 1
+        self.wins += 1 if pnl > 0 else 0
+        self.total_pnl += pnl
+        self.equity += float(pnl)
+        if self.equity > self.running_max:
+            self.running_max = self.equity
+        self.max_drawdown = min(self.max_drawdown, self.equity - self.running_max)
+        for aggregator in self.periods:
+            row = aggregator.add(trade['date'], float(pnl))
+            if row is not None:
+                yield self._period_record(aggregator.period, row)
+
+    def flush(self) -> Iterator[Dict[str, Any]]:
+        for aggregator in self.periods:
+            row = aggregator.flush()
+            if row is not None:
+                yield self._period_record(aggregator.period, row)
+
+    def _period_record(self, period: str, row: Dict[str, Any]) -> Dict[str, Any]:
+        if period == 'daily':
+            # max() / min() over the daily rows keep the first extreme day
+            if self.best_day is None or row['pnl'] > self.best_day['pnl']:
+                self.best_day = row
+            if self.worst_day is None or row['pnl'] < self.worst_day['pnl']:
+                self.worst_day = row
+        return {'type': 'period', 'scope': self.scope, 'period': period, 'row': row}
+
+    def summary(self, open_trades: int, parameters: Dict[str, Any], date_range: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        trades = self.trades
+        losses = trades - self.wins
+        max_drawdown_abs = abs(self.max_drawdown) if trades else 0.0
+        if trades and self.initial_capital > 0:
+            max_drawdown_percent = (max_drawdown_abs / self.running_max * 100) if self.running_max != 0 else 0.0
+            roi_percent = (self.equity - self.initial_capital) / self.initial_capital * 100
+        else:
+            max_drawdown_abs, max_drawdown_percent, roi_percent = 0.0, 0.0, 0.0
+        return {
+            'totalTrades': trades,
+            'winningTrades': self.wins,
+            'losingTrades': losses,
+            'winRate': round((self.wins / trades * 100) if trades > 0 else 0, 2),
+            'totalPnl': round(self.total_pnl, 2),
+            'averagePnl': round(self.total_pnl / trades if trades > 0 else 0, 2),
+            'maxDrawdown': round(max_drawdown_abs, 2),
+            'maxDrawdownPercent': round(max_drawdown_percent, 2),
+            'roiPercent': round(roi_percent, 2),
+            'openTrades': open_trades,
+            'bestDay': self.best_day,
+            'worstDay': self.worst_day,
+            'parameters': parameters,
+            **({'dateRange': date_range} if date_range else {}),
+        }
+
+
+class MountainSignalStream:
+    """Mountain Signal run over candle chunks with indicator, engine and aggregate state carried between them"""
+
+    def __init__(self, instrument_key: str, lot_size: int, strike_step: int, stop_loss_percent: float,
+                 target_percent: float, ema_period: int, initial_capital: float,
+                 rsi_overbought: float = RSI_OVERBOUGHT, rsi_oversold: float = RSI_OVERSOLD,
+                 premium_model: Optional[BlackScholesModel] = None):
+        self.ema_period = ema_period
+        self.engine = MountainSignalEngine(instrument_key, lot_size, strike_step, stop_loss_percent, target_percent,
+                                           rsi_overbought, rsi_oversold, premium_model)
+        self.index_leg = LegSummary('index', initial_capital)
+        self.option_leg = LegSummary('option', initial_capital)
+        self.parameters = {
+            'stopLossPercent': round(abs(stop_loss_percent) * 100, 2),
+            'targetPercent': round(target_percent * 100, 2),
+            'lotSize': lot_size,
+            'strikeStep': strike_step,
+            'initialInvestment': round(initial_capital, 2)
+        }
+        self.last_ema: Optional[float] = None
+        self.tail_closes = np.empty(0)
+        self.date_range: Optional[Dict[str, Any]] = None
+        self.bars = 0
+        self.closed = 0
+
+    def indicators(self, close: np.ndarray):
+        """EMA and RSI of a chunk continuing the series of the previous chunks (same values as one pass)"""
+        # Seeding ewm with the previous EMA repeats the adjust=False recursion exactly
+        if self.last_ema is None:
+            ema = pd.Series(close).ewm(span=self.ema_period, adjust=False).mean().to_numpy()
+        else:
+            seeded = np.concatenate(([self.last_ema], close))
+            ema = pd.Series(seeded).ewm(span=self.ema_period, adjust=False).mean().to_numpy()[1:]
+        window = np.concatenate((self.tail_closes, close))
+        rsi = calculate_rsi(pd.Series(window), period=RSI_PERIOD).to_numpy()[len(self.tail_closes):]
+        self.last_ema = float(ema[-1])
+        self.tail_closes = window[-RSI_PERIOD:]
+        return ema, rsi
+
+    def feed(self, candles: List[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """Run one chunk of candles (e.g. a trading session) in time order; yields trade and period records"""
+        if not candles:
+            return
+        close = np.fromiter((candle['close'] for candle in candles), dtype=float, count=len(candles))
+        ema, rsi = self.indicators(close)
+        on_bar = self.engine.on_bar
+        for candle, close_value, ema_value, rsi_value in zip(candles, close.tolist(), ema.tolist(), rsi.tolist()):
+            event = on_bar(candle['date'], float(candle['high']), float(candle['low']), close_value, ema_value, rsi_value)
+            if event is not None and event.kind == EXIT:
+                yield from self._closed(event.trade, event.option_trade)
+        self.bars += len(candles)
+        self.engine.release_closed()
+
+    def finish(self) -> Iterator[Dict[str, Any]]:
+        """Force-close the open trade, flush the open periods and yield the summary record"""
+        event = self.engine.finish()
+        if event is not None:
+            yield from self._closed(event.trade, event.option_trade)
+        self.engine.release_closed()
+        yield from self.index_leg.flush()
+        yield from self.option_leg.flush()
+        open_trades = 1 if self.engine.in_trade else 0
+        yield {
+            'type': 'summary',
+            'bars': self.bars,
+            'summary': self.index_leg.summary(open_trades, self.parameters, self.date_range),
+            'optionSummary': self.option_leg.summary(open_trades, self.parameters),
+        }
+
+    def run(self, sessions: Iterable[List[Dict[str, Any]]], total_sessions: int = 0,
+            meta: Optional[Dict[str, Any]] = None) -> Iterator[Dict[str, Any]]:
+        """Full record stream over an iterable of candle chunks; progress is reported once per calendar month"""
+        self.date_range = (meta or {}).get('dateRange')
+        yield {'type': 'meta', **(meta or {}), 'parameters': self.parameters}
+        done = 0
+        month = None
+        for candles in sessions:
+            done += 1
+            yield from self.feed(candles)
+            if not candles:
+                continue
+            date = candles[0]['date']
+            if (date.year, date.month) != month:
+                month = (date.year, date.month)
+                yield {
+                    'type': 'progress',
+                    'fraction': round(done / total_sessions, 4) if total_sessions else None,
+                    'date': _iso(date.date() if isinstance(date, datetime.datetime) else date),
+                    'bars': self.bars,
+                    'trades': self.closed,
+                }
+        yield from self.finish()
+
+    def _closed(self, trade: Dict[str, Any], option_trade: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        self.closed += 1
+        yield {'type': 'trade', 'trade': format_trade(trade), 'optionTrade': format_option_trade(option_trade)}
+        if trade['pnl'] is not None:
+            yield from self.index_leg.add(trade)
+        if option_trade['pnl'] is not None:
+            yield from self.option_leg.add(option_trade)
@@ -0,0 +1,318 @@
+"""
+Black-Scholes option premiums for Mountain Signal backtests.
+
+Replaces the linear simulate_option_premium heuristic when a backtest or
+optimizer run asks for premium_model=black_scholes. Every function takes NumPy
+arrays (or scalars) and broadcasts, so a whole option path of (spot, strike,
+time to expiry, IV) is priced in one call; the normal CDF uses the
+Abramowitz & Stegun 26.2.17 polynomial (absolute error below 7.5e-8, i.e.
+well under a paisa on index option premiums) so SciPy is not needed.
+
+Inputs per bar:
+  * time to expiry, in years, from the bar to the close of the contract's
+    expiry session; the contract follows the rules file's expiry_policy
+    (weekly: the next expiry weekday, monthly: the last one of the month) and
+    moves to the previous session when the expiry day is an exchange holiday
+    in trading_calendar. The expiry weekday depends on the instrument, the
+    policy and the date (EXPIRY_WEEKDAYS, following NSE's schedule changes,
+    e.g. every index expiry moving to Tuesday from September 2025);
+  * implied volatility per trading day from OPTION_IV_FILE, forward-filled,
+    falling back to OPTION_DEFAULT_IV:
+
+        {"BANKNIFTY": {"2024-01-01": 0.14, "2024-02-01": 15.5}, "NIFTY": {...}}
+
+    (values above 1 are read as percentages).
+
+BlackScholesModel prices one bar at a time for MountainSignalEngine and builds
+BarPremiums, the per-bar inputs of a whole candle set, for the array kernel and
+SignalTimeline. Both go through the same element-wise NumPy functions, so the
+engine, the kernel and optimizer sweeps produce identical trades.
+"""
+import bisect
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+from trading_calendar import REGULAR_SESSION, is_trading_day, session_hours
+
+PREMIUM_MODELS = ('heuristic', 'black_scholes')
+MONDAY, TUESDAY, WEDNESDAY, THURSDAY = range(4)
+# (instrument, policy) -> [(first expiry date the weekday applies to, weekday)], oldest first; others use THURSDAY
+EXPIRY_WEEKDAYS: Dict[Tuple[str, str], List[Tuple[datetime.date, int]]] = {
+    ('NIFTY', 'weekly'): [(datetime.date.min, THURSDAY), (datetime.date(2025, 9, 1), TUESDAY)],
+    ('NIFTY', 'monthly'): [(datetime.date.min, THURSDAY), (datetime.date(2025, 9, 1), TUESDAY)],
+    ('BANKNIFTY', 'weekly'): [
+        (datetime.date.min, THURSDAY),
+        (datetime.date(2023, 9, 4), WEDNESDAY),
+        (datetime.date(2025, 9, 1), TUESDAY),
+    ],
+    ('BANKNIFTY', 'monthly'): [
+        (datetime.date.min, THURSDAY),
+        (datetime.date(2024, 3, 1), WEDNESDAY),
+        (datetime.date(2025, 1, 1), THURSDAY),
+        (datetime.date(2025, 9, 1), TUESDAY),
+    ],
+}
+SECONDS_PER_YEAR = 365.0 * 24 * 60 * 60
+MIN_TIME_TO_EXPIRY_SECONDS = 60.0
+MIN_PREMIUM = 0.05  # one tick
+
+# Abramowitz & Stegun 26.2.17
+_P = 0.2316419
+_B1, _B2, _B3, _B4, _B5 = 0.319381530, -0.356563782, 1.781477937, -1.821255978, 1.330274429
+_INV_SQRT_2PI = 0.3989422804014327
+
+
+def norm_pdf(x: Any) -> np.ndarray:
+    x = np.asarray(x, dtype=float)
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+
+def norm_cdf(x: Any) -> np.ndarray:
+    """Standard normal CDF (A&S 26.2.17, absolute error < 7.5e-8)"""
+    x = np.asarray(x, dtype=float)
+    t = 1.0 / (1.0 + _P * np.abs(x))
+    tail = norm_pdf(x) * t * (_B1 + t * (_B2 + t * (_B3 + t * (_B4 + t * _B5))))
+    return np.where(x >= 0, 1.0 - tail, tail)
+
+
+def _d1_d2(spot: np.ndarray, strike: np.ndarray, tte: np.ndarray, iv: np.ndarray, rate: float):
+    vol_time = iv * np.sqrt(tte)
+    d1 = (np.log(spot / strike) + (rate + 0.5 * iv * iv) * tte) / vol_time
+    return d1, d1 - vol_time
+
+
+def _inputs(spot: Any, strike: Any, tte: Any, iv: Any, is_call: Any):
+    spot, strike, tte, iv = (np.asarray(values, dtype=float) for values in (spot, strike, tte, iv))
+    # Expired or zero-volatility options are worth their intrinsic value; safe values keep the formula quiet
+    expired = (tte <= 0) | (iv <= 0)
+    if expired.any():
+        tte = np.where(expired, 1.0, tte)
+        iv = np.where(expired, 1.0, iv)
+    return spot, strike, tte, iv, np.asarray(is_call, dtype=bool), expired
+
+
+def black_scholes_price(spot: Any, strike: Any, tte: Any, iv: Any, is_call: Any,
+                        rate: Optional[float] = None) -> np.ndarray:
+    """European option premiums; ``tte`` in years, ``iv`` and ``rate`` as fractions, floored at one tick"""
+    rate = config.OPTION_RISK_FREE_RATE if rate is None else rate
+    spot, strike, tte, iv, is_call, expired = _inputs(spot, strike, tte, iv, is_call)
+    d1, d2 = _d1_d2(spot, strike, tte, iv, rate)
+    discounted_strike = strike * np.exp(-rate * tte)
+    # A single option type (one contract's path) only prices its own side
+    if is_call.ndim == 0:
+        if is_call:
+            price = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+        else:
+            price = discounted_strike * norm_cdf(-d2) - spot * norm_cdf(-d1)
+    else:
+        call = spot * norm_cdf(d1) - discounted_strike * norm_cdf(d2)
+        put = discounted_strike * norm_cdf(-d2) - spot * norm_cdf(-d1)
+        price = np.where(is_call, call, put)
+    if expired.any():
+        price = np.where(expired, np.where(is_call, spot - strike, strike - spot), price)
+    return np.maximum(price, MIN_PREMIUM)
+
+
+def black_scholes_greeks(spot: Any, strike: Any, tte: Any, iv: Any, is_call: Any,
+                         rate: Optional[float] = None) -> Dict[str, np.ndarray]:
+    """Delta, gamma, vega (per 1 vol point) and theta (per calendar day); zero sensitivities once expired"""
+    rate = config.OPTION_RISK_FREE_RATE if rate is None else rate
+    spot, strike, tte, iv, is_call, expired = _inputs(spot, strike, tte, iv, is_call)
+    d1, d2 = _d1_d2(spot, strike, tte, iv, rate)
+    sqrt_tte = np.sqrt(tte)
+    density = norm_pdf(d1)
+    discounted_strike = strike * np.exp(-rate * tte)
+    decay = -spot * density * iv / (2 * sqrt_tte)
+    call_theta = decay - rate * discounted_strike * norm_cdf(d2)
+    put_theta = decay + rate * discounted_strike * norm_cdf(-d2)
+    expired_delta = np.where(is_call, (spot > strike) * 1.0, (spot < strike) * -1.0)
+    shape = np.broadcast_shapes(spot.shape, strike.shape, tte.shape, iv.shape, is_call.shape)
+    greeks = {
+        'delta': np.where(expired, expired_delta, np.where(is_call, norm_cdf(d1), norm_cdf(d1) - 1.0)),
+        'gamma': np.where(expired, 0.0, density / (spot * iv * sqrt_tte)),
+        'vega': np.where(expired, 0.0, spot * density * sqrt_tte / 100),
+        'theta': np.where(expired, 0.0, np.where(is_call, call_theta, put_theta) / 365),
+    }
+    return {name: np.broadcast_to(values, shape) for name, values in greeks.items()}
+
+
+def expiry_weekday(day: datetime.date, instrument_key: str = 'NIFTY', policy: str = 'weekly') -> int:
+    """Weekday (Monday = 0) on which the instrument's weekly / monthly contracts expiring around ``day`` expire"""
+    schedule = EXPIRY_WEEKDAYS.get((instrument_key.upper(), str(policy).lower()), [(datetime.date.min, THURSDAY)])
+    weekday = schedule[0][1]
+    for effective, scheduled in schedule:
+        if effective > day:
+            break
+        weekday = scheduled
+    return weekday
+
+
+def _last_expiry_weekday(year: int, month: int, instrument_key: str) -> datetime.date:
+    day = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    weekday = expiry_weekday(day, instrument_key, 'monthly')
+    while day.weekday() != weekday:
+        day -= datetime.timedelta(days=1)
+    return day
+
+
+def expiry_for(day: datetime.date, policy: str = 'weekly', instrument_key: str = 'NIFTY') -> datetime.date:
+    """Expiry session of the nearest weekly / monthly contract trading on ``day``"""
+    if str(policy).lower() == 'monthly':
+        expiry = _last_expiry_weekday(day.year, day.month, instrument_key)
+        if expiry < day:
+            expiry = _last_expiry_weekday(day.year + day.month // 12, day.month % 12 + 1, instrument_key)
+    else:
+        # The weekday in force on the candidate date decides, so the week of a schedule change expires correctly
+        expiry = day
+        while expiry.weekday() != expiry_weekday(expiry, instrument_key, policy):
+            expiry += datetime.timedelta(days=1)
+    # A holiday on the expiry day moves it to the previous session
+    session = expiry
+    while not is_trading_day(session):
+        session -= datetime.timedelta(days=1)
+    if session < day:
+        return expiry_for(expiry + datetime.timedelta(days=1), policy, instrument_key)
+    return session
+
+
+def expiry_close(day: datetime.date, policy: str = 'weekly', instrument_key: str = 'NIFTY') -> datetime.datetime:
+    """Naive wall-clock close of the expiry session of the contract trading on ``day``"""
+    expiry = expiry_for(day, policy, instrument_key)
+    return datetime.datetime.combine(expiry, (session_hours(expiry) or REGULAR_SESSION)[1])
+
+
+def _wall_clock(dates: Sequence[Any]) -> np.ndarray:
+    """Bar timestamps as naive exchange-time datetime64[ns]"""
+    index = pd.DatetimeIndex(dates)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.values
+
+
+def _load_iv_tables() -> Dict[str, Tuple[List[datetime.date], List[float]]]:
+    path = config.OPTION_IV_FILE
+    if not path or not os.path.exists(path):
+        return {}
+    tables = {}
+    try:
+        with open(path) as fh:
+            data = json.load(fh)
+        for instrument_key, values in data.items():
+            days = sorted((datetime.date.fromisoformat(day), float(iv)) for day, iv in values.items())
+            tables[instrument_key.upper()] = ([day for day, _ in days], [iv / 100 if iv > 1 else iv for _, iv in days])
+        logging.info(f"Loaded implied volatilities for {', '.join(tables) or 'no instruments'} from {path}")
+    except Exception as e:
+        logging.error(f"Error loading implied volatilities from {path}: {e}")
+    return tables
+
+
+_iv_tables = None
+_iv_tables_lock = threading.Lock()
+
+
+def get_iv_tables() -> Dict[str, Tuple[List[datetime.date], List[float]]]:
+    """Per-instrument (sorted days, IVs) from OPTION_IV_FILE, loaded once"""
+    global _iv_tables
+    if _iv_tables is None:
+        with _iv_tables_lock:
+            if _iv_tables is None:
+                _iv_tables = _load_iv_tables()
+    return _iv_tables
+
+
+def implied_volatility(day: datetime.date, instrument_key: str) -> float:
+    """IV of the latest OPTION_IV_FILE day on or before ``day``, else OPTION_DEFAULT_IV"""
+    days, ivs = get_iv_tables().get(instrument_key.upper(), ((), ()))
+    position = bisect.bisect_right(days, day)
+    return ivs[position - 1] if position else config.OPTION_DEFAULT_IV
+
+
+def pricing_fingerprint() -> Dict[str, Any]:
+    """Configuration that changes premiums (for result cache keys)"""
+    digest = 'none'
+    if config.OPTION_IV_FILE and os.path.exists(config.OPTION_IV_FILE):
+        with open(config.OPTION_IV_FILE, 'rb') as fh:
+            digest = hashlib.sha256(fh.read()).hexdigest()
+    return {
+        'default_model': config.OPTION_PREMIUM_MODEL,
+        'rate': config.OPTION_RISK_FREE_RATE,
+        'default_iv': config.OPTION_DEFAULT_IV,
+        'iv_file': digest,
+        'expiry_weekdays': hashlib.sha256(repr(sorted(EXPIRY_WEEKDAYS.items())).encode()).hexdigest()[:16],
+    }
+
+
+class BarPremiums:
+    """Time to expiry (years) and IV of every bar of a candle set; prices option paths over it"""
+    __slots__ = ('tte', 'iv', 'rate')
+
+    def __init__(self, tte: Sequence[float], iv: Sequence[float], rate: Optional[float] = None):
+        self.tte = np.asarray(tte, dtype=float)
+        self.iv = np.asarray(iv, dtype=float)
+        self.rate = config.OPTION_RISK_FREE_RATE if rate is None else rate
+
+    def path(self, close: np.ndarray, strike: float, option_type: str, start: int, stop: int) -> np.ndarray:
+        """Premiums of one contract at the closes of bars start..stop-1"""
+        return black_scholes_price(close[start:stop], strike, self.tte[start:stop], self.iv[start:stop],
+                                   option_type == 'CE', self.rate)
+
+
+class BlackScholesModel:
+    """Black-Scholes premiums for one underlying under an expiry policy"""
+
+    def __init__(self, instrument_key: str, expiry_policy: str = 'weekly', rate: Optional[float] = None):
+        self.instrument_key = instrument_key.upper()
+        self.expiry_policy = str(expiry_policy).lower()
+        self.rate = config.OPTION_RISK_FREE_RATE if rate is None else rate
+        self.closes: Dict[datetime.date, datetime.datetime] = {}
+        self.ivs: Dict[datetime.date, float] = {}
+
+    @property
+    def fingerprint(self) -> Tuple:
+        return ('black_scholes', self.instrument_key, self.expiry_policy, self.rate, pricing_fingerprint()['iv_file'])
+
+    def _day_inputs(self, day: datetime.date) -> Tuple[datetime.datetime, float]:
+        if day not in self.closes:
+            self.closes[day] = expiry_close(day, self.expiry_policy, self.instrument_key)
+            self.ivs[day] = implied_volatility(day, self.instrument_key)
+        return self.closes[day], self.ivs[day]
+
+    def bar_premiums(self, dates: Sequence[Any]) -> BarPremiums:
+        """Per-bar inputs of a candle set for the array kernel and SignalTimeline"""
+        stamps = _wall_clock(dates)
+        days, inverse = np.unique(stamps.astype('datetime64[D]'), return_inverse=True)
+        closes, ivs = zip(*(self._day_inputs(day.astype(datetime.date)) for day in days)) if len(days) else ((), ())
+        expiry_stamps = np.array(closes, dtype='datetime64[ns]')
+        seconds = (expiry_stamps[inverse] - stamps).astype(np.int64) / 1e9
+        tte = np.maximum(seconds, MIN_TIME_TO_EXPIRY_SECONDS) / SECONDS_PER_YEAR
+        return BarPremiums(tte, np.array(ivs, dtype=float)[inverse], self.rate)
+
+    def premium(self, date: datetime.datetime, spot: float, strike: float, option_type: str) -> float:
+        """Premium at one bar; the same arithmetic as bar_premiums + BarPremiums.path, so engine and kernel agree"""
+        bar = date.replace(tzinfo=None)
+        close_at, iv = self._day_inputs(bar.date())
+        seconds = (close_at - bar).total_seconds()
+        tte = max(seconds, MIN_TIME_TO_EXPIRY_SECONDS) / SECONDS_PER_YEAR
+        return float(black_scholes_price(np.array([spot]), strike, np.array([tte]), np.array([iv]),
+                                         option_type == 'CE', self.rate)[0])
+
+
+def get_premium_model(name: Optional[str], instrument_key: str,
+                      expiry_policy: Optional[Dict[str, str]] = None) -> Optional[BlackScholesModel]:
+    """Premium model for a request: None for the heuristic, ValueError for unknown names"""
+    name = (name or config.OPTION_PREMIUM_MODEL).lower()
+    if name not in PREMIUM_MODELS:
+        raise ValueError(f"premium_model must be one of {', '.join(PREMIUM_MODELS)}")
+    if name == 'heuristic':
+        return None
+    policies = {key.upper(): value for key, value in (expiry_policy or {}).items()}
+    return BlackScholesModel(instrument_key, policies.get(instrument_key.upper(), 'weekly'))
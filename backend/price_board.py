@@ -0,0 +1,141 @@
+"""
+Shared in-memory price board fed by the websocket ticker.
+
+Every tick updates ``token -> (last_price, timestamp)``, so strategies and
+endpoints read the latest LTP in O(1) instead of calling ``kite.ltp``. Prices
+are kept until their token is unsubscribed, so callers that act on a price
+pass ``max_age`` (PRICE_BOARD_MAX_AGE) and fall back to ``kite.ltp`` when the
+ticker has stopped delivering, e.g. after a disconnect.
+
+Strategies declare the option tokens they care about with want(owner, tokens);
+the board keeps a reference count per token and subscribes or unsubscribes
+them on the attached websocket as the union changes (e.g. when the ATM strike
+moves). Tokens the ticker subscribed itself at connect time are never
+unsubscribed. An owner's tokens are released automatically when the owner is
+garbage collected.
+"""
+import logging
+import threading
+import time
+import weakref
+from typing import Any, Dict, Iterable, Optional, Set, Tuple
+
+
+class PriceBoard:
+    def __init__(self):
+        self.prices: Dict[int, Tuple[float, float]] = {}  # token -> (last_price, monotonic time)
+        self.lock = threading.Lock()
+        self.wanted: Dict[int, Set[int]] = {}  # owner key -> tokens
+        self.refcounts: Dict[int, int] = {}
+        self.base_tokens: Set[int] = set()
+        self.subscribed: Set[int] = set()  # tokens the board subscribed itself
+        self.ws = None
+        self.metrics = {'subscribes': 0, 'unsubscribes': 0, 'hits': 0, 'misses': 0}
+
+    def update(self, ticks: Iterable[Any]) -> None:
+        """Record the last price of each tick (websocket thread)"""
+        now = time.monotonic()
+        prices = self.prices
+        for tick in ticks:
+            price = tick.get('last_price')
+            if price is not None:
+                prices[tick['instrument_token']] = (price, now)
+
+    def get(self, instrument_token: int, max_age: Optional[float] = None) -> Optional[float]:
+        """Latest price, or None when unknown or older than ``max_age`` seconds"""
+        entry = self.prices.get(instrument_token)
+        if entry is None or (max_age is not None and time.monotonic() - entry[1] > max_age):
+            with self.lock:
+                self.metrics['misses'] += 1
+            return None
+        with self.lock:
+            self.metrics['hits'] += 1
+        return entry[0]
+
+    def want(self, owner: Any, tokens: Iterable[int]) -> None:
+        """Set the tokens ``owner`` needs prices for, replacing its previous set"""
+        key = id(owner)
+        tokens = {int(token) for token in tokens if token}
+        with self.lock:
+            previous = self.wanted.get(key)
+            if previous == tokens:
+                return
+            if previous is None:
+                weakref.finalize(owner, self.release, key)
+                previous = set()
+            for token in tokens - previous:
+                self.refcounts[token] = self.refcounts.get(token, 0) + 1
+            for token in previous - tokens:
+                self._decref(token)
+            self.wanted[key] = tokens
+            self._reconcile()
+
+    def release(self, key: int) -> None:
+        with self.lock:
+            for token in self.wanted.pop(key, ()):
+                self._decref(token)
+            self._reconcile()
+
+    def _decref(self, token: int) -> None:
+        count = self.refcounts.get(token, 0) - 1
+        if count > 0:
+            self.refcounts[token] = count
+        else:
+            self.refcounts.pop(token, None)
+
+    def attach(self, ws, base_tokens: Iterable[int]) -> None:
+        """Use ``ws`` for dynamic subscriptions (called from the ticker's on_connect)"""
+        with self.lock:
+            self.ws = ws
+            self.base_tokens = {int(token) for token in base_tokens}
+            self.subscribed = set()
+            self._reconcile()
+
+    def detach(self, ws) -> None:
+        with self.lock:
+            if self.ws is ws:
+                self.ws = None
+                self.subscribed = set()
+
+    def _reconcile(self) -> None:
+        """Bring the websocket subscriptions in line with the wanted tokens (caller holds the lock)"""
+        if self.ws is None:
+            return
+        needed = set(self.refcounts) - self.base_tokens
+        added = sorted(needed - self.subscribed)
+        removed = sorted(self.subscribed - needed)
+        try:
+            if added:
+                self.ws.subscribe(added)
+                self.ws.set_mode(self.ws.MODE_LTP, added)
+                self.metrics['subscribes'] += len(added)
+            if removed:
+                self.ws.unsubscribe(removed)
+                self.metrics['unsubscribes'] += len(removed)
+                for token in removed:
+                    self.prices.pop(token, None)
+            self.subscribed = needed
+        except Exception as e:
+            logging.error(f"Price board subscription update failed: {e}", exc_info=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        return {
+            'tokens': len(self.prices),
+            'wanted': len(self.refcounts),
+            'dynamic_subscriptions': len(self.subscribed),
+            'owners': len(self.wanted),
+            **self.metrics,
+        }
+
+
+_price_board = None
+_price_board_lock = threading.Lock()
+
+
+def get_price_board() -> PriceBoard:
+    global _price_board
+    if _price_board is None:
+        with _price_board_lock:
+            if _price_board is None:
+                _price_board = PriceBoard()
+    return _price_board
@@ -0,0 +1,238 @@
+"""
+Content-addressed cache for Mountain Signal backtest and optimizer results.
+
+A result is stored under the SHA-256 of its inputs: the endpoint kind, the
+request parameters (canonical JSON), the SHA-256 of mountain_signal_pe.rules,
+mountain_signal_engine.ENGINE_VERSION, the market data source and the option
+pricing settings (default premium model, rate, default IV and the SHA-256 of
+the IV file). Editing the rules file or bumping the engine version therefore
+changes every key, and stale entries simply age out. Only requests whose date
+range ends before today are cached, since candles of completed trading days
+never change (the same assumption the candle store makes); ranges that include
+today always rerun.
+
+Entries are gzipped JSON files ``<root>/<key[:2]>/<key>.json.gz`` holding the
+response body exactly as it was serialised plus its HTTP status, so a hit is
+served without rerunning or re-encoding anything. Only complete 2xx results are
+stored: a runner that could not load every session (a failed historical window,
+see candle_store.iter_candles) lists those days in ``incompleteDays`` and the
+result is served but never cached, so the next request retries the fetch.
+The web process is the only writer (background job results are stored by the
+job manager, not by the job processes); file access times are tracked in an
+in-memory LRU index built from file mtimes on first use, and the least recently
+used files are deleted once the cache grows beyond RESULT_CACHE_MAX_MB.
+"""
+import collections
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from typing import Any, Dict, Optional, Tuple
+
+import config
+from mountain_signal_engine import ENGINE_VERSION
+from option_pricing import pricing_fingerprint
+from rules import rules_fingerprint
+
+SUFFIX = '.json.gz'
+
+
+def cacheable_range(params: Dict[str, Any], today: Optional[datetime.date] = None) -> bool:
+    """True when the request's date range is complete (ends before today)"""
+    try:
+        to_date = datetime.datetime.strptime(str(params.get('to_date')), '%Y-%m-%d').date()
+        datetime.datetime.strptime(str(params.get('from_date')), '%Y-%m-%d')
+    except (TypeError, ValueError):
+        return False
+    return to_date < (today or datetime.date.today())
+
+
+def is_complete_result(body: Any) -> bool:
+    """False when a runner result was computed without some sessions of its date range"""
+    return not (isinstance(body, dict) and body.get('incompleteDays'))
+
+
+class ResultCache:
+    def __init__(self, root: Optional[str] = None, max_bytes: Optional[int] = None):
+        self.root = root or config.RESULT_CACHE_DIR
+        self.max_bytes = max_bytes if max_bytes is not None else int(config.RESULT_CACHE_MAX_MB * 1024 * 1024)
+        self.lock = threading.Lock()
+        self.index: Optional[collections.OrderedDict] = None  # key -> file size, least recently used first
+        self.total_bytes = 0
+        self.metrics = {
+            'hits': 0,
+            'misses': 0,
+            'bypassed': 0,
+            'stores': 0,
+            'evictions': 0,
+            'errors': 0,
+        }
+
+    def key(self, kind: str, params: Dict[str, Any]) -> Optional[str]:
+        """Cache key of a request, or None when its date range is not cacheable"""
+        if not cacheable_range(params):
+            with self.lock:
+                self.metrics['bypassed'] += 1
+            return None
+        material = json.dumps({
+            'kind': kind,
+            'params': params,
+            'rules': rules_fingerprint(),
+            'engine': ENGINE_VERSION,
+            'data': 'fake' if config.USE_FAKE_KITE else 'kite',
+            'pricing': pricing_fingerprint(),
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(material.encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, int]]:
+        """(serialised body, HTTP status) of a cached result, or None"""
+        self._load_index()
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                status_code = int(f.readline())
+                body_json = f.read()
+            os.utime(path)
+        except FileNotFoundError:
+            with self.lock:
+                self._forget(key)
+                self.metrics['misses'] += 1
+            return None
+        except (OSError, ValueError, EOFError) as e:
+            logging.warning(f"Dropping unreadable result cache entry {key}: {e}")
+            self._remove(key)
+            with self.lock:
+                self.metrics['misses'] += 1
+                self.metrics['errors'] += 1
+            return None
+        with self.lock:
+            if key in self.index:
+                self.index.move_to_end(key)
+            self.metrics['hits'] += 1
+        return body_json, status_code
+
+    def put(self, key: str, body_json: str, status_code: int) -> bool:
+        """Store a serialised result; non-2xx results are not cached"""
+        if not 200 <= status_code < 300:
+            return False
+        self._load_index()
+        path = self._path(key)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=1) as f:
+                f.write(f"{status_code}\n")
+                f.write(body_json)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logging.error(f"Error writing result cache entry {key}: {e}", exc_info=True)
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+            with self.lock:
+                self.metrics['errors'] += 1
+            return False
+        with self.lock:
+            self._forget(key)
+            self.index[key] = size
+            self.total_bytes += size
+            self.metrics['stores'] += 1
+            evicted = []
+            while self.total_bytes > self.max_bytes and len(self.index) > 1:
+                old_key, old_size = self.index.popitem(last=False)
+                self.total_bytes -= old_size
+                evicted.append(old_key)
+            self.metrics['evictions'] += len(evicted)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+        return True
+
+    def clear(self) -> int:
+        """Delete every entry; returns the number of files removed"""
+        self._load_index()
+        with self.lock:
+            keys = list(self.index)
+            self.index.clear()
+            self.total_bytes = 0
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        self._load_index()
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics['entries'] = len(self.index)
+            metrics['size_mb'] = round(self.total_bytes / (1024 * 1024), 3)
+        lookups = metrics['hits'] + metrics['misses']
+        metrics['hit_rate'] = round(metrics['hits'] / lookups, 4) if lookups else 0.0
+        metrics['max_size_mb'] = round(self.max_bytes / (1024 * 1024), 3)
+        metrics['engine_version'] = ENGINE_VERSION
+        return metrics
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key + SUFFIX)
+
+    def _forget(self, key: str) -> None:
+        size = self.index.pop(key, None)
+        if size is not None:
+            self.total_bytes -= size
+
+    def _remove(self, key: str) -> None:
+        with self.lock:
+            self._forget(key)
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+
+    def _load_index(self) -> None:
+        """Build the LRU index from the files on disk (oldest mtime first) on first use"""
+        if self.index is not None:
+            return
+        with self.lock:
+            if self.index is not None:
+                return
+            entries = []
+            if os.path.isdir(self.root):
+                for shard in os.scandir(self.root):
+                    if not shard.is_dir():
+                        continue
+                    for entry in os.scandir(shard.path):
+                        if entry.name.endswith(SUFFIX):
+                            stat = entry.stat()
+                            entries.append((stat.st_mtime, entry.name[:-len(SUFFIX)], stat.st_size))
+                        elif entry.name.endswith('.tmp'):
+                            # Left behind by an interrupted write
+                            try:
+                                os.remove(entry.path)
+                            except OSError:
+                                pass
+            entries.sort()
+            self.index = collections.OrderedDict((key, size) for _, key, size in entries)
+            self.total_bytes = sum(size for _, _, size in entries)
+
+
+_result_cache = None
+_result_cache_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, or None when RESULT_CACHE_ENABLED is off"""
+    global _result_cache
+    if not config.RESULT_CACHE_ENABLED:
+        return None
+    if _result_cache is None:
+        with _result_cache_lock:
+            if _result_cache is None:
+                _result_cache = ResultCache()
+    return _result_cache
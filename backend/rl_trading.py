@@ -19,6 +19,7 @@ from torch import nn
 from utils.indicators import calculate_rsi
 from ai_ml import candles_to_dataframe
 from rules import load_mountain_signal_pe_rules
+from mountain_signal_engine import is_pe_signal
 
 
 RL_DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
@@ -92,6 +93,10 @@ class MountainSignalRLEnv:
             self.df['rsi14'] = calculate_rsi(self.df['close'], period=14)
         else:
             self.df['rsi14'] = 50.0  # Default neutral
+        # Plain float lists for the per-step signal check
+        self.lows = self.df['low'].to_numpy(dtype=float).tolist()
+        self.ema5 = self.df['ema5'].to_numpy(dtype=float).tolist()
+        self.rsi14 = self.df['rsi14'].to_numpy(dtype=float).tolist()
         
         self.initial_balance = initial_balance
         self.lot_size = inferred_lot_size
@@ -164,15 +169,11 @@ class MountainSignalRLEnv:
         if self.current_step < 2:
             return
         
-        prev_row = self.df.iloc[self.current_step - 1]
-        prev_ema = prev_row['ema5']
-        prev_rsi = prev_row['rsi14'] if not pd.isna(prev_row['rsi14']) else None
-        
-        # PE Signal: LOW > 5 EMA AND RSI > 70
-        if not pd.isna(prev_ema) and prev_row['low'] > prev_ema:
-            if prev_rsi is not None and prev_rsi > 70:
-                self.pe_signal_candle_idx = self.current_step - 1
-                self.pe_signal_price_above_low = False
+        prev = self.current_step - 1
+        # PE Signal: LOW > 5 EMA AND RSI > 70 (same rule as the backtest engine; NaN never signals)
+        if is_pe_signal(self.lows[prev], self.ema5[prev], self.rsi14[prev]):
+            self.pe_signal_candle_idx = prev
+            self.pe_signal_price_above_low = False
     
     def step(self, action: int) -> Tuple[np.ndarray, float, bool, Dict]:
         """
@@ -1,6 +1,6 @@
 """Utilities for loading strategy business rules defined in DSL files."""
 
-from .loader import load_mountain_signal_pe_rules
+from .loader import load_mountain_signal_pe_rules, rules_fingerprint
 
-__all__ = ["load_mountain_signal_pe_rules"]
+__all__ = ["load_mountain_signal_pe_rules", "rules_fingerprint"]
 
@@ -1,3 +1,4 @@
+import hashlib
 import os
 import re
 from typing import Dict, Any, Optional
@@ -28,6 +29,23 @@ def _parse_percent(value: str) -> Optional[float]:
     return float(match.group(1)) / 100.0
 
 
+def rules_fingerprint(rules_path: Optional[str] = None) -> str:
+    """SHA-256 of the Mountain Signal PE rules file ('missing' when it does not exist).
+
+    Used in cache keys so cached results are invalidated whenever the DSL
+    file is edited.
+    """
+
+    if rules_path is None:
+        rules_path = os.path.join(RULES_DIR, "mountain_signal_pe.rules")
+
+    try:
+        with open(rules_path, "rb") as handle:
+            return hashlib.sha256(handle.read()).hexdigest()
+    except FileNotFoundError:
+        return "missing"
+
+
 def load_mountain_signal_pe_rules(rules_path: Optional[str] = None) -> Dict[str, Any]:
     """Load PE-specific Mountain Signal rules from the DSL file.
 
@@ -1,7 +1,13 @@
 
 from abc import ABC, abstractmethod
+from types import MappingProxyType
 
 class BaseStrategy(ABC):
+    # When ticks back up in the strategy executor, deliver only the latest tick per token
+    coalesce_ticks = True
+    # Read-only copy of self.status for other threads, refreshed by publish_status()
+    status_snapshot = None
+
     def __init__(self, kite, instrument, candle_time, start_time, end_time, stop_loss, target_profit, total_lot, trailing_stop_loss, segment, trade_type, strike_price, expiry_type, strategy_name_input):
         self.kite = kite
         self.instrument = instrument
@@ -18,6 +24,26 @@ class BaseStrategy(ABC):
         self.expiry_type = expiry_type
         self.strategy_name_input = strategy_name_input
 
+    def subscribed_tokens(self):
+        """Instrument tokens whose ticks this strategy consumes (empty means all ticks)"""
+        instrument_token = getattr(self, 'instrument_token', None)
+        return [instrument_token] if instrument_token else []
+
+    def publish_status(self):
+        """Publish a copy of ``status`` for readers on other threads (the update emitter).
+
+        Called on the executor worker after each tick batch, so the copy is taken on the
+        thread that mutates ``status``. Nested lists and dicts (audit trail, signal history,
+        option prices) are copied one level down; their entries are not modified once added.
+        """
+        status = getattr(self, 'status', None)
+        if not isinstance(status, dict):
+            return
+        self.status_snapshot = MappingProxyType({
+            key: list(value) if isinstance(value, list) else dict(value) if isinstance(value, dict) else value
+            for key, value in status.items()
+        })
+
     @abstractmethod
     def run(self):
         pass
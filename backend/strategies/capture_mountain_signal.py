@@ -1,10 +1,16 @@
 from .base_strategy import BaseStrategy
-from utils.kite_utils import get_option_symbols
-from utils.indicators import calculate_rsi
+from audit_sink import get_audit_sink
+from instrument_master import get_instrument_master
+from price_board import get_price_board
+from mountain_signal_engine import is_ce_signal, is_pe_signal
+from utils.streaming_indicators import EMA, RSI
 from rules import load_mountain_signal_pe_rules
+from candle_aggregator import CandleAggregator, get_candle_aggregators
+import config
 import logging
 import datetime
 import re
+from collections import deque
 import pandas as pd
 import numpy as np
 import uuid
@@ -26,6 +32,67 @@ def extract_strike_from_symbol(symbol):
         pass
     return None
 
+
+class SignalIndicatorState:
+    """Streaming EMA / RSI over a candle series whose last entry is still forming.
+
+    Closed candles are folded into utils.streaming_indicators objects once; the forming
+    candle is applied provisionally with peek() on each snapshot, so evaluation costs O(1)
+    instead of rebuilding a DataFrame. Values match ``close.ewm(span, adjust=False)`` and
+    ``calculate_rsi`` (simple rolling means) on the same series.
+    """
+
+    def __init__(self, ema_period=5, rsi_period=14):
+        self.ema_period = ema_period
+        self.rsi_period = rsi_period
+        self.reset()
+
+    def reset(self):
+        self.ema = EMA(self.ema_period)
+        self.rsi = RSI(self.rsi_period)
+        self.last_closed = None
+
+    def _fold(self, candle):
+        self.ema.update(candle)
+        self.rsi.update(candle)
+        self.last_closed = candle
+
+    def sync(self, candles):
+        """Fold closed candles added since the last call (caller holds the candle lock)"""
+        closed_count = len(candles) - 1
+        if closed_count <= 0:
+            if self.last_closed is not None:
+                self.reset()
+            return
+        pending = []
+        index = closed_count - 1
+        while index >= 0 and candles[index] is not self.last_closed:
+            pending.append(candles[index])
+            index -= 1
+        if index < 0 and self.last_closed is not None:
+            # Lost track of the series (ring wrapped past us): rebuild from what is buffered
+            self.reset()
+        for candle in reversed(pending):
+            self._fold(candle)
+
+    def snapshot(self, candles):
+        """Current values for the forming (last) candle and the last closed one"""
+        count = len(candles)
+        if count == 0:
+            return None
+        forming = dict(candles[-1])
+        rsi = None
+        if count >= self.rsi_period + 1 and self.last_closed is not None:
+            rsi = self.rsi.peek(forming)
+        return {
+            'count': count,
+            'candle': forming,
+            'ema': self.ema.peek(forming),
+            'rsi': rsi,
+            'prev_candle': self.last_closed,
+            'prev_ema': self.ema.value,
+        }
+
 class CaptureMountainSignal(BaseStrategy):
     description = """
     ## Capture Mountain Signal Strategy
@@ -46,14 +113,26 @@ class CaptureMountainSignal(BaseStrategy):
     - **Stop Loss:** Price closes below signal candle's LOW
     - **Target:** Wait for at least 1 candle where LOW > 5 EMA, then if 2 consecutive candles CLOSE < 5 EMA -> Exit CE trade
     """
-    def __init__(self, kite, instrument, candle_time, start_time, end_time, stop_loss, target_profit, total_lot, trailing_stop_loss, segment, trade_type, strike_price, expiry_type, strategy_name_input, paper_trade=False, ema_period=5, session_id=None):
+    def __init__(self, kite, instrument, candle_time, start_time, end_time, stop_loss, target_profit, total_lot, trailing_stop_loss, segment, trade_type, strike_price, expiry_type, strategy_name_input, paper_trade=False, ema_period=5, session_id=None, candle_source=None):
         super().__init__(kite, instrument, candle_time, start_time, end_time, stop_loss, target_profit, total_lot, trailing_stop_loss, segment, trade_type, strike_price, expiry_type, strategy_name_input)
         self.strategy_name_input = strategy_name_input
         self.paper_trade = paper_trade
         self.ema_period = ema_period
         self.paper_trade_session_id = session_id  # Store session_id for DB logging
         self.instrument_token = self._get_instrument_token()
-        self.historical_data = [] # Stores 5-minute candles
+        # Candles are built by the shared aggregator for (instrument token, candle_time); the live
+        # registry is fed by the ticker, market replay passes its own candle_source
+        if self.instrument_token is not None:
+            self.candle_aggregator = (candle_source or get_candle_aggregators()).get(self.instrument_token, int(self.candle_time))
+        else:
+            self.candle_aggregator = CandleAggregator(0, int(self.candle_time))
+        self.historical_data = self.candle_aggregator.candles # Ring of the last 100 candles, forming candle last
+        self.indicators = SignalIndicatorState(self.ema_period, 14)
+        # Written on the feeding thread by _on_candle_update, read by process_ticks on the executor worker
+        self.latest_snapshot = None  # (tick time, indicator snapshot) as of the last tick fed
+        self.pending_evaluations = deque()  # (tick time, indicator snapshot) taken inside the evaluation window
+        self.evaluation_captured_for = None  # Start of the candle whose evaluation snapshot was taken
+        self.candle_aggregator.subscribe(on_update=self._on_candle_update)
         self.pe_signal_candle = None
         self.ce_signal_candle = None
         self.trade_placed = False
@@ -104,11 +183,13 @@ class CaptureMountainSignal(BaseStrategy):
             # Audit trail
             'audit_trail': []
         }
-        self.last_candle_timestamp = None
         self.current_candle_data = None
         self.target_hit_candles = 0 # For target profit logic
         self.option_instrument_tokens = {}  # Cache for option instrument tokens
-        self.last_option_price_update = None  # Track when we last updated option prices
+        self.last_option_price_update = None  # Track when we last resolved the option instruments
+        self.last_option_ltp_fallback = None  # When stale board prices were last fetched with kite.ltp
+        self.option_atm_rounded = None  # Rounded ATM the option instruments were resolved for
+        self.price_board = get_price_board()
         # Track all potential signals identified today
         self.status['signal_history_today'] = []
         # Track price action validation after trade exit (for re-entry)
@@ -116,8 +197,6 @@ class CaptureMountainSignal(BaseStrategy):
         self.ce_signal_price_below_high = False  # After exit, need price LOW < signal HIGH before next entry
         # Track which signal candles have already had an entry (to distinguish first entry vs re-entry)
         self.signal_candles_with_entry = set()  # Store signal candle indices that have had entries
-        # Track if signal evaluation has been done for current candle (to prevent duplicate evaluations)
-        self.signal_evaluated_for_current_candle = False
         # Track option contract trades (realistic simulation)
         self.option_trade_history = []
         self.active_option_trade = None
@@ -188,85 +267,33 @@ class CaptureMountainSignal(BaseStrategy):
             return {}
         
         try:
-            instruments = self.kite.instruments('NFO')
-            
-            # Find expiry date
-            all_expiries = sorted(list(set([
-                inst['expiry'] for inst in instruments 
-                if inst['name'] == self.instrument and 'expiry' in inst and inst['expiry']
-            ])))
-            
-            today = datetime.date.today()
-            if self.expiry_type == 'weekly':
-                expiry_date = next((d for d in all_expiries if d > today), None)
-            elif self.expiry_type == 'next_weekly':
-                expiries_after_today = [d for d in all_expiries if d > today]
-                expiry_date = expiries_after_today[1] if len(expiries_after_today) > 1 else None
-            elif self.expiry_type == 'monthly':
-                expiry_date = next((d for d in all_expiries if (d - today).days >= 20), None)
-            else:
-                expiry_date = None
-            
-            if not expiry_date:
+            chain = get_instrument_master().option_chain(self.kite, self.instrument, self.expiry_type)
+            if chain is None or not chain.strikes:
                 return {}
-            
-            expiry_date_str = expiry_date.strftime('%Y-%m-%d')
-            
-            # Filter instruments by expiry
-            filtered_instruments = [inst for inst in instruments 
-                                   if inst['name'] == self.instrument and 
-                                      inst['expiry'].strftime('%Y-%m-%d') == expiry_date_str]
-            
+
             # Determine strike step and round ATM from index LTP (calculate signals on index)
             strike_step = 50 if self.instrument == 'NIFTY' else 100
-            # Round to nearest step
+            # Round to nearest step, then choose the nearest listed strike (prevents old far-away strikes like 46000)
             atm_rounded = round(ltp / strike_step) * strike_step
-            
-            # Available strikes for selected expiry
-            strike_prices = sorted(list(set([inst['strike'] for inst in filtered_instruments])))
-            if not strike_prices:
-                return {}
-            # Choose nearest available to rounded ATM (prevents old far-away strikes like 46000)
-            atm_strike = min(strike_prices, key=lambda x: abs(x - atm_rounded))
-            atm_strike_index = strike_prices.index(atm_strike)
-            
-            # Get ATM, ATM+2, ATM-2 strikes
-            atm_minus2_index = max(0, atm_strike_index - 2)
-            atm_plus2_index = min(len(strike_prices) - 1, atm_strike_index + 2)
-            
-            atm_strike_val = strike_prices[atm_strike_index]
-            atm_minus2_strike = strike_prices[atm_minus2_index]
-            atm_plus2_strike = strike_prices[atm_plus2_index]
-            
-            # Find instruments for each strike and option type
+            strikes = chain.strikes_around(atm_rounded, 2)
+            atm_strike_val = chain.atm_strike(atm_rounded)
+
+            # ATM-2, ATM and ATM+2 (clipped at the ends of the chain)
+            labels = {strikes[0]: 'atm_minus2', atm_strike_val: 'atm', strikes[-1]: 'atm_plus2'}
             option_data = {}
-            for inst in filtered_instruments:
-                strike = inst['strike']
-                option_type = inst['instrument_type']
-                
-                if strike == atm_strike_val:
-                    if option_type == 'CE':
-                        option_data['atm_ce'] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
-                    elif option_type == 'PE':
-                        option_data['atm_pe'] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
-                elif strike == atm_minus2_strike:
-                    if option_type == 'CE':
-                        option_data['atm_minus2_ce'] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
-                    elif option_type == 'PE':
-                        option_data['atm_minus2_pe'] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
-                elif strike == atm_plus2_strike:
-                    if option_type == 'CE':
-                        option_data['atm_plus2_ce'] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
-                    elif option_type == 'PE':
-                        option_data['atm_plus2_pe'] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
-            
+            for strike in (strikes[0], strikes[-1], atm_strike_val):
+                for option_type in ('CE', 'PE'):
+                    inst = chain.option(strike, option_type)
+                    if inst is not None:
+                        option_data[f"{labels[strike]}_{option_type.lower()}"] = {'token': inst['instrument_token'], 'symbol': inst['tradingsymbol'], 'strike': strike}
+
             return option_data
         except Exception as e:
             logging.error(f"Error getting option instruments for monitoring: {e}", exc_info=True)
             return {}
     
     def _update_option_prices(self):
-        """Fetch and update option prices (ATM, ATM+2, ATM-2) from Kite API"""
+        """Update option prices (ATM, ATM+2, ATM-2) from the websocket-fed price board"""
         # Skip option price updates during replay (when kite is None)
         if self.kite is None:
             return
@@ -276,37 +303,45 @@ class CaptureMountainSignal(BaseStrategy):
             if current_ltp == 0:
                 return
             
-            # Get option instruments (cache if not already cached or if LTP changed significantly)
-            if not self.option_instrument_tokens or (self.last_option_price_update is None or 
-                                                    (datetime.datetime.now() - self.last_option_price_update).total_seconds() > 300):
+            # Re-resolve the option instruments when the ATM strike moves (or every 5 minutes for expiry roll-over)
+            strike_step = 50 if self.instrument == 'NIFTY' else 100
+            atm_rounded = round(current_ltp / strike_step) * strike_step
+            if not self.option_instrument_tokens or atm_rounded != self.option_atm_rounded or \
+               self.last_option_price_update is None or \
+               (datetime.datetime.now() - self.last_option_price_update).total_seconds() > 300:
                 self.option_instrument_tokens = self._get_option_instruments_for_monitoring(current_ltp)
+                self.option_atm_rounded = atm_rounded
                 self.last_option_price_update = datetime.datetime.now()
             
+            # The board subscribes these on the ticker and drops strikes we no longer need
+            wanted = [info['token'] for info in self.option_instrument_tokens.values()]
+            if self.status.get('traded_instrument_token'):
+                wanted.append(self.status['traded_instrument_token'])
+            self.price_board.want(self, wanted)
+
             if not self.option_instrument_tokens:
                 return
             
-            # Prepare list of tokens to fetch
-            tokens_to_fetch = []
-            for key in ['atm_ce', 'atm_pe', 'atm_plus2_ce', 'atm_plus2_pe', 'atm_minus2_ce', 'atm_minus2_pe']:
-                if key in self.option_instrument_tokens:
-                    tokens_to_fetch.append(self.option_instrument_tokens[key]['token'])
-            
-            if not tokens_to_fetch:
-                return
-            
-            # Fetch LTP for all option tokens at once
-            ltp_response = self.kite.ltp(tokens_to_fetch)
-            
-            # Update option prices and symbols in status
+            # Update option prices and symbols in status; prices the board has not refreshed within
+            # PRICE_BOARD_MAX_AGE (no tick yet, ticker disconnected) come from one kite.ltp call at that interval
+            stale = {}
             for key in ['atm_ce', 'atm_pe', 'atm_plus2_ce', 'atm_plus2_pe', 'atm_minus2_ce', 'atm_minus2_pe']:
                 if key in self.option_instrument_tokens:
                     token = self.option_instrument_tokens[key]['token']
-                    if token in ltp_response:
-                        self.status['option_prices'][key] = ltp_response[token]['last_price']
-                        self.status['option_symbols'][key] = self.option_instrument_tokens[key]['symbol']
+                    price = self.price_board.get(token, max_age=config.PRICE_BOARD_MAX_AGE)
+                    if price is None:
+                        stale[key] = token
                     else:
-                        self.status['option_prices'][key] = None
-                        self.status['option_symbols'][key] = self.option_instrument_tokens[key]['symbol']
+                        self.status['option_prices'][key] = price
+                    self.status['option_symbols'][key] = self.option_instrument_tokens[key]['symbol']
+            now = datetime.datetime.now()
+            if stale and (self.last_option_ltp_fallback is None or
+                          (now - self.last_option_ltp_fallback).total_seconds() >= config.PRICE_BOARD_MAX_AGE):
+                self.last_option_ltp_fallback = now
+                ltp_response = self.kite.ltp(list(stale.values()))
+                for key, token in stale.items():
+                    quote = ltp_response.get(str(token)) or ltp_response.get(token)
+                    self.status['option_prices'][key] = quote['last_price'] if quote else None
         except Exception as e:
             logging.error(f"Error updating option prices: {e}", exc_info=True)
 
@@ -322,9 +357,11 @@ class CaptureMountainSignal(BaseStrategy):
         return int(base_lot * self.total_lot)
 
     def _get_option_price_snapshot(self, option_type, instrument_token=None):
-        """Fetch latest option LTP using instrument token or cached option prices"""
+        """Latest option LTP from the price board (if fresh), falling back to kite.ltp and then cached option prices"""
         ltp_value = None
-        if instrument_token and self.kite is not None:
+        if isinstance(instrument_token, int):
+            ltp_value = self.price_board.get(instrument_token, max_age=config.PRICE_BOARD_MAX_AGE)
+        if ltp_value is None and instrument_token and self.kite is not None:
             try:
                 quote_key = f"NFO:{instrument_token}" if isinstance(instrument_token, str) and ':' not in instrument_token else instrument_token
                 quote = self.kite.ltp([quote_key])
@@ -427,34 +464,16 @@ class CaptureMountainSignal(BaseStrategy):
                 'message': message,
                 'data': data or {}
             }
-            self.status['audit_trail'].append(audit_entry)
+            audit_trail = self.status['audit_trail']
+            audit_trail.append(audit_entry)
             
-            # Keep only last 1000 audit entries
-            if len(self.status['audit_trail']) > 1000:
-                self.status['audit_trail'] = self.status['audit_trail'][-1000:]
+            # Keep only the last 1000 audit entries, trimmed in place in chunks instead of re-sliced per event
+            if len(audit_trail) > 1100:
+                del audit_trail[:-1000]
             
-            # Save to database if paper trading
+            # Persisted in batches by the audit sink's writer thread if paper trading
             if self.paper_trade and self.paper_trade_session_id:
-                try:
-                    from database import get_db_connection
-                    import json
-                    conn = get_db_connection()
-                    cursor = conn.cursor()
-                    cursor.execute("""
-                        INSERT INTO paper_trade_audit_trail 
-                        (session_id, timestamp, log_type, message, details)
-                        VALUES (?, ?, ?, ?, ?)
-                    """, (
-                        self.paper_trade_session_id,
-                        datetime.datetime.now(),
-                        event_type,
-                        message,
-                        json.dumps(data) if data else None
-                    ))
-                    conn.commit()
-                    conn.close()
-                except Exception as db_error:
-                    logging.error(f"Error saving audit trail to database: {db_error}", exc_info=True)
+                get_audit_sink().append(self.paper_trade_session_id, event_type, message, data)
             
             logging.info(f"[AUDIT] {event_type}: {message}")
         except Exception as e:
@@ -467,71 +486,24 @@ class CaptureMountainSignal(BaseStrategy):
             return None, None
         
         try:
-            # Get option symbols for ATM +/- 2 strikes
-            option_tokens = get_option_symbols(self.kite, self.instrument, self.expiry_type, 2)
-            if not option_tokens:
-                logging.warning(f"Could not fetch option symbols for {self.instrument}")
-                return None, None
-            
-            # Get all instruments to find the trading symbol
-            instruments = self.kite.instruments('NFO')
-            
-            # Find expiry date
-            all_expiries = sorted(list(set([
-                inst['expiry'] for inst in instruments 
-                if inst['name'] == self.instrument and 'expiry' in inst and inst['expiry']
-            ])))
-            
-            today = datetime.date.today()
-            expiry_type_lower = self.expiry_type.lower() if self.expiry_type else ''
-            
-            if expiry_type_lower == 'weekly':
-                # Find the first expiry after today
-                expiries_after_today = [d for d in all_expiries if d > today]
-                expiry_date = expiries_after_today[0] if len(expiries_after_today) > 0 else None
-                # If no expiry after today, try to get today's expiry or next available
-                if not expiry_date:
-                    expiry_date = next((d for d in all_expiries if d >= today), None)
-            elif expiry_type_lower == 'next_weekly':
-                # Find the second expiry after today
-                expiries_after_today = [d for d in all_expiries if d > today]
-                expiry_date = expiries_after_today[1] if len(expiries_after_today) > 1 else None
-                # Fallback to first expiry if second doesn't exist
-                if not expiry_date and len(expiries_after_today) > 0:
-                    expiry_date = expiries_after_today[0]
-            elif expiry_type_lower == 'monthly':
-                # Find the next expiry that is at least 20 days away
-                expiry_date = next((d for d in all_expiries if (d - today).days >= 20), None)
-                # Fallback to furthest expiry if no monthly expiry found
-                if not expiry_date and len(all_expiries) > 0:
-                    expiry_date = max(all_expiries)
-            else:
-                expiry_date = None
-            
+            master = get_instrument_master()
+            master.load(self.kite, 'NFO')
+            expiry_date = master.resolve_expiry(self.instrument, self.expiry_type)
             if not expiry_date:
+                all_expiries = master.expiries(self.instrument)
                 logging.warning(f"Could not find expiry date for {self.instrument} {self.expiry_type}. Available expiries: {all_expiries[:5] if len(all_expiries) > 0 else 'none'}")
                 return None, None
-            
-            expiry_date_str = expiry_date.strftime('%Y-%m-%d')
-            
-            # Filter instruments by expiry and option type
-            filtered_instruments = [inst for inst in instruments 
-                                 if inst['name'] == self.instrument and 
-                                    inst['instrument_type'] == option_type and
-                                    inst['expiry'].strftime('%Y-%m-%d') == expiry_date_str]
-            
-            # Find ATM strike
-            strike_prices = [inst['strike'] for inst in filtered_instruments]
-            if not strike_prices:
+
+            # Find ATM strike among the listed strikes of this option type
+            chain = master.chain(self.instrument, expiry_date)
+            atm_strike = chain.atm_strike(ltp, option_type) if chain else None
+            if atm_strike is None:
                 logging.warning(f"No strike prices found for {self.instrument} {option_type}")
                 return None, None
-            
-            atm_strike = min(strike_prices, key=lambda x: abs(x - ltp))
-            
-            # Find the trading symbol and instrument token
-            for inst in filtered_instruments:
-                if inst['strike'] == atm_strike:
-                    return inst['tradingsymbol'], inst['instrument_token']
+
+            inst = chain.option(atm_strike, option_type)
+            if inst is not None:
+                return inst['tradingsymbol'], inst['instrument_token']
             
             return None, None
         except Exception as e:
@@ -583,10 +555,8 @@ class CaptureMountainSignal(BaseStrategy):
 
         self.status['current_ltp'] = current_ltp
         
-        # Update option prices (every 5 seconds to avoid too many API calls)
-        if self.last_option_price_update is None or \
-           (datetime.datetime.now() - self.last_option_price_update).total_seconds() >= 5:
-            self._update_option_prices()
+        # Option prices are read from the price board in memory, so they are refreshed on every tick
+        self._update_option_prices()
 
         # Convert tick_timestamp to datetime object if it's not already
         if isinstance(tick_timestamp, (int, float)):
@@ -624,214 +594,181 @@ class CaptureMountainSignal(BaseStrategy):
                 logging.info(f"Market close square off executed at {self.exit_price:.2f}. P&L: {current_pnl:.2f}")
                 return  # Exit early after square off
 
-        # Determine the current 5-minute candle's start time
-        candle_interval_minutes = int(self.candle_time)
-        current_candle_start_time = tick_datetime - datetime.timedelta(minutes=tick_datetime.minute % candle_interval_minutes, seconds=tick_datetime.second, microseconds=tick_datetime.microsecond)
-
-        # Initialize or update current candle data
-        if self.current_candle_data is None or self.current_candle_data['date'] != current_candle_start_time:
-            # New candle started
-            if self.current_candle_data is not None: # Process the completed candle
-                self._process_completed_candle(self.current_candle_data)
-            
-            self.current_candle_data = {
-                'date': current_candle_start_time,
-                'open': current_ltp,
-                'high': current_ltp,
-                'low': current_ltp,
-                'close': current_ltp,
-                'volume': 0 # Volume not available in ticks, keep as 0 or estimate
-            }
-            self.historical_data.append(self.current_candle_data) # Add new candle to historical data
-            # Reset signal evaluation flag for new candle
-            self.signal_evaluated_for_current_candle = False
-        else:
-            # Update existing candle
-            self.current_candle_data['high'] = max(self.current_candle_data['high'], current_ltp)
-            self.current_candle_data['low'] = min(self.current_candle_data['low'], current_ltp)
-            self.current_candle_data['close'] = current_ltp
-            # self.current_candle_data['volume'] += latest_tick.get('volume_delta', 0) # If volume delta is available
-
-        # Keep historical_data to a manageable size (e.g., last 100 candles)
-        if len(self.historical_data) > 100:
-            self.historical_data.pop(0)
+        # Candle and indicators come from the snapshot taken when the aggregator applied the latest tick,
+        # so they match that tick even when this worker lags the feed or the batch was coalesced
+        latest = self.latest_snapshot
+        if latest is None:
+            return
+        snapshot_time, snapshot = latest
+        self.current_candle_data = snapshot['candle']
 
         # Update status message
         self.status['message'] = f"Processing ticks. Current candle: {self.current_candle_data['date'].strftime('%H:%M')} - {current_ltp:.2f}"
         # Update aligned last execution time (minute % 5 == 4, second == 40)
         try:
-            self.status['last_execution_time'] = self._aligned_execution_time(tick_datetime).isoformat()
+            self.status['last_execution_time'] = self._aligned_execution_time(snapshot_time).isoformat()
         except Exception:
             pass
 
         # **SIGNAL EVALUATION TIMING: rule-driven seconds before candle close**
-        # Calculate how many seconds we are from the candle end
-        candle_duration_seconds = candle_interval_minutes * 60
-        seconds_into_candle = (tick_datetime - current_candle_start_time).total_seconds()
-        seconds_before_close = candle_duration_seconds - seconds_into_candle
-        
+        # Window snapshots are queued by _on_candle_update for every candle, so none is lost to coalescing
+        while self.pending_evaluations:
+            evaluated_at, evaluation_snapshot = self.pending_evaluations.popleft()
+            self._evaluate_signal_candle(evaluation_snapshot)
+            logging.info(
+                f"Signal evaluation triggered at {evaluated_at.strftime('%H:%M:%S')} "
+                f"(target {getattr(self, '_signal_evaluate_seconds', 20)}s ± {getattr(self, '_signal_evaluate_buffer', 2)}s before candle close)"
+            )
+
+        # Only run strategy logic if we have enough historical data for EMA calculation
+        if snapshot['count'] > self.ema_period:
+            self._apply_strategy_logic(snapshot)
+
+    def _on_candle_update(self, candle):
+        """Aggregator on_update callback, run on the feeding thread right after each tick is applied.
+
+        Takes the indicator snapshot for that tick and, once per candle, queues the snapshot of the
+        first tick inside the evaluation window (rule-driven seconds before close) for process_ticks.
+        """
+        tick_time = self.candle_aggregator.last_tick_at
+        with self.candle_aggregator.lock:
+            self.indicators.sync(self.historical_data)
+            snapshot = self.indicators.snapshot(self.historical_data)
+        if snapshot is None or tick_time is None:
+            return
+
+        candle_start = candle['date']
+        seconds_before_close = int(self.candle_time) * 60 - (tick_time - candle_start).total_seconds()
         target_seconds = getattr(self, '_signal_evaluate_seconds', 20)
         buffer_seconds = getattr(self, '_signal_evaluate_buffer', 2)
         lower_bound = max(0, target_seconds - buffer_seconds)
         upper_bound = target_seconds + buffer_seconds
 
         # Evaluate signal close to candle completion while still prior to close
-        if lower_bound <= seconds_before_close <= upper_bound:
-            if not self.signal_evaluated_for_current_candle and len(self.historical_data) > self.ema_period:
-                self._evaluate_signal_candle()
-                self.signal_evaluated_for_current_candle = True
-                logging.info(
-                    f"Signal evaluation triggered at {tick_datetime.strftime('%H:%M:%S')} "
-                    f"({seconds_before_close:.1f}s before candle close; target {target_seconds}s ± {buffer_seconds}s)"
-                )
+        if lower_bound <= seconds_before_close <= upper_bound and self.evaluation_captured_for != candle_start \
+                and snapshot['count'] > self.ema_period:
+            self.evaluation_captured_for = candle_start
+            self.pending_evaluations.append((tick_time, snapshot))
+        self.latest_snapshot = (tick_time, snapshot)
 
-        # Only run strategy logic if we have enough historical data for EMA calculation
-        if len(self.historical_data) > self.ema_period:
-            self._apply_strategy_logic()
-
-    def _process_completed_candle(self, candle):
-        # This method is called when a candle closes. 
-        # The main strategy logic will be applied here or in _apply_strategy_logic
-        pass
-
-    def _evaluate_signal_candle(self):
+    def _evaluate_signal_candle(self, snapshot):
         """
         Evaluate signal candle conditions 20 seconds before candle close.
         This method checks if the CURRENT (forming) candle meets signal criteria.
         At 20 seconds before close, we have 99% complete candle data.
+        ``snapshot`` is the indicator snapshot taken by _on_candle_update inside the window.
         """
-        df = pd.DataFrame(self.historical_data)
-        df['ema'] = df['close'].ewm(span=self.ema_period, adjust=False).mean()
-        
-        # Calculate RSI 14 for signal identification
-        if len(df) >= 15:  # Need at least 15 candles for RSI 14
-            df['rsi14'] = calculate_rsi(df['close'], period=14)
-        else:
-            df['rsi14'] = None
-
-        # Ensure we have at least one candle
-        if len(df) < 1:
-            return
 
         # Use the CURRENT (last) candle for evaluation - it's still forming but 99% complete
-        current_candle = df.iloc[-1]
-        current_ema = current_candle['ema']
-        current_rsi = current_candle['rsi14'] if 'rsi14' in df.columns and pd.notna(current_candle['rsi14']) else None
+        current_candle = snapshot['candle']
+        current_ema = snapshot['ema']
+        current_rsi = snapshot['rsi']
 
         timing_seconds = getattr(self, '_signal_evaluate_seconds', 20)
         timing_label = f"{int(timing_seconds)}s before close"
 
         # --- PE Signal Candle Identification: LOW > 5 EMA AND RSI > 70 ---
         # Note: We evaluate the forming candle shortly before close per rules
-        if current_candle['low'] > current_ema:
-            # RSI condition must be met at signal identification time
-            if current_rsi is not None and current_rsi > 70:
-                # Signal Reset: If a newer candle meets the same criteria (LOW > 5 EMA + RSI > 70), 
-                # it REPLACES the previous PE signal candle
-                if self.pe_signal_candle is not None:
-                    # New PE signal candle replaces old one
-                    # Reset price action validation and entry tracking
-                    self.pe_signal_price_above_low = False
-                    # Clear entry tracking for old signal
-                    signal_candle_id = id(self.pe_signal_candle)
-                    if signal_candle_id in self.signal_candles_with_entry:
-                        self.signal_candles_with_entry.remove(signal_candle_id)
+        # The rule itself lives in mountain_signal_engine so backtests evaluate the same condition
+        if is_pe_signal(current_candle['low'], current_ema, current_rsi):
+            # Signal Reset: If a newer candle meets the same criteria (LOW > 5 EMA + RSI > 70), 
+            # it REPLACES the previous PE signal candle
+            if self.pe_signal_candle is not None:
+                # New PE signal candle replaces old one
+                # Reset price action validation and entry tracking
+                self.pe_signal_price_above_low = False
+                # Clear entry tracking for old signal
+                signal_candle_id = id(self.pe_signal_candle)
+                if signal_candle_id in self.signal_candles_with_entry:
+                    self.signal_candles_with_entry.remove(signal_candle_id)
                 
-                self.pe_signal_candle = current_candle
-                self.status['signal_status'] = f"PE Signal Candle Identified ({timing_label}): {self.pe_signal_candle['date'].strftime('%H:%M')} (H:{self.pe_signal_candle['high']:.2f}, L:{self.pe_signal_candle['low']:.2f})"
-                self.status['signal_candle_time'] = self.pe_signal_candle['date'].strftime('%H:%M') + '-' + (self.pe_signal_candle['date'] + datetime.timedelta(minutes=int(self.candle_time))).strftime('%H:%M')
-                self.status['signal_candle_high'] = self.pe_signal_candle['high']
-                self.status['signal_candle_low'] = self.pe_signal_candle['low']
-                self.ce_signal_candle = None # Only one active signal type
-                self._add_audit_trail('signal_identified', self.status['signal_status'], {
-                    'signal_type': 'PE',
-                    'candle_time': self.status['signal_candle_time'],
-                    'high': self.pe_signal_candle['high'],
-                    'low': self.pe_signal_candle['low'],
-                    'ema': current_ema,
-                    'rsi': current_rsi,
-                    'evaluation_timing': f'{int(timing_seconds)}_seconds_before_close'
-                })
-                # Append to today's signal history
-                try:
-                    signal_date = self.pe_signal_candle['date'] if isinstance(self.pe_signal_candle['date'], datetime.datetime) else None
-                    if signal_date and signal_date.date() == datetime.date.today():
-                        self.status['signal_history_today'].append({
-                            'type': 'PE',
-                            'time': self.status['signal_candle_time'],
-                            'high': self.pe_signal_candle['high'],
-                            'low': self.pe_signal_candle['low']
-                        })
-                        if len(self.status['signal_history_today']) > 200:
-                            self.status['signal_history_today'] = self.status['signal_history_today'][-200:]
-                except Exception:
-                    pass
-                logging.info(self.status['signal_status'])
+            self.pe_signal_candle = current_candle
+            self.status['signal_status'] = f"PE Signal Candle Identified ({timing_label}): {self.pe_signal_candle['date'].strftime('%H:%M')} (H:{self.pe_signal_candle['high']:.2f}, L:{self.pe_signal_candle['low']:.2f})"
+            self.status['signal_candle_time'] = self.pe_signal_candle['date'].strftime('%H:%M') + '-' + (self.pe_signal_candle['date'] + datetime.timedelta(minutes=int(self.candle_time))).strftime('%H:%M')
+            self.status['signal_candle_high'] = self.pe_signal_candle['high']
+            self.status['signal_candle_low'] = self.pe_signal_candle['low']
+            self.ce_signal_candle = None # Only one active signal type
+            self._add_audit_trail('signal_identified', self.status['signal_status'], {
+                'signal_type': 'PE',
+                'candle_time': self.status['signal_candle_time'],
+                'high': self.pe_signal_candle['high'],
+                'low': self.pe_signal_candle['low'],
+                'ema': current_ema,
+                'rsi': current_rsi,
+                'evaluation_timing': f'{int(timing_seconds)}_seconds_before_close'
+            })
+            # Append to today's signal history
+            try:
+                signal_date = self.pe_signal_candle['date'] if isinstance(self.pe_signal_candle['date'], datetime.datetime) else None
+                if signal_date and signal_date.date() == datetime.date.today():
+                    self.status['signal_history_today'].append({
+                        'type': 'PE',
+                        'time': self.status['signal_candle_time'],
+                        'high': self.pe_signal_candle['high'],
+                        'low': self.pe_signal_candle['low']
+                    })
+                    if len(self.status['signal_history_today']) > 200:
+                        self.status['signal_history_today'] = self.status['signal_history_today'][-200:]
+            except Exception:
+                pass
+            logging.info(self.status['signal_status'])
 
         # --- CE Signal Candle Identification: HIGH < 5 EMA AND RSI < 30 ---
         # Note: We evaluate the forming candle shortly before close per rules
-        if current_candle['high'] < current_ema:
-            # RSI condition must be met at signal identification time
-            if current_rsi is not None and current_rsi < 30:
-                # Signal Reset: If a newer candle meets the same criteria (HIGH < 5 EMA + RSI < 30), 
-                # it REPLACES the previous CE signal candle
-                if self.ce_signal_candle is not None:
-                    # New CE signal candle replaces old one
-                    # Reset price action validation and entry tracking
-                    self.ce_signal_price_below_high = False
-                    # Clear entry tracking for old signal
-                    signal_candle_id = id(self.ce_signal_candle)
-                    if signal_candle_id in self.signal_candles_with_entry:
-                        self.signal_candles_with_entry.remove(signal_candle_id)
+        # The rule itself lives in mountain_signal_engine so backtests evaluate the same condition
+        if is_ce_signal(current_candle['high'], current_ema, current_rsi):
+            # Signal Reset: If a newer candle meets the same criteria (HIGH < 5 EMA + RSI < 30), 
+            # it REPLACES the previous CE signal candle
+            if self.ce_signal_candle is not None:
+                # New CE signal candle replaces old one
+                # Reset price action validation and entry tracking
+                self.ce_signal_price_below_high = False
+                # Clear entry tracking for old signal
+                signal_candle_id = id(self.ce_signal_candle)
+                if signal_candle_id in self.signal_candles_with_entry:
+                    self.signal_candles_with_entry.remove(signal_candle_id)
                 
-                self.ce_signal_candle = current_candle
-                self.status['signal_status'] = f"CE Signal Candle Identified ({timing_label}): {self.ce_signal_candle['date'].strftime('%H:%M')} (H:{self.ce_signal_candle['high']:.2f}, L:{self.ce_signal_candle['low']:.2f})"
-                self.status['signal_candle_time'] = self.ce_signal_candle['date'].strftime('%H:%M') + '-' + (self.ce_signal_candle['date'] + datetime.timedelta(minutes=int(self.candle_time))).strftime('%H:%M')
-                self.status['signal_candle_high'] = self.ce_signal_candle['high']
-                self.status['signal_candle_low'] = self.ce_signal_candle['low']
-                self.pe_signal_candle = None # Only one active signal type
-                self._add_audit_trail('signal_identified', self.status['signal_status'], {
-                    'signal_type': 'CE',
-                    'candle_time': self.status['signal_candle_time'],
-                    'high': self.ce_signal_candle['high'],
-                    'low': self.ce_signal_candle['low'],
-                    'ema': current_ema,
-                    'rsi': current_rsi,
-                    'evaluation_timing': f'{int(timing_seconds)}_seconds_before_close'
-                })
-                # Append to today's signal history
-                try:
-                    signal_date = self.ce_signal_candle['date'] if isinstance(self.ce_signal_candle['date'], datetime.datetime) else None
-                    if signal_date and signal_date.date() == datetime.date.today():
-                        self.status['signal_history_today'].append({
-                            'type': 'CE',
-                            'time': self.status['signal_candle_time'],
-                            'high': self.ce_signal_candle['high'],
-                            'low': self.ce_signal_candle['low']
-                        })
-                        if len(self.status['signal_history_today']) > 200:
-                            self.status['signal_history_today'] = self.status['signal_history_today'][-200:]
-                except Exception:
-                    pass
-                logging.info(self.status['signal_status'])
-
-    def _apply_strategy_logic(self):
-        df = pd.DataFrame(self.historical_data)
-        df['ema'] = df['close'].ewm(span=self.ema_period, adjust=False).mean()
-        
-        # Calculate RSI 14 for signal identification
-        if len(df) >= 15:  # Need at least 15 candles for RSI 14
-            df['rsi14'] = calculate_rsi(df['close'], period=14)
-        else:
-            df['rsi14'] = None
+            self.ce_signal_candle = current_candle
+            self.status['signal_status'] = f"CE Signal Candle Identified ({timing_label}): {self.ce_signal_candle['date'].strftime('%H:%M')} (H:{self.ce_signal_candle['high']:.2f}, L:{self.ce_signal_candle['low']:.2f})"
+            self.status['signal_candle_time'] = self.ce_signal_candle['date'].strftime('%H:%M') + '-' + (self.ce_signal_candle['date'] + datetime.timedelta(minutes=int(self.candle_time))).strftime('%H:%M')
+            self.status['signal_candle_high'] = self.ce_signal_candle['high']
+            self.status['signal_candle_low'] = self.ce_signal_candle['low']
+            self.pe_signal_candle = None # Only one active signal type
+            self._add_audit_trail('signal_identified', self.status['signal_status'], {
+                'signal_type': 'CE',
+                'candle_time': self.status['signal_candle_time'],
+                'high': self.ce_signal_candle['high'],
+                'low': self.ce_signal_candle['low'],
+                'ema': current_ema,
+                'rsi': current_rsi,
+                'evaluation_timing': f'{int(timing_seconds)}_seconds_before_close'
+            })
+            # Append to today's signal history
+            try:
+                signal_date = self.ce_signal_candle['date'] if isinstance(self.ce_signal_candle['date'], datetime.datetime) else None
+                if signal_date and signal_date.date() == datetime.date.today():
+                    self.status['signal_history_today'].append({
+                        'type': 'CE',
+                        'time': self.status['signal_candle_time'],
+                        'high': self.ce_signal_candle['high'],
+                        'low': self.ce_signal_candle['low']
+                    })
+                    if len(self.status['signal_history_today']) > 200:
+                        self.status['signal_history_today'] = self.status['signal_history_today'][-200:]
+            except Exception:
+                pass
+            logging.info(self.status['signal_status'])
 
+    def _apply_strategy_logic(self, snapshot):
         # Ensure we have at least two candles for signal/entry logic
-        if len(df) < 2:
+        if snapshot is None or snapshot['count'] < 2:
             self.status['signal_status'] = 'Not enough candles for signal identification.'
             return
 
-        current_candle = df.iloc[-1]
-        current_ema = current_candle['ema']
+        current_candle = snapshot['candle']
+        current_ema = snapshot['ema']
+        previous_candle = snapshot['prev_candle']
+        previous_ema = snapshot['prev_ema']
 
         # NOTE: Signal identification is now handled by _evaluate_signal_candle() 
         # which runs 20 seconds before candle close. This method only handles entry/exit logic.
@@ -1083,7 +1020,7 @@ class CaptureMountainSignal(BaseStrategy):
                 
                 if self.target_hit_candles >= 1: # If condition met for at least one candle
                     # Then if 2 consecutive candles CLOSE > 5 EMA -> Exit PE trade
-                    if len(df) >= 3 and df.iloc[-1]['close'] > df.iloc[-1]['ema'] and df.iloc[-2]['close'] > df.iloc[-2]['ema']:
+                    if snapshot['count'] >= 3 and current_candle['close'] > current_ema and previous_candle['close'] > previous_ema:
                         self.exit_price = current_candle['close']
                         self._add_audit_trail('target_hit', f"Target Profit hit at {self.exit_price:.2f} (PE)", {
                             'exit_price': self.exit_price,
@@ -1105,7 +1042,7 @@ class CaptureMountainSignal(BaseStrategy):
 
                 if self.target_hit_candles >= 1: # If condition met for at least one candle
                     # Then if 2 consecutive candles CLOSE < 5 EMA -> Exit CE trade
-                    if len(df) >= 3 and df.iloc[-1]['close'] < df.iloc[-1]['ema'] and df.iloc[-2]['close'] < df.iloc[-2]['ema']:
+                    if snapshot['count'] >= 3 and current_candle['close'] < current_ema and previous_candle['close'] < previous_ema:
                         self.exit_price = current_candle['close']
                         self._add_audit_trail('target_hit', f"Target Profit hit at {self.exit_price:.2f} (CE)", {
                             'exit_price': self.exit_price,
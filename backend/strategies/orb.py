@@ -1,5 +1,6 @@
 
 from .base_strategy import BaseStrategy
+from instrument_master import get_instrument_master
 import logging
 import datetime
 
@@ -18,6 +19,9 @@ class ORB(BaseStrategy):
     - **Sell Signal:** Price breaks below the opening range low.
     - **Stop Loss & Target:** Configurable percentages.
     """
+    # The opening range high/low is built from every tick, so backlogged ticks are never coalesced
+    coalesce_ticks = False
+
     def __init__(self, kite, instrument, candle_time, start_time, end_time, stop_loss, target_profit, total_lot, trailing_stop_loss, segment, trade_type, strike_price, expiry_type, strategy_name_input, paper_trade=False):
         super().__init__(kite, instrument, candle_time, start_time, end_time, stop_loss, target_profit, total_lot, trailing_stop_loss, segment, trade_type, strike_price, expiry_type, strategy_name_input)
         self.strategy_name_input = strategy_name_input
@@ -64,7 +68,8 @@ class ORB(BaseStrategy):
         return None
 
     def _get_atm_option_symbol(self, ltp, option_type):
-        instruments = self.kite.instruments('NFO')
+        master = get_instrument_master()
+        master.load(self.kite, 'NFO')
         
         # Filter instruments by expiry type
         today = datetime.date.today()
@@ -93,27 +98,14 @@ class ORB(BaseStrategy):
         else:
             expiry_date = today # Default to today if expiry_type is not recognized
 
-        # Format expiry date to match KiteConnect instrument format (YYYY-MM-DD)
-        expiry_date_str = expiry_date.strftime('%Y-%m-%d')
-
-        filtered_instruments = [inst for inst in instruments if 
-                                inst['name'] == self.instrument and 
-                                inst['instrument_type'] == option_type and
-                                inst['expiry'].strftime('%Y-%m-%d') == expiry_date_str]
-
-        # Find the nearest strike price
-        strike_prices = [inst['strike'] for inst in filtered_instruments]
-        if not strike_prices:
-            logging.warning(f"No strike prices found for {self.instrument} {option_type} with expiry {expiry_date_str}")
+        chain = master.chain(self.instrument, expiry_date)
+        atm_strike = chain.atm_strike(ltp, option_type) if chain else None
+        if atm_strike is None:
+            logging.warning(f"No strike prices found for {self.instrument} {option_type} with expiry {expiry_date.strftime('%Y-%m-%d')}")
             return None
 
-        atm_strike = min(strike_prices, key=lambda x:abs(x-ltp))
-
-        # Find the corresponding trading symbol
-        for inst in filtered_instruments:
-            if inst['strike'] == atm_strike:
-                return inst['tradingsymbol']
-        return None
+        inst = chain.option(atm_strike, option_type)
+        return inst['tradingsymbol'] if inst else None
 
     def _place_order(self, ltp, option_type):
         instrument_token_to_trade = self._get_atm_option_symbol(ltp, option_type)
@@ -124,8 +116,8 @@ class ORB(BaseStrategy):
         # Get trading symbol for logging
         trading_symbol = ""
         try:
-            instruments = self.kite.instruments('NFO')
-            instrument_details = next((item for item in instruments if item["instrument_token"] == instrument_token_to_trade), None)
+            get_instrument_master().load(self.kite, 'NFO')
+            instrument_details = get_instrument_master().get(instrument_token_to_trade)
             trading_symbol = instrument_details['tradingsymbol'] if instrument_details else f"Unknown ({instrument_token_to_trade})"
         except Exception as e:
             logging.error(f"Error fetching instrument details for {instrument_token_to_trade}: {e}")
@@ -0,0 +1,220 @@
+"""
+Off-thread strategy execution.
+
+Every running strategy gets its own ordered inbox of tick batches. A small
+worker pool services the inboxes; a strategy is only ever handled by one worker
+at a time, so its batches are processed in arrival order while a slow strategy
+(or a slow ``kite.ltp`` call inside it) no longer holds up the websocket thread
+or any other strategy.
+
+When an inbox is backlogged the pending batches are coalesced into one batch
+holding only the latest tick per instrument token, unless the submitter asks for
+every tick to be delivered. Coalescing inboxes are bounded and shed their oldest
+batch once full; non-coalescing inboxes never drop a batch and instead log a
+warning (and count ``backlog_warnings``) each time the backlog grows by another
+``max_batches``.
+"""
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+import config
+
+Handler = Callable[[List[Any]], None]
+
+
+def latest_per_token(ticks: List[Any]) -> List[Any]:
+    """Keep only the most recent tick for each instrument token, in arrival order"""
+    latest: Dict[Any, Any] = {}
+    for tick in ticks:
+        token = tick['instrument_token']
+        latest.pop(token, None)
+        latest[token] = tick
+    return list(latest.values())
+
+
+class _Inbox:
+    __slots__ = ('batches', 'handler', 'coalesce', 'scheduled', 'metrics')
+
+    def __init__(self):
+        self.batches: Deque[Tuple[float, List[Any]]] = deque()
+        self.handler: Optional[Handler] = None
+        self.coalesce = True
+        self.scheduled = False
+        self.metrics = {
+            'batches_enqueued': 0,
+            'batches_processed': 0,
+            'ticks_processed': 0,
+            'ticks_coalesced': 0,
+            'batches_dropped': 0,
+            'backlog_warnings': 0,
+            'max_queue_depth': 0,
+            'errors': 0,
+            'runs': 0,
+            'last_lag_ms': 0.0,
+            'max_lag_ms': 0.0,
+            'last_run_ms': 0.0,
+            'max_run_ms': 0.0,
+            'avg_run_ms': 0.0,
+        }
+
+
+class StrategyExecutor:
+    def __init__(self, workers: Optional[int] = None, max_batches: Optional[int] = None, coalesce_backlog: Optional[int] = None):
+        self.workers = workers or config.STRATEGY_EXECUTOR_WORKERS
+        self.max_batches = max_batches or config.STRATEGY_INBOX_MAX_BATCHES
+        self.coalesce_backlog = coalesce_backlog or config.STRATEGY_COALESCE_BACKLOG
+        self.inboxes: Dict[str, _Inbox] = {}
+        self.ready: "queue.Queue[Optional[str]]" = queue.Queue()
+        self.lock = threading.Lock()
+        self.threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        with self.lock:
+            if self.threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._worker, name=f'strategy-executor-{i}', daemon=True)
+                thread.start()
+                self.threads.append(thread)
+        logging.info(f"Strategy executor started with {self.workers} workers")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self.lock:
+            threads, self.threads = self.threads, []
+        for _ in threads:
+            self.ready.put(None)
+        for thread in threads:
+            thread.join(timeout)
+
+    def submit(self, key: str, ticks: List[Any], handler: Handler, coalesce: bool = True) -> None:
+        """Queue a tick batch for ``key``; called from the websocket thread and never blocks"""
+        if not ticks:
+            return
+        with self.lock:
+            inbox = self.inboxes.get(key)
+            if inbox is None:
+                inbox = self.inboxes[key] = _Inbox()
+            inbox.handler = handler
+            inbox.coalesce = coalesce
+            inbox.batches.append((time.monotonic(), ticks))
+            depth = len(inbox.batches)
+            inbox.metrics['batches_enqueued'] += 1
+            inbox.metrics['max_queue_depth'] = max(inbox.metrics['max_queue_depth'], depth)
+            if depth > self.max_batches:
+                if coalesce:
+                    # Bounded inbox: the oldest batch goes first
+                    inbox.batches.popleft()
+                    inbox.metrics['batches_dropped'] += 1
+                elif depth % self.max_batches == 1:
+                    # Every tick must be delivered, so keep the batch and surface the backlog instead
+                    inbox.metrics['backlog_warnings'] += 1
+                    logging.warning(f"Strategy executor inbox for {key} is {depth} batches behind and does not coalesce; no ticks dropped")
+            if inbox.scheduled:
+                return
+            inbox.scheduled = True
+        self.ready.put(key)
+
+    def forget(self, key: str) -> None:
+        """Drop the inbox and metrics of a strategy that is no longer running"""
+        with self.lock:
+            inbox = self.inboxes.get(key)
+            if inbox is not None:
+                inbox.batches.clear()
+                inbox.handler = None
+                if not inbox.scheduled:
+                    del self.inboxes[key]
+
+    def _take(self, inbox: _Inbox) -> Tuple[float, List[Any]]:
+        """Pop everything pending for an inbox (caller holds the lock)"""
+        oldest = inbox.batches[0][0]
+        if len(inbox.batches) == 1:
+            return oldest, inbox.batches.popleft()[1]
+        ticks: List[Any] = []
+        while inbox.batches:
+            ticks.extend(inbox.batches.popleft()[1])
+        return oldest, ticks
+
+    def _worker(self) -> None:
+        while True:
+            key = self.ready.get()
+            if key is None:
+                return
+            with self.lock:
+                inbox = self.inboxes.get(key)
+                if inbox is None or not inbox.batches or inbox.handler is None:
+                    if inbox is not None:
+                        inbox.scheduled = False
+                        if inbox.handler is None and self.inboxes.get(key) is inbox:
+                            del self.inboxes[key]
+                    continue
+                pending = len(inbox.batches)
+                oldest, ticks = self._take(inbox)
+                handler = inbox.handler
+                coalesce = inbox.coalesce
+
+            received = len(ticks)
+            if coalesce and pending >= self.coalesce_backlog:
+                ticks = latest_per_token(ticks)
+
+            started = time.monotonic()
+            lag_ms = (started - oldest) * 1000.0
+            failed = False
+            try:
+                handler(ticks)
+            except Exception as e:
+                failed = True
+                logging.error(f"Strategy executor handler for {key} failed: {e}", exc_info=True)
+            run_ms = (time.monotonic() - started) * 1000.0
+
+            with self.lock:
+                m = inbox.metrics
+                m['batches_processed'] += pending
+                m['ticks_processed'] += len(ticks)
+                m['ticks_coalesced'] += received - len(ticks)
+                m['errors'] += int(failed)
+                m['last_lag_ms'] = lag_ms
+                m['max_lag_ms'] = max(m['max_lag_ms'], lag_ms)
+                m['last_run_ms'] = run_ms
+                m['max_run_ms'] = max(m['max_run_ms'], run_ms)
+                m['runs'] += 1
+                m['avg_run_ms'] += (run_ms - m['avg_run_ms']) / m['runs']
+                if inbox.batches:
+                    reschedule = True
+                else:
+                    reschedule = inbox.scheduled = False
+                    if self.inboxes.get(key) is inbox and inbox.handler is None:
+                        del self.inboxes[key]
+            if reschedule:
+                # Requeue behind other ready strategies so one busy inbox cannot starve the pool
+                self.ready.put(key)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            strategies = {
+                key: dict(inbox.metrics, queue_depth=len(inbox.batches))
+                for key, inbox in self.inboxes.items()
+            }
+        return {
+            'workers': self.workers,
+            'running': any(thread.is_alive() for thread in self.threads),
+            'ready_queue': self.ready.qsize(),
+            'strategies': strategies,
+        }
+
+
+_strategy_executor = None
+_strategy_executor_lock = threading.Lock()
+
+
+def get_strategy_executor() -> StrategyExecutor:
+    global _strategy_executor
+    if _strategy_executor is None:
+        with _strategy_executor_lock:
+            if _strategy_executor is None:
+                _strategy_executor = StrategyExecutor()
+                _strategy_executor.start()
+    return _strategy_executor
@@ -0,0 +1,175 @@
+"""
+Versioned strategy_update protocol.
+
+Each strategy room has a stream with a monotonically increasing sequence
+number. The first update (and every resync) is a full snapshot; after that only
+deltas are emitted:
+
+    {'type': 'snapshot', 'seq': n, 'strategy_id': ..., <full strategy_update payload>}
+    {'type': 'delta', 'seq': n, 'strategy_id': ...,
+     'metrics': {<changed metric fields>},
+     'audit_append': [<new audit entries>],
+     'candles': {'drop': d, 'from': i, 'items': [...]},
+     <changed top-level fields>}
+
+A client applies ``candles`` by dropping ``d`` candles from the front, truncating
+at ``from`` and appending ``items``. A client that sees a sequence gap emits
+``strategy_resync`` and receives the snapshot matching the latest sequence.
+
+Payloads reference the strategy's live status objects (option_prices,
+signal_history_today, ...), which the strategy keeps changing in place, so the
+stream diffs and stores a detached copy; otherwise the retained state would
+change along with the strategy and those changes would never produce a delta.
+"""
+import copy
+import threading
+from typing import Any, Dict, List, Optional
+
+PROTOCOL_VERSION = 2
+
+# Audit entries ride in metrics.audit_trail on snapshots but are appended via audit_append in deltas
+AUDIT_WINDOW = 50
+
+
+def _candle_delta(previous: List[Dict[str, Any]], current: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Describe how to turn ``previous`` into ``current`` (None if unchanged)"""
+    drop = 0
+    if previous and current:
+        first_time = current[0].get('time')
+        for i, candle in enumerate(previous):
+            if candle.get('time') == first_time:
+                drop = i
+                break
+        else:
+            drop = len(previous)
+    elif previous:
+        drop = len(previous)
+    shifted = previous[drop:]
+    start = 0
+    while start < len(current) and start < len(shifted):
+        if current[start] is not shifted[start] and current[start] != shifted[start]:
+            break
+        start += 1
+    if drop == 0 and start == len(current) == len(shifted):
+        return None
+    return {'drop': drop, 'from': start, 'items': current[start:]}
+
+
+def _audit_append(previous: List[Any], current: List[Any]) -> List[Any]:
+    """Entries at the end of ``current`` that are not in ``previous``"""
+    if not previous:
+        return list(current)
+    last = previous[-1]
+    for i in range(len(current) - 1, -1, -1):
+        if current[i] is last or current[i] == last:
+            return current[i + 1:]
+    return list(current)
+
+
+def _detach(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a payload that later in-place changes to the strategy's status cannot reach.
+
+    historical_candles is rebuilt on every update from serialised candles that
+    are never modified afterwards, so its list is copied but not its items.
+    """
+    state = {}
+    for key, value in payload.items():
+        if key == 'historical_candles':
+            state[key] = list(value)
+        elif isinstance(value, (dict, list)):
+            state[key] = copy.deepcopy(value)
+        else:
+            state[key] = value
+    return state
+
+
+class StrategyStream:
+    def __init__(self, strategy_id: str):
+        self.strategy_id = strategy_id
+        self.seq = 0
+        self.state: Optional[Dict[str, Any]] = None
+        self.lock = threading.Lock()
+
+    def encode(self, payload: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Return the next message for a full strategy_update payload (None if nothing changed)"""
+        payload = _detach(payload)
+        with self.lock:
+            previous = self.state
+            if previous is None:
+                self.state = payload
+                self.seq += 1
+                return self._snapshot()
+
+            delta: Dict[str, Any] = {}
+            metrics = payload.get('metrics', {})
+            old_metrics = previous.get('metrics', {})
+            changed = {
+                key: value for key, value in metrics.items()
+                if key != 'audit_trail' and old_metrics.get(key) != value
+            }
+            if changed:
+                delta['metrics'] = changed
+            appended = _audit_append(old_metrics.get('audit_trail', []), metrics.get('audit_trail', []))
+            if appended:
+                delta['audit_append'] = appended
+
+            candles = _candle_delta(previous.get('historical_candles', []), payload.get('historical_candles', []))
+            if candles is not None:
+                delta['candles'] = candles
+
+            for key, value in payload.items():
+                if key in ('metrics', 'historical_candles', 'log', 'strategy_id'):
+                    continue
+                if previous.get(key) != value:
+                    delta[key] = value
+
+            if not delta:
+                return None
+            # The log line only describes this update, so it is not diffed
+            if 'log' in payload:
+                delta['log'] = payload['log']
+            self.state = payload
+            self.seq += 1
+            delta.update({'type': 'delta', 'version': PROTOCOL_VERSION, 'seq': self.seq, 'strategy_id': self.strategy_id})
+            return delta
+
+    def _snapshot(self) -> Dict[str, Any]:
+        snapshot = dict(self.state)
+        snapshot.update({'type': 'snapshot', 'version': PROTOCOL_VERSION, 'seq': self.seq, 'strategy_id': self.strategy_id})
+        return snapshot
+
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        """Full state matching the latest sequence number, for new subscribers and resyncs"""
+        with self.lock:
+            if self.state is None:
+                return None
+            return self._snapshot()
+
+
+class StrategyStreams:
+    def __init__(self):
+        self.streams: Dict[str, StrategyStream] = {}
+        self.lock = threading.Lock()
+
+    def get(self, room: str, strategy_id: str) -> StrategyStream:
+        with self.lock:
+            stream = self.streams.get(room)
+            if stream is None:
+                stream = self.streams[room] = StrategyStream(strategy_id)
+            return stream
+
+    def snapshot(self, room: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            stream = self.streams.get(room)
+        return stream.snapshot() if stream else None
+
+    def discard(self, room: str) -> None:
+        with self.lock:
+            self.streams.pop(room, None)
+
+
+_strategy_streams = StrategyStreams()
+
+
+def get_strategy_streams() -> StrategyStreams:
+    return _strategy_streams
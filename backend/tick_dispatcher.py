@@ -0,0 +1,167 @@
+"""
+Token-indexed tick dispatch for running strategies.
+
+Instead of handing every tick batch to every running strategy, the dispatcher
+keeps a ``token -> [run_id]`` subscription index built from each strategy's
+declared instruments and delivers each strategy only its own ticks, parsed once
+into compact TickRecord objects.
+"""
+import datetime
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class StrategyRegistry(dict):
+    """dict of running strategies that bumps ``version`` on every membership change"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.version = 0
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.version += 1
+
+    def __delitem__(self, key):
+        super().__delitem__(key)
+        self.version += 1
+
+    def pop(self, key, *args):
+        result = super().pop(key, *args)
+        self.version += 1
+        return result
+
+    def popitem(self):
+        result = super().popitem()
+        self.version += 1
+        return result
+
+    def clear(self):
+        super().clear()
+        self.version += 1
+
+    def update(self, *args, **kwargs):
+        super().update(*args, **kwargs)
+        self.version += 1
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self.version += 1
+        return super().setdefault(key, default)
+
+
+class TickRecord:
+    """Compact parsed tick. Supports the dict-style access strategies already use."""
+
+    __slots__ = ('instrument_token', 'last_price', 'timestamp', 'volume', 'oi')
+
+    def __init__(self, instrument_token: int, last_price: float, timestamp: Optional[datetime.datetime], volume: int = 0, oi: int = 0):
+        self.instrument_token = instrument_token
+        self.last_price = last_price
+        self.timestamp = timestamp
+        self.volume = volume
+        self.oi = oi
+
+    @classmethod
+    def from_tick(cls, tick: Dict[str, Any]) -> 'TickRecord':
+        timestamp = tick.get('timestamp') or tick.get('last_trade_time') or tick.get('exchange_timestamp')
+        if isinstance(timestamp, (int, float)):
+            timestamp = datetime.datetime.fromtimestamp(timestamp)
+        return cls(
+            tick['instrument_token'],
+            tick['last_price'],
+            timestamp,
+            tick.get('volume_traded', tick.get('volume', 0)) or 0,
+            tick.get('oi', 0) or 0,
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        if key in self.__slots__:
+            return getattr(self, key)
+        raise KeyError(key)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__slots__ and getattr(self, key) is not None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self.__slots__:
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __repr__(self) -> str:
+        return f"TickRecord(token={self.instrument_token}, price={self.last_price}, ts={self.timestamp})"
+
+
+def declared_tokens(strategy: Any) -> Optional[List[int]]:
+    """Tokens a strategy wants ticks for; None means it receives every tick"""
+    if hasattr(strategy, 'subscribed_tokens'):
+        tokens = strategy.subscribed_tokens()
+    else:
+        token = getattr(strategy, 'instrument_token', None)
+        tokens = [token] if token is not None else []
+    tokens = [int(token) for token in tokens if token is not None]
+    return tokens or None
+
+
+class TickDispatcher:
+    def __init__(self, running_strategies: Dict[str, Dict[str, Any]]):
+        self.running_strategies = running_strategies
+        self.lock = threading.Lock()
+        self.index: Dict[int, List[str]] = {}
+        self.wildcard: List[str] = []
+        self.indexed_version: Optional[int] = None
+        self.indexed_tokens: Dict[str, Tuple[int, ...]] = {}
+
+    def _registry_version(self) -> Optional[int]:
+        return getattr(self.running_strategies, 'version', None)
+
+    def rebuild(self) -> None:
+        """Rebuild the token -> run_id index from the running strategies"""
+        index: Dict[int, List[str]] = {}
+        wildcard: List[str] = []
+        indexed_tokens: Dict[str, Tuple[int, ...]] = {}
+        for run_id, strategy_info in list(self.running_strategies.items()):
+            tokens = declared_tokens(strategy_info.get('strategy'))
+            if tokens is None:
+                wildcard.append(run_id)
+                continue
+            indexed_tokens[run_id] = tuple(tokens)
+            for token in tokens:
+                index.setdefault(token, []).append(run_id)
+        with self.lock:
+            self.index = index
+            self.wildcard = wildcard
+            self.indexed_tokens = indexed_tokens
+            self.indexed_version = self._registry_version()
+        logging.info(f"Tick dispatcher indexed {len(indexed_tokens)} strategies over {len(index)} tokens ({len(wildcard)} unfiltered)")
+
+    def _ensure_index(self) -> None:
+        version = self._registry_version()
+        if version is None or version != self.indexed_version:
+            self.rebuild()
+
+    def dispatch(self, ticks: List[Dict[str, Any]]) -> Iterator[Tuple[str, Dict[str, Any], List[Any]]]:
+        """Yield (run_id, strategy_info, ticks_for_strategy) for strategies with relevant ticks"""
+        self._ensure_index()
+        with self.lock:
+            index = self.index
+            wildcard = self.wildcard
+
+        per_strategy: Dict[str, List[TickRecord]] = {}
+        all_records: List[TickRecord] = []
+        for tick in ticks:
+            record = TickRecord.from_tick(tick)
+            if wildcard:
+                all_records.append(record)
+            for run_id in index.get(record.instrument_token, ()):
+                per_strategy.setdefault(run_id, []).append(record)
+        for run_id in wildcard:
+            per_strategy[run_id] = all_records
+
+        for run_id, records in per_strategy.items():
+            strategy_info = self.running_strategies.get(run_id)
+            if strategy_info is None or not records:
+                continue
+            yield run_id, strategy_info, records
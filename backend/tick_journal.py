@@ -0,0 +1,295 @@
+"""
+Append-only binary tick journal.
+
+Each tick is a fixed-width little-endian record (epoch-ns, token, price, volume,
+OI) appended to ``<root>/<YYYY-MM-DD>/<instrument_token>.ticks``. Every
+INDEX_STRIDE-th record is also written to a sparse ``.idx`` file of
+(epoch-ns, record number) pairs so time-range reads can seek without scanning.
+Segments are read through numpy memory maps for replay and backtests.
+
+SQLite only keeps per-segment metadata and rollups (record count, first/last
+timestamp, price range) in tick_journal_segments.
+"""
+import datetime
+import logging
+import os
+import sqlite3
+import threading
+from typing import Any, Dict, Iterable, List
+
+import numpy as np
+
+import config
+from database import get_db_connection
+
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
+
+TICK_DTYPE = np.dtype([
+    ('ts_ns', '<i8'),
+    ('token', '<u4'),
+    ('price', '<f8'),
+    ('volume', '<u8'),
+    ('oi', '<u8'),
+])
+INDEX_DTYPE = np.dtype([
+    ('ts_ns', '<i8'),
+    ('record', '<i8'),
+])
+INDEX_STRIDE = 256
+
+
+def to_epoch_ns(ts: datetime.datetime) -> int:
+    """Tick timestamps from Kite are naive IST datetimes"""
+    if ts.tzinfo is None:
+        ts = ts.replace(tzinfo=IST)
+    return int(ts.timestamp()) * 1_000_000_000 + ts.microsecond * 1000
+
+
+def from_epoch_ns(ts_ns: int) -> datetime.datetime:
+    return datetime.datetime.fromtimestamp(ts_ns / 1_000_000_000, IST).replace(tzinfo=None)
+
+
+def ensure_tick_journal_tables() -> None:
+    conn = get_db_connection()
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS tick_journal_segments (
+            day TEXT NOT NULL,
+            instrument_token INTEGER NOT NULL,
+            record_count INTEGER NOT NULL DEFAULT 0,
+            first_ts TEXT,
+            last_ts TEXT,
+            low_price REAL,
+            high_price REAL,
+            last_price REAL,
+            PRIMARY KEY (day, instrument_token)
+        )
+    """)
+    conn.commit()
+    conn.close()
+
+
+class TickJournal:
+    def __init__(self, root_dir: str):
+        self.root_dir = root_dir
+        self.lock = threading.Lock()
+        self.record_counts: Dict[str, int] = {}
+        os.makedirs(root_dir, exist_ok=True)
+        ensure_tick_journal_tables()
+
+    def _segment_path(self, day: datetime.date, instrument_token: int) -> str:
+        return os.path.join(self.root_dir, day.isoformat(), f"{int(instrument_token)}.ticks")
+
+    def _segment_records(self, path: str) -> int:
+        count = self.record_counts.get(path)
+        if count is None:
+            count = os.path.getsize(path) // TICK_DTYPE.itemsize if os.path.exists(path) else 0
+            self.record_counts[path] = count
+        return count
+
+    def append(self, conn, ticks: Iterable[Dict[str, Any]]) -> int:
+        """Append parsed ticks (dicts with ts, instrument_token, last_price, volume, oi).
+
+        Segment metadata is upserted on ``conn``; the caller owns the transaction.
+        """
+        groups: Dict[tuple, List[tuple]] = {}
+        for tick in ticks:
+            ts = tick['ts']
+            groups.setdefault((ts.date(), int(tick['instrument_token'])), []).append((
+                to_epoch_ns(ts),
+                int(tick['instrument_token']),
+                float(tick['last_price']),
+                int(tick.get('volume') or 0),
+                int(tick.get('oi') or 0),
+            ))
+
+        written = 0
+        with self.lock:
+            for (day, instrument_token), rows in groups.items():
+                records = np.array(rows, dtype=TICK_DTYPE)
+                path = self._segment_path(day, instrument_token)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                start = self._segment_records(path)
+                with open(path, 'ab') as fh:
+                    fh.write(records.tobytes())
+                self.record_counts[path] = start + len(records)
+
+                # Sparse index entries for every record number that is a multiple of the stride
+                first_indexed = -(-start // INDEX_STRIDE) * INDEX_STRIDE
+                positions = np.arange(first_indexed, start + len(records), INDEX_STRIDE)
+                if len(positions):
+                    index = np.empty(len(positions), dtype=INDEX_DTYPE)
+                    index['ts_ns'] = records['ts_ns'][positions - start]
+                    index['record'] = positions
+                    with open(path[:-6] + '.idx', 'ab') as fh:
+                        fh.write(index.tobytes())
+
+                conn.execute("""
+                    INSERT INTO tick_journal_segments (day, instrument_token, record_count, first_ts, last_ts, low_price, high_price, last_price)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(day, instrument_token) DO UPDATE SET
+                        record_count = record_count + excluded.record_count,
+                        last_ts = excluded.last_ts,
+                        low_price = MIN(low_price, excluded.low_price),
+                        high_price = MAX(high_price, excluded.high_price),
+                        last_price = excluded.last_price
+                """, (
+                    day.isoformat(),
+                    instrument_token,
+                    len(records),
+                    from_epoch_ns(int(records['ts_ns'][0])).strftime('%Y-%m-%d %H:%M:%S'),
+                    from_epoch_ns(int(records['ts_ns'][-1])).strftime('%Y-%m-%d %H:%M:%S'),
+                    float(records['price'].min()),
+                    float(records['price'].max()),
+                    float(records['price'][-1]),
+                ))
+                written += len(records)
+        return written
+
+    def open_segment(self, day: datetime.date, instrument_token: int) -> np.ndarray:
+        """Memory-map one segment (empty array if it does not exist)"""
+        path = self._segment_path(day, instrument_token)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=TICK_DTYPE)
+        count = os.path.getsize(path) // TICK_DTYPE.itemsize
+        if count == 0:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.memmap(path, dtype=TICK_DTYPE, mode='r', shape=(count,))
+
+    def _seek(self, day: datetime.date, instrument_token: int, start_ns: int) -> int:
+        """Record number at or before the first record >= start_ns, using the sparse index"""
+        index_path = self._segment_path(day, instrument_token)[:-6] + '.idx'
+        if not os.path.exists(index_path) or os.path.getsize(index_path) < INDEX_DTYPE.itemsize:
+            return 0
+        index = np.fromfile(index_path, dtype=INDEX_DTYPE)
+        pos = int(np.searchsorted(index['ts_ns'], start_ns, side='left')) - 1
+        return int(index['record'][pos]) if pos >= 0 else 0
+
+    def read_range(self, instrument_token: int, start: datetime.datetime, end: datetime.datetime) -> np.ndarray:
+        """Return records for a token between two naive IST datetimes (inclusive)"""
+        start_ns = to_epoch_ns(start)
+        end_ns = to_epoch_ns(end)
+        parts = []
+        day = start.date()
+        while day <= end.date():
+            segment = self.open_segment(day, instrument_token)
+            if len(segment):
+                offset = self._seek(day, instrument_token, start_ns)
+                window = segment[offset:]
+                lo = int(np.searchsorted(window['ts_ns'], start_ns, side='left'))
+                hi = int(np.searchsorted(window['ts_ns'], end_ns, side='right'))
+                if hi > lo:
+                    parts.append(window[lo:hi])
+            day += datetime.timedelta(days=1)
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def tail(self, instrument_token: int, limit: int = 100) -> np.ndarray:
+        """Most recent records for a token, newest first"""
+        conn = get_db_connection()
+        days = [row['day'] for row in conn.execute(
+            'SELECT day FROM tick_journal_segments WHERE instrument_token = ? ORDER BY day DESC',
+            (int(instrument_token),)
+        ).fetchall()]
+        conn.close()
+        parts = []
+        remaining = limit
+        for day in days:
+            segment = self.open_segment(datetime.date.fromisoformat(day), instrument_token)
+            if not len(segment):
+                continue
+            chunk = segment[-remaining:][::-1]
+            parts.append(np.array(chunk))
+            remaining -= len(chunk)
+            if remaining <= 0:
+                break
+        if not parts:
+            return np.empty(0, dtype=TICK_DTYPE)
+        return np.concatenate(parts)
+
+    def summary(self, instrument_token: int) -> Dict[str, Any]:
+        """Record count and last timestamp for a token from the SQLite metadata"""
+        conn = get_db_connection()
+        row = conn.execute(
+            'SELECT SUM(record_count) AS row_count, MAX(last_ts) AS last_ts FROM tick_journal_segments WHERE instrument_token = ?',
+            (int(instrument_token),)
+        ).fetchone()
+        conn.close()
+        return {
+            'row_count': int(row['row_count'] or 0) if row else 0,
+            'last_collected_at': row['last_ts'] if row and row['last_ts'] else None,
+        }
+
+
+def records_to_ticks(records: np.ndarray) -> List[Dict[str, Any]]:
+    """Convert journal records into the tick_data row shape used by replay endpoints"""
+    return [
+        {
+            'instrument_token': int(token),
+            'timestamp': from_epoch_ns(int(ts_ns)).strftime('%Y-%m-%d %H:%M:%S'),
+            'last_price': float(price),
+            'volume': int(volume),
+            'oi': int(oi),
+        }
+        for ts_ns, token, price, volume, oi in zip(
+            records['ts_ns'].tolist(),
+            records['token'].tolist(),
+            records['price'].tolist(),
+            records['volume'].tolist(),
+            records['oi'].tolist(),
+        )
+    ]
+
+
+# Pre-journal tables; kept readable until migrate_database.migrate_tick_tables_to_journal has run
+LEGACY_TICK_TABLES = ('tick_data', 'market_data')
+
+
+def read_legacy_ticks(conn, instrument_token: int, start: datetime.datetime = None,
+                      end: datetime.datetime = None, limit: int = None) -> List[Dict[str, Any]]:
+    """Rows for a token from the old tick_data / market_data tables, in records_to_ticks shape.
+
+    Returns ticks oldest first, or newest first when ``limit`` is given (like tail).
+    The first table holding rows for the token wins; missing tables are skipped.
+    """
+    for table in LEGACY_TICK_TABLES:
+        query = f'SELECT instrument_token, timestamp, last_price, volume FROM {table} WHERE instrument_token = ? AND last_price IS NOT NULL'
+        params: List[Any] = [int(instrument_token)]
+        if start is not None and end is not None:
+            query += ' AND timestamp BETWEEN ? AND ?'
+            params += [start.strftime('%Y-%m-%d %H:%M:%S'), end.strftime('%Y-%m-%d %H:%M:%S')]
+        if limit is not None:
+            query += ' ORDER BY timestamp DESC LIMIT ?'
+            params.append(int(limit))
+        else:
+            query += ' ORDER BY timestamp'
+        try:
+            rows = conn.execute(query, params).fetchall()
+        except sqlite3.OperationalError:
+            continue
+        if rows:
+            return [
+                {
+                    'instrument_token': int(row['instrument_token']),
+                    'timestamp': str(row['timestamp'])[:19],
+                    'last_price': float(row['last_price']),
+                    'volume': int(row['volume'] or 0),
+                    'oi': 0,
+                }
+                for row in rows
+            ]
+    return []
+
+
+_tick_journal = None
+_tick_journal_lock = threading.Lock()
+
+
+def get_tick_journal() -> TickJournal:
+    global _tick_journal
+    if _tick_journal is None:
+        with _tick_journal_lock:
+            if _tick_journal is None:
+                _tick_journal = TickJournal(config.TICK_JOURNAL_DIR)
+                logging.info(f"Tick journal at {config.TICK_JOURNAL_DIR}")
+    return _tick_journal
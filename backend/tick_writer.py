@@ -0,0 +1,193 @@
+"""
+Batched background persistence for websocket ticks.
+
+Ticker.on_ticks only enqueues the raw batch; a single writer thread drains the
+bounded queue once per flush interval, appends the ticks to the binary tick
+journal and updates the segment metadata in one SQLite transaction. The
+database is switched to WAL mode so readers never block the writer.
+"""
+import datetime
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import config
+from database import get_db_connection
+from tick_journal import get_tick_journal
+
+# Index instruments are always journaled, independent of tick_data_status
+INDEX_TOKENS = {256265, 260105}
+
+
+def tick_timestamp(tick: Dict[str, Any]) -> Optional[datetime.datetime]:
+    """Extract the tick time the same way the strategies do"""
+    timestamp = tick.get('timestamp') or tick.get('last_trade_time') or tick.get('exchange_timestamp')
+    if not timestamp:
+        return None
+    if isinstance(timestamp, datetime.datetime):
+        return timestamp
+    return datetime.datetime.fromtimestamp(timestamp)
+
+
+class TickWriter:
+    def __init__(self, max_queue: Optional[int] = None, flush_interval: Optional[float] = None, status_refresh_seconds: float = 5.0):
+        self.queue: "queue.Queue[Tuple[float, List[Dict[str, Any]]]]" = queue.Queue(maxsize=max_queue or config.TICK_WRITER_QUEUE_SIZE)
+        self.flush_interval = flush_interval if flush_interval is not None else config.TICK_WRITER_FLUSH_INTERVAL
+        self.status_refresh_seconds = status_refresh_seconds
+        self.journal = get_tick_journal()
+        self.recording_tokens: set = set()
+        self.status_loaded_at = 0.0
+        self.thread: Optional[threading.Thread] = None
+        self.stop_event = threading.Event()
+        self.lock = threading.Lock()
+        self.metrics = {
+            'batches_enqueued': 0,
+            'ticks_enqueued': 0,
+            'dropped_ticks': 0,
+            'flushes': 0,
+            'records_written': 0,
+            'skipped_no_timestamp': 0,
+            'write_errors': 0,
+            'last_flush_ms': 0.0,
+            'max_flush_ms': 0.0,
+            'avg_flush_ms': 0.0,
+            'last_enqueue_to_write_ms': 0.0,
+        }
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.thread = threading.Thread(target=self._run, name='tick-writer', daemon=True)
+            self.thread.start()
+        logging.info("Tick writer started")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def enqueue(self, ticks: List[Dict[str, Any]]) -> bool:
+        """Called from the websocket thread; never blocks"""
+        try:
+            self.queue.put_nowait((time.monotonic(), ticks))
+        except queue.Full:
+            with self.lock:
+                self.metrics['dropped_ticks'] += len(ticks)
+            return False
+        with self.lock:
+            self.metrics['batches_enqueued'] += 1
+            self.metrics['ticks_enqueued'] += len(ticks)
+        return True
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = dict(self.metrics)
+        metrics['queue_depth'] = self.queue.qsize()
+        metrics['queue_capacity'] = self.queue.maxsize
+        metrics['running'] = bool(self.thread and self.thread.is_alive())
+        return metrics
+
+    def _refresh_recording_tokens(self, conn) -> None:
+        now = time.monotonic()
+        if now - self.status_loaded_at < self.status_refresh_seconds:
+            return
+        rows = conn.execute("SELECT instrument_token FROM tick_data_status WHERE status = 'Running'").fetchall()
+        self.recording_tokens = {row[0] for row in rows}
+        self.status_loaded_at = now
+
+    def _drain(self) -> Tuple[List[Dict[str, Any]], Optional[float]]:
+        ticks: List[Dict[str, Any]] = []
+        oldest: Optional[float] = None
+        while True:
+            try:
+                enqueued_at, batch = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if oldest is None:
+                oldest = enqueued_at
+            ticks.extend(batch)
+        return ticks, oldest
+
+    def _flush(self, conn, ticks: List[Dict[str, Any]], oldest: Optional[float]) -> None:
+        started = time.monotonic()
+        self._refresh_recording_tokens(conn)
+        records = []
+        skipped = 0
+        for tick in ticks:
+            instrument_token = tick['instrument_token']
+            # Recording tokens are journaled on demand; index ticks are always kept (formerly market_data)
+            if instrument_token not in self.recording_tokens and instrument_token not in INDEX_TOKENS:
+                continue
+            ts = tick_timestamp(tick)
+            if ts is None:
+                skipped += 1
+                continue
+            records.append({
+                'ts': ts,
+                'instrument_token': instrument_token,
+                'last_price': tick['last_price'],
+                'volume': tick.get('volume_traded', tick.get('volume', 0)),
+                'oi': tick.get('oi', 0),
+            })
+
+        written = 0
+        try:
+            with conn:
+                if records:
+                    written = self.journal.append(conn, records)
+        except Exception as e:
+            logging.error(f"Error writing tick batch ({len(records)} records): {e}")
+            with self.lock:
+                self.metrics['write_errors'] += 1
+            return
+
+        elapsed_ms = (time.monotonic() - started) * 1000.0
+        with self.lock:
+            m = self.metrics
+            m['flushes'] += 1
+            m['records_written'] += written
+            m['skipped_no_timestamp'] += skipped
+            m['last_flush_ms'] = elapsed_ms
+            m['max_flush_ms'] = max(m['max_flush_ms'], elapsed_ms)
+            m['avg_flush_ms'] += (elapsed_ms - m['avg_flush_ms']) / m['flushes']
+            if oldest is not None:
+                m['last_enqueue_to_write_ms'] = (time.monotonic() - oldest) * 1000.0
+
+    def _run(self) -> None:
+        conn = get_db_connection()
+        try:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+        except Exception as e:
+            logging.warning(f"Could not enable WAL mode for tick writer: {e}")
+        try:
+            while not self.stop_event.is_set():
+                self.stop_event.wait(self.flush_interval)
+                ticks, oldest = self._drain()
+                if ticks:
+                    self._flush(conn, ticks, oldest)
+            ticks, oldest = self._drain()
+            if ticks:
+                self._flush(conn, ticks, oldest)
+        except Exception as e:
+            logging.error(f"Tick writer stopped unexpectedly: {e}", exc_info=True)
+        finally:
+            conn.close()
+
+
+_tick_writer = None
+_tick_writer_lock = threading.Lock()
+
+
+def get_tick_writer() -> TickWriter:
+    global _tick_writer
+    if _tick_writer is None:
+        with _tick_writer_lock:
+            if _tick_writer is None:
+                _tick_writer = TickWriter()
+                _tick_writer.start()
+    return _tick_writer
@@ -1,10 +1,56 @@
 
-from kiteconnect import KiteTicker
+import contextlib
 import logging
 import datetime
+import functools
+import config
+if config.USE_FAKE_KITE:
+    from fake_kite import FakeKiteTicker as KiteTicker
+else:
+    from kiteconnect import KiteTicker
+from candle_aggregator import get_candle_aggregators
 from database import get_db_connection
+from price_board import get_price_board
+from strategy_executor import get_strategy_executor
+from strategy_stream import get_strategy_streams
+from tick_dispatcher import TickDispatcher
+from tick_writer import get_tick_writer
+from update_emitter import get_update_emitter
 from utils import get_option_symbols
 
+# Executor inbox used for the frontend market_data broadcast
+MARKET_DATA_KEY = '_market_data'
+
+
+def _candle_field(candle, field, default=None):
+    return candle.get(field, default) if isinstance(candle, dict) else getattr(candle, field, default)
+
+
+def _serialize_candle(candle):
+    candle_date = _candle_field(candle, 'date')
+    if candle_date:
+        if isinstance(candle_date, datetime.datetime):
+            date_str = candle_date.isoformat()
+        else:
+            date_str = str(candle_date)
+    else:
+        date_str = datetime.datetime.now().isoformat()
+    return {
+        'time': date_str,
+        'open': _candle_field(candle, 'open', 0),
+        'high': _candle_field(candle, 'high', 0),
+        'low': _candle_field(candle, 'low', 0),
+        'close': _candle_field(candle, 'close', 0),
+        'volume': _candle_field(candle, 'volume', 0)
+    }
+
+
+def _is_today(candle_time, today):
+    try:
+        return datetime.datetime.fromisoformat(candle_time).date() == today
+    except (TypeError, ValueError):
+        return False
+
 class Ticker:
     def __init__(self, api_key, access_token, running_strategies, socketio, kite):
         self.kws = KiteTicker(api_key, access_token)
@@ -15,313 +61,320 @@ class Ticker:
         self.kws.on_connect = self.on_connect
         self.kws.on_close = self.on_close
         self.db_connection = get_db_connection() # Initialize DB connection here
+        self.tick_writer = get_tick_writer()
+        self.candle_aggregators = get_candle_aggregators()
+        self.price_board = get_price_board()
+        self.dispatcher = TickDispatcher(running_strategies)
+        self.executor = get_strategy_executor()
+        self.emitter = get_update_emitter(socketio)
+        self.chart_cache = {}
+        self.audit_cursor = {}
+        self.trade_event_emitted = {}
+        self.streams = get_strategy_streams()
 
     def on_ticks(self, ws, ticks):
+        # Persistence happens on the tick writer thread so the websocket thread never waits on SQLite
+        self.tick_writer.enqueue(ticks)
+
+        # Shared candles and last prices are updated in arrival order before any strategy sees these ticks
+        self.candle_aggregators.feed(ticks)
+        self.price_board.update(ticks)
+
+        # Strategies and the frontend broadcast run on the strategy executor; this thread only enqueues.
+        # The dispatcher yields only strategies subscribed to a token in this batch, each with its own
+        # parsed ticks, and works from a snapshot so pause/square-off can modify running_strategies
+        for unique_run_id, strategy_info, strategy_ticks in self.dispatcher.dispatch(ticks):
+            strategy_obj = strategy_info['strategy']
+            self.executor.submit(
+                unique_run_id,
+                strategy_ticks,
+                functools.partial(self._process_strategy, unique_run_id, strategy_info),
+                coalesce=getattr(strategy_obj, 'coalesce_ticks', True),
+            )
+        self.executor.submit(MARKET_DATA_KEY, ticks, self._broadcast_market_data)
+
+    def _process_strategy(self, unique_run_id, strategy_info, strategy_ticks):
+        """Runs on a strategy executor worker; batches for one strategy are handled in order"""
+        if unique_run_id not in self.running_strategies:
+            # Stopped while ticks were queued
+            self.executor.forget(unique_run_id)
+            return
+
+        strategy_obj = strategy_info['strategy']
+        db_id = strategy_info.get('db_id')
+        user_id = strategy_info.get('user_id', 0)
+
+        # Process ticks for this strategy with error handling
         try:
-            with get_db_connection() as conn:
-                cursor = conn.cursor()
-                for tick in ticks:
-                    instrument_token = tick['instrument_token']
-                    status_row = cursor.execute('SELECT status FROM tick_data_status WHERE instrument_token = ?', (instrument_token,)).fetchone()
-                    status = status_row[0] if status_row else 'Stopped'
-
-                    if status == 'Running':
-                        timestamp = None
-                        if 'timestamp' in tick:
-                            timestamp = tick['timestamp']
-                        elif 'last_trade_time' in tick:
-                            timestamp = tick['last_trade_time']
-                        elif 'exchange_timestamp' in tick:
-                            timestamp = tick['exchange_timestamp']
-                        
-                        if timestamp:
-                            if isinstance(timestamp, datetime.datetime):
-                                timestamp_str = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                            else:
-                                timestamp_str = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-                            
-                            cursor.execute(
-                                "INSERT INTO tick_data (instrument_token, timestamp, last_price, volume) VALUES (?, ?, ?, ?)",
-                                (tick['instrument_token'], timestamp_str, tick['last_price'], tick.get('volume', 0))
-                            )
-                        else:
-                            logging.warning(f"Skipping tick because it has no timestamp: {tick}")
-                conn.commit()
+            strategy_obj.process_ticks(strategy_ticks)
         except Exception as e:
-            logging.error(f"Error storing tick data for replay: {e}")
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        for tick in ticks:
-            # Store tick data in the database
-            instrument_token = tick['instrument_token']
-            last_price = tick['last_price']
-            volume = tick.get('volume', 0)  # Volume might not be present for all tick types
-            
-            timestamp = None
-            if 'timestamp' in tick:
-                timestamp = tick['timestamp']
-            elif 'last_trade_time' in tick:
-                timestamp = tick['last_trade_time']
-            elif 'exchange_timestamp' in tick:
-                timestamp = tick['exchange_timestamp']
-
-            if timestamp:
-                if isinstance(timestamp, datetime.datetime):
-                    timestamp = timestamp.strftime('%Y-%m-%d %H:%M:%S')
-                else:
-                    timestamp = datetime.datetime.fromtimestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S')
-            else:
-                logging.warning(f"Skipping tick because it has no timestamp: {tick}")
-                continue
-
-            # Determine trading_symbol and instrument_type based on instrument_token
-            trading_symbol = ""
-            instrument_type = ""
-            if instrument_token == 256265: # NIFTY 50
-                trading_symbol = "NIFTY 50"
-                instrument_type = "INDEX"
-            elif instrument_token == 260105: # NIFTY BANK
-                trading_symbol = "BANKNIFTY"
-                instrument_type = "INDEX"
-            # Add more conditions for other instruments as needed
-
-            if trading_symbol and instrument_type:
+            logging.error(f"Error processing ticks for strategy {db_id} ({strategy_info.get('name', 'unknown')}): {e}", exc_info=True)
+            # Don't stop other strategies if one fails
+        # The emitter thread builds updates from this copy, never from the status dict this worker mutates
+        strategy_obj.publish_status()
+
+        # Updates are built and emitted by the throttled emitter, so a burst of ticks costs one dict write here
+        if db_id and user_id:
+            self.emitter.schedule(unique_run_id, functools.partial(self._build_strategy_updates, unique_run_id, strategy_info))
+
+    def _chart_candles(self, unique_run_id, strategy_obj):
+        """Last 50 candles with EMA for charting.
+
+        Closed candles (and their EMA) are only re-serialized when a new candle opens;
+        each call just refreshes the forming candle on top of the cached series.
+        """
+        candles = getattr(strategy_obj, 'historical_data', None)
+        if not candles:
+            self.chart_cache.pop(unique_run_id, None)
+            return [], []
+        # The feeding thread appends to the ring and updates the forming candle in place under this lock
+        aggregator = getattr(strategy_obj, 'candle_aggregator', None)
+        with aggregator.lock if aggregator is not None else contextlib.nullcontext():
+            candle_count = len(candles)
+            window = candles[-50:]  # Last 50 candles
+            if window and isinstance(window[-1], dict):
+                window[-1] = dict(window[-1])  # The forming candle keeps changing once the lock is released
+        if not window:
+            self.chart_cache.pop(unique_run_id, None)
+            return [], []
+        ema_period = getattr(strategy_obj, 'ema_period', None)
+        with_ema = ema_period is not None and len(window) >= ema_period
+        today = datetime.datetime.now().date()
+        key = (candle_count, _candle_field(window[-1], 'date'), with_ema, today)
+
+        cache = self.chart_cache.get(unique_run_id)
+        if cache is None or cache['key'] != key:
+            closed = []
+            for candle in window[:-1]:
                 try:
-                    cursor.execute(
-                        "INSERT INTO market_data (instrument_token, trading_symbol, timestamp, last_price, volume, instrument_type) VALUES (?, ?, ?, ?, ?, ?)",
-                        (instrument_token, trading_symbol, timestamp, last_price, volume, instrument_type)
-                    )
-                    conn.commit()
+                    closed.append(_serialize_candle(candle))
                 except Exception as e:
-                    logging.error(f"Error storing tick data: {e}")
-                    conn.rollback()
+                    logging.debug(f"Error processing candle data: {e}")
+            ema = None
+            if with_ema and closed:
+                multiplier = 2 / (ema_period + 1)
+                ema = closed[0]['close']
+                for candle in closed:
+                    ema = (candle['close'] - ema) * multiplier + ema
+                    candle['ema5'] = ema
+            cache = {
+                'key': key,
+                'closed': closed,
+                'ema': ema,
+                'today_closed': [c for c in closed if _is_today(c['time'], today)],
+            }
+            self.chart_cache[unique_run_id] = cache
+
+        historical_candles = list(cache['closed'])
+        forming = None
+        try:
+            forming = _serialize_candle(window[-1])
+        except Exception as e:
+            logging.debug(f"Error processing candle data: {e}")
+        if forming is not None:
+            if with_ema:
+                multiplier = 2 / (ema_period + 1)
+                previous = cache['ema'] if cache['ema'] is not None else forming['close']
+                forming['ema5'] = (forming['close'] - previous) * multiplier + previous
+            historical_candles.append(forming)
 
-        conn.close()
+        today_candles = list(cache['today_closed'])
+        if forming is not None and _is_today(forming['time'], today):
+            today_candles.append(forming)
+        return historical_candles, today_candles
 
-        # Process ticks for strategies and emit updates (iterate over a snapshot to avoid runtime errors
-        # if the dict is modified concurrently by pause/square-off actions)
-        for unique_run_id, strategy_info in list(self.running_strategies.items()):
-            strategy_obj = strategy_info['strategy']
-            db_id = strategy_info.get('db_id')
-            user_id = strategy_info.get('user_id', 0)
-            
-            # Process ticks for this strategy with error handling
+    def _build_strategy_updates(self, unique_run_id, strategy_info):
+        """Build the strategy_update (and paper_trade_update) messages from the strategy's current state"""
+        db_id = strategy_info.get('db_id')
+        user_id = strategy_info.get('user_id', 0)
+        room_name = f"strategy_{user_id}_{db_id}"
+        if unique_run_id not in self.running_strategies:
+            self.chart_cache.pop(unique_run_id, None)
+            self.audit_cursor.pop(unique_run_id, None)
+            self.trade_event_emitted.pop(unique_run_id, None)
+            self.streams.discard(room_name)
+            return []
+
+        strategy_obj = strategy_info['strategy']
+        # Published by the executor worker (BaseStrategy.publish_status); safe to read on this thread
+        strategy_status = getattr(strategy_obj, 'status_snapshot', None) or {}
+        messages = []
+
+        # Prepare comprehensive metrics including all strategy details
+        metrics = {
+            'currentPrice': strategy_status.get('current_price', strategy_status.get('current_ltp', 0)),
+            'entryPrice': strategy_status.get('entry_price', 0),
+            'currentPnL': strategy_status.get('pnl', 0),
+            'unrealizedPnL': strategy_status.get('pnl', 0),
+            'realizedPnL': strategy_status.get('realized_pnl', 0),
+            'quantity': strategy_status.get('quantity', 0),
+            'status': strategy_status.get('state', 'running'),
+            'instrument': strategy_info.get('instrument', ''),
+            'strategyName': strategy_info.get('name', ''),
+            'option_prices': strategy_status.get('option_prices', {}),
+            'option_symbols': strategy_status.get('option_symbols', {}),
+            'traded_instrument': strategy_status.get('traded_instrument', ''),
+            'traded_instrument_token': strategy_status.get('traded_instrument_token'),
+            'audit_trail': strategy_status.get('audit_trail', [])[-50:],  # Last 50 entries
+            # Mountain signal specific
+            'signal_status': strategy_status.get('signal_status', ''),
+            'signal_candle_time': strategy_status.get('signal_candle_time', 'N/A'),
+            'signal_candle_high': strategy_status.get('signal_candle_high', 0),
+            'signal_candle_low': strategy_status.get('signal_candle_low', 0),
+            'entry_order_id': strategy_status.get('entry_order_id', 'N/A'),
+            'sl_order_id': strategy_status.get('sl_order_id', 'N/A'),
+            'tp_order_id': strategy_status.get('tp_order_id', 'N/A'),
+            'stop_loss_level': strategy_status.get('stop_loss_level', 0),
+            'target_profit_level': strategy_status.get('target_profit_level', 0),
+            'paper_trade_mode': strategy_status.get('paper_trade_mode', False),
+            'position': strategy_status.get('position', 0),
+            'message': strategy_status.get('message', ''),
+            # Prefer aligned execution time from strategy if available
+            'last_execution_time': strategy_status.get('last_execution_time', datetime.datetime.now().isoformat())
+        }
+
+        historical_candles, today_candles = self._chart_candles(unique_run_id, strategy_obj)
+
+        # Get signal candle info for CE/PE break lines
+        signal_candle_high = strategy_status.get('signal_candle_high', 0)
+        signal_candle_low = strategy_status.get('signal_candle_low', 0)
+        position = strategy_status.get('position', 0)
+
+        # Determine break levels
+        pe_break_level = None
+        ce_break_level = None
+        if position == -1 and signal_candle_low > 0:  # PE position
+            pe_break_level = signal_candle_low
+        elif position == 1 and signal_candle_high > 0:  # CE position
+            ce_break_level = signal_candle_high
+
+        # Subscribers get a snapshot first and sequence-numbered deltas afterwards (see strategy_stream)
+        update = self.streams.get(room_name, str(db_id)).encode({
+            'strategy_id': str(db_id),
+            'metrics': metrics,
+            'historical_candles': historical_candles,
+            'signal_candle_high': signal_candle_high,
+            'signal_candle_low': signal_candle_low,
+            'pe_break_level': pe_break_level,
+            'ce_break_level': ce_break_level,
+            'signal_history_today': strategy_status.get('signal_history_today', []),
+            'log': {
+                'timestamp': datetime.datetime.now().isoformat(),
+                'action': strategy_status.get('message', 'Processing'),
+                'price': metrics['currentPrice'],
+                'quantity': metrics['quantity'],
+                'pnl': metrics['currentPnL'],
+                'status': 'active'
+            }
+        })
+        if update is not None:
+            messages.append(('strategy_update', update, room_name))
+
+        # Paper trade specific updates if this is a paper trade strategy
+        if strategy_info.get('paper_trade'):
             try:
-                strategy_obj.process_ticks(ticks)
+                messages.extend(self._build_paper_trade_updates(unique_run_id, db_id, strategy_status, today_candles))
             except Exception as e:
-                logging.error(f"Error processing ticks for strategy {db_id} ({strategy_info.get('name', 'unknown')}): {e}", exc_info=True)
-                # Don't stop other strategies if one fails
-            
-            # Emit strategy update to subscribed clients
-            if db_id and user_id:
-                try:
-                    room_name = f"strategy_{user_id}_{db_id}"
-                    strategy_status = strategy_obj.status if hasattr(strategy_obj, 'status') else {}
-                    
-                    # Prepare comprehensive metrics including all strategy details
-                    metrics = {
-                        'currentPrice': strategy_status.get('current_price', strategy_status.get('current_ltp', 0)),
-                        'entryPrice': strategy_status.get('entry_price', 0),
-                        'currentPnL': strategy_status.get('pnl', 0),
-                        'unrealizedPnL': strategy_status.get('pnl', 0),
-                        'realizedPnL': strategy_status.get('realized_pnl', 0),
-                        'quantity': strategy_status.get('quantity', 0),
-                        'status': strategy_status.get('state', 'running'),
-                        'instrument': strategy_info.get('instrument', ''),
-                        'strategyName': strategy_info.get('name', ''),
-                        'option_prices': strategy_status.get('option_prices', {}),
-                        'option_symbols': strategy_status.get('option_symbols', {}),
-                        'traded_instrument': strategy_status.get('traded_instrument', ''),
-                        'traded_instrument_token': strategy_status.get('traded_instrument_token'),
-                        'audit_trail': strategy_status.get('audit_trail', [])[-50:],  # Last 50 entries
-                        # Mountain signal specific
-                        'signal_status': strategy_status.get('signal_status', ''),
-                        'signal_candle_time': strategy_status.get('signal_candle_time', 'N/A'),
-                        'signal_candle_high': strategy_status.get('signal_candle_high', 0),
-                        'signal_candle_low': strategy_status.get('signal_candle_low', 0),
-                        'entry_order_id': strategy_status.get('entry_order_id', 'N/A'),
-                        'sl_order_id': strategy_status.get('sl_order_id', 'N/A'),
-                        'tp_order_id': strategy_status.get('tp_order_id', 'N/A'),
-                        'stop_loss_level': strategy_status.get('stop_loss_level', 0),
-                        'target_profit_level': strategy_status.get('target_profit_level', 0),
-                        'paper_trade_mode': strategy_status.get('paper_trade_mode', False),
-                        'position': strategy_status.get('position', 0),
-                        'message': strategy_status.get('message', ''),
-                        # Prefer aligned execution time from strategy if available
-                        'last_execution_time': strategy_status.get('last_execution_time', datetime.datetime.now().isoformat())
-                    }
-                    
-                    # Get historical candles if available (for charting)
-                    historical_candles = []
-                    if hasattr(strategy_obj, 'historical_data'):
-                        candles = getattr(strategy_obj, 'historical_data', [])
-                        for candle in candles[-50:]:  # Last 50 candles
-                            try:
-                                candle_date = candle.get('date') if isinstance(candle, dict) else getattr(candle, 'date', None)
-                                if candle_date:
-                                    if isinstance(candle_date, datetime.datetime):
-                                        date_str = candle_date.isoformat()
-                                    else:
-                                        date_str = str(candle_date)
-                                else:
-                                    date_str = datetime.datetime.now().isoformat()
-                                
-                                historical_candles.append({
-                                    'time': date_str,
-                                    'open': candle.get('open') if isinstance(candle, dict) else getattr(candle, 'open', 0),
-                                    'high': candle.get('high') if isinstance(candle, dict) else getattr(candle, 'high', 0),
-                                    'low': candle.get('low') if isinstance(candle, dict) else getattr(candle, 'low', 0),
-                                    'close': candle.get('close') if isinstance(candle, dict) else getattr(candle, 'close', 0),
-                                    'volume': candle.get('volume', 0) if isinstance(candle, dict) else getattr(candle, 'volume', 0)
-                                })
-                            except Exception as e:
-                                logging.debug(f"Error processing candle data: {e}")
-                                continue
-                    
-                    # Calculate 5 EMA if we have candles
-                    if len(historical_candles) > 0 and hasattr(strategy_obj, 'ema_period'):
-                        ema_period = getattr(strategy_obj, 'ema_period', 5)
-                        if len(historical_candles) >= ema_period:
-                            # Calculate EMA for last candles
-                            closes = [c['close'] for c in historical_candles]
-                            # Simple EMA calculation
-                            multiplier = 2 / (ema_period + 1)
-                            ema_values = []
-                            ema = closes[0]
-                            for close in closes:
-                                ema = (close - ema) * multiplier + ema
-                                ema_values.append(ema)
-                            
-                            # Add EMA to last candle
-                            if len(ema_values) > 0:
-                                for i, candle in enumerate(historical_candles):
-                                    if i < len(ema_values):
-                                        candle['ema5'] = ema_values[i]
-                    
-                    # Get signal candle info for CE/PE break lines
-                    signal_candle_high = strategy_status.get('signal_candle_high', 0)
-                    signal_candle_low = strategy_status.get('signal_candle_low', 0)
-                    position = strategy_status.get('position', 0)
-                    
-                    # Determine break levels
-                    pe_break_level = None
-                    ce_break_level = None
-                    if position == -1 and signal_candle_low > 0:  # PE position
-                        pe_break_level = signal_candle_low
-                    elif position == 1 and signal_candle_high > 0:  # CE position
-                        ce_break_level = signal_candle_high
-                    
-                    # Emit to strategy room
-                    self.socketio.emit('strategy_update', {
-                        'strategy_id': str(db_id),
-                        'metrics': metrics,
-                        'historical_candles': historical_candles,
-                        'signal_candle_high': signal_candle_high,
-                        'signal_candle_low': signal_candle_low,
-                        'pe_break_level': pe_break_level,
-                        'ce_break_level': ce_break_level,
-                        'signal_history_today': strategy_status.get('signal_history_today', []),
-                        'log': {
-                            'timestamp': datetime.datetime.now().isoformat(),
-                            'action': strategy_status.get('message', 'Processing'),
-                            'price': metrics['currentPrice'],
-                            'quantity': metrics['quantity'],
-                            'pnl': metrics['currentPnL'],
-                            'status': 'active'
-                        }
-                    }, room=room_name)
-                    
-                    # Emit paper trade specific updates if this is a paper trade strategy
-                    if strategy_info.get('paper_trade'):
-                        try:
-                            # Prepare audit log for paper trade
-                            latest_audit = strategy_status.get('audit_trail', [])
-                            audit_log = None
-                            if latest_audit:
-                                latest_entry = latest_audit[-1]
-                                audit_log = {
-                                    'id': len(latest_audit),
-                                    'timestamp': latest_entry.get('timestamp', datetime.datetime.now().isoformat()),
-                                    'type': latest_entry.get('type', 'info'),
-                                    'message': latest_entry.get('message', ''),
-                                    'details': latest_entry.get('data', {})
-                                }
-                            
-                            # Prepare chart data (today's candles only)
-                            today = datetime.datetime.now().date()
-                            today_candles = []
-                            today_ema = []
-                            today_rsi = []
-                            
-                            for candle in historical_candles[-100:]:  # Last 100 candles
-                                try:
-                                    candle_time = datetime.datetime.fromisoformat(candle['time']) if isinstance(candle['time'], str) else candle['time']
-                                    if isinstance(candle_time, datetime.datetime) and candle_time.date() == today:
-                                        today_candles.append({
-                                            'x': candle['time'],
-                                            'o': candle['open'],
-                                            'h': candle['high'],
-                                            'l': candle['low'],
-                                            'c': candle['close']
-                                        })
-                                        if 'ema5' in candle:
-                                            today_ema.append({'x': candle['time'], 'y': candle['ema5']})
-                                        # RSI calculation would need to be added if not already in strategy
-                                except Exception as e:
-                                    logging.debug(f"Error processing candle for paper trade: {e}")
-                                    continue
-                            
-                            # Prepare trade event if a trade was just placed or closed
-                            trade_event = None
-                            if strategy_status.get('trade_placed') and not strategy_status.get('last_trade_event_emitted'):
-                                # New trade entry
-                                trade_event = {
-                                    'signalTime': strategy_status.get('signal_candle_time', ''),
-                                    'signalType': 'PE' if strategy_status.get('position') == -1 else 'CE',
-                                    'signalHigh': strategy_status.get('signal_candle_high', 0),
-                                    'signalLow': strategy_status.get('signal_candle_low', 0),
-                                    'entryTime': datetime.datetime.now().isoformat(),
-                                    'entryPrice': strategy_status.get('entry_price', 0),
-                                    'optionSymbol': strategy_status.get('traded_instrument', ''),
-                                    'optionPrice': strategy_status.get('option_prices', {}).get('atm_pe' if strategy_status.get('position') == -1 else 'atm_ce', 0),
-                                    'exitTime': None,
-                                    'exitPrice': None,
-                                    'exitType': None,
-                                    'pnl': None,
-                                    'pnlPercent': None
-                                }
-                                strategy_status['last_trade_event_emitted'] = True
-                            elif not strategy_status.get('trade_placed') and strategy_status.get('last_trade_event_emitted'):
-                                # Trade was closed
-                                trade_event = {
-                                    'exitTime': datetime.datetime.now().isoformat(),
-                                    'exitPrice': strategy_status.get('exit_price', 0),
-                                    'exitType': strategy_status.get('exit_type', ''),
-                                    'pnl': strategy_status.get('pnl', 0),
-                                    'pnlPercent': strategy_status.get('pnl_percent', 0)
-                                }
-                                strategy_status['last_trade_event_emitted'] = False
-                            
-                            # Emit paper trade update (only if there's new data)
-                            if audit_log or len(today_candles) > 0 or trade_event:
-                                self.socketio.emit('paper_trade_update', {
-                                    'status': strategy_status.get('message', 'Running'),
-                                    'auditLog': audit_log,
-                                    'chartData': {
-                                        'candles': today_candles,
-                                        'ema5': today_ema,
-                                        'rsi14': today_rsi
-                                    },
-                                    'tradeEvent': trade_event
-                                }, room=f'paper_trade_{db_id}')
-                        except Exception as e:
-                            logging.error(f"Error emitting paper trade update for strategy {db_id}: {e}", exc_info=True)
-                    
-                except Exception as e:
-                    logging.error(f"Error emitting strategy update for strategy {db_id}: {e}", exc_info=True)
-        
-        # Broadcast ticks to the frontend
+                logging.error(f"Error building paper trade update for strategy {db_id}: {e}", exc_info=True)
+        return messages
+
+    def _build_paper_trade_updates(self, unique_run_id, db_id, strategy_status, today_candles):
+        room = f'paper_trade_{db_id}'
+
+        # Audit entries added since the last emission, oldest first (only the newest on the first update)
+        latest_audit = strategy_status.get('audit_trail', [])
+        new_entries = []
+        cursor = self.audit_cursor.get(unique_run_id)
+        for position in range(len(latest_audit) - 1, -1, -1):
+            if latest_audit[position] is cursor:
+                break
+            new_entries.append((position, latest_audit[position]))
+            if cursor is None:
+                break
+        new_entries.reverse()
+        if latest_audit:
+            self.audit_cursor[unique_run_id] = latest_audit[-1]
+        audit_logs = [
+            {
+                'id': position + 1,
+                'timestamp': entry.get('timestamp', datetime.datetime.now().isoformat()),
+                'type': entry.get('type', 'info'),
+                'message': entry.get('message', ''),
+                'details': entry.get('data', {})
+            }
+            for position, entry in new_entries
+        ]
+
+        # Chart data (today's candles only)
+        chart_candles = []
+        today_ema = []
+        today_rsi = []
+        for candle in today_candles:
+            chart_candles.append({
+                'x': candle['time'],
+                'o': candle['open'],
+                'h': candle['high'],
+                'l': candle['low'],
+                'c': candle['close']
+            })
+            if 'ema5' in candle:
+                today_ema.append({'x': candle['time'], 'y': candle['ema5']})
+            # RSI calculation would need to be added if not already in strategy
+
+        # Prepare trade event if a trade was just placed or closed
+        trade_event = None
+        trade_event_emitted = self.trade_event_emitted.get(unique_run_id, False)
+        if strategy_status.get('trade_placed') and not trade_event_emitted:
+            # New trade entry
+            trade_event = {
+                'signalTime': strategy_status.get('signal_candle_time', ''),
+                'signalType': 'PE' if strategy_status.get('position') == -1 else 'CE',
+                'signalHigh': strategy_status.get('signal_candle_high', 0),
+                'signalLow': strategy_status.get('signal_candle_low', 0),
+                'entryTime': datetime.datetime.now().isoformat(),
+                'entryPrice': strategy_status.get('entry_price', 0),
+                'optionSymbol': strategy_status.get('traded_instrument', ''),
+                'optionPrice': strategy_status.get('option_prices', {}).get('atm_pe' if strategy_status.get('position') == -1 else 'atm_ce', 0),
+                'exitTime': None,
+                'exitPrice': None,
+                'exitType': None,
+                'pnl': None,
+                'pnlPercent': None
+            }
+            self.trade_event_emitted[unique_run_id] = True
+        elif not strategy_status.get('trade_placed') and trade_event_emitted:
+            # Trade was closed
+            trade_event = {
+                'exitTime': datetime.datetime.now().isoformat(),
+                'exitPrice': strategy_status.get('exit_price', 0),
+                'exitType': strategy_status.get('exit_type', ''),
+                'pnl': strategy_status.get('pnl', 0),
+                'pnlPercent': strategy_status.get('pnl_percent', 0)
+            }
+            self.trade_event_emitted[unique_run_id] = False
+
+        messages = []
+        # The client appends every auditLog it receives, so older new entries go out on their own
+        for audit_log in audit_logs[:-1]:
+            messages.append(('paper_trade_update', {'auditLog': audit_log}, room))
+        audit_log = audit_logs[-1] if audit_logs else None
+
+        # Emit paper trade update (only if there's new data)
+        if audit_log or len(chart_candles) > 0 or trade_event:
+            messages.append(('paper_trade_update', {
+                'status': strategy_status.get('message', 'Running'),
+                'auditLog': audit_log,
+                'chartData': {
+                    'candles': chart_candles,
+                    'ema5': today_ema,
+                    'rsi14': today_rsi
+                },
+                'tradeEvent': trade_event
+            }, room))
+        return messages
+
+    def _broadcast_market_data(self, ticks):
+        """Broadcast ticks to the frontend (runs on the strategy executor)"""
         try:
             for tick in ticks:
                 instrument_token = tick.get('instrument_token')
@@ -415,6 +468,8 @@ class Ticker:
 
         ws.subscribe(instrument_tokens)
         ws.set_mode(ws.MODE_FULL, instrument_tokens)
+        # Option tokens strategies asked the price board for (ATM strikes move during the day)
+        self.price_board.attach(ws, instrument_tokens)
 
         # Populate the tick_data_status table
         try:
@@ -428,6 +483,7 @@ class Ticker:
 
     def on_close(self, ws, code, reason):
         logging.info(f"Kite Ticker connection closed: {code} - {reason}")
+        self.price_board.detach(ws)
 
     def start(self):
         try:
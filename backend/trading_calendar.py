@@ -0,0 +1,117 @@
+"""
+NSE trading calendar.
+
+Knows weekends, exchange holidays and special sessions (Muhurat trading,
+Saturday budget/DR sessions) so historical fetches only request sessions
+that actually traded. Additional holidays or sessions can be supplied without
+a code change through a JSON file referenced by NSE_CALENDAR_FILE:
+
+    {"holidays": ["2027-01-26"], "special_sessions": {"2027-11-08": ["18:00", "19:00"]}}
+"""
+import datetime
+import json
+import logging
+import os
+from typing import Dict, List, Optional, Set, Tuple
+
+import config
+
+REGULAR_SESSION = (datetime.time(9, 15), datetime.time(15, 30))
+
+# NSE equity/F&O trading holidays that fall on weekdays
+NSE_HOLIDAYS: Set[datetime.date] = {datetime.date.fromisoformat(d) for d in (
+    # 2023
+    '2023-01-26', '2023-03-07', '2023-03-30', '2023-04-04', '2023-04-07', '2023-04-14',
+    '2023-05-01', '2023-06-28', '2023-08-15', '2023-09-19', '2023-10-02', '2023-10-24',
+    '2023-11-14', '2023-11-27', '2023-12-25',
+    # 2024
+    '2024-01-22', '2024-01-26', '2024-03-08', '2024-03-25', '2024-03-29', '2024-04-11',
+    '2024-04-17', '2024-05-01', '2024-05-20', '2024-06-17', '2024-07-17', '2024-08-15',
+    '2024-10-02', '2024-11-01', '2024-11-15', '2024-11-20', '2024-12-25',
+    # 2025
+    '2025-02-26', '2025-03-14', '2025-03-31', '2025-04-10', '2025-04-14', '2025-04-18',
+    '2025-05-01', '2025-08-15', '2025-08-27', '2025-10-02', '2025-10-21', '2025-10-22',
+    '2025-11-05', '2025-12-25',
+    # 2026
+    '2026-01-15', '2026-01-26', '2026-03-03', '2026-03-26', '2026-03-31', '2026-04-03',
+    '2026-04-14', '2026-05-01', '2026-05-28', '2026-06-26', '2026-09-14', '2026-10-02',
+    '2026-10-20', '2026-11-10', '2026-11-24', '2026-12-25',
+)}
+
+# Sessions outside the regular weekday schedule: Muhurat trading, Saturday
+# budget sessions and DR drill sessions. Values are (open, close).
+SPECIAL_SESSIONS: Dict[datetime.date, Tuple[datetime.time, datetime.time]] = {
+    datetime.date(2023, 11, 12): (datetime.time(18, 15), datetime.time(19, 15)),
+    datetime.date(2024, 1, 20): (datetime.time(9, 15), datetime.time(15, 30)),
+    datetime.date(2024, 3, 2): (datetime.time(9, 15), datetime.time(12, 30)),
+    datetime.date(2024, 5, 18): (datetime.time(9, 15), datetime.time(12, 30)),
+    datetime.date(2024, 11, 1): (datetime.time(18, 0), datetime.time(19, 0)),
+    datetime.date(2025, 2, 1): (datetime.time(9, 15), datetime.time(15, 30)),
+    datetime.date(2025, 10, 21): (datetime.time(13, 45), datetime.time(14, 45)),
+}
+
+
+def _load_overrides() -> None:
+    path = config.NSE_CALENDAR_FILE
+    if not path or not os.path.exists(path):
+        return
+    try:
+        with open(path) as fh:
+            data = json.load(fh)
+        for day in data.get('holidays', []):
+            NSE_HOLIDAYS.add(datetime.date.fromisoformat(day))
+        for day, (start, end) in data.get('special_sessions', {}).items():
+            SPECIAL_SESSIONS[datetime.date.fromisoformat(day)] = (
+                datetime.time.fromisoformat(start),
+                datetime.time.fromisoformat(end),
+            )
+        logging.info(f"Loaded NSE calendar overrides from {path}")
+    except Exception as e:
+        logging.error(f"Error loading NSE calendar overrides from {path}: {e}")
+
+
+_load_overrides()
+
+
+def is_trading_day(day: datetime.date) -> bool:
+    """Return True if NSE holds a session (regular or special) on this day"""
+    if day in SPECIAL_SESSIONS:
+        return True
+    return day.weekday() < 5 and day not in NSE_HOLIDAYS
+
+
+def session_hours(day: datetime.date) -> Optional[Tuple[datetime.time, datetime.time]]:
+    """Return (open, close) for the day's session, or None if the market is closed"""
+    if day in SPECIAL_SESSIONS:
+        return SPECIAL_SESSIONS[day]
+    if is_trading_day(day):
+        return REGULAR_SESSION
+    return None
+
+
+def session_bounds(day: datetime.date) -> Tuple[datetime.datetime, datetime.datetime]:
+    """Return naive datetimes spanning the day's session (regular hours if closed)"""
+    start, end = session_hours(day) or REGULAR_SESSION
+    # Regular hours are always included so special days never clip normal bars
+    start = min(start, REGULAR_SESSION[0])
+    end = max(end, REGULAR_SESSION[1])
+    return datetime.datetime.combine(day, start), datetime.datetime.combine(day, end)
+
+
+def trading_days(from_date: datetime.date, to_date: datetime.date) -> List[datetime.date]:
+    """All trading sessions between two dates (inclusive)"""
+    return [
+        from_date + datetime.timedelta(days=i)
+        for i in range((to_date - from_date).days + 1)
+        if is_trading_day(from_date + datetime.timedelta(days=i))
+    ]
+
+
+def previous_trading_day(day: datetime.date, max_lookback: int = 15) -> datetime.date:
+    """Most recent trading session strictly before ``day``"""
+    candidate = day
+    for _ in range(max_lookback):
+        candidate -= datetime.timedelta(days=1)
+        if is_trading_day(candidate):
+            return candidate
+    return day - datetime.timedelta(days=1)
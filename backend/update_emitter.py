@@ -0,0 +1,123 @@
+"""
+Throttled Socket.IO emission for strategy updates.
+
+Strategy workers only mark a strategy as dirty together with a builder for its
+payloads. A single emitter thread wakes at STRATEGY_UPDATE_RATE_HZ, calls the
+builder of every dirty strategy once and emits the result, so clients always get
+the freshest state while the per-tick cost drops to a dict assignment.
+"""
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import config
+
+# A builder returns the (event, payload, room) triples to emit for one strategy
+Builder = Callable[[], List[Tuple[str, Dict[str, Any], str]]]
+
+
+class ThrottledEmitter:
+    def __init__(self, socketio, rate_hz: Optional[float] = None):
+        self.socketio = socketio
+        self.interval = 1.0 / (rate_hz or config.STRATEGY_UPDATE_RATE_HZ)
+        self.pending: Dict[str, Builder] = {}
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread: Optional[threading.Thread] = None
+        self.metrics = {
+            'updates_scheduled': 0,
+            'updates_coalesced': 0,
+            'emits': 0,
+            'build_errors': 0,
+            'last_cycle_ms': 0.0,
+            'max_cycle_ms': 0.0,
+        }
+        self.started_at = time.monotonic()
+
+    def start(self) -> None:
+        with self.lock:
+            if self.thread and self.thread.is_alive():
+                return
+            self.stop_event.clear()
+            self.started_at = time.monotonic()
+            self.thread = threading.Thread(target=self._run, name='strategy-update-emitter', daemon=True)
+            self.thread.start()
+        logging.info(f"Strategy update emitter started at {1.0 / self.interval:.1f} Hz")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout)
+
+    def schedule(self, key: str, builder: Builder) -> None:
+        """Mark ``key`` dirty; only the latest builder per key is used"""
+        with self.lock:
+            self.metrics['updates_scheduled'] += 1
+            if key in self.pending:
+                self.metrics['updates_coalesced'] += 1
+            self.pending[key] = builder
+
+    def discard(self, key: str) -> None:
+        with self.lock:
+            self.pending.pop(key, None)
+
+    def flush(self) -> None:
+        """Build and emit every pending update now"""
+        started = time.monotonic()
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        emits = 0
+        errors = 0
+        for key, builder in pending.items():
+            try:
+                messages = builder()
+            except Exception as e:
+                errors += 1
+                logging.error(f"Error building strategy update for {key}: {e}", exc_info=True)
+                continue
+            for event, payload, room in messages:
+                try:
+                    self.socketio.emit(event, payload, room=room)
+                    emits += 1
+                except Exception as e:
+                    logging.error(f"Error emitting {event} for {key}: {e}", exc_info=True)
+        elapsed_ms = (time.monotonic() - started) * 1000.0
+        with self.lock:
+            m = self.metrics
+            m['emits'] += emits
+            m['build_errors'] += errors
+            if pending:
+                m['last_cycle_ms'] = elapsed_ms
+                m['max_cycle_ms'] = max(m['max_cycle_ms'], elapsed_ms)
+
+    def _run(self) -> None:
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Strategy update emitter cycle failed: {e}", exc_info=True)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics['pending'] = len(self.pending)
+        uptime = max(time.monotonic() - self.started_at, 1e-9)
+        metrics['rate_hz'] = 1.0 / self.interval
+        metrics['emits_per_second'] = metrics['emits'] / uptime
+        metrics['running'] = bool(self.thread and self.thread.is_alive())
+        return metrics
+
+
+_update_emitter = None
+_update_emitter_lock = threading.Lock()
+
+
+def get_update_emitter(socketio) -> ThrottledEmitter:
+    global _update_emitter
+    if _update_emitter is None:
+        with _update_emitter_lock:
+            if _update_emitter is None:
+                _update_emitter = ThrottledEmitter(socketio)
+                _update_emitter.start()
+    return _update_emitter
@@ -1,5 +1,6 @@
 # Utils package initialization
 from .indicators import *
+from .streaming_indicators import *
 from .backtest_metrics import *
 from .kite_utils import get_option_symbols
 
@@ -10,6 +11,9 @@ __all__ = [
     'calculate_rsi', 'calculate_macd', 'calculate_bollinger_bands',
     'calculate_atr', 'calculate_stochastic', 'calculate_obv',
     'detect_support_resistance', 'identify_candlestick_patterns',
+    # Streaming indicators
+    'SMA', 'EMA', 'WMA', 'RSI', 'MACD', 'BollingerBands', 'ATR', 'Stochastic', 'OBV',
+    'CandlePatterns', 'PATTERN_NAMES',
     # Metrics
     'calculate_sharpe_ratio', 'calculate_max_drawdown', 'calculate_win_rate',
     'calculate_profit_factor', 'calculate_average_trade', 'generate_equity_curve',
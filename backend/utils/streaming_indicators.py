@@ -0,0 +1,486 @@
+"""
+Streaming Technical Indicators
+Stateful counterparts of the batch functions in indicators.py.
+
+Each indicator is a small __slots__ object: call update(bar) once per bar and
+read .value (None until enough bars have been seen). ``bar`` is either a
+number (taken as the close) or a mapping/object with open/high/low/close/volume.
+peek(bar) returns what update(bar) would produce without changing the state,
+which lets live strategies evaluate a still-forming candle.
+
+Every class also has a vectorized batch() classmethod that returns NumPy
+arrays (NaN during warm-up) matching both the streaming values and the pandas
+functions in indicators.py within floating point tolerance, so live strategies,
+replay and backtests can share one implementation.
+"""
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def _field(bar: Any, name: str) -> float:
+    if isinstance(bar, (int, float, np.floating, np.integer)):
+        return float(bar)
+    try:
+        return float(bar[name])
+    except (TypeError, KeyError, IndexError):
+        return float(getattr(bar, name))
+
+
+def _nan_array(n: int) -> np.ndarray:
+    return np.full(n, np.nan, dtype=float)
+
+
+def _rolling_mean(values: np.ndarray, period: int) -> np.ndarray:
+    out = _nan_array(len(values))
+    if len(values) >= period:
+        out[period - 1:] = sliding_window_view(values, period).mean(axis=1)
+    return out
+
+
+class SMA:
+    """Simple Moving Average"""
+    __slots__ = ('period', 'window', 'total', 'updates', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.updates = 0
+        self.value: Optional[float] = None
+
+    def _next_total(self, x: float) -> float:
+        dropped = self.window[0] if len(self.window) == self.period else 0.0
+        return self.total + x - dropped
+
+    def peek(self, bar: Any) -> Optional[float]:
+        x = _field(bar, 'close')
+        if len(self.window) + 1 < self.period:
+            return None
+        return self._next_total(x) / self.period
+
+    def update(self, bar: Any) -> Optional[float]:
+        x = _field(bar, 'close')
+        self.total = self._next_total(x)
+        self.window.append(x)
+        self.updates += 1
+        if self.updates % self.period == 0:
+            # Re-sum once per window so the running total cannot drift
+            self.total = float(sum(self.window))
+        if len(self.window) == self.period:
+            self.value = self.total / self.period
+        return self.value
+
+    @classmethod
+    def batch(cls, close, period: int) -> np.ndarray:
+        return _rolling_mean(np.asarray(close, dtype=float), period)
+
+
+class EMA:
+    """Exponential Moving Average (pandas ewm(span=period, adjust=False))"""
+    __slots__ = ('period', 'alpha', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.alpha = 2 / (period + 1)
+        self.value: Optional[float] = None
+
+    def peek(self, bar: Any) -> float:
+        x = _field(bar, 'close')
+        if self.value is None:
+            return x
+        return (x - self.value) * self.alpha + self.value
+
+    def update(self, bar: Any) -> float:
+        self.value = self.peek(bar)
+        return self.value
+
+    @classmethod
+    def batch(cls, close, period: int) -> np.ndarray:
+        return pd.Series(np.asarray(close, dtype=float)).ewm(span=period, adjust=False).mean().to_numpy()
+
+
+class WMA:
+    """Weighted Moving Average (weights 1..period, newest heaviest)"""
+    __slots__ = ('period', 'window', 'total', 'weighted', 'divisor', 'updates', 'value')
+
+    def __init__(self, period: int):
+        self.period = period
+        self.window = deque(maxlen=period)
+        self.total = 0.0
+        self.weighted = 0.0
+        self.updates = 0
+        self.divisor = period * (period + 1) / 2
+        self.value: Optional[float] = None
+
+    def _next(self, x: float) -> Tuple[float, float]:
+        if len(self.window) < self.period:
+            # Still filling: the new bar gets weight len + 1
+            return self.total + x, self.weighted + (len(self.window) + 1) * x
+        # Full window: every weight drops by one, the oldest falls out, the new bar gets weight period
+        return self.total - self.window[0] + x, self.weighted - self.total + self.period * x
+
+    def peek(self, bar: Any) -> Optional[float]:
+        x = _field(bar, 'close')
+        if len(self.window) + 1 < self.period:
+            return None
+        return self._next(x)[1] / self.divisor
+
+    def update(self, bar: Any) -> Optional[float]:
+        x = _field(bar, 'close')
+        self.total, self.weighted = self._next(x)
+        self.window.append(x)
+        self.updates += 1
+        if self.updates % self.period == 0:
+            # Re-sum once per window so the running sums cannot drift
+            self.total = float(sum(self.window))
+            self.weighted = float(sum(i * v for i, v in enumerate(self.window, 1)))
+        if len(self.window) == self.period:
+            self.value = self.weighted / self.divisor
+        return self.value
+
+    @classmethod
+    def batch(cls, close, period: int) -> np.ndarray:
+        values = np.asarray(close, dtype=float)
+        out = _nan_array(len(values))
+        if len(values) >= period:
+            weights = np.arange(1, period + 1, dtype=float)
+            out[period - 1:] = sliding_window_view(values, period) @ weights / weights.sum()
+        return out
+
+
+def _rsi_from(gain: float, loss: float) -> Optional[float]:
+    if loss > 0:
+        return 100 - (100 / (1 + gain / loss))
+    if gain > 0:
+        return 100.0
+    return None
+
+
+class RSI:
+    """Relative Strength Index with simple rolling means (same as calculate_rsi)"""
+    __slots__ = ('period', 'previous', 'gains', 'losses', 'value')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous: Optional[float] = None
+        self.gains = deque(maxlen=period)
+        self.losses = deque(maxlen=period)
+        self.value: Optional[float] = None
+
+    def _delta(self, x: float) -> float:
+        # The first bar has no change; calculate_rsi counts it as zero gain and zero loss
+        return 0.0 if self.previous is None else x - self.previous
+
+    def peek(self, bar: Any) -> Optional[float]:
+        x = _field(bar, 'close')
+        if len(self.gains) + 1 < self.period:
+            return None
+        delta = self._delta(x)
+        # Sum the surviving window directly so an all-zero side stays exactly zero
+        keep = self.period - 1
+        gain = (sum(list(self.gains)[-keep:] if keep else []) + max(delta, 0.0)) / self.period
+        loss = (sum(list(self.losses)[-keep:] if keep else []) + max(-delta, 0.0)) / self.period
+        return _rsi_from(gain, loss)
+
+    def update(self, bar: Any) -> Optional[float]:
+        x = _field(bar, 'close')
+        delta = self._delta(x)
+        self.gains.append(max(delta, 0.0))
+        self.losses.append(max(-delta, 0.0))
+        self.previous = x
+        if len(self.gains) == self.period:
+            self.value = _rsi_from(sum(self.gains) / self.period, sum(self.losses) / self.period)
+        return self.value
+
+    @classmethod
+    def batch(cls, close, period: int = 14) -> np.ndarray:
+        values = np.asarray(close, dtype=float)
+        delta = np.zeros(len(values))
+        delta[1:] = np.diff(values)
+        gain = _rolling_mean(np.clip(delta, 0, None), period)
+        loss = _rolling_mean(np.clip(-delta, 0, None), period)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            rsi = 100 - (100 / (1 + gain / loss))
+        return rsi
+
+
+class MACD:
+    """MACD line, signal line and histogram"""
+    __slots__ = ('fast', 'slow', 'signal', 'value')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.value: Optional[Tuple[float, float, float]] = None
+
+    def peek(self, bar: Any) -> Tuple[float, float, float]:
+        macd_line = self.fast.peek(bar) - self.slow.peek(bar)
+        signal_line = self.signal.peek(macd_line)
+        return macd_line, signal_line, macd_line - signal_line
+
+    def update(self, bar: Any) -> Tuple[float, float, float]:
+        macd_line = self.fast.update(bar) - self.slow.update(bar)
+        signal_line = self.signal.update(macd_line)
+        self.value = (macd_line, signal_line, macd_line - signal_line)
+        return self.value
+
+    @classmethod
+    def batch(cls, close, fast: int = 12, slow: int = 26, signal: int = 9) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        macd_line = EMA.batch(close, fast) - EMA.batch(close, slow)
+        signal_line = EMA.batch(macd_line, signal)
+        return macd_line, signal_line, macd_line - signal_line
+
+
+class BollingerBands:
+    """Upper band, middle band (SMA) and lower band using the sample standard deviation"""
+    __slots__ = ('period', 'std_dev', 'window', 'value')
+
+    def __init__(self, period: int = 20, std_dev: float = 2.0):
+        self.period = period
+        self.std_dev = std_dev
+        self.window = deque(maxlen=period)
+        self.value: Optional[Tuple[float, float, float]] = None
+
+    def _bands(self, values) -> Tuple[float, float, float]:
+        mean = sum(values) / self.period
+        std = (sum((v - mean) ** 2 for v in values) / (self.period - 1)) ** 0.5
+        return mean + std * self.std_dev, mean, mean - std * self.std_dev
+
+    def peek(self, bar: Any) -> Optional[Tuple[float, float, float]]:
+        if len(self.window) + 1 < self.period:
+            return None
+        values = list(self.window)[-(self.period - 1):] if self.period > 1 else []
+        values.append(_field(bar, 'close'))
+        return self._bands(values)
+
+    def update(self, bar: Any) -> Optional[Tuple[float, float, float]]:
+        self.window.append(_field(bar, 'close'))
+        if len(self.window) == self.period:
+            self.value = self._bands(self.window)
+        return self.value
+
+    @classmethod
+    def batch(cls, close, period: int = 20, std_dev: float = 2.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        values = np.asarray(close, dtype=float)
+        middle = _nan_array(len(values))
+        std = _nan_array(len(values))
+        if len(values) >= period:
+            windows = sliding_window_view(values, period)
+            middle[period - 1:] = windows.mean(axis=1)
+            std[period - 1:] = windows.std(axis=1, ddof=1)
+        return middle + std * std_dev, middle, middle - std * std_dev
+
+
+def _true_range(high: float, low: float, previous_close: Optional[float]) -> float:
+    if previous_close is None:
+        return high - low
+    return max(high - low, abs(high - previous_close), abs(low - previous_close))
+
+
+class ATR:
+    """Average True Range (simple rolling mean of the true range)"""
+    __slots__ = ('period', 'previous_close', 'ranges', 'value')
+
+    def __init__(self, period: int = 14):
+        self.period = period
+        self.previous_close: Optional[float] = None
+        self.ranges = deque(maxlen=period)
+        self.value: Optional[float] = None
+
+    def peek(self, bar: Any) -> Optional[float]:
+        if len(self.ranges) + 1 < self.period:
+            return None
+        tr = _true_range(_field(bar, 'high'), _field(bar, 'low'), self.previous_close)
+        ranges = list(self.ranges)[-(self.period - 1):] if self.period > 1 else []
+        return (sum(ranges) + tr) / self.period
+
+    def update(self, bar: Any) -> Optional[float]:
+        self.ranges.append(_true_range(_field(bar, 'high'), _field(bar, 'low'), self.previous_close))
+        self.previous_close = _field(bar, 'close')
+        if len(self.ranges) == self.period:
+            self.value = sum(self.ranges) / self.period
+        return self.value
+
+    @classmethod
+    def batch(cls, high, low, close, period: int = 14) -> np.ndarray:
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        tr = high - low
+        if len(close) > 1:
+            previous = close[:-1]
+            tr[1:] = np.maximum(tr[1:], np.maximum(np.abs(high[1:] - previous), np.abs(low[1:] - previous)))
+        return _rolling_mean(tr, period)
+
+
+class Stochastic:
+    """Stochastic oscillator (%K, %D); extremes are tracked with monotonic deques"""
+    __slots__ = ('k_period', 'd_period', 'index', 'lows', 'highs', 'k_values', 'value')
+
+    def __init__(self, k_period: int = 14, d_period: int = 3):
+        self.k_period = k_period
+        self.d_period = d_period
+        self.index = 0
+        self.lows = deque()   # (index, low) with increasing lows
+        self.highs = deque()  # (index, high) with decreasing highs
+        self.k_values = deque(maxlen=d_period)
+        self.value: Optional[Tuple[Optional[float], Optional[float]]] = None
+
+    def _k(self, close: float, lowest: float, highest: float) -> Optional[float]:
+        if highest == lowest:
+            return None
+        return 100 * ((close - lowest) / (highest - lowest))
+
+    def _d(self, k_values) -> Optional[float]:
+        if len(k_values) < self.d_period or any(k is None for k in k_values):
+            return None
+        return sum(k_values) / self.d_period
+
+    def peek(self, bar: Any) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        if self.index + 1 < self.k_period:
+            return None
+        low, high, close = _field(bar, 'low'), _field(bar, 'high'), _field(bar, 'close')
+        oldest = self.index - self.k_period + 1
+        lowest = min([l for i, l in self.lows if i >= oldest] + [low])
+        highest = max([h for i, h in self.highs if i >= oldest] + [high])
+        k = self._k(close, lowest, highest)
+        k_values = list(self.k_values)[-(self.d_period - 1):] if self.d_period > 1 else []
+        k_values.append(k)
+        return k, self._d(k_values)
+
+    def update(self, bar: Any) -> Optional[Tuple[Optional[float], Optional[float]]]:
+        low, high, close = _field(bar, 'low'), _field(bar, 'high'), _field(bar, 'close')
+        while self.lows and self.lows[-1][1] >= low:
+            self.lows.pop()
+        self.lows.append((self.index, low))
+        while self.highs and self.highs[-1][1] <= high:
+            self.highs.pop()
+        self.highs.append((self.index, high))
+        oldest = self.index - self.k_period + 1
+        while self.lows[0][0] < oldest:
+            self.lows.popleft()
+        while self.highs[0][0] < oldest:
+            self.highs.popleft()
+        self.index += 1
+        if self.index < self.k_period:
+            return self.value
+        k = self._k(close, self.lows[0][1], self.highs[0][1])
+        self.k_values.append(k)
+        self.value = (k, self._d(self.k_values))
+        return self.value
+
+    @classmethod
+    def batch(cls, high, low, close, k_period: int = 14, d_period: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        high = np.asarray(high, dtype=float)
+        low = np.asarray(low, dtype=float)
+        close = np.asarray(close, dtype=float)
+        k = _nan_array(len(close))
+        if len(close) >= k_period:
+            lowest = sliding_window_view(low, k_period).min(axis=1)
+            highest = sliding_window_view(high, k_period).max(axis=1)
+            span = highest - lowest
+            with np.errstate(divide='ignore', invalid='ignore'):
+                k[k_period - 1:] = np.where(span == 0, np.nan, 100 * ((close[k_period - 1:] - lowest) / span))
+        return k, _rolling_mean(k, d_period)
+
+
+class OBV:
+    """On-Balance Volume"""
+    __slots__ = ('previous_close', 'value')
+
+    def __init__(self):
+        self.previous_close: Optional[float] = None
+        self.value = 0.0
+
+    def peek(self, bar: Any) -> float:
+        close = _field(bar, 'close')
+        if self.previous_close is None:
+            return self.value
+        return self.value + _field(bar, 'volume') * float(np.sign(close - self.previous_close))
+
+    def update(self, bar: Any) -> float:
+        self.value = self.peek(bar)
+        self.previous_close = _field(bar, 'close')
+        return self.value
+
+    @classmethod
+    def batch(cls, close, volume) -> np.ndarray:
+        close = np.asarray(close, dtype=float)
+        volume = np.asarray(volume, dtype=float)
+        change = np.zeros(len(close))
+        change[1:] = np.sign(np.diff(close))
+        return np.cumsum(volume * change)
+
+
+PATTERN_NAMES = ('bullish', 'bearish', 'doji', 'hammer', 'shooting_star', 'bullish_engulfing', 'bearish_engulfing')
+
+
+class CandlePatterns:
+    """Candlestick pattern flags for the latest bar (same rules as identify_candlestick_patterns)"""
+    __slots__ = ('previous', 'value')
+
+    def __init__(self):
+        self.previous: Optional[Tuple[float, float, float]] = None  # (open, close, body)
+        self.value: Optional[Dict[str, bool]] = None
+
+    def peek(self, bar: Any) -> Dict[str, bool]:
+        o, h, l, c = _field(bar, 'open'), _field(bar, 'high'), _field(bar, 'low'), _field(bar, 'close')
+        body = abs(c - o)
+        upper_shadow = h - max(o, c)
+        lower_shadow = min(o, c) - l
+        candle_range = h - l
+        flags = {
+            'bullish': c > o,
+            'bearish': c < o,
+            'doji': body < candle_range * 0.1,
+            'hammer': body < candle_range * 0.3 and lower_shadow > body * 2 and upper_shadow < body,
+            'shooting_star': body < candle_range * 0.3 and upper_shadow > body * 2 and lower_shadow < body,
+            'bullish_engulfing': False,
+            'bearish_engulfing': False,
+        }
+        if self.previous is not None:
+            prev_open, prev_close, prev_body = self.previous
+            flags['bullish_engulfing'] = c > prev_open and o < prev_close and body > prev_body * 1.1
+            flags['bearish_engulfing'] = c < prev_open and o > prev_close and body > prev_body * 1.1
+        return flags
+
+    def update(self, bar: Any) -> Dict[str, bool]:
+        self.value = self.peek(bar)
+        o, c = _field(bar, 'open'), _field(bar, 'close')
+        self.previous = (o, c, abs(c - o))
+        return self.value
+
+    @classmethod
+    def batch(cls, open_, high, low, close) -> Dict[str, np.ndarray]:
+        o = np.asarray(open_, dtype=float)
+        h = np.asarray(high, dtype=float)
+        l = np.asarray(low, dtype=float)
+        c = np.asarray(close, dtype=float)
+        body = np.abs(c - o)
+        upper_shadow = h - np.maximum(o, c)
+        lower_shadow = np.minimum(o, c) - l
+        candle_range = h - l
+        patterns = {
+            'bullish': c > o,
+            'bearish': c < o,
+            'doji': body < candle_range * 0.1,
+            'hammer': (body < candle_range * 0.3) & (lower_shadow > body * 2) & (upper_shadow < body),
+            'shooting_star': (body < candle_range * 0.3) & (upper_shadow > body * 2) & (lower_shadow < body),
+            'bullish_engulfing': np.zeros(len(c), dtype=bool),
+            'bearish_engulfing': np.zeros(len(c), dtype=bool),
+        }
+        if len(c) > 1:
+            patterns['bullish_engulfing'][1:] = (c[1:] > o[:-1]) & (o[1:] < c[:-1]) & (body[1:] > body[:-1] * 1.1)
+            patterns['bearish_engulfing'][1:] = (c[1:] < o[:-1]) & (o[1:] > c[:-1]) & (body[1:] > body[:-1] * 1.1)
+        return patterns
+
+
+__all__ = [
+    'SMA', 'EMA', 'WMA', 'RSI', 'MACD', 'BollingerBands', 'ATR', 'Stochastic', 'OBV',
+    'CandlePatterns', 'PATTERN_NAMES',
+]
@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useRef } from 'react';
 import { io, Socket } from 'socket.io-client';
+import { applyStrategyUpdate, StrategyUpdateState } from '../strategyUpdates';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, Area, AreaChart, ReferenceLine } from 'recharts';
 
 interface EnhancedRealTimeStrategyMonitorProps {
@@ -137,18 +138,28 @@ const EnhancedRealTimeStrategyMonitor: React.FC<EnhancedRealTimeStrategyMonitorP
       newSocket.emit('subscribe_market_data', { strategy_id: strategyId });
     });
 
-    // Strategy updates
-    newSocket.on('strategy_update', (data: {
-      strategy_id: string;
-      metrics: StrategyMetrics;
-      log?: StrategyLog;
-      logic_status?: StrategyLogic[];
-      historical_candles?: any[];
-      signal_candle_high?: number;
-      signal_candle_low?: number;
-      pe_break_level?: number | null;
-      ce_break_level?: number | null;
-    }) => {
+    // Strategy updates: a snapshot followed by sequence-numbered deltas
+    let updateState: StrategyUpdateState | null = null;
+    newSocket.on('strategy_update', (message: any) => {
+      if (String(message.strategy_id) !== String(strategyId)) return;
+      const next = applyStrategyUpdate(updateState, message);
+      if (!next) {
+        // Missed a delta: ask for a fresh snapshot
+        newSocket.emit('strategy_resync', { strategy_id: strategyId });
+        return;
+      }
+      updateState = next;
+      const data: {
+        strategy_id: string;
+        metrics: StrategyMetrics;
+        log?: StrategyLog;
+        logic_status?: StrategyLogic[];
+        historical_candles?: any[];
+        signal_candle_high?: number;
+        signal_candle_low?: number;
+        pe_break_level?: number | null;
+        ce_break_level?: number | null;
+      } = next.payload;
       if (data.strategy_id === strategyId) {
         // Ensure metrics values are numbers
         const parseMetricValue = (val: any): number => {
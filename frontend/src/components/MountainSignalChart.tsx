@@ -1,5 +1,6 @@
 import React, { useState, useEffect, useMemo, useCallback, useRef } from 'react';
 import { ComposedChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer, ReferenceLine, Customized, XAxisProps, YAxisProps } from 'recharts';
+import { useBackgroundJob } from './useBackgroundJob';
 
 interface Strategy {
   id: number;
@@ -528,6 +529,33 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
     };
   } | null>(null);
 
+  // Backtests and optimizer runs execute as background jobs, so they survive a page reload
+  const backtestJob = useBackgroundJob(
+    'backtest_mountain_signal',
+    (body) => {
+      setBacktestResults(body);
+      setBacktestLoading(false);
+    },
+    (message) => {
+      setBacktestError(message);
+      setBacktestLoading(false);
+    }
+  );
+  const optimizerJob = useBackgroundJob(
+    'optimizer_mountain_signal',
+    (body) => {
+      const { status, ...payload } = body;
+      setOptimizerResults(payload as OptimizerResults);
+      setOptimizerLoading(false);
+    },
+    (message) => {
+      setOptimizerError(message);
+      setOptimizerLoading(false);
+    }
+  );
+  const backtestBusy = backtestLoading || backtestJob.running;
+  const optimizerBusy = optimizerLoading || optimizerJob.running;
+
   const emaPeriod = strategy.ema_period || 5;
   const candleTime = parseInt(strategy.candle_time) || 5;
   const instrument = strategy.instrument; // NIFTY or BANKNIFTY
@@ -609,40 +637,21 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
     setOptimizerError(null);
 
     try {
-      const response = await fetch('http://localhost:8000/api/optimizer_mountain_signal', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        credentials: 'include',
-        body: JSON.stringify({
-          strategy_id: strategy.id,
-          from_date: optimizerFromDate,
-          to_date: optimizerToDate,
-          instrument: strategy.instrument,
-          candle_time: strategy.candle_time,
-          ema_period: strategy.ema_period || 5,
-          option_stop_loss_percent: optimizerStopLossPercent,
-          option_target_percent: optimizerTargetPercent,
-          initial_investment: optimizerInitialInvestment,
-        }),
+      // Results arrive through the optimizerJob callbacks
+      await optimizerJob.submit({
+        strategy_id: strategy.id,
+        from_date: optimizerFromDate,
+        to_date: optimizerToDate,
+        instrument: strategy.instrument,
+        candle_time: strategy.candle_time,
+        ema_period: strategy.ema_period || 5,
+        option_stop_loss_percent: optimizerStopLossPercent,
+        option_target_percent: optimizerTargetPercent,
+        initial_investment: optimizerInitialInvestment,
       });
-
-      if (!response.ok) {
-        throw new Error('Failed to optimize strategy');
-      }
-
-      const data = await response.json();
-      if (data.status === 'success') {
-        const { status, ...payload } = data;
-        setOptimizerResults(payload as OptimizerResults);
-      } else {
-        throw new Error(data.message || 'Optimization failed');
-      }
     } catch (err) {
       console.error('Error running optimizer:', err);
       setOptimizerError(err instanceof Error ? err.message : 'An error occurred while running optimizer');
-    } finally {
       setOptimizerLoading(false);
     }
   };
@@ -1805,36 +1814,18 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
     setBacktestResults(null);
 
     try {
-      const response = await fetch('http://localhost:8000/api/backtest_mountain_signal', {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        credentials: 'include',
-        body: JSON.stringify({
-          strategy_id: strategy.id,
-          from_date: backtestFromDate,
-          to_date: backtestToDate,
-          instrument: strategy.instrument,
-          candle_time: strategy.candle_time,
-          ema_period: strategy.ema_period || 5,
-        }),
+      // Results arrive through the backtestJob callbacks
+      await backtestJob.submit({
+        strategy_id: strategy.id,
+        from_date: backtestFromDate,
+        to_date: backtestToDate,
+        instrument: strategy.instrument,
+        candle_time: strategy.candle_time,
+        ema_period: strategy.ema_period || 5,
       });
-
-      if (!response.ok) {
-        throw new Error('Failed to run backtest');
-      }
-
-      const data = await response.json();
-      if (data.status === 'success') {
-        setBacktestResults(data);
-      } else {
-        throw new Error(data.message || 'Backtest failed');
-      }
     } catch (err) {
       console.error('Error running backtest:', err);
       setBacktestError(err instanceof Error ? err.message : 'An error occurred while running backtest');
-    } finally {
       setBacktestLoading(false);
     }
   };
@@ -1882,12 +1873,12 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
                 <button
                   className="btn btn-primary w-100"
                   onClick={runBacktest}
-                  disabled={backtestLoading || !backtestFromDate || !backtestToDate}
+                  disabled={backtestBusy || !backtestFromDate || !backtestToDate}
                 >
-                  {backtestLoading ? (
+                  {backtestBusy ? (
                     <>
                       <span className="spinner-border spinner-border-sm me-2" role="status"></span>
-                      Running...
+                      Running{backtestJob.job && backtestJob.running ? ` ${Math.round(backtestJob.job.progress * 100)}%` : ''}...
                     </>
                   ) : (
                     <>
@@ -2720,7 +2711,7 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
                     setOptimizerTargetPercent(Number(defaultTargetPercent.toFixed(2)));
                     setOptimizerInitialInvestment(100000);
                   }}
-                  disabled={optimizerLoading}
+                  disabled={optimizerBusy}
                 >
                   <i className="bi bi-arrow-counterclockwise me-2"></i>Reset Parameters
                 </button>
@@ -2730,12 +2721,12 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
                 <button
                   className="btn btn-primary w-100"
                   onClick={runOptimizer}
-                  disabled={optimizerLoading || !optimizerFromDate || !optimizerToDate}
+                  disabled={optimizerBusy || !optimizerFromDate || !optimizerToDate}
                 >
-                  {optimizerLoading ? (
+                  {optimizerBusy ? (
                     <>
                       <span className="spinner-border spinner-border-sm me-2" role="status"></span>
-                      Running...
+                      Running{optimizerJob.job && optimizerJob.running ? ` ${Math.round(optimizerJob.job.progress * 100)}%` : ''}...
                     </>
                   ) : (
                     <>
@@ -2769,7 +2760,7 @@ const MountainSignalChart: React.FC<MountainSignalChartProps> = ({ strategy, act
               </>
             )}
 
-            {!optimizerResults && !optimizerLoading && (
+            {!optimizerResults && !optimizerBusy && (
               <div className="alert alert-info border-0 bg-info bg-opacity-10">
                 <i className="bi bi-lightbulb me-2"></i>
                 Select a date range and adjust the stop loss / target percentages, then click <strong>Run Optimizer</strong> to view results.
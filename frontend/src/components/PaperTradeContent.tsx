@@ -96,14 +96,22 @@ const PaperTradeContent: React.FC<PaperTradeContentProps> = () => {
   useEffect(() => {
     if (!selectedSessionId || viewMode !== 'historical') return;
 
+    let cancelled = false;
     const fetchAuditTrail = async () => {
       try {
-        const response = await fetch(`http://localhost:8000/api/paper_trade/audit_trail/${selectedSessionId}`, {
-          credentials: 'include'
-        });
-        const data = await response.json();
-        if (response.ok && data.status === 'success') {
-          setAuditLogs(data.audit_logs || []);
+        // The endpoint is keyset-paged: keep requesting after the last id until has_more is false
+        let logs: AuditLog[] = [];
+        let after = 0;
+        while (!cancelled) {
+          const response = await fetch(`http://localhost:8000/api/paper_trade/audit_trail/${selectedSessionId}?after=${after}`, {
+            credentials: 'include'
+          });
+          const data = await response.json();
+          if (!response.ok || data.status !== 'success') break;
+          logs = logs.concat(data.audit_logs || []);
+          if (!cancelled) setAuditLogs(logs);
+          if (!data.has_more) break;
+          after = data.next_cursor;
         }
       } catch (error) {
         console.error('Error fetching audit trail:', error);
@@ -111,6 +119,9 @@ const PaperTradeContent: React.FC<PaperTradeContentProps> = () => {
     };
 
     fetchAuditTrail();
+    return () => {
+      cancelled = true;
+    };
   }, [selectedSessionId, viewMode]);
 
   // Fetch strategies
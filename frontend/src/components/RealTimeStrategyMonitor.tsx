@@ -1,5 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { io, Socket } from 'socket.io-client';
+import { applyStrategyUpdate, StrategyUpdateState } from '../strategyUpdates';
 import { LineChart, Line, XAxis, YAxis, CartesianGrid, Tooltip, Legend, ResponsiveContainer } from 'recharts';
 
 interface RealTimeStrategyMonitorProps {
@@ -44,11 +45,21 @@ const RealTimeStrategyMonitor: React.FC<RealTimeStrategyMonitorProps> = ({ strat
       newSocket.emit('subscribe_strategy', { strategy_id: strategyId });
     });
 
-    newSocket.on('strategy_update', (data: {
-      strategy_id: string;
-      metrics: LiveMetrics;
-      log: StrategyLog;
-    }) => {
+    let updateState: StrategyUpdateState | null = null;
+    newSocket.on('strategy_update', (message: any) => {
+      if (String(message.strategy_id) !== String(strategyId)) return;
+      const next = applyStrategyUpdate(updateState, message);
+      if (!next) {
+        // Missed a delta: ask for a fresh snapshot
+        newSocket.emit('strategy_resync', { strategy_id: strategyId });
+        return;
+      }
+      updateState = next;
+      const data: {
+        strategy_id: string;
+        metrics: LiveMetrics;
+        log: StrategyLog;
+      } = next.payload;
       if (data.strategy_id === strategyId) {
         setLiveMetrics(data.metrics);
         if (data.log) {
@@ -0,0 +1,153 @@
+import { useCallback, useEffect, useRef, useState } from 'react';
+import { io, Socket } from 'socket.io-client';
+
+const API_BASE_URL = 'http://localhost:8000';
+
+export interface BackgroundJob {
+  id: string;
+  kind: string;
+  status: 'queued' | 'running' | 'succeeded' | 'failed' | 'cancelled';
+  progress: number;
+  message: string | null;
+  errorMessage: string | null;
+  params: Record<string, any>;
+  createdAt: string | null;
+  startedAt: string | null;
+  finishedAt: string | null;
+  hasResult: boolean;
+}
+
+const FINISHED_STATUSES = ['succeeded', 'failed', 'cancelled'];
+
+/**
+ * Run a backtest / optimizer request as a background job (POST /api/jobs).
+ *
+ * Progress arrives as job_update events in the user's jobs room. The id of the
+ * last job of each kind is kept in localStorage, so after a reload the hook
+ * resumes a job that is still active or loads the result of one that finished
+ * while the page was away.
+ */
+export function useBackgroundJob(
+  kind: string,
+  onResult: (body: any) => void,
+  onError: (message: string) => void
+) {
+  const [job, setJob] = useState<BackgroundJob | null>(null);
+  const jobIdRef = useRef<string | null>(null);
+  const settledRef = useRef<Set<string>>(new Set());
+  const latestRef = useRef<Map<string, BackgroundJob>>(new Map());
+  const onResultRef = useRef(onResult);
+  const onErrorRef = useRef(onError);
+  onResultRef.current = onResult;
+  onErrorRef.current = onError;
+  const storageKey = `backgroundJob:${kind}`;
+
+  const settle = useCallback(async (update: BackgroundJob) => {
+    if (!FINISHED_STATUSES.includes(update.status) || settledRef.current.has(update.id)) {
+      return;
+    }
+    settledRef.current.add(update.id);
+    localStorage.removeItem(storageKey);
+    if (update.status === 'cancelled') {
+      onErrorRef.current('Job cancelled');
+      return;
+    }
+    if (!update.hasResult) {
+      onErrorRef.current(update.errorMessage || 'Job failed');
+      return;
+    }
+    try {
+      const response = await fetch(`${API_BASE_URL}/api/jobs/${update.id}/result`, { credentials: 'include' });
+      const body = await response.json();
+      if (response.ok && body.status === 'success') {
+        onResultRef.current(body);
+      } else {
+        onErrorRef.current(body.message || update.errorMessage || 'Job failed');
+      }
+    } catch (err) {
+      onErrorRef.current(err instanceof Error ? err.message : 'Failed to load job result');
+    }
+  }, [storageKey]);
+
+  const track = useCallback((update: BackgroundJob) => {
+    if (update.kind !== kind || (jobIdRef.current && update.id !== jobIdRef.current)) {
+      return;
+    }
+    jobIdRef.current = update.id;
+    setJob(update);
+    settle(update);
+  }, [kind, settle]);
+
+  useEffect(() => {
+    const socket: Socket = io(API_BASE_URL, { transports: ['polling'], withCredentials: true });
+
+    socket.on('connect', () => {
+      socket.emit('subscribe_jobs');
+    });
+
+    socket.on('job_snapshot', (data: { jobs: BackgroundJob[] }) => {
+      const storedId = localStorage.getItem(storageKey);
+      const active = (data.jobs || []).find((item) => item.kind === kind && (!storedId || item.id === storedId));
+      if (active) {
+        track(active);
+      }
+    });
+
+    socket.on('job_update', (update: BackgroundJob) => {
+      // Updates can arrive before the POST /api/jobs response; keep them for submit()
+      latestRef.current.set(update.id, update);
+      track(update);
+    });
+
+    // A job that finished while the page was closed is not in the snapshot; load it directly
+    const storedId = localStorage.getItem(storageKey);
+    if (storedId) {
+      fetch(`${API_BASE_URL}/api/jobs/${storedId}`, { credentials: 'include' })
+        .then((response) => (response.ok ? response.json() : null))
+        .then((data) => {
+          if (data && data.status === 'success') {
+            track(data.job);
+          } else {
+            localStorage.removeItem(storageKey);
+          }
+        })
+        .catch((err) => console.error('Error resuming background job:', err));
+    }
+
+    return () => {
+      socket.disconnect();
+    };
+  }, [kind, storageKey, track]);
+
+  const submit = useCallback(async (params: Record<string, any>) => {
+    const response = await fetch(`${API_BASE_URL}/api/jobs`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      credentials: 'include',
+      body: JSON.stringify({ kind, params }),
+    });
+    const data = await response.json();
+    if (!response.ok || data.status !== 'success') {
+      throw new Error(data.message || 'Failed to submit job');
+    }
+    jobIdRef.current = data.job.id;
+    localStorage.setItem(storageKey, data.job.id);
+    track(latestRef.current.get(data.job.id) || data.job);
+    return data.job as BackgroundJob;
+  }, [kind, storageKey, track]);
+
+  const cancel = useCallback(async () => {
+    if (!jobIdRef.current) {
+      return;
+    }
+    await fetch(`${API_BASE_URL}/api/jobs/${jobIdRef.current}/cancel`, {
+      method: 'POST',
+      credentials: 'include',
+    });
+  }, []);
+
+  const running = job !== null && !FINISHED_STATUSES.includes(job.status);
+  return { job, running, submit, cancel };
+}
@@ -0,0 +1,57 @@
+// Client side of the versioned strategy_update protocol (see backend/strategy_stream.py).
+// The server sends a full snapshot first and sequence-numbered deltas afterwards.
+
+export interface StrategyUpdateState {
+  seq: number;
+  payload: any;
+}
+
+const AUDIT_WINDOW = 50;
+const PROTOCOL_FIELDS = ['type', 'version', 'seq'];
+
+/**
+ * Apply a strategy_update message to the current state.
+ * Returns the new state, or null when a delta cannot be applied (no snapshot yet or a
+ * sequence gap) and the caller should emit `strategy_resync`.
+ */
+export function applyStrategyUpdate(state: StrategyUpdateState | null, message: any): StrategyUpdateState | null {
+  if (!message || message.type === undefined) {
+    // Pre-protocol server: every message is a full payload
+    return { seq: state ? state.seq : 0, payload: message };
+  }
+
+  if (message.type === 'snapshot') {
+    // Snapshots are always authoritative (the server may have restarted the stream)
+    const payload = { ...message };
+    PROTOCOL_FIELDS.forEach((key) => delete payload[key]);
+    return { seq: message.seq, payload };
+  }
+
+  if (!state || message.seq !== state.seq + 1) {
+    return null;
+  }
+
+  const { metrics, audit_append, candles } = message;
+  const fields = { ...message };
+  [...PROTOCOL_FIELDS, 'metrics', 'audit_append', 'candles'].forEach((key) => delete fields[key]);
+  const previous = state.payload;
+  const nextMetrics = { ...(previous.metrics || {}), ...(metrics || {}) };
+  if (audit_append && audit_append.length) {
+    nextMetrics.audit_trail = [...(nextMetrics.audit_trail || []), ...audit_append].slice(-AUDIT_WINDOW);
+  }
+
+  let historical = previous.historical_candles || [];
+  if (candles) {
+    historical = historical.slice(candles.drop).slice(0, candles.from).concat(candles.items);
+  }
+
+  return {
+    seq: message.seq,
+    payload: {
+      ...previous,
+      ...fields,
+      metrics: nextMetrics,
+      historical_candles: historical,
+    },
+  };
+}